@@ -1,7 +1,8 @@
 -- 1. COMPANY
 CREATE TABLE public.company (
     id_company SERIAL PRIMARY KEY,                                                  -- SERIAL maakt automatisch 1, 2, 3... aan.
-    company_name VARCHAR NOT NULL
+    company_name VARCHAR NOT NULL,
+    storage_used_bytes BIGINT NOT NULL DEFAULT 0                                    -- Bytes aan unieke bijlagen (quota), bijgehouden door de app
 );
 
 -- 2. PROFILE
@@ -15,6 +16,7 @@ CREATE TABLE public.profile (
     password_hash TEXT NOT NULL,
     
     createdat TIMESTAMPTZ DEFAULT NOW(),       
+    deleted_at TIMESTAMPTZ,                                                    -- Gezet = verwijderd (verborgen), wordt op de achtergrond opgeruimd
 
     -- RELATIE NAAR COMPANY:
     CONSTRAINT fk_profile_company FOREIGN KEY (id_company)
@@ -28,6 +30,7 @@ CREATE TABLE public.project (
     id_company INTEGER NOT NULL,
     project_name VARCHAR NOT NULL,
     createdat TIMESTAMPTZ DEFAULT NOW(),
+    deleted_at TIMESTAMPTZ,                                                    -- Gezet = verwijderd (verborgen), wordt op de achtergrond opgeruimd
     
     -- TtV Schaling limieten (INTEGER en met DEFAULT waarden)
     ttm_low_limit INTEGER DEFAULT 0,
@@ -185,3 +188,193 @@ CREATE TABLE public.project_chat_message (
         REFERENCES public.profile (id_profile)
         ON DELETE CASCADE
 );
+
+-- 11. FEATURE_DECISION_TALLY (gematerialiseerde stemtelling, bijgewerkt in dezelfde transactie als de decision upsert)
+CREATE TABLE public.feature_decision_tally (
+    id_feature VARCHAR PRIMARY KEY,
+
+    approved INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0,
+
+    CONSTRAINT fk_tally_feature FOREIGN KEY (id_feature)
+        REFERENCES public.features_ideas (id_feature)
+        ON DELETE CASCADE                                                       -- Feature weg -> telling weg.
+);
+
+-- 12. OPTIMIZATION_RUN (bewaard resultaat van de roadmap-optimalisatie, cache op input_hash)
+CREATE TABLE public.optimization_run (
+    id_run SERIAL PRIMARY KEY,
+    id_roadmap INTEGER NOT NULL,
+    id_profile INTEGER,
+
+    input_hash VARCHAR(64) NOT NULL,                                            -- SHA-256 over feature-waarden, capaciteiten, alpha en pins
+    alpha DOUBLE PRECISION NOT NULL,
+    time_capacity DOUBLE PRECISION,
+    budget_allocation DOUBLE PRECISION,
+
+    feature_fingerprints JSON NOT NULL,                                         -- {id_feature: [vectr, uren, kosten]} voor warm starts
+    selected_feature_ids JSON NOT NULL,
+    must_include JSON NOT NULL,
+    must_exclude JSON NOT NULL,
+
+    objective_value DOUBLE PRECISION NOT NULL,
+    time_used DOUBLE PRECISION NOT NULL,
+    cost_used DOUBLE PRECISION NOT NULL,
+    solve_seconds DOUBLE PRECISION NOT NULL,
+    warm_started BOOLEAN NOT NULL,
+    createdat TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_run_roadmap FOREIGN KEY (id_roadmap)
+        REFERENCES public.roadmap (id_roadmap)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_run_profile FOREIGN KEY (id_profile)
+        REFERENCES public.profile (id_profile)
+        ON DELETE SET NULL                                                      -- Run blijft bestaan als de gebruiker verdwijnt.
+);
+
+-- 13. ROADMAP_FEATURE_PIN (must-include / must-exclude per roadmap)
+CREATE TABLE public.roadmap_feature_pin (
+    id_roadmap INTEGER NOT NULL,
+    id_feature VARCHAR NOT NULL,
+    pin VARCHAR(10) NOT NULL,                                                   -- include / exclude
+
+    PRIMARY KEY (id_roadmap, id_feature),
+    CONSTRAINT fk_pin_roadmap FOREIGN KEY (id_roadmap)
+        REFERENCES public.roadmap (id_roadmap)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_pin_feature FOREIGN KEY (id_feature)
+        REFERENCES public.features_ideas (id_feature)
+        ON DELETE CASCADE
+);
+
+-- 14. FEATURE_DEPENDENCY (precedence: id_prerequisite moet gekozen zijn vóór id_feature)
+CREATE TABLE public.feature_dependency (
+    id_feature VARCHAR NOT NULL,
+    id_prerequisite VARCHAR NOT NULL,
+    createdat TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (id_feature, id_prerequisite),
+    CONSTRAINT ck_dependency_not_self CHECK (id_feature <> id_prerequisite),   -- Cycli van lengte > 1 worden in de applicatie geweigerd
+    CONSTRAINT fk_dependency_feature FOREIGN KEY (id_feature)
+        REFERENCES public.features_ideas (id_feature)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_dependency_prerequisite FOREIGN KEY (id_prerequisite)
+        REFERENCES public.features_ideas (id_feature)
+        ON DELETE CASCADE
+);
+
+-- 15. SEARCH_DOCUMENT (full-text zoeken over features, evidence en chat, per company)
+CREATE TABLE public.search_document (
+    id_document SERIAL PRIMARY KEY,
+    kind VARCHAR(10) NOT NULL,                                                  -- feature / evidence / chat
+    ref_id VARCHAR NOT NULL,                                                    -- id van de bronrij
+    id_company INTEGER NOT NULL,
+    id_project INTEGER NOT NULL,
+    id_feature VARCHAR,
+    id_evidence INTEGER,
+    id_message INTEGER,
+    title TEXT,
+    body TEXT,
+    createdat TIMESTAMPTZ DEFAULT NOW(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (                                -- Titel weegt zwaarder dan de tekst
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED,
+
+    CONSTRAINT uq_search_document_ref UNIQUE (kind, ref_id),
+    CONSTRAINT fk_search_company FOREIGN KEY (id_company)
+        REFERENCES public.company (id_company)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_search_project FOREIGN KEY (id_project)
+        REFERENCES public.project (id_project)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_search_feature FOREIGN KEY (id_feature)
+        REFERENCES public.features_ideas (id_feature)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_search_evidence FOREIGN KEY (id_evidence)
+        REFERENCES public.evidence (id_evidence)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_search_message FOREIGN KEY (id_message)
+        REFERENCES public.project_chat_message (id_message)
+        ON DELETE CASCADE
+);
+
+-- 16. CACHE_INVALIDATION (outbox: welke project-/company-caches een commit verouderd maakte)
+CREATE TABLE public.cache_invalidation (
+    id_invalidation BIGSERIAL PRIMARY KEY,                                      -- Workers lezen alles boven hun laatst verwerkte id
+    scope VARCHAR(10) NOT NULL,                                                 -- project / company
+    key INTEGER NOT NULL,                                                       -- id_project of id_company
+    createdat TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- 17. PURGE_JOB (voortgang van het verwijderen van een project/profiel op de achtergrond)
+CREATE TABLE public.purge_job (
+    id_job SERIAL PRIMARY KEY,
+    kind VARCHAR(10) NOT NULL,                                                  -- project / profile
+    target_id INTEGER NOT NULL,                                                 -- id_project of id_profile (geen FK: die rij verdwijnt)
+    id_company INTEGER NOT NULL,
+    label VARCHAR,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',                               -- queued / running / done / failed
+    step VARCHAR(40),
+    total_rows INTEGER,
+    deleted_rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    createdat TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,                                                   -- Laatst afgewerkte blok; te oud = job overnemen
+    finished_at TIMESTAMPTZ,
+
+    CONSTRAINT fk_purge_job_company FOREIGN KEY (id_company)
+        REFERENCES public.company (id_company)
+        ON DELETE CASCADE
+);
+
+-- 18. ATTACHMENT_BLOB (één rij per unieke bestandsinhoud, bestand op schijf onder zijn SHA-256)
+CREATE TABLE public.attachment_blob (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    createdat TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 19. EVIDENCE_ATTACHMENT (bestand bij een evidence; dezelfde inhoud kan vaak voorkomen)
+CREATE TABLE public.evidence_attachment (
+    id_attachment SERIAL PRIMARY KEY,
+    id_evidence INTEGER NOT NULL UNIQUE,                                        -- Eén bijlage per evidence
+    id_company INTEGER NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    filename VARCHAR NOT NULL,
+    mimetype VARCHAR,
+    size BIGINT NOT NULL,
+    createdat TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_evidence_attachment_evidence FOREIGN KEY (id_evidence)
+        REFERENCES public.evidence (id_evidence)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_evidence_attachment_company FOREIGN KEY (id_company)
+        REFERENCES public.company (id_company)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_evidence_attachment_blob FOREIGN KEY (sha256)
+        REFERENCES public.attachment_blob (sha256)                              -- RESTRICT: inhoud blijft zolang er verwijzingen zijn
+);
+
+-- INDEXEN
+CREATE INDEX ix_evidence_feature_confidence
+    ON public.evidence (id_feature, new_confidence);                            -- SELECT max(new_confidence) per feature via index
+CREATE INDEX ix_optimization_run_roadmap_hash
+    ON public.optimization_run (id_roadmap, input_hash);                        -- Cache-lookup op identieke input
+CREATE INDEX ix_feature_dependency_prerequisite
+    ON public.feature_dependency (id_prerequisite);                             -- Opvolgers van een feature opzoeken
+CREATE INDEX ix_cache_invalidation_createdat
+    ON public.cache_invalidation (createdat);                                   -- Oude outbox-rijen opruimen
+CREATE INDEX ix_purge_job_company_status
+    ON public.purge_job (id_company, status);                                   -- Lopende verwijderingen op het projectoverzicht
+CREATE INDEX ix_evidence_attachment_company_sha
+    ON public.evidence_attachment (id_company, sha256);                         -- Verwijst de company nog naar deze inhoud? (quota)
+CREATE EXTENSION IF NOT EXISTS btree_gin;                                       -- Nodig voor een integer-kolom in een GIN-index
+CREATE INDEX ix_search_document_vector
+    ON public.search_document USING gin (id_company, search_vector);            -- Full-text zoeken binnen één company
+CREATE INDEX ix_search_document_project ON public.search_document (id_project);
+CREATE INDEX ix_search_document_feature ON public.search_document (id_feature);
+CREATE INDEX ix_search_document_evidence ON public.search_document (id_evidence);
+CREATE INDEX ix_search_document_message ON public.search_document (id_message);
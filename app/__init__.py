@@ -4,10 +4,13 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect  # NIEUW: Importeer CSRF bescherming
 from datetime import timedelta
+from jinja2 import FileSystemBytecodeCache
 from config import Config
+from app.utils.db_routing import RoutingSession, replica_binds
 
 # Objecten buiten de factory aanmaken
-db = SQLAlchemy()
+# (RoutingSession: leesqueries van GET-requests naar read replicas, zie app/utils/db_routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 csrf = CSRFProtect() # NIEUW: Maak het CSRF object aan
 
@@ -38,6 +41,10 @@ def create_app():
         SESSION_COOKIE_SECURE=not is_dev    # Staat op False bij jou lokaal, maar op True voor de prof/productie
     )
 
+    # Read replicas als extra binds (replica_0, replica_1, ...)
+    if app.config.get("SQLALCHEMY_REPLICA_URIS"):
+        app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), **replica_binds(app.config)}
+
     # 3. INITIALISATIE
     db.init_app(app)
     migrate.init_app(app, db)
@@ -48,12 +55,48 @@ def create_app():
     # in naam van jouw ingelogde gebruikers (Cross-Site Request Forgery).
     csrf.init_app(app)
 
-    # Reflecteer bestaande tabellen
+    # Jinja bytecode cache: gecompileerde templates op schijf, zodat een herstarte worker ze niet
+    # opnieuw moet compileren (een gewijzigde template heeft een andere checksum en wordt opnieuw gecompileerd)
+    if app.config.get("JINJA_BYTECODE_CACHE_DIR"):
+        os.makedirs(app.config["JINJA_BYTECODE_CACHE_DIR"], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["JINJA_BYTECODE_CACHE_DIR"])
+
+    # Reflecteer bestaande tabellen (enkel de primary, replicas hebben hetzelfde schema)
     with app.app_context():
-        db.reflect()
+        db.reflect(bind_key=None)
 
     # Blueprints registreren
     from app import routes, models
     app.register_blueprint(routes.main)
 
+    # JSON API (batch-endpoints, zie app/api.py)
+    from app.api import api
+    app.register_blueprint(api)
+
+    # CLI commando's (bijv. flask recompute-confidence --project-id 1)
+    from app.commands import register_commands
+    register_commands(app)
+
+    # Cache-invalidatie: outbox bij elke flush, listener per worker
+    from app.utils.cache_bus import init_cache_bus
+    init_cache_bus(app)
+
+    # Zoekindex (search_document) bijwerken bij elke flush
+    from app.utils.search import init_search_index
+    init_search_index(app)
+
+    # Verwijderde projecten/profielen verbergen + opruimen op de achtergrond
+    from app.utils.purge import init_purge
+    init_purge(app)
+
+    # Read-your-writes na een POST (enkel nodig met replicas)
+    if app.config.get("SQLALCHEMY_REPLICA_URIS"):
+        from app.utils.db_routing import init_read_replicas
+        init_read_replicas(app)
+
+    # Queries per request tellen (enkel voor load tests)
+    if app.config.get("QUERY_COUNT_HEADER"):
+        from app.utils.query_counter import init_query_counter
+        init_query_counter(app)
+
     return app
\ No newline at end of file
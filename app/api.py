@@ -0,0 +1,114 @@
+# app/api.py
+# JSON API met batch-endpoints: veel features, stemmen of evidence in één request.
+#
+# - Eén keer authoriseren per batch (login, rol, company van het project), niet per item.
+# - Elk item wordt gevalideerd met dezelfde regels als de HTML-formulieren en krijgt een eigen
+#   resultaat {"index", "status", ...}; met "atomic": true wordt niets geschreven zodra één item fout is.
+# - Alle geldige items gaan in één transactie met bulk-statements naar de database (app/utils/batch.py).
+# - Sessie-login zoals de rest van de app; CSRF blijft actief (token in de X-CSRFToken header).
+from flask import Blueprint, current_app, jsonify, request
+
+from app import db
+from app.models import Profile, Project
+from app.utils.batch import (
+    has_errors, validate_decisions, validate_evidence, validate_features,
+    write_decisions, write_evidence, write_features,
+)
+from app.utils.form_helpers import require_company_ownership, require_login, require_role
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+def _authorize(project_id, roles=None):
+    """:return: (user, project, None) of (None, None, foutresponse)"""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return None, None, ('', 401)
+    if roles and require_role(roles, user):
+        return None, None, ('', 403)
+    project = Project.query.get_or_404(project_id)
+    if require_company_ownership(project.id_company, user):
+        return None, None, ('', 403)
+    return user, project, None
+
+
+def _batch_items():
+    """:return: (items, atomic, None) of (None, None, foutresponse)"""
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, None, (jsonify({"errors": ["items must be a non-empty list."]}), 400)
+    max_items = current_app.config["API_BATCH_MAX_ITEMS"]
+    if len(items) > max_items:
+        return None, None, (jsonify({"errors": [f"A batch holds at most {max_items} items."]}), 413)
+    return items, bool(data.get("atomic")), None
+
+
+def _respond(results, atomic, write):
+    """Schrijft de geldige items (tenzij atomic en er fouten zijn) en commit één keer."""
+    if atomic and has_errors(results):
+        return jsonify({"written": 0, "results": results}), 400
+    write()
+    db.session.commit()
+    written = sum(1 for result in results if result["status"] != "error")
+    return jsonify({"written": written, "results": results}), (207 if has_errors(results) else 200)
+
+
+# ==============================
+# FEATURES: BATCH
+# ==============================
+@api.route("/projects/<int:project_id>/features/batch", methods=["POST"])
+def features_batch(project_id):
+    """
+    Maakt features aan (zonder id_feature) of werkt ze volledig bij (met id_feature).
+    JSON: {"items": [{"name_feature": ..., "extra_revenue": ..., ...}], "atomic": false}
+    """
+    _, project, error = _authorize(project_id, ["Founder", "PM"])
+    if error:
+        return error
+    items, atomic, error = _batch_items()
+    if error:
+        return error
+
+    results, plan = validate_features(project, items)
+    return _respond(results, atomic, lambda: write_features(project, plan))
+
+
+# ==============================
+# DECISIONS: BATCH
+# ==============================
+@api.route("/projects/<int:project_id>/decisions/batch", methods=["POST"])
+def decisions_batch(project_id):
+    """
+    Stemmen van de ingelogde gebruiker op veel features tegelijk.
+    JSON: {"items": [{"id_feature": ..., "decision": "Yes" | "No" | "Approved" | "Rejected" | "Pending"}]}
+    """
+    user, project, error = _authorize(project_id)
+    if error:
+        return error
+    items, atomic, error = _batch_items()
+    if error:
+        return error
+
+    results, votes = validate_decisions(project, items)
+    return _respond(results, atomic, lambda: write_decisions(project, user.id_profile, votes, results))
+
+
+# ==============================
+# EVIDENCE: BATCH
+# ==============================
+@api.route("/projects/<int:project_id>/evidence/batch", methods=["POST"])
+def evidence_batch(project_id):
+    """
+    Voegt evidence toe aan features van dit project (velden zoals het formulier, plus id_feature).
+    JSON: {"items": [{"id_feature": ..., "title": ..., "type_select": ..., "new_confidence": ...}]}
+    """
+    _, project, error = _authorize(project_id)
+    if error:
+        return error
+    items, atomic, error = _batch_items()
+    if error:
+        return error
+
+    results, rows = validate_evidence(project, items)
+    return _respond(results, atomic, lambda: write_evidence(project, rows, results))
@@ -0,0 +1,387 @@
+# app/asgi.py
+# ASGI-modus: dezelfde app, maar de I/O-gebonden endpoints draaien async op de event loop.
+#
+#   uvicorn asgi:app --workers 2
+#
+# - Chat (partial + long polling), live calc (ROI/TTV partials) en de feature-lijst (JSON)
+#   worden hier async bediend met een AsyncSession (asyncpg voor PostgreSQL, aiosqlite lokaal).
+#   Een wachtende chat-client kost dan geen thread, enkel een coroutine.
+# - Alle andere routes gaan ongewijzigd naar de Flask (WSGI) app, in een threadpool (a2wsgi).
+# - Login-sessie en CSRF-token worden gelezen zoals Flask/Flask-WTF ze maakten (zelfde cookie,
+#   zelfde SECRET_KEY), zodat gebruikers tussen beide soorten endpoints niets merken.
+import asyncio
+import hmac
+import io
+import json
+import re
+from collections import defaultdict
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadData, URLSafeTimedSerializer
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.formparser import parse_form_data
+from werkzeug.http import parse_cookie
+
+from app import create_app
+from app.models import Profile, Project, ProjectChatMessage
+from app.utils.calculations import calc_roi, calc_ttv
+from app.utils.feature_data import select_features
+from app.utils.payloads import chat_messages_payload, feature_list_payload
+from app.utils.scoring import SCORING_COLUMNS, ScoringRow, score_rows
+
+# sync driver -> async driver
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+ROI_FIELDS = ("extra_revenue", "churn_reduction", "cost_savings", "investment_hours", "hourly_rate", "opex", "other_costs")
+
+
+def async_database_url(url):
+    """Afgeleide async URL van DATABASE_URL (asyncpg kent 'sslmode' niet, wel 'ssl')."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        return url
+    url = url.set(drivername=driver)
+    if driver.endswith("asyncpg") and "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+# -----------------------------------
+# REQUEST / RESPONSE
+# -----------------------------------
+
+class AsyncRequest:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.body = body
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        self.args = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        self.cookies = parse_cookie(self.headers.get("cookie", ""))
+        self._form = None
+
+    @property
+    def is_secure(self):
+        return self.scope.get("scheme") == "https"
+
+    def arg_int(self, name, default=0):
+        try:
+            return int(self.args.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    @property
+    def form(self):
+        """Formulierdata (urlencoded of multipart, zoals FormData in main.js) via de Werkzeug parser."""
+        if self._form is None:
+            environ = {
+                "REQUEST_METHOD": self.method,
+                "CONTENT_TYPE": self.headers.get("content-type", ""),
+                "CONTENT_LENGTH": str(len(self.body)),
+                "wsgi.input": io.BytesIO(self.body),
+            }
+            _stream, self._form, _files = parse_form_data(environ)
+        return self._form
+
+
+async def respond(send, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    raw_headers = [(b"content-type", content_type.encode("latin-1")), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def respond_json(send, payload, status=200):
+    await respond(send, status, json.dumps(payload), content_type="application/json")
+
+
+async def redirect(send, location):
+    await respond(send, 302, b"", headers=[("location", location)])
+
+
+# -----------------------------------
+# CHAT WATCHER (LONG POLLING)
+# -----------------------------------
+
+class ChatWatcher:
+    """
+    Eén poller per project, hoe veel clients er ook wachten: één MAX(id_message)-query per
+    interval, en bij een nieuw bericht worden alle wachtende requests tegelijk gewekt.
+    """
+
+    def __init__(self, sessions, interval):
+        self.sessions = sessions
+        self.interval = interval
+        self.latest = {}
+        self.conditions = defaultdict(asyncio.Condition)
+        self.waiters = defaultdict(int)
+        self.tasks = {}
+
+    async def wait_for_message(self, project_id, after, timeout):
+        """True zodra er een bericht met id > after is, False na `timeout` seconden."""
+        condition = self.conditions[project_id]
+        self.waiters[project_id] += 1
+        if project_id not in self.tasks:
+            self.tasks[project_id] = asyncio.create_task(self._poll(project_id))
+        try:
+            async with condition:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self.latest.get(project_id, 0) > after), timeout
+                )
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiters[project_id] -= 1
+
+    async def _poll(self, project_id):
+        try:
+            while self.waiters[project_id] > 0:
+                async with self.sessions() as session:
+                    latest = (await session.execute(
+                        select(func.max(ProjectChatMessage.id_message))
+                        .where(ProjectChatMessage.id_project == project_id)
+                    )).scalar() or 0
+                if latest != self.latest.get(project_id):
+                    self.latest[project_id] = latest
+                    condition = self.conditions[project_id]
+                    async with condition:
+                        condition.notify_all()
+                await asyncio.sleep(self.interval)
+        finally:
+            self.tasks.pop(project_id, None)
+            if self.waiters[project_id] > 0:                            # net nieuwe wachtende binnengekomen
+                self.tasks[project_id] = asyncio.create_task(self._poll(project_id))
+
+    async def close(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+        self.tasks.clear()
+
+
+# -----------------------------------
+# ASGI APP
+# -----------------------------------
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.wsgi = WSGIMiddleware(flask_app, workers=config["ASGI_WSGI_THREADS"])
+        self.engine = create_async_engine(
+            config.get("ASYNC_DATABASE_URL") or async_database_url(config["SQLALCHEMY_DATABASE_URI"]),
+            pool_pre_ping=True,
+        )
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.watcher = ChatWatcher(self.sessions, config["CHAT_WATCH_INTERVAL"])
+        self.long_poll_seconds = config["CHAT_LONG_POLL_SECONDS"]
+        self.routes = [
+            ("GET", re.compile(r"^/chat/project/(\d+)/messages$"), self.chat_messages),
+            ("GET", re.compile(r"^/chat/project/(\d+)/messages\.json$"), self.chat_messages_json),
+            ("GET", re.compile(r"^/projects/(\d+)/features\.json$"), self.features_json),
+            ("POST", re.compile(r"^/features/calc/roi$"), self.calc_roi),
+            ("POST", re.compile(r"^/features/calc/ttv$"), self.calc_ttv),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] == "http":
+            for method, pattern, handler in self.routes:
+                match = pattern.match(scope["path"])
+                if match and scope["method"] == method:
+                    body = await self.read_body(receive)
+                    return await handler(AsyncRequest(scope, body), send, *map(int, match.groups()))
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.watcher.close()
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def render(self, template, **context):
+        return self.flask_app.jinja_env.get_template(template).render(**context)
+
+    # Sessie en CSRF (zelfde cookie en tokens als Flask / Flask-WTF)
+
+    def flask_session(self, request):
+        cookie = request.cookies.get(self.flask_app.config["SESSION_COOKIE_NAME"])
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        if not cookie or serializer is None:
+            return {}
+        try:
+            return serializer.loads(cookie, max_age=int(self.flask_app.permanent_session_lifetime.total_seconds()))
+        except BadData:
+            return {}
+
+    def csrf_valid(self, request):
+        config = self.flask_app.config
+        if not config.get("WTF_CSRF_ENABLED", True):
+            return True
+        field = config.get("WTF_CSRF_FIELD_NAME", "csrf_token")
+        token = request.form.get(field)
+        for header in config.get("WTF_CSRF_HEADERS", ["X-CSRFToken", "X-CSRF-Token"]):
+            token = token or request.headers.get(header.lower())
+        session_token = self.flask_session(request).get(field)
+        if not token or not session_token:
+            return False
+        serializer = URLSafeTimedSerializer(
+            config.get("WTF_CSRF_SECRET_KEY") or self.flask_app.secret_key, salt="wtf-csrf-token"
+        )
+        try:
+            raw = serializer.loads(token, max_age=config.get("WTF_CSRF_TIME_LIMIT", 3600))
+        except BadData:
+            return False
+        if not hmac.compare_digest(session_token, raw):
+            return False
+        if request.is_secure and config.get("WTF_CSRF_SSL_STRICT", True):
+            referrer = urlsplit(request.headers.get("referer", ""))
+            return referrer.scheme == "https" and referrer.netloc == request.headers.get("host")
+        return True
+
+    async def authorize(self, session, request, project_id):
+        """(user, project) of (None, None) na een al verstuurde redirect/404 (zoals require_login/ownership)."""
+        user_id = self.flask_session(request).get("user_id")
+        user = None
+        if user_id is not None:
+            user = (await session.execute(
+                select(Profile.id_profile, Profile.id_company).where(Profile.id_profile == user_id)
+            )).first()
+        if user is None:
+            return None, ("redirect", "/login")
+
+        project = (await session.execute(
+            select(
+                Project.id_project, Project.id_company,
+                Project.ttm_low_limit, Project.ttm_high_limit, Project.ttbv_low_limit, Project.ttbv_high_limit,
+            ).where(Project.id_project == project_id)
+        )).first()
+        if project is None:
+            return None, ("status", 404)
+        if project.id_company != user.id_company:
+            return None, ("redirect", "/dashboard")
+        return (user, project), None
+
+    async def deny(self, send, denial):
+        kind, value = denial
+        if kind == "redirect":
+            return await redirect(send, value)
+        return await respond(send, value, b"Not Found")
+
+    # Endpoints
+
+    async def _messages(self, session, project_id, after=None):
+        stmt = (
+            select(
+                ProjectChatMessage.id_message,
+                ProjectChatMessage.id_profile,
+                Profile.name.label("sender_name"),
+                ProjectChatMessage.content,
+                ProjectChatMessage.createdat,
+            )
+            .join(Profile, Profile.id_profile == ProjectChatMessage.id_profile)
+            .where(ProjectChatMessage.id_project == project_id)
+        )
+        if after is not None:
+            stmt = stmt.where(ProjectChatMessage.id_message > after).order_by(ProjectChatMessage.id_message.asc())
+        else:
+            stmt = stmt.order_by(ProjectChatMessage.createdat.asc())
+        return (await session.execute(stmt)).all()
+
+    async def chat_messages(self, request, send, project_id):
+        """Zelfde HTML-partial als de sync route chat_project_messages."""
+        async with self.sessions() as session:
+            allowed, denial = await self.authorize(session, request, project_id)
+            if denial:
+                return await self.deny(send, denial)
+            user, _project = allowed
+            rows = await self._messages(session, project_id)
+
+        messages = [
+            SimpleNamespace(
+                id_message=r.id_message, id_profile=r.id_profile, content=r.content, createdat=r.createdat,
+                sender=SimpleNamespace(name=r.sender_name),
+            )
+            for r in rows
+        ]
+        html = self.render("chat_messages.html", messages=messages, user=SimpleNamespace(id_profile=user.id_profile))
+        await respond(send, 200, html)
+
+    async def chat_messages_json(self, request, send, project_id):
+        """Long polling: wacht tot ?wait seconden op berichten na ?after (geen DB-connectie tijdens het wachten)."""
+        after = request.arg_int("after")
+        wait = max(0, min(request.arg_int("wait"), self.long_poll_seconds))
+
+        async with self.sessions() as session:
+            allowed, denial = await self.authorize(session, request, project_id)
+            if denial:
+                return await self.deny(send, denial)
+            user, _project = allowed
+            rows = await self._messages(session, project_id, after=after)
+
+        if not rows and wait:
+            if await self.watcher.wait_for_message(project_id, after, wait):
+                async with self.sessions() as session:
+                    rows = await self._messages(session, project_id, after=after)
+
+        await respond_json(send, chat_messages_payload(rows, user.id_profile, after=after))
+
+    async def features_json(self, request, send, project_id):
+        async with self.sessions() as session:
+            allowed, denial = await self.authorize(session, request, project_id)
+            if denial:
+                return await self.deny(send, denial)
+            _user, project = allowed
+            result = await session.execute(select_features(SCORING_COLUMNS, project_id=project_id))
+            rows = [ScoringRow(*row) for row in result]
+
+        await respond_json(send, feature_list_payload(project_id, score_rows(rows, project)))
+
+    async def calc_roi(self, request, send):
+        if not self.csrf_valid(request):
+            return await respond(send, 400, b"The CSRF token is missing or invalid.")
+        roi_percent = calc_roi(*(request.form.get(name) for name in ROI_FIELDS))
+        await respond(send, 200, self.render(
+            "features/_roi_partial.html", roi_percent=roi_percent if roi_percent is not None else 0.0
+        ))
+
+    async def calc_ttv(self, request, send):
+        if not self.csrf_valid(request):
+            return await respond(send, 400, b"The CSRF token is missing or invalid.")
+        ttv_weeks = calc_ttv(request.form.get("ttm_weeks"), request.form.get("ttbv_weeks"))
+        await respond(send, 200, self.render(
+            "features/_ttv_partial.html", ttv_weeks=ttv_weeks if ttv_weeks is not None else 0.0
+        ))
+
+
+def create_asgi_app():
+    return AsyncApp(create_app())
@@ -0,0 +1,94 @@
+# app/commands.py
+# Flask CLI commando's voor onderhoudstaken (uitvoeren via `flask <commando>`).
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.utils.form_helpers import recompute_confidence_bulk
+
+
+@click.command("recompute-confidence")
+@click.option("--project-id", type=int, default=None, help="Only features of this project.")
+@click.option("--company-id", type=int, default=None, help="All features of this company.")
+@with_appcontext
+def recompute_confidence_command(project_id, company_id):
+    """Repairs quality_score from the evidence table in one set-based UPDATE."""
+    if project_id is None and company_id is None:
+        raise click.UsageError("Provide --project-id or --company-id.")
+
+    updated = recompute_confidence_bulk(project_id=project_id, company_id=company_id)
+    click.echo(f"Recomputed confidence for {updated} feature(s).")
+
+
+@click.command("db-replicas")
+@with_appcontext
+def db_replicas_command():
+    """Shows the replication lag of each configured read replica."""
+    from app import db
+    from app.utils.db_routing import replica_monitor
+
+    rows = replica_monitor.status(db.engines, current_app.config)
+    if not rows:
+        click.echo("No read replicas configured (DATABASE_REPLICA_URLS).")
+        return
+    for key, lag, healthy in rows:
+        lag_text = "unreachable" if lag is None else f"lag {lag:.1f}s"
+        click.echo(f"{key}: {lag_text} ({'in use' if healthy else 'skipped, reads go to the primary'})")
+
+
+@click.command("search-reindex")
+@click.option("--company-id", type=int, default=None, help="Only documents of this company.")
+@with_appcontext
+def search_reindex_command(company_id):
+    """Rebuilds the full-text search index from features, evidence and chat."""
+    from app.utils.search import rebuild_search_index
+
+    total = rebuild_search_index(company_id=company_id)
+    click.echo(f"Indexed {total} search document(s).")
+
+
+@click.command("purge-run")
+@with_appcontext
+def purge_run_command():
+    """Runs queued (or abandoned) project/profile deletions in the foreground."""
+    from app.utils.purge import pending_job_ids, run_purge_job
+
+    config = current_app.config
+    job_ids = pending_job_ids(config["PURGE_STALE_SECONDS"])
+    if not job_ids:
+        click.echo("No pending deletions.")
+        return
+
+    def report(job):
+        click.echo(f"  {job.kind} {job.label!r}: {job.step or job.status} {job.deleted_rows}/{job.total_rows} ({job.percent}%)")
+
+    for job_id in job_ids:
+        job = run_purge_job(
+            job_id, chunk_size=config["PURGE_CHUNK_SIZE"], stale_seconds=config["PURGE_STALE_SECONDS"], progress=report,
+        )
+        if job is None:
+            click.echo(f"Job {job_id} is being run by another worker, skipped.")
+        else:
+            click.echo(f"Job {job_id}: {job.status}, {job.deleted_rows} row(s) deleted.")
+
+
+@click.command("attachments-gc")
+@with_appcontext
+def attachments_gc_command():
+    """Recounts attachment storage per company and deletes files no evidence refers to anymore."""
+    from app import db
+    from app.utils.attachments import collect_garbage, reconcile_storage_usage
+
+    changed = reconcile_storage_usage()
+    db.session.commit()
+    removed, freed = collect_garbage(current_app.config["ATTACHMENT_GC_GRACE_SECONDS"])
+    click.echo(f"Storage usage corrected for {changed} company(ies).")
+    click.echo(f"Removed {removed} unreferenced file(s), {freed / (1024 * 1024):.1f} MB freed.")
+
+
+def register_commands(app):
+    app.cli.add_command(recompute_confidence_command)
+    app.cli.add_command(db_replicas_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(purge_run_command)
+    app.cli.add_command(attachments_gc_command)
@@ -8,4 +8,9 @@ CONF_MAX = 10.0
 TTV_SLOW_THRESHOLD = 5.0
 TTV_MID_THRESHOLD = 7.0
 TTV_MAX = 10.0
-TTV_MIN = 0.0
\ No newline at end of file
+TTV_MIN = 0.0
+
+# Monte Carlo onzekerheid: relatieve spreiding (sigma van de lognormale ruis) van de inputs
+# bij maximale (CONF_MAX) en minimale (CONF_MIN) confidence
+MC_SPREAD_AT_MAX_CONF = 0.05
+MC_SPREAD_AT_MIN_CONF = 0.60
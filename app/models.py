@@ -1,7 +1,7 @@
 from . import db  # haal db uit __init__.py
 import datetime  # datetime importeren
 from .security import hash_password, verify_password, needs_rehash
-from sqlalchemy import desc
+from sqlalchemy import DDL, desc, event
 import uuid
 
 # ------------------------------------
@@ -32,6 +32,8 @@ class Company(db.Model):
     # Primary key
     id_company = db.Column(db.Integer, primary_key=True)
     company_name = db.Column(db.String, nullable=False)
+    # Bytes aan bijlagen (elke unieke inhoud één keer), incrementeel bijgehouden door app/utils/attachments.py
+    storage_used_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
 
     # Relaties:
     profiles = db.relationship("Profile", back_populates="company", lazy=True)      # Company (1) <---> (Many) Profile
@@ -65,6 +67,7 @@ class Profile(db.Model):
     
     #metadata
     createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)            # Tijdstip van creatie 
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)              # gezet = verwijderd, wordt op de achtergrond opgeruimd (zie app/utils/purge.py)
 
     def __repr__(self):
         return f"<Profile {self.name}>"
@@ -98,6 +101,7 @@ class Project(db.Model):
 
     project_name = db.Column(db.String, nullable=False)
     createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)    
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)              # gezet = verwijderd, wordt op de achtergrond opgeruimd (zie app/utils/purge.py)
     # TtV Schalings limiet
     ttm_low_limit = db.Column(db.Integer, nullable=True, default=0)
     ttm_high_limit = db.Column(db.Integer, nullable=True, default=10)
@@ -174,6 +178,14 @@ class Features_ideas(db.Model):
         passive_deletes=True,
     )
 
+    decision_tally = db.relationship(                                               # O(1) stemtelling i.p.v. alle decisions te tellen
+        "FeatureDecisionTally",
+        back_populates="feature",
+        uselist=False,
+        cascade="all, delete",
+        passive_deletes=True,
+    )
+
     @property                                                                       # berekeningen of database-queries uit te voeren wanneer een attribuut wordt opgevraagd
     def latest_decision(self):                                                      # haalt de meest recente Decision op basis van createdat
         return (
@@ -304,7 +316,11 @@ class Milestone(db.Model):
 # =====================================================
 class Evidence(db.Model):
     __tablename__ = "evidence"
-    __table_args__ = {"schema": "public"}
+    __table_args__ = (
+        # Index voor SELECT max(new_confidence) per feature (incrementele confidence)
+        db.Index("ix_evidence_feature_confidence", "id_feature", "new_confidence"),
+        {"schema": "public"},
+    )
 
     id_evidence = db.Column(db.Integer, primary_key=True)
 
@@ -327,6 +343,53 @@ class Evidence(db.Model):
     feature = db.relationship("Features_ideas", backref="evidence")
 
 
+# =====================================================
+# ATTACHMENTS (bestanden bij evidence, content-addressed)
+# =====================================================
+# Elke unieke inhoud staat één keer op schijf onder zijn SHA-256 (zie app/utils/attachments.py);
+# evidence_attachment verwijst ernaar met de bestandsnaam zoals de gebruiker hem uploadde.
+class AttachmentBlob(db.Model):
+    __tablename__ = "attachment_blob"
+    __table_args__ = {"schema": "public"}
+
+    sha256 = db.Column(db.String(64), primary_key=True)                                 # hex digest = bestandsnaam op schijf
+    size = db.Column(db.BigInteger, nullable=False)
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+
+class EvidenceAttachment(db.Model):
+    __tablename__ = "evidence_attachment"
+    __table_args__ = (
+        db.Index("ix_evidence_attachment_company_sha", "id_company", "sha256"),       # verwijst de company nog naar deze inhoud?
+        {"schema": "public"},
+    )
+
+    id_attachment = db.Column(db.Integer, primary_key=True)
+
+    id_evidence = db.Column(
+        db.Integer,
+        db.ForeignKey("public.evidence.id_evidence", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,                                                                    # één bijlage per evidence
+    )
+    id_company = db.Column(
+        db.Integer,
+        db.ForeignKey("public.company.id_company", ondelete="CASCADE"),
+        nullable=False,
+    )
+    sha256 = db.Column(db.String(64), db.ForeignKey("public.attachment_blob.sha256"), nullable=False)
+
+    filename = db.Column(db.String, nullable=False)
+    mimetype = db.Column(db.String)
+    size = db.Column(db.BigInteger, nullable=False)
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+    evidence = db.relationship(
+        "Evidence",
+        backref=db.backref("attachment", uselist=False, passive_deletes=True),
+    )
+
+
 # =====================================================
 # DECISION
 # =====================================================
@@ -363,6 +426,132 @@ class Decision(db.Model):
     feature = db.relationship("Features_ideas", back_populates="decisions")
     profile = db.relationship("Profile")
 
+
+# =====================================================
+# DECISION TALLY (gematerialiseerde stemtelling per feature)
+# =====================================================
+class FeatureDecisionTally(db.Model):
+    __tablename__ = "feature_decision_tally"
+    __table_args__ = {"schema": "public"}
+
+    # 1 rij per feature, bijgewerkt in dezelfde transactie als de Decision upsert
+    id_feature = db.Column(
+        db.String,
+        db.ForeignKey("public.features_ideas.id_feature", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    approved = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rejected = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    pending = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    feature = db.relationship("Features_ideas", back_populates="decision_tally")
+
+    @property
+    def total(self):
+        return (self.approved or 0) + (self.rejected or 0) + (self.pending or 0)
+
+# =====================================================
+# FEATURE DEPENDENCY (precedence: id_prerequisite moet vóór id_feature gekozen worden)
+# =====================================================
+class FeatureDependency(db.Model):
+    __tablename__ = "feature_dependency"
+    __table_args__ = (
+        db.CheckConstraint("id_feature <> id_prerequisite", name="ck_dependency_not_self"),
+        db.Index("ix_feature_dependency_prerequisite", "id_prerequisite"),
+        {"schema": "public"},
+    )
+
+    id_feature = db.Column(
+        db.String,
+        db.ForeignKey("public.features_ideas.id_feature", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    id_prerequisite = db.Column(
+        db.String,
+        db.ForeignKey("public.features_ideas.id_feature", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+    # Geen backrefs: het verwijderen van een feature laat de database de links opruimen (CASCADE)
+    feature = db.relationship("Features_ideas", foreign_keys=[id_feature])
+    prerequisite = db.relationship("Features_ideas", foreign_keys=[id_prerequisite])
+
+
+# =====================================================
+# OPTIMIZATION RUN (bewaard resultaat van roadmap_optimize)
+# =====================================================
+class OptimizationRun(db.Model):
+    __tablename__ = "optimization_run"
+    __table_args__ = (
+        db.Index("ix_optimization_run_roadmap_hash", "id_roadmap", "input_hash"),
+        {"schema": "public"},
+    )
+
+    id_run = db.Column(db.Integer, primary_key=True)
+
+    id_roadmap = db.Column(
+        db.Integer,
+        db.ForeignKey("public.roadmap.id_roadmap", ondelete="CASCADE"),
+        nullable=False,
+    )
+    id_profile = db.Column(
+        db.Integer,
+        db.ForeignKey("public.profile.id_profile", ondelete="SET NULL"),
+        nullable=True,
+    )
+
+    # SHA-256 over feature-waarden, capaciteiten, alpha en pins: identieke input -> zelfde hash
+    input_hash = db.Column(db.String(64), nullable=False)
+    alpha = db.Column(db.Float, nullable=False)
+    time_capacity = db.Column(db.Float)
+    budget_allocation = db.Column(db.Float)
+
+    # Per feature een vingerafdruk (waarde/uren/kosten), nodig om een warm start te bepalen
+    feature_fingerprints = db.Column(db.JSON, nullable=False, default=dict)
+    selected_feature_ids = db.Column(db.JSON, nullable=False, default=list)
+    must_include = db.Column(db.JSON, nullable=False, default=list)
+    must_exclude = db.Column(db.JSON, nullable=False, default=list)
+
+    objective_value = db.Column(db.Float, nullable=False, default=0.0)
+    time_used = db.Column(db.Float, nullable=False, default=0.0)
+    cost_used = db.Column(db.Float, nullable=False, default=0.0)
+    solve_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    warm_started = db.Column(db.Boolean, nullable=False, default=False)
+
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+    roadmap = db.relationship(
+        "Roadmap",
+        backref=db.backref("optimization_runs", cascade="all, delete-orphan", passive_deletes=True),
+    )
+    profile = db.relationship("Profile")
+
+
+# =====================================================
+# ROADMAP FEATURE PIN (must-include / must-exclude per roadmap)
+# =====================================================
+PIN_TYPES = ("include", "exclude")
+
+class RoadmapFeaturePin(db.Model):
+    __tablename__ = "roadmap_feature_pin"
+    __table_args__ = {"schema": "public"}
+
+    id_roadmap = db.Column(
+        db.Integer,
+        db.ForeignKey("public.roadmap.id_roadmap", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    id_feature = db.Column(
+        db.String,
+        db.ForeignKey("public.features_ideas.id_feature", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    pin = db.Column(db.String(10), nullable=False)                                      # include / exclude
+
+
 # =====================================================
 # PROJECT CHAT MESSAGE
 # =====================================================
@@ -389,3 +578,162 @@ class ProjectChatMessage(db.Model):
 
     sender = db.relationship("Profile")
     project = db.relationship("Project")
+
+
+# =====================================================
+# CACHE INVALIDATION (outbox voor de caches van alle workers)
+# =====================================================
+# Elke transactie die features, projecten, ... wijzigt schrijft hier in dezelfde commit welke
+# sleutels (project X, company Y) verouderd zijn. Alle workers lezen deze rijen (na een NOTIFY
+# op PostgreSQL, anders door te pollen) en vergeten hun cache-entries voor die sleutels.
+# Zie app/utils/cache_bus.py.
+CACHE_SCOPES = ("project", "company")
+
+class CacheInvalidation(db.Model):
+    __tablename__ = "cache_invalidation"
+    __table_args__ = (
+        db.Index("ix_cache_invalidation_createdat", "createdat"),                   # opruimen van oude rijen
+        # SQLite: ids nooit hergebruiken, ook niet als de tabel na het opruimen leeg is
+        {"schema": "public", "sqlite_autoincrement": True},
+    )
+
+    id_invalidation = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)                                    # project / company
+    key = db.Column(db.Integer, nullable=False)                                         # id_project of id_company
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+
+
+# =====================================================
+# PURGE JOB (achtergrond-verwijdering van projecten en profielen)
+# =====================================================
+# Een verwijderd project/profiel krijgt meteen deleted_at (en is dan overal verborgen); de rijen
+# eronder worden daarna in blokken verwijderd. Deze tabel houdt de voortgang bij.
+PURGE_KINDS = ("project", "profile")
+PURGE_STATUSES = ("queued", "running", "done", "failed")
+
+class PurgeJob(db.Model):
+    __tablename__ = "purge_job"
+    __table_args__ = (
+        db.Index("ix_purge_job_company_status", "id_company", "status"),
+        {"schema": "public"},
+    )
+
+    id_job = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(10), nullable=False)                                     # project / profile
+    target_id = db.Column(db.Integer, nullable=False)                                   # id_project of id_profile (geen FK: de rij verdwijnt)
+    id_company = db.Column(
+        db.Integer,
+        db.ForeignKey("public.company.id_company", ondelete="CASCADE"),
+        nullable=False,
+    )
+    label = db.Column(db.String)                                                        # naam, voor de voortgang in de UI
+
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    step = db.Column(db.String(40))                                                     # tabel die nu geleegd wordt
+    total_rows = db.Column(db.Integer)                                                  # te verwijderen rijen (geschat bij de start)
+    deleted_rows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime(timezone=True))
+    heartbeat_at = db.Column(db.DateTime(timezone=True))                                # laatst afgewerkte blok; oud = worker gestopt
+    finished_at = db.Column(db.DateTime(timezone=True))
+
+    @property
+    def percent(self):
+        if self.status == "done":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.deleted_rows * 100 / self.total_rows), 99)
+
+# =====================================================
+# SEARCH DOCUMENT (full-text index over features, evidence en chat)
+# =====================================================
+# Eén rij per doorzoekbaar object, met company en project al ingevuld (zoeken = één tabel, geen joins).
+# Bijgehouden bij elke flush (app/utils/search.py). De eigenlijke index hangt af van de database:
+# - PostgreSQL: gegenereerde tsvector-kolom (titel gewicht A, tekst gewicht B) + GIN (id_company, tsvector)
+# - SQLite (lokaal/tests): FTS5 tabel met de search_document rijen als content, via triggers bijgewerkt
+SEARCH_KINDS = ("feature", "evidence", "chat")
+
+class SearchDocument(db.Model):
+    __tablename__ = "search_document"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "ref_id", name="uq_search_document_ref"),
+        # FK-kolommen: cascades vanuit project/feature/evidence/bericht zonder seq scan
+        db.Index("ix_search_document_project", "id_project"),
+        db.Index("ix_search_document_feature", "id_feature"),
+        db.Index("ix_search_document_evidence", "id_evidence"),
+        db.Index("ix_search_document_message", "id_message"),
+        {"schema": "public"},
+    )
+
+    id_document = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(10), nullable=False)                                     # feature / evidence / chat
+    ref_id = db.Column(db.String, nullable=False)                                       # id_feature, id_evidence of id_message
+
+    id_company = db.Column(
+        db.Integer,
+        db.ForeignKey("public.company.id_company", ondelete="CASCADE"),
+        nullable=False,
+    )
+    id_project = db.Column(
+        db.Integer,
+        db.ForeignKey("public.project.id_project", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Feature waar het document bij hoort (feature zelf of evidence); weg met de feature
+    id_feature = db.Column(
+        db.String,
+        db.ForeignKey("public.features_ideas.id_feature", ondelete="CASCADE"),
+        nullable=True,
+    )
+    # Bronrij; ook verwijderd wanneer de database zelf cascadeert (bv. berichten van een verwijderd profiel)
+    id_evidence = db.Column(
+        db.Integer,
+        db.ForeignKey("public.evidence.id_evidence", ondelete="CASCADE"),
+        nullable=True,
+    )
+    id_message = db.Column(
+        db.Integer,
+        db.ForeignKey("public.project_chat_message.id_message", ondelete="CASCADE"),
+        nullable=True,
+    )
+
+    title = db.Column(db.Text)
+    body = db.Column(db.Text)
+    createdat = db.Column(db.DateTime(timezone=True), default=datetime.datetime.utcnow)
+
+
+# Database-specifieke index (ook bij db.create_all(), bv. lokaal of in de benchmarks)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B')"
+)
+for _ddl in (
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    f"ALTER TABLE public.search_document ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_search_document_vector ON public.search_document USING gin (id_company, search_vector)",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
+
+for _ddl in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS public.search_document_fts USING fts5("
+    "title, body, content='search_document', content_rowid='id_document')",
+    "CREATE TRIGGER public.search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id_document, new.title, new.body); END",
+    "CREATE TRIGGER public.search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+    "VALUES ('delete', old.id_document, old.title, old.body); END",
+    "CREATE TRIGGER public.search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+    "VALUES ('delete', old.id_document, old.title, old.body); "
+    "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id_document, new.title, new.body); END",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+event.listen(
+    SearchDocument.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS public.search_document_fts").execute_if(dialect="sqlite"),
+)
@@ -1,20 +1,41 @@
 import matplotlib
-import math
 matplotlib.use("Agg") 
 import uuid, datetime
+import gzip
+from collections import namedtuple
 from io import BytesIO
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response
-from sqlalchemy.orm import joinedload
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response
+from sqlalchemy.orm import joinedload, selectinload
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from app import db
-from app.models import MilestoneFeature, Profile, Company, Project, Features_ideas, Roadmap, Milestone, Evidence, Decision, ProjectChatMessage, CONFIDENCE_LEVELS
+from app.models import FeatureDependency, OptimizationRun, RoadmapFeaturePin, Profile, Company, Project, Features_ideas, Roadmap, Milestone, Evidence, Decision, ProjectChatMessage, PurgeJob, EvidenceAttachment, CONFIDENCE_LEVELS
 from app.constants import CONF_MIN, CONF_LOW_THRESHOLD, CONF_MID_HIGH_THRESHOLD, CONF_MAX, TTV_MIN, TTV_SLOW_THRESHOLD, TTV_MID_THRESHOLD, TTV_MAX
 from app.utils.calculations import calc_roi, calc_ttv, to_numeric, calculate_feature_cost, calculate_vectr_scores
-from app.utils.form_helpers import prepare_vectr_chart_data, require_login, require_role, require_company_ownership, parse_project_form, parse_feature_form, parse_roadmap_form, parse_milestone_form, parse_evidence_form, recompute_feature_confidence
+from app.utils.form_helpers import prepare_vectr_chart_data, require_login, require_role, require_company_ownership, parse_project_form, parse_feature_form, FEATURE_FIELD_PARSERS, parse_roadmap_form, parse_milestone_form, parse_evidence_form, apply_evidence_added, apply_evidence_removed
 from app.utils.knapsack_optimizer import optimize_roadmap
-from app.utils.outliers import detect_vectr_outliers_and_tag
+from app.utils.portfolio_optimizer import (
+    default_company_caps, load_portfolio_candidates, load_company_roadmaps, optimize_portfolio,
+)
+from app.utils.scoring import load_scoring_rows, load_scored_rows
+from app.utils.payloads import feature_list_payload, chat_messages_payload
+from app.utils.chart_aggregation import chart_payload, parse_bounds, parse_grid
+from app.utils.vectr_pdf import render_chart_pdf, load_portfolio_report, build_portfolio_pdf
+from app.utils.search import search_documents, SEARCH_KINDS
+from app.utils.cache_bus import ScopedCache, company_key, project_key, publish_invalidation
+from app.utils.purge import mark_project_deleted, mark_profile_deleted, purge_runner, ACTIVE_STATUSES as PURGE_ACTIVE_STATUSES
+from app.utils.outliers import detect_vectr_outliers_and_tag, compute_outlier_bounds, iqr_bounds_affected, tag_outlier, OUTLIER_METRICS
+from app.utils.decisions import cast_feature_decision
+from app.utils.optimization_runs import get_or_solve_run, prune_runs, recent_runs, set_pin
+from app.utils.dependency_graph import load_project_graph, add_dependency, DependencyCycleError
+from app.utils.capacity_curve import compute_capacity_curve, curve_to_json
+from app.utils.monte_carlo import load_simulation_inputs, simulate_project
+from app.utils.milestone_scheduler import (
+    build_periods, schedule_item, schedule_features, replace_roadmap_links, reschedule_feature, scheduling_inputs,
+)
+from app.utils.milestone_links import project_feature_ids, project_milestones, sync_milestone_links, move_feature_links
+from app.utils.attachments import AttachmentError, attach_file, remove_attachments, send_attachment
+from app.utils.streaming import LazyRows, RowStream, stream_page
+from app.utils.authorization import authorize, resolve_resource
 
 # Blueprint
 main = Blueprint("main", __name__)
@@ -245,9 +266,12 @@ def delete_profile():
         return user  # Redirect naar login
         
     try:
-        # 2. Verwijder de gebruiker uit de database
-        db.session.delete(user)
+        # 2. Profiel meteen verbergen; stemmen (+ tellingen), chatberichten en het profiel zelf
+        #    worden op de achtergrond in blokken verwijderd (zie app/utils/purge.py)
+        job = mark_profile_deleted(user)
         db.session.commit()
+        purge_runner.start(current_app._get_current_object())
+        purge_runner.submit(job.id_job)
         
         # 3. Ruim de sessie op
         session.clear()
@@ -277,7 +301,39 @@ def projects():
         .order_by(Project.id_project.desc())
         .all()
     )
-    return render_template("projects.html", projects=projects)
+    # Projecten die nog op de achtergrond verwijderd worden (of waarbij dat mislukte)
+    purge_jobs = (
+        PurgeJob.query
+        .filter(PurgeJob.id_company == user.id_company, PurgeJob.kind == "project")
+        .filter(PurgeJob.status.in_(PURGE_ACTIVE_STATUSES + ("failed",)))
+        .order_by(PurgeJob.id_job)
+        .all()
+    )
+    return render_template("projects.html", projects=projects, purge_jobs=purge_jobs)
+
+
+@main.route("/purge-jobs/<int:job_id>")
+def purge_job_status(job_id):
+    """Voortgang van een verwijdering (gepolled door het projectoverzicht)."""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    job = PurgeJob.query.get_or_404(job_id)
+    company_redirect = require_company_ownership(job.id_company, user)
+    if company_redirect:
+        return company_redirect
+
+    return jsonify({
+        "id": job.id_job,
+        "kind": job.kind,
+        "label": job.label,
+        "status": job.status,
+        "step": job.step,
+        "deleted": job.deleted_rows,
+        "total": job.total_rows,
+        "percent": job.percent,
+    })
 
 
 
@@ -381,8 +437,12 @@ def delete_project(project_id):
         return company_redirect
 
     try:
-        db.session.delete(project)
+        # Project meteen verbergen; features, evidence, roadmaps, ... worden op de achtergrond
+        # in blokken verwijderd (zie app/utils/purge.py), de voortgang staat op het projectoverzicht
+        job = mark_project_deleted(project)
         db.session.commit()
+        purge_runner.start(current_app._get_current_object())
+        purge_runner.submit(job.id_job)
         flash("Project deleted successfully.", "success")
     except Exception as e:
         db.session.rollback()
@@ -580,50 +640,78 @@ def view_features(project_id):
     sort_by = request.args.get("sort_by", "vectr") # Standaard sorteren op VECTR
     direction = request.args.get("direction", "desc")
 
-    # HAAL ALLE FEATURES OP
-    features_query = Features_ideas.query.filter_by(id_project=project_id).options(joinedload(Features_ideas.decisions))
-    features = features_query.all() # Voer de query uit zonder ORDER BY
-
-    # BEREKEN VECTR SCORE OP ALLE FEATURES
-    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
-    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
-    
-    # Bereken VECTR, waardoor 'vectr_score' aan elk object wordt toegevoegd
-    features = calculate_vectr_scores(features, ttm_limits, ttbv_limits)
-    
-    features = detect_vectr_outliers_and_tag(features)
-    
-    # Bepaal de sorteringssleutel (de lambda functie)
-    if sort_by == "vectr":
-        # Sorteren op het dynamisch berekende attribuut, met fallback naar 0.0
-        sort_key = lambda f: getattr(f, 'vectr_score', 0.0)
-    elif sort_by == "roi":
-        sort_key = lambda f: f.roi_percent if f.roi_percent is not None else 0.0
-    elif sort_by == "ttv":
-        # Sorteren op ruwe weken, met fallback naar 0.0
-        sort_key = lambda f: f.ttv_weeks if f.ttv_weeks is not None else 0.0
-    elif sort_by == "confidence":
-        sort_key = lambda f: f.quality_score if f.quality_score is not None else 0.0
-    else: # Standaard sorteren op naam
-        sort_key = lambda f: f.name_feature
-        
-    # Voer de sortering uit
-    features = sorted(features, 
-                      key=sort_key, 
-                      reverse=(direction == "desc"))
-
+    # Enkel de eigen stemmen van de gebruiker ophalen: {id_feature: decision_type}
+    user_votes = dict(
+        db.session.query(Decision.id_feature, Decision.decision_type)
+        .join(Features_ideas, Features_ideas.id_feature == Decision.id_feature)
+        .filter(Features_ideas.id_project == project_id, Decision.id_profile == user.id_profile)
+        .all()
+    )
 
-    return render_template(
+    # Features pas laden en scoren wanneer de template bij de tabel komt: de layout is dan al verstuurd
+    def load_features():
+        # HAAL ALLE FEATURES OP (met gematerialiseerde stemtelling i.p.v. alle decisions)
+        features_query = Features_ideas.query.filter_by(id_project=project_id).options(joinedload(Features_ideas.decision_tally))
+        features = features_query.all() # Voer de query uit zonder ORDER BY
+
+        # BEREKEN VECTR SCORE OP ALLE FEATURES
+        ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
+        ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
+
+        # Bereken VECTR, waardoor 'vectr_score' aan elk object wordt toegevoegd
+        features = calculate_vectr_scores(features, ttm_limits, ttbv_limits)
+
+        features = detect_vectr_outliers_and_tag(features)
+
+        # Bepaal de sorteringssleutel (de lambda functie)
+        if sort_by == "vectr":
+            # Sorteren op het dynamisch berekende attribuut, met fallback naar 0.0
+            sort_key = lambda f: getattr(f, 'vectr_score', 0.0)
+        elif sort_by == "roi":
+            sort_key = lambda f: f.roi_percent if f.roi_percent is not None else 0.0
+        elif sort_by == "ttv":
+            # Sorteren op ruwe weken, met fallback naar 0.0
+            sort_key = lambda f: f.ttv_weeks if f.ttv_weeks is not None else 0.0
+        elif sort_by == "confidence":
+            sort_key = lambda f: f.quality_score if f.quality_score is not None else 0.0
+        else: # Standaard sorteren op naam
+            sort_key = lambda f: f.name_feature
+
+        # Voer de sortering uit
+        features = sorted(features, 
+                          key=sort_key, 
+                          reverse=(direction == "desc"))
+        return features
+
+    return stream_page(
         "view_features.html",
         project=project,
-        features=features,
+        features=LazyRows(load_features),
         company=company,
         current_sort=sort_by,
         current_direction=direction,
         can_sort=can_sort,
         current_user=user,
+        user_votes=user_votes,
     )
     
+# ==============================
+# FEATURE LIJST (JSON)
+# ==============================
+# In ASGI-modus (asgi.py) wordt deze URL door een async endpoint bediend; dit is de sync versie.
+@main.route("/projects/<int:project_id>/features.json", methods=["GET"])
+def project_features_json(project_id):
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    project = Project.query.get_or_404(project_id)
+    company_redirect = require_company_ownership(project.id_company, user)
+    if company_redirect:
+        return company_redirect
+
+    return jsonify(feature_list_payload(project.id_project, load_scored_rows(project)))
+
 # ==============================
 # DISMISS OUTLIER WARNING
 # ==============================
@@ -656,26 +744,175 @@ def dismiss_warning(outlier_id):
     return ('', 204) # HTTP 204 No Content
 
 # ==============================
-# EDIT FEATURE
+# FEATURE ROW PARTIALS
 # ==============================
-@main.route("/feature/<uuid:id_feature>/edit", methods=["GET", "POST"])
-def edit_feature(id_feature):
+# Rij-acties (stem, dismiss, quick edit) geven enkel de bijgewerkte <tr> terug i.p.v.
+# een redirect naar view_features, dat de hele tabel opnieuw zou scoren en renderen.
+
+def _project_metric_rows(project):
+    """Lichte rijen met enkel de scoring-kolommen, voor de IQR-grenzen van het project."""
+    return load_scored_rows(project)
+
+
+# IQR-grenzen per project; elke wijziging aan het project of zijn features (in eender welke worker)
+# invalideert ze via de cache bus
+_OUTLIER_BOUNDS_CACHE = ScopedCache(size=256)
+
+def _project_outlier_bounds(project):
+    return _OUTLIER_BOUNDS_CACHE.get_or_set(
+        project.id_project,
+        (project_key(project.id_project),),
+        lambda: compute_outlier_bounds(_project_metric_rows(project)),
+    )
+
+
+def _score_feature(feature, project):
+    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
+    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
+    calculate_vectr_scores([feature], ttm_limits, ttbv_limits)
+    return {attr: getattr(feature, attr, None) for attr in OUTLIER_METRICS}
+
+
+def _render_feature_row(feature, project, user, bounds=None):
+    """Rendert één tabelrij; outlier-vlag enkel voor deze feature t.o.v. de projectgrenzen."""
+    if bounds is None:
+        bounds = _project_outlier_bounds(project)
+
+    _score_feature(feature, project)
+    tag_outlier(feature, bounds)
+
+    user_votes = dict(
+        db.session.query(Decision.id_feature, Decision.decision_type)
+        .filter_by(id_feature=feature.id_feature, id_profile=user.id_profile)
+        .all()
+    )
+    return render_template("features/_feature_row.html", feature=feature, user_votes=user_votes)
+
+
+def _load_row_feature(id_feature, user):
+    """Feature + project ophalen (één query) met company-check; None als de gebruiker geen toegang heeft."""
+    resource = resolve_resource("feature", id_feature)
+    if require_company_ownership(resource["project"].id_company, user):
+        return None, None
+    return resource["feature"], resource["project"]
+
+
+@main.route("/feature/<uuid:id_feature>/decision/<string:decision_value>/row", methods=["POST"])
+def feature_decision_row(id_feature, decision_value):
     user = require_login()
     if not isinstance(user, Profile):
-        return user
+        return ('', 401)
 
-    feature = Features_ideas.query.get_or_404(str(id_feature))
-    project = Project.query.get_or_404(feature.id_project)
-    company = Company.query.get(project.id_company)
+    feature, project = _load_row_feature(id_feature, user)
+    if feature is None:
+        return ('', 403)
 
-    # Only founder/PM + ownership
-    role_redirect = require_role(["Founder", "PM"], user)
-    if role_redirect:
-        return role_redirect
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect
+    try:
+        cast_feature_decision(feature.id_feature, user.id_profile, _decision_type_from_value(decision_value))
+        publish_invalidation(project_ids=[project.id_project])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error setting decision: {e}")
+        return ('', 500)
+
+    # Stemmen veranderen geen metriek -> enkel deze rij opnieuw renderen
+    return _render_feature_row(feature, project, user)
+
+
+@main.route("/feature/<uuid:id_feature>/dismiss/row", methods=["POST"])
+def dismiss_warning_row(id_feature):
+    user = require_login()
+    if not isinstance(user, Profile):
+        return ('', 401)
+
+    feature, project = _load_row_feature(id_feature, user)
+    if feature is None:
+        return ('', 403)
+
+    feature.warning_dismissed = True
+    db.session.commit()
+
+    return _render_feature_row(feature, project, user)
 
+
+@main.route("/feature/<uuid:id_feature>/quick-edit", methods=["POST"])
+def quick_edit_feature(id_feature):
+    """
+    Past enkel de meegestuurde velden aan en geeft de bijgewerkte rij terug.
+    Als de wijziging de IQR-grenzen kan verschuiven, zet de response 'X-Outliers-Changed'
+    zodat de client de tabel (en dus de vlaggen van andere rijen) vernieuwt.
+    """
+    user = require_login()
+    if not isinstance(user, Profile):
+        return ('', 401)
+
+    if require_role(["Founder", "PM"], user):
+        return ('', 403)
+
+    feature, project = _load_row_feature(id_feature, user)
+    if feature is None:
+        return ('', 403)
+
+    # 1. Enkel meegestuurde velden valideren (zelfde validators als parse_feature_form)
+    errors = []
+    data = {
+        field: parse(request.form, errors)
+        for field, parse in FEATURE_FIELD_PARSERS.items()
+        if field in request.form
+    }
+
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # 2. Grenzen en metrieken VOOR de wijziging
+    bounds = _project_outlier_bounds(project)
+    old_metrics = _score_feature(feature, project)
+    old_inputs = scheduling_inputs(feature)
+
+    for field, value in data.items():
+        setattr(feature, field, value)
+
+    # Elke edit reset de waarschuwing (zoals in edit_feature)
+    feature.warning_dismissed = False
+    feature.roi_percent = calc_roi(
+        feature.extra_revenue,
+        feature.churn_reduction,
+        feature.cost_savings,
+        feature.investment_hours,
+        feature.hourly_rate,
+        feature.opex,
+        feature.other_costs,
+    )
+    feature.ttv_weeks = calc_ttv(feature.ttm_weeks, feature.ttbv_weeks)
+
+    new_metrics = _score_feature(feature, project)
+    # Planning repareren i.p.v. volledig herplannen (enkel als de feature ingepland is en
+    # uren/kosten/ROI/TTM wijzigden)
+    _, conflicts = reschedule_feature(feature, project, before=old_inputs)
+    db.session.commit()
+
+    # 3. Vlaggen enkel herberekenen als de gewijzigde metriek een anker van de grenzen raakt
+    outliers_changed = any(
+        iqr_bounds_affected(bounds, attr, old_metrics[attr], new_metrics[attr])
+        for attr in OUTLIER_METRICS
+    )
+    if outliers_changed:
+        bounds = _project_outlier_bounds(project)                   # de commit heeft de cache al geïnvalideerd
+
+    response = Response(_render_feature_row(feature, project, user, bounds=bounds))
+    if outliers_changed:
+        response.headers["X-Outliers-Changed"] = "1"
+    if conflicts:
+        response.headers["X-Schedule-Conflicts"] = ", ".join(conflicts)
+    return response
+
+# ==============================
+# EDIT FEATURE
+# ==============================
+@main.route("/feature/<uuid:id_feature>/edit", methods=["GET", "POST"])
+@authorize("feature", "id_feature", roles=["Founder", "PM"])     # Only founder/PM + ownership
+def edit_feature(feature, project, company):
     if request.method == "POST":
         data, errors = parse_feature_form(request.form)
         if errors:
@@ -686,8 +923,11 @@ def edit_feature(id_feature):
                 feature=feature,
                 project=project,
                 company=company,
+                **_dependency_context(feature),
             )
 
+        old_inputs = scheduling_inputs(feature)
+
         # 1. Update alle feature velden met de nieuwe data
         feature.name_feature = data["name_feature"]
         feature.description = data["description"]
@@ -719,35 +959,159 @@ def edit_feature(id_feature):
         )
         feature.ttv_weeks = calc_ttv(feature.ttm_weeks, feature.ttbv_weeks)
 
+        # 4. Milestone-planning incrementeel repareren (enkel bij gewijzigde uren/kosten/ROI/TTM)
+        moved, conflicts = reschedule_feature(feature, project, before=old_inputs)
+
         db.session.commit()
+        if moved:
+            flash(f"Milestone schedule updated: {moved} feature(s) moved.", "info")
+        if conflicts:
+            flash(
+                "This feature no longer fits the capacity of milestone(s) "
+                f"{', '.join(conflicts)} and was left in place. Review the roadmap.",
+                "warning",
+            )
         flash("Feature updated successfully.", "success")
         return redirect(url_for("main.view_features", project_id=feature.id_project))
 
     return render_template(
-        "edit_feature.html", feature=feature, project=project, company=company
+        "edit_feature.html", feature=feature, project=project, company=company,
+        **_dependency_context(feature),
     )
-    
+
+
 # ==============================
-# DELETE FEATURE
+# FEATURE DEPENDENCIES
 # ==============================
-@main.route("/feature/<uuid:id_feature>/delete", methods=["POST"])
-def delete_feature(id_feature):
-    user = require_login()                      # Controleer of gebruiker ingelogd is; anders redirect
-    if not isinstance(user, Profile):           # require_login() kan Response teruggeven → direct teruggeven
-        return user
 
-    feature = Features_ideas.query.get_or_404(str(id_feature))  # Haalt feature op; 404 als niet gevonden
-    project = Project.query.get_or_404(feature.id_project)      # Haalt project op waar feature toe behoort
+def _dependency_context(feature):
+    """Directe prerequisites/opvolgers van een feature en de features die nog als prerequisite kunnen."""
+    graph = load_project_graph(feature.id_project)
+    index = graph.index.get(feature.id_feature)
+    prerequisite_ids = {graph.nodes[i] for i in graph.prerequisites[index]} if index is not None else set()
+    dependent_ids = {graph.nodes[i] for i in graph.dependents[index]} if index is not None else set()
+
+    # Kandidaten: zelfde project, geen cyclus, nog niet gekoppeld
+    blocked = graph.descendants(feature.id_feature) | prerequisite_ids | {feature.id_feature}
+    project_features = (
+        Features_ideas.query.filter_by(id_project=feature.id_project)
+        .order_by(Features_ideas.name_feature.asc())
+        .all()
+    )
+    return {
+        "prerequisites": [f for f in project_features if f.id_feature in prerequisite_ids],
+        "dependents": [f for f in project_features if f.id_feature in dependent_ids],
+        "prerequisite_candidates": [f for f in project_features if f.id_feature not in blocked],
+    }
+
+
+def _load_feature_for_dependencies(id_feature):
+    """Gedeelde checks: login, Founder/PM en company. Returns (response, None) of (None, feature)."""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user, None
+
+    role_redirect = require_role(["Founder", "PM"], user)
+    if role_redirect:
+        return role_redirect, None
 
-    company_redirect = require_company_ownership(project.id_company, user)  # Check dat user van juiste company is
+    resource = resolve_resource("feature", id_feature)           # feature + project in één query
+    company_redirect = require_company_ownership(resource["project"].id_company, user)
+    if company_redirect:
+        return company_redirect, None
+    return None, resource["feature"]
+
+
+@main.route("/feature/<uuid:id_feature>/dependencies/add", methods=["POST"])
+def add_feature_dependency(id_feature):
+    response, feature = _load_feature_for_dependencies(id_feature)
+    if response is not None:
+        return response
+
+    prerequisite = Features_ideas.query.filter_by(
+        id_feature=request.form.get("id_prerequisite", ""), id_project=feature.id_project
+    ).first()
+    if prerequisite is None:
+        flash("Choose a feature from the same project.", "danger")
+        return redirect(url_for("main.edit_feature", id_feature=feature.id_feature))
+
+    try:
+        add_dependency(feature, prerequisite)
+    except DependencyCycleError:
+        flash(f"'{prerequisite.name_feature}' already depends on this feature; that would create a cycle.", "danger")
+        return redirect(url_for("main.edit_feature", id_feature=feature.id_feature))
+
+    db.session.commit()
+    flash(f"'{feature.name_feature}' now depends on '{prerequisite.name_feature}'.", "success")
+    return redirect(url_for("main.edit_feature", id_feature=feature.id_feature))
+
+
+@main.route("/feature/<uuid:id_feature>/dependencies/<uuid:id_prerequisite>/delete", methods=["POST"])
+def delete_feature_dependency(id_feature, id_prerequisite):
+    response, feature = _load_feature_for_dependencies(id_feature)
+    if response is not None:
+        return response
+
+    FeatureDependency.query.filter_by(
+        id_feature=feature.id_feature, id_prerequisite=str(id_prerequisite)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    flash("Dependency removed.", "success")
+    return redirect(url_for("main.edit_feature", id_feature=feature.id_feature))
+
+
+@main.route("/project/<int:project_id>/dependencies", methods=["GET"])
+def project_dependencies(project_id):
+    """Afhankelijkheidsgraaf van een project, per niveau (topologische volgorde)."""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    project = Project.query.get_or_404(project_id)
+    company_redirect = require_company_ownership(project.id_company, user)
     if company_redirect:
         return company_redirect
-    
-    # Only founder/PM + ownership
-    role_redirect = require_role(["Founder"], user)
-    if role_redirect:
-        return role_redirect                                    # Geeft redirect als ongeldig
 
+    features = Features_ideas.query.filter_by(id_project=project.id_project).all()
+    by_id = {f.id_feature: f for f in features}
+    graph = load_project_graph(project.id_project)
+
+    cycle = None
+    levels = []
+    try:
+        level_of = graph.levels()
+    except DependencyCycleError as exc:
+        # Enkel mogelijk bij data die buiten de app om werd ingevoerd
+        cycle = [by_id[fid].name_feature for fid in exc.cycle or [] if fid in by_id]
+        level_of = {}
+
+    if cycle is None:
+        for fid, level in level_of.items():
+            while len(levels) <= level:
+                levels.append([])
+            if fid in by_id:
+                levels[level].append({
+                    "feature": by_id[fid],
+                    "prerequisites": [by_id[graph.nodes[i]] for i in graph.prerequisites[graph.index[fid]] if graph.nodes[i] in by_id],
+                })
+        for column in levels:
+            column.sort(key=lambda item: item["feature"].name_feature)
+
+    independent = sorted((f for f in features if f.id_feature not in graph.index), key=lambda f: f.name_feature)
+    return render_template(
+        "feature_dependencies.html",
+        project=project,
+        levels=levels,
+        independent=independent,
+        cycle=cycle,
+    )
+    
+# ==============================
+# DELETE FEATURE
+# ==============================
+@main.route("/feature/<uuid:id_feature>/delete", methods=["POST"])
+@authorize("feature", "id_feature", roles=["Founder"])     # Alleen Founders mogen verwijderen
+def delete_feature(feature):
     project_id = feature.id_project               # Project ID opslaan zodat we na delete kunnen redirecten
     db.session.delete(feature)                    # Feature verwijderen uit database
     db.session.commit()                           # Veranderingen opslaan
@@ -770,18 +1134,102 @@ def vectr_chart(project_id):
     if company_redirect:
         return company_redirect               # Blokkeer toegang tot projecten van andere companies
 
-    features = Features_ideas.query.filter_by(id_project=project_id).all()   # Alle features voor dit project ophalen
-
-    # De volledige berekening wordt uitgevoerd in een aparte helperfunctie voor overzichtelijkheid
-    chart_data = prepare_vectr_chart_data(project, features)
-
+    # De data zelf komt via vectr_chart_data (JSON, geaggregeerd per zoomniveau)
     return render_template(
         "vectr_chart.html",                   # Template dat de grafiek tekent
         project=project,                      # Project-info naar de template sturen
-        chart_data=chart_data                 # Computed chart data naar template
     )
 
 
+# ==============================
+# VECTR CHART DATA (JSON, LEVEL-OF-DETAIL)
+# ==============================
+@main.route("/projects/<int:project_id>/vectr-chart/data", methods=["GET"])
+def vectr_chart_data(project_id):
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    project = Project.query.get_or_404(project_id)
+    company_redirect = require_company_ownership(project.id_company, user)
+    if company_redirect:
+        return company_redirect
+
+    # Venster (?x0=&x1=&y0=&y1=) en raster; kleinere bounds = fijnere clusters
+    bounds = parse_bounds(request.args)
+    grid = parse_grid(request.args, current_app.config["CHART_GRID"])
+    etag, body = chart_payload(
+        project, bounds, grid,
+        max_points=current_app.config["CHART_MAX_POINTS"],
+        cache_size=current_app.config["CHART_CACHE_SIZE"],
+    )
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif request.accept_encodings["gzip"]:
+        response = Response(body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(body), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"          # altijd hervalideren via de ETag
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+
+# ==============================
+# MONTE CARLO SIMULATIE (ONZEKERHEID VECTR/ROI)
+# ==============================
+@main.route("/project/<int:project_id>/simulate", methods=["GET", "POST"])
+def simulate_project_uncertainty(project_id):
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    project = Project.query.get_or_404(project_id)
+    company_redirect = require_company_ownership(project.id_company, user)
+    if company_redirect:
+        return company_redirect
+
+    roadmaps = Roadmap.query.filter_by(id_project=project.id_project).order_by(Roadmap.start_roadmap.asc()).all()
+
+    n_samples = 2000
+    alpha = 1.0
+    roadmap = roadmaps[0] if roadmaps else None
+    if request.method == "POST":
+        max_samples = current_app.config.get("MONTE_CARLO_MAX_SAMPLES", 100000)
+        n_samples = int(to_numeric(request.form.get("samples", n_samples)))
+        if not 100 <= n_samples <= max_samples:
+            flash(f"Samples must be between 100 and {max_samples}.", "danger")
+            n_samples = 2000
+        alpha = to_numeric(request.form.get("alpha", 1.0))
+        if not 0.0 <= alpha <= 1.0:
+            flash("Alpha must be between 0.0 and 1.0.", "danger")
+            alpha = 1.0
+        roadmap_id = request.form.get("roadmap_id", type=int)
+        roadmap = next((r for r in roadmaps if r.id_roadmap == roadmap_id), None)
+
+    # Grote runs over een process pool; kleine runs blijven in het request-proces
+    workers = 1
+    if n_samples >= current_app.config.get("MONTE_CARLO_POOL_THRESHOLD", 20000):
+        workers = current_app.config.get("MONTE_CARLO_WORKERS", 4)
+
+    inputs = load_simulation_inputs(project)
+    result = simulate_project(
+        inputs, n_samples=n_samples, roadmap=roadmap, alpha=alpha, workers=workers,
+        max_exact_bytes=current_app.config.get("MONTE_CARLO_EXACT_MAX_BYTES"),
+    )
+
+    return render_template(
+        "simulation_result.html",
+        project=project,
+        roadmaps=roadmaps,
+        roadmap=roadmap,
+        alpha=alpha,
+        result=result,
+    )
+
 
 # ==============================
 # ADD ROADMAP
@@ -841,22 +1289,25 @@ def roadmap_overview(project_id):
         return company_redirect                     # Geen toegang buiten eigen bedrijf
 
     # Roadmaps sorted by start_roadmap (string sort works for "Qn YYYY")
-    roadmaps = (
-        Roadmap.query.filter_by(id_project=project_id)
-        .order_by(Roadmap.start_roadmap.asc())      # Roadmaps chronologisch sorteren
-        .all()
-    )
-
-    # Milestones binnen roadmaps sorteren op startdatum
-    for roadmap in roadmaps:
-        roadmap.milestones.sort(
-            key=lambda m: m.start_date if m.start_date else datetime.date.max
-        )                                           # Milestones zonder datum helemaal onderaan
-
-    return render_template(
+    # Pas geladen wanneer de template bij de lijst komt (de layout is dan al verstuurd);
+    # milestones + hun features in twee extra queries (selectinload) i.p.v. één per roadmap/milestone
+    def iter_roadmaps():
+        roadmaps = (
+            Roadmap.query.filter_by(id_project=project_id)
+            .options(selectinload(Roadmap.milestones).selectinload(Milestone.features))
+            .order_by(Roadmap.start_roadmap.asc())      # Roadmaps chronologisch sorteren
+        )
+        for roadmap in roadmaps:
+            # Milestones binnen roadmaps sorteren op startdatum
+            roadmap.milestones.sort(
+                key=lambda m: m.start_date if m.start_date else datetime.date.max
+            )                                           # Milestones zonder datum helemaal onderaan
+            yield roadmap
+
+    return stream_page(
         "roadmap_overview.html",
         project=project,
-        roadmaps=roadmaps,
+        roadmaps=RowStream(iter_roadmaps()),
     )
 
 # ==============================
@@ -864,23 +1315,8 @@ def roadmap_overview(project_id):
 # ==============================
 
 @main.route("/roadmap/edit/<int:roadmap_id>", methods=["GET", "POST"])
-def edit_roadmap(roadmap_id):
-    user = require_login()                           # Login check
-    if not isinstance(user, Profile):
-        return user
-
-    # Founders and PM's mogen editen
-    role_redirect = require_role(["Founder", "PM"], user)  # Enkel Founder mag roadmap aanpassen
-    if role_redirect:
-        return role_redirect
-
-    roadmap = Roadmap.query.get_or_404(roadmap_id)   # Roadmap ophalen
-    project = Project.query.get_or_404(roadmap.id_project)
-
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect                      # Blokkeer toegang tot andere companies
-
+@authorize("roadmap", "roadmap_id", roles=["Founder", "PM"])     # Founders and PM's mogen editen
+def edit_roadmap(roadmap, project):
     if request.method == "POST":
         data, errors = parse_roadmap_form(request.form)   # Validatie helper
         if errors:                                       # Bij fouten → formulier opnieuw tonen
@@ -907,49 +1343,63 @@ def edit_roadmap(roadmap_id):
 #==============================
 
 @main.route("/roadmap/optimize/<int:roadmap_id>", methods=["GET", "POST"])
-def roadmap_optimize(roadmap_id):
-    user = require_login()
-    if not isinstance(user, Profile):
-        return user
-
-    role_redirect = require_role(["Founder", "PM"], user)
-    if role_redirect:
-        return role_redirect
-    
-    roadmap = Roadmap.query.get_or_404(roadmap_id)
-    project = Project.query.get_or_404(roadmap.id_project)
-    
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect
-
-    # 1. Haal alle features op en bereken de VECTR-scores 
-    features = Features_ideas.query.filter_by(id_project=project.id_project).all()
+@authorize("roadmap", "roadmap_id", roles=["Founder", "PM"])
+def roadmap_optimize(user, roadmap, project):
+    # 1. Haal alle features op en bereken de VECTR-scores (met de GESCHAALDE TTV)
     # Zorg dat de VECTR score op de features is gezet vóórdat je optimize_roadmap aanroept!
-    # Dit is cruciaal. Je kunt hiervoor de calculate_vectr_scores uit calculations.py gebruiken.
-    # (Let op: de calculate_vectr_scores functie in calculations.py gebruikt ttv_weeks * (roi_percent/100) * confidence_score, wat een simpele formule is, maar werkt.)
-
-
-    # 1a. Limieten ophalen uit Project object en verpakken in tuples
-    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
-    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
-    
-    # 1b. Correcte aanroep met de vereiste argumenten
-    # Dit zal nu de VECTR score berekenen met de GESCHAALDE TTV.
-    features = calculate_vectr_scores(features, ttm_limits, ttbv_limits)
+    # ScoringRow's i.p.v. ORM-objecten: enkel de kolommen die de optimizer en de tabel nodig hebben.
+    features = load_scored_rows(project)
     
     # Standaard Alpha
     alpha = 1.0 
+    pin_milestones = False
     
-    if request.method == "POST":
+    if request.method == "POST" or "alpha" in request.args:
         # Gebruiker kan de strategische weging (Alpha) instellen via een formulier
-        alpha = to_numeric(request.form.get("alpha", 1.0))
+        alpha = to_numeric(request.values.get("alpha", 1.0))
         if not 0.0 <= alpha <= 1.0:
             flash("Alpha must be between 0.0 and 1.0.", "danger")
             alpha = 1.0 # fallback
+        pin_milestones = request.values.get("pin_milestones") == "1"
+
+    # 2. Bewaarde run tonen (?run=<id>) of de run voor deze input ophalen/oplossen.
+    #    Enkel "Save run" (POST) schrijft een run weg; bekijken blijft read-only.
+    save_run = request.method == "POST" and request.form.get("save_run") == "1"
+    run = None
+    run_id = request.args.get("run", type=int)
+    if run_id is not None:
+        run = OptimizationRun.query.filter_by(id_run=run_id, id_roadmap=roadmap.id_roadmap).first()
+        if run is None:
+            flash("Optimization run not found.", "warning")
+        else:
+            alpha = run.alpha
+    cached = run is not None
+    if run is None:
+        try:
+            run, cached = get_or_solve_run(
+                roadmap, features, alpha, user=user, pin_milestones=pin_milestones, persist=save_run,
+            )
+        except DependencyCycleError as exc:
+            # Enkel mogelijk bij data die buiten de app om werd ingevoerd: zonder afhankelijkheden oplossen
+            names = {f.id_feature: f.name_feature for f in features}
+            cycle = " → ".join(names.get(fid, fid) for fid in exc.cycle or [])
+            flash(f"Feature dependencies contain a cycle ({cycle}); optimized without dependencies.", "danger")
+            run, cached = get_or_solve_run(
+                roadmap, features, alpha, user=user, pin_milestones=pin_milestones, persist=save_run,
+                ignore_dependencies=True,
+            )
+        if save_run:
+            if not cached:
+                db.session.flush()
+                prune_runs(roadmap, current_app.config["OPTIMIZATION_RUNS_KEEP"])
+            db.session.commit()
+            flash(f"Run #{run.id_run} saved.", "success")
 
-    # 2. Voer het Knapzak-algoritme uit
-    optimized_selection = optimize_roadmap(roadmap, features, alpha=alpha)
+    selected_ids = set(run.selected_feature_ids or [])
+    pins = {p.id_feature: p.pin for p in RoadmapFeaturePin.query.filter_by(id_roadmap=roadmap.id_roadmap)}
+    pins_not_fitting = [fid for fid in run.must_include or [] if fid not in selected_ids]
+    if pins_not_fitting:
+        flash(f"{len(pins_not_fitting)} must-include feature(s) did not fit in the roadmap capacity.", "warning")
 
     # 3. Zorg dat de originele features (voor de niet-geselecteerde) ook de dichtheid hebben
     # zodat de tabel kan worden weergegeven
@@ -962,13 +1412,11 @@ def roadmap_optimize(roadmap_id):
         cost_weight = calculate_feature_cost(f)
         
         time_weight = f.investment_hours if f.investment_hours is not None else 0
-        value = f.vectr_score if f.vectr_score is not None else 0
-        
-        # ... (de rest van de logica in de lus blijft hetzelfde)
         
         all_features_data.append({
             'feature': f,
-            'is_selected': f in optimized_selection,
+            'is_selected': f.id_feature in selected_ids,
+            'pin': pins.get(f.id_feature),
             # Voeg gewicht en kosten toe voor weergave in de template
             'time_weight': time_weight, 
             'cost_weight': cost_weight
@@ -985,44 +1433,210 @@ def roadmap_optimize(roadmap_id):
         features_data=all_features_data,
         alpha=alpha,
         max_time=roadmap.time_capacity, 
-        max_cost=roadmap.budget_allocation
+        max_cost=roadmap.budget_allocation,
+        run=run,
+        cached=cached,
+        pin_milestones=pin_milestones,
+        recent_runs=recent_runs(roadmap),
     )
 
 
+@main.route("/roadmap/<int:roadmap_id>/pin/<uuid:id_feature>", methods=["POST"])
+@authorize("roadmap", "roadmap_id", roles=["Founder", "PM"])
+def roadmap_pin_feature(roadmap, project, id_feature):
+    """Must-include / must-exclude pin voor een feature in deze roadmap (pin='none' verwijdert)."""
+    feature = Features_ideas.query.filter_by(id_feature=str(id_feature), id_project=project.id_project).first_or_404()
+    set_pin(roadmap, feature.id_feature, request.form.get("pin", "none"))
+    db.session.commit()
+
+    # Terug naar het resultaat met dezelfde instellingen; de nieuwe run start warm vanuit de vorige
+    return redirect(url_for(
+        "main.roadmap_optimize",
+        roadmap_id=roadmap.id_roadmap,
+        alpha=request.form.get("alpha", 1.0),
+        pin_milestones=request.form.get("pin_milestones", "0"),
+    ))
+
+
 
 # ==============================
-# ADD MILESTONES
+# CAPACITEITSCURVE (WAT LEVERT EXTRA TIJD/BUDGET OP?)
 # ==============================
 
-@main.route("/milestone/add/<int:roadmap_id>", methods=["GET", "POST"])
-def add_milestone(roadmap_id):
-    user = require_login()  # Controle: enkel Founder/PM mogen milestones toevoegen.
+def _roadmap_capacity_curve(roadmap_id):
+    """Gedeelde auth + berekening voor de HTML- en JSON-variant. Returns (response, None) of (None, data)."""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user, None
 
-    role_redirect = require_role(["Founder", "PM"], user)
+    resource = resolve_resource("roadmap", roadmap_id)           # roadmap + project in één query
+    roadmap, project = resource["roadmap"], resource["project"]
+
+    company_redirect = require_company_ownership(project.id_company, user)
+    if company_redirect:
+        return company_redirect, None
+
+    features = load_scored_rows(project)
+
+    curve = compute_capacity_curve(
+        roadmap,
+        features,
+        time_levels=request.args.get("time_levels", 40, type=int),
+        budget_levels=request.args.get("budget_levels", 40, type=int),
+    )
+    data = curve_to_json(curve)
+
+    # Ter vergelijking: de waarde van de greedy selectie bij de huidige capaciteit
+    data["greedy_value"] = round(sum(f.vectr_score for f in optimize_roadmap(roadmap, features, alpha=1.0)), 2)
+    return None, (roadmap, project, data)
+
+
+@main.route("/roadmap/<int:roadmap_id>/capacity-curve", methods=["GET"])
+def roadmap_capacity_curve(roadmap_id):
+    response, payload = _roadmap_capacity_curve(roadmap_id)
+    if response is not None:
+        return response
+    roadmap, project, data = payload
+    return render_template("capacity_curve.html", roadmap=roadmap, project=project, curve=data)
+
+
+@main.route("/roadmap/<int:roadmap_id>/capacity-curve/data", methods=["GET"])
+def roadmap_capacity_curve_data(roadmap_id):
+    response, payload = _roadmap_capacity_curve(roadmap_id)
+    if response is not None:
+        return response
+    return jsonify(payload[2])
+
+
+# ==============================
+# MILESTONE PLANNING (MULTI-PERIODE)
+# ==============================
+
+@main.route("/roadmap/schedule/<int:roadmap_id>", methods=["POST"])
+@authorize("roadmap", "roadmap_id", roles=["Founder", "PM"])
+def roadmap_schedule(roadmap, project):
+    """Plant de door de optimizer gekozen features in over de milestones van de roadmap."""
+    periods = build_periods(roadmap, roadmap.milestones)
+    if not periods:
+        flash("Add milestones with a start and end date before scheduling.", "warning")
+        return redirect(url_for("main.roadmap_overview", project_id=project.id_project))
+
+    alpha = to_numeric(request.form.get("alpha", 1.0))
+    if alpha is None or not 0.0 <= alpha <= 1.0:
+        alpha = 1.0
+
+    # 1. Selectie van de optimizer (zelfde als roadmap_optimize)
+    features = load_scored_rows(project)
+    selection = optimize_roadmap(roadmap, features, alpha=alpha)
+
+    # 2. Verdelen over de periodes en de links van deze roadmap vervangen
+    schedule = schedule_features(periods, [schedule_item(f) for f in selection])
+    replace_roadmap_links(roadmap, schedule)
+    db.session.commit()
+
+    scheduled = len(schedule["placement"])
+    message = f"Scheduled {scheduled} feature(s) over {len(periods)} milestone(s)."
+    if schedule["unscheduled"]:
+        message += f" {len(schedule['unscheduled'])} selected feature(s) did not fit in any milestone."
+    flash(message, "success")
+    return redirect(url_for("main.roadmap_overview", project_id=project.id_project))
+
+
+# ==============================
+# PORTFOLIO OPTIMALISATIE (ALLE PROJECTEN VAN DE COMPANY)
+# ==============================
+
+@main.route("/portfolio/optimize", methods=["GET", "POST"])
+def portfolio_optimize():
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    # Founders verdelen het budget over alle projecten
+    role_redirect = require_role(["Founder"], user)
     if role_redirect:
         return role_redirect
 
-    roadmap = Roadmap.query.get_or_404(roadmap_id)  # Haal de roadmap op; 404 bij fout.
-    project = Project.query.get_or_404(roadmap.id_project)  # Project van de roadmap ophalen.
+    roadmap_rows = load_company_roadmaps(user.id_company)
+    roadmaps = [roadmap for roadmap, _ in roadmap_rows]
+    project_names = {roadmap.id_project: name for roadmap, name in roadmap_rows}
 
-    # Check of user toegang heeft tot dit bedrijf
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect  # Blokkeert toegang als user niet van dezelfde company is.
+    # 1. Alle features van alle projecten in één query (enkel numerieke kolommen)
+    candidates = load_portfolio_candidates(user.id_company)
 
-    # Alle features van dit project ophalen
-    features = Features_ideas.query.filter_by(id_project=project.id_project).all()
+    # Standaard: som van de capaciteit van roadmaps die features kunnen krijgen
+    default_time_cap, default_budget_cap = default_company_caps(candidates, roadmaps)
 
-    # VECTR score berekenen voor sortering
+    alpha = 1.0
+    company_time_cap = default_time_cap
+    company_budget_cap = default_budget_cap
 
+    if request.method == "POST":
+        alpha = to_numeric(request.form.get("alpha", 1.0))
+        if not 0.0 <= alpha <= 1.0:
+            flash("Alpha must be between 0.0 and 1.0.", "danger")
+            alpha = 1.0 # fallback
 
-    # 1a. Limieten ophalen uit Project object en verpakken in tuples
-    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
-    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
-    
-    # 1b. Correcte aanroep met de vereiste argumenten
-    # Dit zal nu de VECTR score berekenen met de GESCHAALDE TTV.
-    features = calculate_vectr_scores(features, ttm_limits, ttbv_limits)
+        # Leeg veld = som van de roadmap-capaciteiten (projecten met features)
+        if (request.form.get("company_time_cap") or "").strip():
+            company_time_cap = max(to_numeric(request.form.get("company_time_cap")), 0.0)
+        if (request.form.get("company_budget_cap") or "").strip():
+            company_budget_cap = max(to_numeric(request.form.get("company_budget_cap")), 0.0)
+
+    # 2. Multi-knapzak over alle roadmaps + company-brede limieten
+    result = optimize_portfolio(
+        candidates,
+        roadmaps,
+        company_time_cap=company_time_cap,
+        company_budget_cap=company_budget_cap,
+        alpha=alpha,
+    )
+
+    # 3. Per roadmap de gekozen features (hoogste VECTR eerst) voor de template
+    roadmaps_data = []
+    for roadmap in roadmaps:
+        chosen = sorted(
+            result["assignments"][roadmap.id_roadmap],
+            key=lambda i: result["value"][i],
+            reverse=True,
+        )
+        roadmaps_data.append({
+            "roadmap": roadmap,
+            "project_name": project_names.get(roadmap.id_project, ""),
+            "usage": result["roadmap_usage"][roadmap.id_roadmap],
+            "features": [
+                {
+                    "id_feature": candidates["id_feature"][i],
+                    "name_feature": candidates["name_feature"][i],
+                    "vectr_score": float(result["value"][i]),
+                    "time_weight": float(result["hours"][i]),
+                    "cost_weight": float(result["cost"][i]),
+                }
+                for i in chosen
+            ],
+        })
+
+    return render_template(
+        "portfolio_optimization_result.html",
+        roadmaps_data=roadmaps_data,
+        result=result,
+        candidate_count=len(candidates["id_feature"]),
+        alpha=alpha,
+        company_time_cap=company_time_cap,
+        company_budget_cap=company_budget_cap,
+    )
+
+
+# ==============================
+# ADD MILESTONES
+# ==============================
+
+@main.route("/milestone/add/<int:roadmap_id>", methods=["GET", "POST"])
+@authorize("roadmap", "roadmap_id", roles=["Founder", "PM"])     # Enkel Founder/PM mogen milestones toevoegen
+def add_milestone(roadmap_id, roadmap, project):
+    # Alle features van dit project ophalen en de VECTR score berekenen voor sortering
+    # (met de GESCHAALDE TTV; enkel de scoring-kolommen)
+    features = load_scored_rows(project)
 
     # Features sorteren op VECTR score (beste eerst)
     features = sorted(features, key=lambda x: getattr(x, "vectr_score", 0), reverse=True)
@@ -1050,16 +1664,12 @@ def add_milestone(roadmap_id):
             status=data["status"],
         )
 
-        # 🎯 Meerdere features koppelen via MilestoneFeature (CORRECT)
-        selected = request.form.getlist("features")
-
-        for id_feature in selected:
-            link = MilestoneFeature(
-                milestone=milestone,
-                id_feature=id_feature,
-            )
-            db.session.add(link)
         db.session.add(milestone)  # Toevoegen aan DB
+        db.session.flush()         # id_milestone nodig voor de links
+
+        # 🎯 Meerdere features koppelen (enkel features van dit project, één bulk INSERT)
+        selected = project_feature_ids(project.id_project, request.form.getlist("features"))
+        sync_milestone_links(milestone.id_milestone, selected)
         db.session.commit()        # Wijzigingen opslaan
 
         flash("Milestone added successfully.", "success")
@@ -1079,33 +1689,10 @@ def add_milestone(roadmap_id):
 
 
 @main.route("/milestone/edit/<int:id_milestone>", methods=["GET", "POST"])
-def edit_milestone(id_milestone):
-    user = require_login()  # Controle: enkel Founder/PM mogen milestones toevoegen.
-
-    role_redirect = require_role(["Founder", "PM"], user)
-    if role_redirect:
-        return role_redirect
-
-    milestone = Milestone.query.get_or_404(id_milestone)  # Bestaande milestone ophalen
-    roadmap = Roadmap.query.get_or_404(milestone.id_roadmap)
-    project = Project.query.get_or_404(roadmap.id_project)
-
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect  # Toegang beperken tot eigen company
-
-    # Alle features van dit project ophalen
-    features = Features_ideas.query.filter_by(id_project=project.id_project).all()
-
-    # VECTR score berekenen (zoals bij add_milestone)
-
-    # 1a. Limieten ophalen uit Project object en verpakken in tuples
-    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
-    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
-    
-    # 1b. Correcte aanroep met de vereiste argumenten
-    # Dit zal nu de VECTR score berekenen met de GESCHAALDE TTV.
-    features = calculate_vectr_scores(features, ttm_limits, ttbv_limits)
+@authorize("milestone", "id_milestone", roles=["Founder", "PM"])     # Enkel Founder/PM mogen milestones aanpassen
+def edit_milestone(milestone, roadmap, project):
+    # Alle features van dit project ophalen en de VECTR score berekenen (zoals bij add_milestone)
+    features = load_scored_rows(project)
 
     features = sorted(features, key=lambda x: getattr(x, "vectr_score", 0), reverse=True)
 
@@ -1133,21 +1720,10 @@ def edit_milestone(id_milestone):
         milestone.goal = data["goal"]
         milestone.status = data["status"]
 
-        # Nieuwe selectie van features koppelen
-        selected = request.form.getlist("features")
-        # 🔥 Eerst bestaande links verwijderen
-        milestone.milestone_features.clear()
-
-        # 🔗 Nieuwe selectie koppelen
-        selected = request.form.getlist("features")
-
-        for id_feature in selected:
-            link = MilestoneFeature(
-                milestone=milestone,
-                id_feature=id_feature,
-            )
-            db.session.add(link)
-
+        # 🔗 Nieuwe selectie koppelen: enkel het verschil met de bestaande links wegschrijven
+        # (één bulk DELETE + één bulk INSERT; ongewijzigde links blijven staan)
+        selected = project_feature_ids(project.id_project, request.form.getlist("features"))
+        sync_milestone_links(milestone.id_milestone, selected)
 
         db.session.commit()  # Opslaan in database
 
@@ -1162,28 +1738,66 @@ def edit_milestone(id_milestone):
     )
 
 # ==============================
-# DELETE MILESTONE
+# BULK: FEATURES VERPLAATSEN TUSSEN MILESTONES / ROADMAPS
 # ==============================
 
-@main.route("/milestone/delete/<int:id_milestone>", methods=["POST"])
-def delete_milestone(id_milestone):
-    user = require_login()  # Login check
+@main.route("/projects/<int:project_id>/milestone-links/move", methods=["POST"])
+def move_milestone_features(project_id):
+    """
+    Verplaatst veel features in één transactie naar een andere milestone.
+    JSON: {"feature_ids": [...], "to_milestone": id, "from_milestone": id | "from_roadmap": id}
+    Zonder bron worden de features uit de andere milestones van de roadmap van het doel gehaald;
+    met from_roadmap verhuizen ze van een andere roadmap van het project.
+    """
+    user = require_login()
     if not isinstance(user, Profile):
-        return user
+        return ('', 401)
 
-    # Alleen Founders mogen verwijderen
-    role_redirect = require_role(["Founder"], user)
-    if role_redirect:
-        return role_redirect
+    if require_role(["Founder", "PM"], user):
+        return ('', 403)
 
-    milestone = Milestone.query.get_or_404(id_milestone)  # Opzoeken of 404
-    roadmap = Roadmap.query.get_or_404(milestone.id_roadmap)
-    project = Project.query.get_or_404(roadmap.id_project)
+    project = Project.query.get_or_404(project_id)
+    if require_company_ownership(project.id_company, user):
+        return ('', 403)
+
+    data = request.get_json(silent=True) or {}
+    feature_ids = data.get("feature_ids")
+    if not isinstance(feature_ids, list) or not feature_ids:
+        return jsonify({"errors": ["feature_ids must be a non-empty list."]}), 400
+
+    # Milestones en features van dit project, elk in één query
+    milestones = project_milestones(project.id_project)
+    target = data.get("to_milestone")
+    if target not in milestones:
+        return jsonify({"errors": ["to_milestone is not a milestone of this project."]}), 400
+
+    if data.get("from_milestone") is not None:
+        if data["from_milestone"] not in milestones:
+            return jsonify({"errors": ["from_milestone is not a milestone of this project."]}), 400
+        sources = [data["from_milestone"]]
+    else:
+        source_roadmap = data.get("from_roadmap", milestones[target])
+        if source_roadmap not in set(milestones.values()):
+            return jsonify({"errors": ["from_roadmap is not a roadmap of this project."]}), 400
+        sources = [mid for mid, rid in milestones.items() if rid == source_roadmap]
 
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect  # Veiligheidscheck: mag je dit milestone wel verwijderen?
+    wanted = {str(fid) for fid in feature_ids}
+    valid = project_feature_ids(project.id_project, wanted)
+    if valid != wanted:
+        return jsonify({"errors": ["Some features do not belong to this project."], "invalid": sorted(wanted - valid)}), 400
 
+    added, removed = move_feature_links(valid, target, sources)
+    db.session.commit()
+    return jsonify({"moved": len(valid), "added": added, "removed": removed, "to_milestone": target})
+
+
+# ==============================
+# DELETE MILESTONE
+# ==============================
+
+@main.route("/milestone/delete/<int:id_milestone>", methods=["POST"])
+@authorize("milestone", "id_milestone", roles=["Founder"])     # Alleen Founders mogen verwijderen
+def delete_milestone(milestone, roadmap):
     db.session.delete(milestone)  # Milestone verwijderen
     db.session.commit()           # Permanent opslaan
 
@@ -1196,19 +1810,10 @@ def delete_milestone(id_milestone):
 # EVIDENCE: ADD
 # ==============================
 @main.route("/feature/<id_feature>/add-evidence", methods=["GET", "POST"])
-def add_evidence(id_feature):
-    user = require_login()                     # Login check
-    if not isinstance(user, Profile):
-        return user
-
-    feature = Features_ideas.query.get_or_404(id_feature)  # Feature ophalen
-    project = Project.query.get_or_404(feature.id_project)
-
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect  # Voorkomt dat users bij andere companies evidence toevoegen
-
+@authorize("feature", "id_feature")     # Voorkomt dat users bij andere companies evidence toevoegen
+def add_evidence(id_feature, feature, project):
     if request.method == "POST":
+        _limit_upload_size()
         data, errors = parse_evidence_form(request.form)  # Form validatie
         if errors:
             for e in errors:
@@ -1229,10 +1834,19 @@ def add_evidence(id_feature):
         )
 
         db.session.add(ev)
-        db.session.flush()  # Flush slaat tijdelijk ev op zodat het beschikbaar is in sessie voor de helperfunctie
 
-        new_score = recompute_feature_confidence(feature)  # Confidence herberekenen via helper functie
-        feature.quality_score = new_score if new_score is not None else old_conf
+        # Optioneel bestand: in blokken naar de attachment store (zie app/utils/attachments.py)
+        upload = request.files.get("attachment_file")
+        if upload and upload.filename:
+            try:
+                attach_file(ev, project.id_company, upload)
+            except AttachmentError as e:
+                db.session.rollback()
+                flash(str(e), "danger")
+                return render_template("add_evidence.html", feature=feature, CONFIDENCE_LEVELS=CONFIDENCE_LEVELS)
+
+        # O(1): nieuwe evidence kan de confidence alleen verhogen, geen herberekening nodig
+        apply_evidence_added(feature, data["new_confidence"])
 
         db.session.commit()
 
@@ -1257,6 +1871,7 @@ def view_evidence(id_feature):
     # Evidence oplijsten: hoogste confidence eerst
     evidence_list = (
         Evidence.query.filter_by(id_feature=id_feature)
+        .options(joinedload(Evidence.attachment))       # bijlagen in dezelfde query
         .order_by(Evidence.new_confidence.desc())
         .all()
     )
@@ -1276,31 +1891,17 @@ def view_evidence(id_feature):
 # EVIDENCE: DELETE
 # ==============================
 @main.route("/evidence/<int:evidence_id>/delete", methods=["POST"])
-def delete_evidence(evidence_id):
-    user = require_login()
-    if not isinstance(user, Profile):
-        return user
-    
-    # Alleen Founders mogen verwijderen
-    role_redirect = require_role(["Founder"], user)
-    if role_redirect:
-        return role_redirect
-
-    ev = Evidence.query.get_or_404(evidence_id)  # Evidence ophalen
-    feature = Features_ideas.query.get_or_404(ev.id_feature)
-    project = Project.query.get_or_404(feature.id_project)
+@authorize("evidence", "evidence_id", roles=["Founder"])     # Alleen Founders mogen verwijderen
+def delete_evidence(evidence, feature):
+    fallback_old = evidence.old_confidence or 0.0  # Oude waarde gebruiken als fallback
+    removed_conf = evidence.new_confidence
 
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect
-
-    fallback_old = ev.old_confidence or 0.0  # Oude waarde gebruiken als fallback
-
-    db.session.delete(ev)
+    remove_attachments(EvidenceAttachment.id_evidence == evidence.id_evidence)  # bijlage + quota van de company
+    db.session.delete(evidence)
     db.session.flush()                        # Verwijderen verwerken voordat score herberekend wordt
 
-    new_score = recompute_feature_confidence(feature)
-    feature.quality_score = new_score if new_score is not None else fallback_old
+    # SELECT max() enkel als de verwijderde evidence het maximum kon zijn
+    apply_evidence_removed(feature, removed_conf, fallback=fallback_old)
 
     db.session.commit()
 
@@ -1313,43 +1914,54 @@ def delete_evidence(evidence_id):
 # EVIDENCE: EDIT
 # ==============================
 @main.route("/evidence/<int:evidence_id>/edit", methods=["GET", "POST"])
-def edit_evidence(evidence_id):
-    user = require_login()
-    if not isinstance(user, Profile):
-        return user
-
-    ev = Evidence.query.get_or_404(evidence_id)
-    feature = Features_ideas.query.get_or_404(ev.id_feature)
-    project = Project.query.get_or_404(feature.id_project)
-
-    company_redirect = require_company_ownership(project.id_company, user)
-    if company_redirect:
-        return company_redirect
-
+@authorize("evidence", "evidence_id")
+def edit_evidence(evidence, feature, project):
     if request.method == "POST":
+        _limit_upload_size()
         data, errors = parse_evidence_form(request.form)
         if errors:
             for e in errors:
                 flash(e, "danger")
             return render_template(
                 "edit_evidence.html",
-                evidence=ev,
+                evidence=evidence,
                 feature=feature,
                 CONFIDENCE_LEVELS=CONFIDENCE_LEVELS,
             )
 
-        # Velden actualiseren
-        ev.title = data["title"]
-        ev.type = data["final_type"]
-        ev.source = data["source"]
-        ev.description = data["description"]
-        ev.attachment_url = data["attachment_url"]
-        ev.new_confidence = data["new_confidence"]
+        previous_conf = evidence.new_confidence
 
-        db.session.flush()  # Score opnieuw kunnen berekenen
+        # Velden actualiseren
+        evidence.title = data["title"]
+        evidence.type = data["final_type"]
+        evidence.source = data["source"]
+        evidence.description = data["description"]
+        evidence.attachment_url = data["attachment_url"]
+        evidence.new_confidence = data["new_confidence"]
+
+        # Bijlage vervangen of verwijderen
+        upload = request.files.get("attachment_file")
+        try:
+            if upload and upload.filename:
+                attach_file(evidence, project.id_company, upload)
+            elif request.form.get("remove_attachment"):
+                remove_attachments(EvidenceAttachment.id_evidence == evidence.id_evidence)
+        except AttachmentError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return render_template(
+                "edit_evidence.html",
+                evidence=evidence,
+                feature=feature,
+                CONFIDENCE_LEVELS=CONFIDENCE_LEVELS,
+            )
 
-        new_score = recompute_feature_confidence(feature)
-        feature.quality_score = new_score if new_score is not None else 0.0
+        # Verhoging -> O(1) update, verlaging -> één SELECT max()
+        if previous_conf is None or data["new_confidence"] >= previous_conf:
+            apply_evidence_added(feature, data["new_confidence"])
+        else:
+            db.session.flush()  # Score opnieuw kunnen berekenen
+            apply_evidence_removed(feature, previous_conf)
 
         db.session.commit()
 
@@ -1358,13 +1970,28 @@ def edit_evidence(evidence_id):
 
     return render_template(
         "edit_evidence.html",
-        evidence=ev,
+        evidence=evidence,
         feature=feature,
         CONFIDENCE_LEVELS=CONFIDENCE_LEVELS,
     )
 
 
 
+# ==============================
+# EVIDENCE: BIJLAGE DOWNLOADEN
+# ==============================
+def _limit_upload_size():
+    """Te grote uploads meteen weigeren (413), nog voor Werkzeug het formulier inleest."""
+    request.max_content_length = current_app.config["ATTACHMENT_MAX_BYTES"] + 1024 * 1024   # + marge voor de tekstvelden
+
+
+@main.route("/attachments/<int:attachment_id>")
+@authorize("attachment", "attachment_id")
+def evidence_attachment(attachment):
+    """Bestand van een evidence (Range-requests, ETag, lange private cache)."""
+    return send_attachment(attachment)
+
+
 # ==============================
 # VECTR CHART PDF
 # ==============================
@@ -1381,138 +2008,17 @@ def vectr_chart_pdf(project_id):
     if company_redirect:
         return company_redirect  # Redirect als user niet eigenaar is van company
 
-    # 3) Haal alle features van dit project op
-    features = Features_ideas.query.filter_by(id_project=project_id).all()
+    # 3) Haal alle features van dit project op (enkel de scoring-kolommen)
+    features = load_scoring_rows(project_id)
 
     # 4) Gebruik de centrale helper om de geschaalde chart data te verkrijgen
     # Deze helper (prepare_vectr_chart_data) haalt de grenzen uit het Project object.
     chart_data = prepare_vectr_chart_data(project, features) 
 
-    # 5) Bepaal de TtV grenzen van het Project voor de schaal-berekening in de plot
-    # De grens is nu de som van de project-limieten (TTM Low/High + TTBV Low/High)
-    local_TTV_MIN = (project.ttm_low_limit or 0.0) + (project.ttbv_low_limit or 0.0)
-    local_TTV_MAX = (project.ttm_high_limit or 10.0) + (project.ttbv_high_limit or 0.0)
-
-    # 6) Setup matplotlib figuur
-    fig, ax = plt.subplots(figsize=(10, 10))                # Maak een figuur en een as-object van 10x10 inch
-    ax.set_xlim(0.0, 10.0)
-    ax.set_ylim(0.0, 10.0)
-
-    # 7) Definieer zones (kleurvlakken op de chart)
-    zones = [
-        {"color": (1, 0, 0, 0.25), "x": 0.0, "y": 0.0, "w": 7.0, "h": 5.0},   # rood zone
-        {"color": (1, 140/255, 0, 0.25), "x": 1.0, "y": 5.0, "w": 6.0, "h": 5.0}, # oranje zone
-        {"color": (1, 0, 0, 0.25), "x": 0.0, "y": 5.0, "w": 1.0, "h": 5.0},   # rood smalle zone
-        {"color": (0, 150/255, 0, 0.25), "x": 7.0, "y": 7.0, "w": 3.0, "h": 3.0}, # groen zone
-        {"color": (144/255, 238/255, 144/255, 0.25), "x": 7.0, "y": 5.0, "w": 3.0, "h": 2.0}, # lichtgroen zone
-        {"color": (1, 165/255, 0, 0.25), "x": 7.0, "y": 0.0, "w": 3.0, "h": 5.0}, # oranje zone
-    ]
-
-    # 8) Voeg zones toe als rechthoeken
-    for z in zones:
-        rect = patches.Rectangle(
-            (z["x"], z["y"]),           # startpositie (linkeronderhoek)
-            z["w"],                     # breedte van de rechthoek
-            z["h"],                     # hoogte van de rechthoek
-            facecolor=z["color"],       # vulkleur (RGBA)
-            edgecolor=(0, 0, 0, 0.4),   # randkleur (zwart, transparant)
-            linewidth=0.5,              # dikte van de rand
-        )
-        ax.add_patch(rect)              # voeg de rechthoek toe aan de grafiek
-
-    # 9) Helperfunctie: bepaal kleur van een feature op basis van confidence + TTV
-    def get_zone_color_mpl(confidence, ttv_scaled):
-        x_low = CONF_LOW_THRESHOLD        # drempel voor lage confidence
-        x_high = CONF_MID_HIGH_THRESHOLD  # drempel voor hoge confidence
-        y_slow = TTV_SLOW_THRESHOLD       # drempel voor trage TTV
-        y_fast = TTV_MID_THRESHOLD        # drempel voor snelle TTV
-
-        # Logica: kies kleur afhankelijk van confidence en TTV
-        if confidence >= x_high:
-            if ttv_scaled >= y_fast:
-                return (0, 150/255, 0, 1)  # groen
-            elif y_slow <= ttv_scaled < y_fast:
-                return (144/255, 238/255, 144/255, 1)  # lichtgroen
-            else:
-                return (1, 165/255, 0, 1)  # oranje
-        else:
-            if ttv_scaled < y_slow or confidence < x_low:
-                return (1, 0, 0, 1)  # rood
-            else:
-                return (1, 140/255, 0, 1)  # oranje
-
-    # 10) Verzamel scatter data (punten op de chart)
-    scatter_x = []       # x-waarden: confidence waarden
-    scatter_y = []       # y-waarden: TTV waarden
-    scatter_s = []       # grootte van de cirkel (ROI)
-    scatter_c = []       # kleur van de cirkel
-    scatter_labels = []  # naam van de feature
-
-    for item in chart_data: # Loop over de reeds geschaalde data uit de helper
-        
-        conf = item["confidence"]                       # confidence score
-        ttv_scaled = item["ttv"]                        # geschaalde TTV (0-10)
-        roi_val = item["roi"]                           # ROI waarde
-        
-        # De effectieve TTV (ttm_weeks + ttbv_weeks) zit in item["ttv_weeks"] indien nodig
-        
-        if roi_val and roi_val > 0:
-            # Als ROI positief is: bereken de wortel
-            size_mpl_area = 32 * math.sqrt(roi_val/100) *32 * math.sqrt(roi_val/100)* math.pi           # bubble size (straal = 25 * math.sqrt(roi_val/100) )
-        else:
-            # Als ROI negatief of 0 is: geef de bubble een grootte van 0 (of een kleine vaste waarde)
-            size_mpl_area = 0  
-
-        color = get_zone_color_mpl(conf, ttv_scaled)              # kleur bepalen via helperfunctie
-        
-        # Voegt data toe aan de lijsten
-        scatter_x.append(conf)
-        scatter_y.append(ttv_scaled)
-        scatter_s.append(size_mpl_area)
-        scatter_c.append(color)
-        if size_mpl_area > 0:
-            scatter_labels.append(item["name"])
-
-    # 11) Plot scatter chart
-    ax.scatter(
-        scatter_x,
-        scatter_y,
-        s=scatter_s,        # grootte van de cirkel
-        c=scatter_c,        # kleur van de cirkel
-        edgecolors="black", # zwarte rand
-        linewidths=1.0,
-        alpha=0.8,          # transparantie
-    )
+    # 5) Teken de chart (zones, bubbels, labels) en bewaar hem als PDF in een geheugenbuffer
+    buf = BytesIO(render_chart_pdf(chart_data, f"VECTR Prioritization Chart for {project.project_name}"))
 
-    # 12) Labels en ticks (custom tekst op assen)
-    ax.set_xticks([0, 1, 3, 5, 7, 8, 10])
-    ax.set_xticklabels(["0", "Low", "3", "5", "7", "High", "10"])
-    ax.set_yticks([0, 1, 2, 3, 5, 7, 8, 10])
-    ax.set_yticklabels(["0", "1", "Slow", "3", "5", "7", "Fast", "10"])
-
-    ax.set_xlabel("Confidence")                                             # x-as label
-    ax.set_ylabel("Time-to-Value (TtV)")                                    # y-as label
-    ax.set_title(f"VECTR Prioritization Chart for {project.project_name}")  # titel met projectnaam
-
-    # 13) Annotaties (labels bij de punten)
-    for i, label in enumerate(scatter_labels):
-        ax.annotate(
-            label,                        # tekst (feature naam)
-            (scatter_x[i], scatter_y[i]), # positie van de cirkel
-            textcoords="offset points",   # offset in pixels
-            xytext=(5, -5),               # verschuiving van label
-            ha="left",                    # horizontale uitlijning
-            fontsize=7,                   # lettergrootte
-        )
-
-    # 14) Opslaan als PDF in geheugenbuffer
-    plt.tight_layout()              # layout netjes maken
-    buf = BytesIO()                 # buffer in geheugen (om data tijdelijk op te slaan zonder dat er iets op de schijft terecht komt) )
-    plt.savefig(buf, format="pdf")  # figuur opslaan als PDF in buffer
-    plt.close(fig)                  # figuur sluiten om geheugen vrij te maken
-    buf.seek(0)                     # cursor terug naar begin van buffer
-
-    # 15) Stuur PDF terug als download
+    # 6) Stuur PDF terug als download
     return send_file(
         buf,
         as_attachment=True,                                             # forceer download
@@ -1520,9 +2026,75 @@ def vectr_chart_pdf(project_id):
         mimetype="application/pdf",                                     # soort bestand waarin het wordt gedownload
     )
 
+# ==============================
+# PORTFOLIO RAPPORT (PDF, ALLE PROJECTEN)
+# ==============================
+@main.route("/portfolio/report.pdf", methods=["GET"])
+def portfolio_report_pdf():
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    alpha = to_numeric(request.args.get("alpha", 0.5))
+    if not 0.0 <= alpha <= 1.0:
+        alpha = 0.5
+
+    # 1) Data in dit proces (één query voor alle features), 2) pagina's in een process pool
+    cover, pages = load_portfolio_report(user.id_company, alpha=alpha)
+    document = build_portfolio_pdf(cover, pages, workers=current_app.config.get("PDF_REPORT_WORKERS", 1))
+
+    # 3) Samengevoegde PDF in blokken naar de client
+    company_name = cover["company_name"] or "company"
+    return send_file(
+        document,
+        as_attachment=True,
+        download_name=f"vectr_portfolio_{company_name}.pdf",
+        mimetype="application/pdf",
+    )
+
+# ==============================
+# SEARCH ROUTE
+# ==============================
+@main.route("/search", methods=["GET"])
+def search():
+    """Full-text zoeken in features, evidence en chat van de eigen company."""
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    query = request.args.get("q", "").strip()
+    kind = request.args.get("kind") if request.args.get("kind") in SEARCH_KINDS else None
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+
+    results, has_next, truncated = search_documents(
+        user.id_company,
+        query,
+        page=page,
+        per_page=current_app.config.get("SEARCH_PER_PAGE", 20),
+        kind=kind,
+        max_candidates=current_app.config.get("SEARCH_MAX_CANDIDATES", 5000),
+    )
+    return render_template(
+        "search_results.html",
+        query=query,
+        kind=kind,
+        kinds=SEARCH_KINDS,
+        page=page,
+        has_next=has_next,
+        truncated=truncated,
+        results=results,
+    )
+
 # ==============================
 # FEATURE DECISION ROUTE 
 # ==============================
+def _decision_type_from_value(decision_value):
+    if decision_value == "Yes":
+        return "Approved"
+    elif decision_value == "No":
+        return "Rejected"
+    return "Pending"
+
 @main.route("/set_feature_decision/<string:id_feature>/<string:decision_value>", methods=["POST"])
 def set_feature_decision(id_feature, decision_value):
     # 1) Login check
@@ -1536,29 +2108,12 @@ def set_feature_decision(id_feature, decision_value):
 
 
     # 3) Map Yes/No naar decision types (matcht met je CSS: decision-approved / decision-rejected)
-    if decision_value == "Yes":
-        decision_type = "Approved"
-    elif decision_value == "No":
-        decision_type = "Rejected"
-    else:
-        decision_type = "Pending"
+    decision_type = _decision_type_from_value(decision_value)
 
-    # 4) Nieuwe Decision record opslaan of bestaande bijwerken voor deze gebruiker
+    # 4) Atomaire upsert (INSERT ... ON CONFLICT DO UPDATE) + stemtelling in dezelfde transactie
     try:
-        existing_decision = Decision.query.filter_by(
-            id_feature=feature.id_feature, id_profile=user.id_profile
-        ).first()
-
-        if existing_decision:
-            existing_decision.decision_type = decision_type
-        else:
-            d = Decision(
-                id_feature=feature.id_feature,
-                id_profile=user.id_profile,
-                decision_type=decision_type,
-            )
-            db.session.add(d)
-
+        cast_feature_decision(feature.id_feature, user.id_profile, decision_type)
+        publish_invalidation(project_ids=[feature.id_project])     # stemtelling via Core: caches zelf melden
         db.session.commit()
 
         flash(f"Decision saved: {decision_type}", "success")
@@ -1587,6 +2142,23 @@ def project_detail(project_id):
         project=project, 
         features=features
     )
+# Projecten in de navbar per company; invalidatie via de cache bus (nieuw/gewijzigd/verwijderd project)
+_SIDEBAR_CACHE = ScopedCache(size=512)
+SidebarProject = namedtuple("SidebarProject", ["id_project", "project_name"])
+
+def _sidebar_projects(company_id):
+    """(id_project, project_name) van alle projecten van een company, gesorteerd op naam."""
+    return _SIDEBAR_CACHE.get_or_set(
+        company_id,
+        (company_key(company_id),),
+        lambda: [
+            SidebarProject(*row)
+            for row in db.session.query(Project.id_project, Project.project_name)
+            .filter_by(id_company=company_id)
+            .order_by(Project.project_name.asc())
+        ],
+    )
+
 # Dit is een Context Processor. Het injecteert de user_projects variabele in ALLE templates.
 @main.context_processor
 def inject_user_projects():
@@ -1596,14 +2168,12 @@ def inject_user_projects():
     if user_id:
         # Stap 1: Zoek de user zijn Profile om de id_company te vinden
         # We gaan ervan uit dat id_profile overeenkomt met de user_id in de sessie
-        profile = Profile.query.filter_by(id_profile=user_id).first() 
+        # (db.session.get: meestal al geladen door require_login, dus geen extra query)
+        profile = db.session.get(Profile, user_id)
         
         if profile and profile.id_company:
-            company_id = profile.id_company
-            
-            # Stap 2: Haal alle projecten op voor die company_id
-            # Sorteer ze op naam (project_name.asc()) voor een mooie lijst
-            user_projects = Project.query.filter_by(id_company=company_id).order_by(Project.project_name.asc()).all()
+            # Stap 2: Projecten van die company (gecachet), gesorteerd op naam
+            user_projects = _sidebar_projects(profile.id_company)
             
     # Zorgt dat {{ user_projects }} overal beschikbaar is
     return dict(user_projects=user_projects)
@@ -1616,6 +2186,17 @@ def inject_user_projects():
 # CHAT DASHBOARD (PROJECT-CHATS)
 # ==============================
 
+def _chat_messages(project_id):
+    """Berichten van een project-chat als stream: afzender in dezelfde query, rijen per batch."""
+    return RowStream(
+        ProjectChatMessage.query
+        .filter_by(id_project=project_id)
+        .options(joinedload(ProjectChatMessage.sender))
+        .order_by(ProjectChatMessage.createdat.asc())
+        .yield_per(200)
+    )
+
+
 @main.route("/chat")
 def chat_dashboard():
     """Toont chatdashboard: links projecten, rechts chat van eerste project."""
@@ -1639,18 +2220,11 @@ def chat_dashboard():
     # Standaard: eerste project in de lijst
     first_project = projects[0]
 
-    messages = (
-        ProjectChatMessage.query
-        .filter_by(id_project=first_project.id_project)
-        .order_by(ProjectChatMessage.createdat.asc())
-        .all()
-    )
-
-    return render_template(
+    return stream_page(
         "chat_dashboard.html",
         projects=projects,
         selected_project=first_project,
-        messages=messages,
+        messages=_chat_messages(first_project.id_project),
         user=user,
     )
 
@@ -1677,18 +2251,11 @@ def chat_dashboard_project(project_id):
         .all()
     )
 
-    messages = (
-        ProjectChatMessage.query
-        .filter_by(id_project=project_id)
-        .order_by(ProjectChatMessage.createdat.asc())
-        .all()
-    )
-
-    return render_template(
+    return stream_page(
         "chat_dashboard.html",
         projects=projects,
         selected_project=project,
-        messages=messages,
+        messages=_chat_messages(project_id),
         user=user,
     )
 
@@ -1736,15 +2303,41 @@ def chat_project_messages(project_id):
     if company_redirect:
         return company_redirect
 
+    return stream_page(
+        "chat_messages.html",
+        messages=_chat_messages(project_id),
+        user=user,
+    )
+
+
+@main.route("/chat/project/<int:project_id>/messages.json")
+def chat_project_messages_json(project_id):
+    """
+    Berichten na ?after=<id_message> als JSON. De sync versie antwoordt meteen; in ASGI-modus
+    houdt het async endpoint de request open tot er een nieuw bericht is (?wait=<s>).
+    """
+    user = require_login()
+    if not isinstance(user, Profile):
+        return user
+
+    project = Project.query.get_or_404(project_id)
+
+    company_redirect = require_company_ownership(project.id_company, user)
+    if company_redirect:
+        return company_redirect
+
+    after = request.args.get("after", 0, type=int)
     messages = (
-        ProjectChatMessage.query
-        .filter_by(id_project=project_id)
-        .order_by(ProjectChatMessage.createdat.asc())
+        db.session.query(
+            ProjectChatMessage.id_message,
+            ProjectChatMessage.id_profile,
+            Profile.name.label("sender_name"),
+            ProjectChatMessage.content,
+            ProjectChatMessage.createdat,
+        )
+        .join(Profile, Profile.id_profile == ProjectChatMessage.id_profile)
+        .filter(ProjectChatMessage.id_project == project_id, ProjectChatMessage.id_message > after)
+        .order_by(ProjectChatMessage.id_message.asc())
         .all()
     )
-
-    return render_template(
-        "chat_messages.html",
-        messages=messages,
-        user=user,
-    )
\ No newline at end of file
+    return jsonify(chat_messages_payload(messages, user.id_profile, after=after))
\ No newline at end of file
@@ -0,0 +1,68 @@
+// static/js/capacity_curve.js
+
+/**
+ * Toont de features die bij een bepaald punt van de curve gekozen worden.
+ */
+function showCurveSelection(curveData, point, label) {
+    const title = document.getElementById('curveSelectionTitle');
+    const list = document.getElementById('curveSelection');
+    title.textContent = `Selected features at ${label} (value ${point.value})`;
+    list.innerHTML = '';
+    if (point.features.length === 0) {
+        list.innerHTML = '<li class="text-muted">No features fit at this level.</li>';
+        return;
+    }
+    point.features.forEach(id => {
+        const li = document.createElement('li');
+        li.textContent = curveData.features[id] || id;
+        list.appendChild(li);
+    });
+}
+
+/**
+ * Eén lijngrafiek (trapfunctie) van waarde t.o.v. capaciteit.
+ */
+function drawCurve(canvasId, curveData, points, xKey, xLabel, formatX) {
+    const ctx = document.getElementById(canvasId).getContext('2d');
+    return new Chart(ctx, {
+        type: 'line',
+        data: {
+            datasets: [{
+                label: 'Best VECTR value',
+                data: points.map(p => ({ x: p[xKey], y: p.value })),
+                stepped: true,
+                borderColor: 'rgba(0, 120, 200, 1)',
+                backgroundColor: 'rgba(0, 120, 200, 0.15)',
+                fill: true,
+                pointRadius: 3
+            }]
+        },
+        options: {
+            scales: {
+                x: { type: 'linear', title: { display: true, text: xLabel } },
+                y: { beginAtZero: true, title: { display: true, text: 'VECTR value' } }
+            },
+            plugins: {
+                legend: { display: false },
+                tooltip: { callbacks: { title: items => formatX(items[0].parsed.x) } }
+            },
+            onClick: (event, elements) => {
+                if (!elements.length) return;
+                const point = points[elements[0].index];
+                showCurveSelection(curveData, point, formatX(point[xKey]));
+            }
+        }
+    });
+}
+
+function initCapacityCurves(curveData) {
+    const euro = v => '€ ' + Math.round(v).toLocaleString();
+    const hours = v => Math.round(v) + ' hours';
+
+    drawCurve('budgetCurveChart', curveData, curveData.budget_curve, 'budget', 'Budget (€)', euro);
+    drawCurve('timeCurveChart', curveData, curveData.time_curve, 'hours', 'Time (hours)', hours);
+
+    // Standaard: de selectie bij de huidige (volledige) capaciteit
+    const last = curveData.budget_curve[curveData.budget_curve.length - 1];
+    if (last) showCurveSelection(curveData, last, euro(last.budget));
+}
@@ -0,0 +1,79 @@
+// static/js/feature_rows.js
+
+/**
+ * Rij-acties in de feature-tabel (stemmen, waarschuwing verwijderen, quick edit)
+ * zonder de volledige pagina te herladen: de server stuurt enkel de bijgewerkte <tr> terug.
+ * Zonder JavaScript blijven de gewone formulieren (met redirect) werken.
+ */
+
+function getCsrfToken() {
+    const input = document.querySelector("input[name='csrf_token']");
+    return input ? input.value : "";
+}
+
+/**
+ * Vervangt de bestaande rij (zelfde id) door de HTML van de server.
+ * @param {string} html - De gerenderde <tr> uit features/_feature_row.html.
+ */
+function replaceFeatureRow(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    const newRow = template.content.querySelector("tr");
+    if (!newRow) return;
+
+    const oldRow = document.getElementById(newRow.id);
+    if (oldRow) {
+        oldRow.replaceWith(newRow);
+        if (typeof initOutlierPopovers === "function") initOutlierPopovers(newRow);
+    }
+}
+
+/**
+ * POST naar een rij-partial endpoint en vervang de rij.
+ * Als de server 'X-Outliers-Changed' meestuurt, zijn de IQR-grenzen verschoven
+ * en kunnen ook andere rijen een andere vlag hebben -> hele tabel vernieuwen.
+ * 'X-Schedule-Conflicts' noemt de milestones waar de feature niet meer in past (de link blijft staan).
+ */
+async function postRowPartial(url, formData) {
+    const res = await fetch(url, {
+        method: "POST",
+        body: formData || new FormData(),
+        headers: { "X-CSRFToken": getCsrfToken() },
+    });
+
+    if (!res.ok) {
+        throw new Error(`Row update failed with status ${res.status}`);
+    }
+    const conflicts = res.headers.get("X-Schedule-Conflicts");
+    if (conflicts) {
+        window.alert(`This feature no longer fits the capacity of milestone(s) ${conflicts}. Review the roadmap.`);
+    }
+    if (res.headers.get("X-Outliers-Changed")) {
+        window.location.reload();
+        return;
+    }
+    replaceFeatureRow(await res.text());
+}
+
+/**
+ * Quick edit: past enkel de meegegeven velden van een feature aan.
+ * @param {string} featureId - UUID van de feature.
+ * @param {Object} fields - bv. { quality_score: 3, investment_hours: 40 }
+ */
+function quickEditFeature(featureId, fields) {
+    const formData = new FormData();
+    Object.entries(fields).forEach(([key, value]) => formData.append(key, value));
+    return postRowPartial(`/feature/${encodeURIComponent(featureId)}/quick-edit`, formData);
+}
+
+// Stemknoppen onderscheppen (event delegation, werkt ook voor vervangen rijen)
+document.addEventListener("submit", (event) => {
+    const form = event.target.closest("form.js-row-action");
+    if (!form || !form.dataset.partialUrl) return;
+
+    event.preventDefault();
+    postRowPartial(form.dataset.partialUrl, new FormData(form)).catch(err => {
+        console.error("Partial update failed, falling back to full submit:", err);
+        form.submit();
+    });
+});
@@ -18,7 +18,18 @@ function confirmAndDismissWarning(outlierId) {
             if (instance) instance.hide();
         }
 
-        // 2. Voer de POST request uit
+        // 2. Rij-partial: enkel deze rij vervangen i.p.v. de hele pagina te herladen
+        const row = container ? container.closest('tr[data-feature-id]') : null;
+        if (row && typeof postRowPartial === 'function') {
+            postRowPartial(`/feature/${encodeURIComponent(row.dataset.featureId)}/dismiss/row`)
+                .catch(err => {
+                    console.error('Failed to dismiss warning:', err);
+                    alert('Could not remove the warning due to a server error.');
+                });
+            return;
+        }
+
+        // Fallback: oude endpoint + herladen
         fetch(`/outliers/${encodeURIComponent(outlierId)}/dismiss`, {
             method: 'POST',
             // headers: { 'Content-Type': 'application/json' } is niet langer nodig, maar mag blijven.
@@ -44,10 +55,12 @@ function confirmAndDismissWarning(outlierId) {
 
 
 /**
- * Initialiseert alle Popovers.
+ * Initialiseert de Popovers binnen `root` (standaard het hele document).
+ * Wordt ook aangeroepen voor rijen die via een partial-endpoint vervangen zijn.
  */
-document.addEventListener('DOMContentLoaded', () => {
-  
+function initOutlierPopovers(root) {
+  root = root || document;
+
   // Hulpfunctie om de Popover te controleren/sluiten
   const hideIfOutside = (popoverInstance, triggerEl) => {
       setTimeout(() => {
@@ -63,7 +76,7 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
   // 1. INITIALISEER ALLE POPOVERS
-  document.querySelectorAll('.outlier-trigger').forEach(triggerEl => {
+  root.querySelectorAll('.outlier-trigger').forEach(triggerEl => {
     const contentId = triggerEl.dataset.bsContentId;
     const contentEl = document.getElementById(contentId);
     if (!contentEl) return;
@@ -106,4 +119,6 @@ document.addEventListener('DOMContentLoaded', () => {
     // Zorg ervoor dat de popover sluit als de muis beweegt
     triggerEl.addEventListener('mouseleave', () => hideIfOutside(popoverInstance, triggerEl));
   });
-});
\ No newline at end of file
+}
+
+document.addEventListener('DOMContentLoaded', () => initOutlierPopovers(document));
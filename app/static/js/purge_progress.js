@@ -0,0 +1,39 @@
+// static/js/purge_progress.js
+// Voortgang van projecten die op de achtergrond verwijderd worden (projectoverzicht).
+// Elke balk pollt /purge-jobs/<id> tot de job klaar of mislukt is.
+
+const PURGE_POLL_MS = 1500;
+
+function pollPurgeJob(el) {
+    const bar = el.querySelector('[data-purge-bar]');
+    const status = el.querySelector('[data-purge-status]');
+
+    fetch(`/purge-jobs/${encodeURIComponent(el.dataset.purgeJob)}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(job => {
+            bar.style.width = `${job.percent}%`;
+            if (job.status === 'done') {
+                status.textContent = 'done';
+                // Even tonen dat het klaar is, dan de melding weghalen
+                setTimeout(() => el.remove(), 1500);
+                return;
+            }
+            if (job.status === 'failed') {
+                status.textContent = 'failed';
+                el.classList.replace('alert-secondary', 'alert-danger');
+                return;
+            }
+            status.textContent = `${job.step || job.status} · ${job.percent}%`;
+            setTimeout(() => pollPurgeJob(el), PURGE_POLL_MS);
+        })
+        .catch(err => console.error('Failed to load purge progress:', err));
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('[data-purge-job]').forEach(el => {
+        if (!el.classList.contains('alert-danger')) pollPurgeJob(el);
+    });
+});
@@ -1,7 +1,8 @@
 // static/js/vectr_chart.js
 
 // Definieer de initialisatiefunctie globaal
-function initVECTRChart(ctx, chartData) {
+// chartData: losse features; clusters: gebundelde features (zie vectr_chart_data); bounds: [x0, x1, y0, y1]
+function initVECTRChart(ctx, chartData, clusters = [], bounds = [0, 10, 0, 10]) {
         // ====================================================
         // 1. Custom Plugin: VECTR Zes Zones 
         // ====================================================
@@ -11,6 +12,11 @@ function initVECTRChart(ctx, chartData) {
                 const { ctx, chartArea: { left, top, right, bottom }, scales: { x, y } } = chart;
                 ctx.save();
 
+                // Bij inzoomen vallen zones deels buiten beeld: enkel binnen de tekenzone kleuren
+                ctx.beginPath();
+                ctx.rect(left, top, right - left, bottom - top);
+                ctx.clip();
+
                 // Grenswaarden voor Confidence (X-as)
                 const x_low = x.getPixelForValue(1);
                 const x_mid_high = x.getPixelForValue(7);
@@ -117,12 +123,37 @@ function initVECTRChart(ctx, chartData) {
             // Zet de rand op zwart voor contrast
             borderColor: 'rgba(0, 0, 0, 1)',
             borderWidth: 1
+        }, {
+            label: 'Clusters',
+            data: clusters.map(item => {
+                // Cluster: gemiddelde ROI bepaalt de basisgrootte, het aantal features maakt hem groter
+                const isMobile = window.innerWidth < 768;
+                const scaleFactor = isMobile ? 22 : 50;
+                const diameter = scaleFactor * Math.sqrt(Math.max(item.roi, 0) / 100) * (1 + Math.log10(item.count));
+                const radius = Math.min(Math.max(6, diameter / 2), isMobile ? 30 : 60);
+
+                return {
+                    x: item.confidence,
+                    y: item.ttv,
+                    r: radius,
+                    count: item.count,
+                    roi: item.roi,
+                    roi_sum: item.roi_sum,
+                    top: item.top,
+                    bounds: item.bounds,
+                    zoomable: item.zoomable,
+                    backgroundColor: getZoneColor(item.confidence, item.ttv).replace(', 1)', ', 0.6)')
+                };
+            }),
+            backgroundColor: (context) => context.raw.backgroundColor,
+            borderColor: 'rgba(0, 0, 0, 1)',
+            borderWidth: 3
         }];
 
         // ====================================================
         // 3. Chart.js Initialization
         // ====================================================
-        new Chart(ctx, {
+        return new Chart(ctx, {
             type: 'bubble',
             data: { datasets: datasets },
             plugins: [sixZonePlugin],
@@ -137,6 +168,15 @@ function initVECTRChart(ctx, chartData) {
                         callbacks: {
                             label: function (context) {
                                 const item = context.raw;
+                                if (item.count) {
+                                    // Cluster: aantal, gemiddelde ROI en de features met de hoogste ROI
+                                    return [
+                                        `${item.count} features`,
+                                        `Average ROI: ${item.roi.toFixed(1)}%`,
+                                        ...item.top.map(f => `${f.name} (${f.roi.toFixed(1)}%)`),
+                                        item.zoomable ? 'Click to zoom in' : 'Same position, cannot be separated'
+                                    ];
+                                }
                                 return [
                                     item.name,
                                     `Confidence (X): ${item.confidence.toFixed(2)}`,
@@ -159,8 +199,8 @@ function initVECTRChart(ctx, chartData) {
                         },
                         type: 'linear',
                         position: 'bottom',
-                        min: 0,
-                        max: 10.0,
+                        min: bounds[0],
+                        max: bounds[1],
                         ticks: {
                             // Toon 'Low' bij 0,5 en 'High' bij 8
                             callback: function (value, index, ticks) {
@@ -180,8 +220,8 @@ function initVECTRChart(ctx, chartData) {
                             text: 'Time-to-Value score (TtV)'
                         },
                         type: 'linear',
-                        min: 0,
-                        max: 10.0,
+                        min: bounds[2],
+                        max: bounds[3],
                         ticks: {
                             // Toon 'Fast' bij 8 en 'Slow' bij 3 
                             callback: function (value, index, ticks) {
@@ -198,4 +238,41 @@ function initVECTRChart(ctx, chartData) {
                 }
             }
         });
-    }
\ No newline at end of file
+    }
+
+
+// Haalt de chart-data op bij de server (geaggregeerd per zoomniveau) en tekent de grafiek.
+// Klik op een cluster = inzoomen op zijn features (fijnere clusters of losse features).
+function loadVECTRChart(ctx, dataUrl, { status = null, resetButton = null } = {}) {
+    let chart = null;
+
+    async function show(bounds) {
+        const params = bounds ? new URLSearchParams({ x0: bounds[0], x1: bounds[1], y0: bounds[2], y1: bounds[3] }) : '';
+        const response = await fetch(bounds ? `${dataUrl}?${params}` : dataUrl, { headers: { 'Accept': 'application/json' } });
+        if (!response.ok) {
+            if (status) status.textContent = 'Chart data could not be loaded.';
+            return;
+        }
+        const data = await response.json();
+
+        if (chart) chart.destroy();
+        chart = initVECTRChart(ctx, data.points, data.clusters, data.bounds);
+        chart.options.onClick = (event, elements) => {
+            const element = elements[0];
+            if (!element || element.datasetIndex !== 1) return;
+            const cluster = chart.data.datasets[1].data[element.index];
+            if (cluster.zoomable) show(cluster.bounds);
+        };
+
+        const zoomed = bounds !== null;
+        if (resetButton) resetButton.style.display = zoomed ? '' : 'none';
+        if (status) {
+            status.textContent = data.aggregated
+                ? `${data.total} features in view, ${data.clusters.length} clusters. Click a cluster to zoom in.`
+                : `${data.total} features in view.`;
+        }
+    }
+
+    if (resetButton) resetButton.addEventListener('click', () => show(null));
+    show(null);
+}
@@ -0,0 +1,313 @@
+# app/utils/attachments.py
+# Lokale opslag van evidence-bijlagen.
+#
+# - Uploads worden in blokken van CHUNK_SIZE gelezen, gehasht (SHA-256) en naar een tijdelijk bestand
+#   geschreven; nooit het hele bestand in het geheugen. Werkzeug zet grote uploads zelf al in een
+#   tijdelijk bestand (SpooledTemporaryFile), dus ook het parsen van het formulier blijft klein.
+# - Content-addressed: het bestand heet zoals zijn hash (root/ab/cd/abcd...). Dezelfde inhoud bij
+#   andere features of companies staat maar één keer op schijf (attachment_blob = één rij per inhoud).
+# - Quota per company: storage_used_bytes telt elke unieke inhoud van die company één keer. De eerste
+#   verwijzing verhoogt de teller (UPDATE ... WHERE used + size <= quota, dus atomair), de laatste
+#   verwijzing die verdwijnt verlaagt hem. `flask attachments-gc` rekent de tellers opnieuw uit en ruimt
+#   bestanden zonder verwijzing op.
+# - Serveren via send_file: sendfile/wsgi.file_wrapper, Range-requests en ETag (= de hash). De inhoud
+#   achter een bijlage-id verandert nooit, dus mag de browser hem lang bewaren (privé: achter login).
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+
+from flask import current_app, send_file
+from sqlalchemy import case, delete, func, select, tuple_, update
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.models import AttachmentBlob, Company, EvidenceAttachment
+from app.utils.decisions import dialect_insert
+
+CHUNK_SIZE = 64 * 1024
+# Enkel deze types mag de browser zelf tonen; al de rest wordt een download (geen HTML/SVG van gebruikers op ons domein)
+INLINE_MIMETYPES = {"application/pdf", "image/png", "image/jpeg", "image/gif", "image/webp", "text/plain"}
+
+
+class AttachmentError(ValueError):
+    """Upload geweigerd (leeg, te groot of quota van de company overschreden)."""
+
+
+# -----------------------------------
+# OPSLAG OP SCHIJF
+# -----------------------------------
+
+def attachment_root():
+    return current_app.config["ATTACHMENT_ROOT"]
+
+
+def blob_path(sha256):
+    return os.path.join(attachment_root(), sha256[:2], sha256[2:4], sha256)
+
+
+def store_stream(stream, max_bytes):
+    """
+    Schrijft een stream blok per blok weg onder zijn SHA-256.
+    :return: (sha256, size); bestond de inhoud al, dan wordt niets extra bewaard
+    """
+    tmp_dir = os.path.join(attachment_root(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    hasher, size = hashlib.sha256(), 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AttachmentError(f"The file is larger than {max_bytes // (1024 * 1024)} MB.")
+                hasher.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        sha256 = hasher.hexdigest()
+        final_path = blob_path(sha256)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)                                     # zelfde inhoud bestaat al: dedup
+            os.utime(final_path)                                    # recent gebruikt: attachments-gc laat hem staan
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)                         # atomair: nooit een half bestand
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# -----------------------------------
+# QUOTA
+# -----------------------------------
+
+def _company_references(company_id, sha256):
+    return db.session.execute(
+        select(func.count()).select_from(EvidenceAttachment)
+        .where(EvidenceAttachment.id_company == company_id, EvidenceAttachment.sha256 == sha256)
+    ).scalar()
+
+
+def _charge(company_id, sha256, size, quota):
+    """Eerste verwijzing van de company naar deze inhoud: teller verhogen, binnen het quotum."""
+    if _company_references(company_id, sha256):
+        return
+    result = db.session.execute(
+        update(Company)
+        .where(Company.id_company == company_id, Company.storage_used_bytes + size <= quota)
+        .values(storage_used_bytes=Company.storage_used_bytes + size)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise AttachmentError("Your company has reached its storage quota for attachments.")
+
+
+def release_attachments(rows):
+    """
+    Na het verwijderen van bijlagen (rijen met id_company, sha256, size): de teller verlagen voor
+    inhoud waar de company niet meer naar verwijst. Eén query voor alle paren.
+    """
+    sizes = {(row.id_company, row.sha256): row.size for row in rows}
+    if not sizes:
+        return
+    still_used = set(db.session.execute(
+        select(EvidenceAttachment.id_company, EvidenceAttachment.sha256)
+        .where(tuple_(EvidenceAttachment.id_company, EvidenceAttachment.sha256).in_(sorted(sizes)))
+        .distinct()
+    ).all())
+
+    freed = {}
+    for (company_id, sha256), size in sizes.items():
+        if (company_id, sha256) not in still_used:
+            freed[company_id] = freed.get(company_id, 0) + size
+    for company_id, size in freed.items():
+        db.session.execute(
+            update(Company)
+            .where(Company.id_company == company_id)
+            .values(storage_used_bytes=case(
+                (Company.storage_used_bytes > size, Company.storage_used_bytes - size), else_=0,
+            ))
+            .execution_options(synchronize_session=False)
+        )
+
+
+# -----------------------------------
+# BIJLAGEN
+# -----------------------------------
+
+def attach_file(evidence, company_id, file_storage):
+    """
+    Bewaart een geüploade file (werkzeug FileStorage) als bijlage van `evidence`; een vorige bijlage
+    wordt vervangen. De caller commit.
+    :raises AttachmentError: leeg, te groot of quotum overschreden
+    """
+    config = current_app.config
+    sha256, size = store_stream(file_storage.stream, config["ATTACHMENT_MAX_BYTES"])
+    if size == 0:
+        raise AttachmentError("The uploaded file is empty.")
+
+    db.session.execute(
+        dialect_insert(AttachmentBlob)
+        .values(sha256=sha256, size=size)
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+    if evidence.id_evidence is not None:
+        remove_attachments(EvidenceAttachment.id_evidence == evidence.id_evidence)
+    _charge(company_id, sha256, size, config["ATTACHMENT_QUOTA_BYTES"])
+
+    if evidence.id_evidence is not None:
+        db.session.expire(evidence, ["attachment"])                 # vorige bijlage is net verwijderd
+    filename = secure_filename(file_storage.filename or "") or "attachment"
+    attachment = EvidenceAttachment(
+        evidence=evidence,
+        id_company=company_id,
+        sha256=sha256,
+        filename=filename,
+        mimetype=file_storage.mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        size=size,
+    )
+    db.session.add(attachment)
+    return attachment
+
+
+def remove_attachments(condition):
+    """Verwijdert bijlagen (één DELETE) en past de quota aan. De bestanden ruimt attachments-gc op."""
+    rows = db.session.execute(
+        select(EvidenceAttachment.id_attachment, EvidenceAttachment.id_company,
+               EvidenceAttachment.sha256, EvidenceAttachment.size)
+        .where(condition)
+    ).all()
+    if not rows:
+        return 0
+    ids = {row.id_attachment for row in rows}
+    db.session.execute(
+        delete(EvidenceAttachment)
+        .where(EvidenceAttachment.id_attachment.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, EvidenceAttachment) and obj.id_attachment in ids:
+            db.session.expunge(obj)
+    release_attachments(rows)
+    return len(rows)
+
+
+def send_attachment(attachment):
+    """Response met het bestand: Range-requests, ETag en een lange (private) cache."""
+    inline = attachment.mimetype in INLINE_MIMETYPES
+    response = send_file(
+        blob_path(attachment.sha256),
+        mimetype=attachment.mimetype if inline else "application/octet-stream",
+        as_attachment=not inline,
+        download_name=attachment.filename,
+        conditional=True,                                           # 304 en 206 (Range)
+        etag=attachment.sha256,
+        last_modified=attachment.createdat,
+        max_age=current_app.config["ATTACHMENT_MAX_AGE"],
+    )
+    # Achter login: enkel de browser mag bewaren, geen gedeelde caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+# -----------------------------------
+# ONDERHOUD
+# -----------------------------------
+
+def reconcile_storage_usage():
+    """Rekent storage_used_bytes van elke company opnieuw uit (unieke inhoud per company)."""
+    per_company = (
+        select(EvidenceAttachment.id_company, EvidenceAttachment.sha256, EvidenceAttachment.size)
+        .distinct()
+        .subquery()
+    )
+    used = dict(db.session.execute(
+        select(per_company.c.id_company, func.sum(per_company.c.size)).group_by(per_company.c.id_company)
+    ).all())
+    changed = 0
+    for company_id, current in db.session.execute(select(Company.id_company, Company.storage_used_bytes)).all():
+        if (current or 0) != (used.get(company_id) or 0):
+            db.session.execute(
+                update(Company).where(Company.id_company == company_id)
+                .values(storage_used_bytes=used.get(company_id) or 0)
+                .execution_options(synchronize_session=False)
+            )
+            changed += 1
+    return changed
+
+
+def collect_garbage(grace_seconds):
+    """
+    Verwijdert inhoud waar geen enkele bijlage nog naar verwijst, plus bestanden zonder blob-rij.
+    Enkel ouder dan grace_seconds: een upload die net bezig is, blijft staan.
+    :return: (verwijderde bestanden, vrijgekomen bytes)
+    """
+    cutoff = time.time() - grace_seconds
+    unreferenced = ~(
+        select(EvidenceAttachment.id_attachment).where(EvidenceAttachment.sha256 == AttachmentBlob.sha256).exists()
+    )
+    orphans = db.session.execute(select(AttachmentBlob.sha256).where(unreferenced)).scalars().all()
+
+    candidates = [
+        sha256 for sha256 in orphans
+        if not os.path.exists(blob_path(sha256)) or os.path.getmtime(blob_path(sha256)) < cutoff
+    ]
+    removed, freed = [], 0
+    if candidates:
+        # Nogmaals NOT EXISTS in de DELETE zelf: een bijlage die intussen toegevoegd werd, houdt zijn blob
+        removed_rows = db.session.execute(
+            delete(AttachmentBlob)
+            .where(AttachmentBlob.sha256.in_(candidates), unreferenced)
+            .returning(AttachmentBlob.sha256, AttachmentBlob.size)
+        ).all()
+        removed = [row.sha256 for row in removed_rows]
+        freed = sum(row.size for row in removed_rows)
+    db.session.commit()
+
+    # Pas na de commit de bestanden zelf (een rollback mag geen bestanden kosten)
+    for sha256 in removed:
+        if os.path.exists(blob_path(sha256)):
+            os.remove(blob_path(sha256))
+
+    # Bestanden zonder blob-rij (upload teruggedraaid, bv. quotum overschreden) en tijdelijke bestanden
+    for path, size in _stale_files(cutoff):
+        os.remove(path)
+        removed.append(os.path.basename(path))
+        freed += size
+    return len(removed), freed
+
+
+def _stale_files(cutoff):
+    """(pad, grootte) van bestanden ouder dan cutoff die niet (meer) bij een attachment_blob horen."""
+    root = attachment_root()
+    if not os.path.isdir(root):
+        return []
+    on_disk = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.getmtime(path) < cutoff:
+                on_disk[path] = name
+    known = set()
+    names = sorted(set(on_disk.values()))
+    for start in range(0, len(names), 1000):
+        known.update(db.session.execute(
+            select(AttachmentBlob.sha256).where(AttachmentBlob.sha256.in_(names[start:start + 1000]))
+        ).scalars())
+    return [
+        (path, os.path.getsize(path))
+        for path, name in on_disk.items()
+        if name not in known or os.path.dirname(path) == os.path.join(root, "tmp")
+    ]
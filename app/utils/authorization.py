@@ -0,0 +1,109 @@
+# app/utils/authorization.py
+# Autorisatie voor geneste resources (evidence -> feature -> project, milestone -> roadmap -> project, ...).
+#
+# - resolve_resource() laadt het doel samen met zijn ouders, project en company in één query met joins,
+#   i.p.v. een get_or_404 per stap. Alles komt in de identity map: ev.feature, milestone.roadmap,
+#   project.company e.d. kosten daarna geen query meer.
+# - Verwijderde projecten (deleted_at) vallen weg via de filter van app/utils/purge.py: 404.
+# - @authorize(...) op een route: login, rol, laden (404) en company-check, in die volgorde. De route
+#   krijgt de geladen objecten als argumenten, maar enkel die hij zelf declareert (user, project, ...).
+import inspect
+import uuid
+from functools import wraps
+
+from flask import abort
+from sqlalchemy import inspect as sa_inspect, select
+
+from app import db
+from app.models import Company, Evidence, EvidenceAttachment, Features_ideas, Milestone, Profile, Project, Roadmap
+from app.utils.form_helpers import require_company_ownership, require_login, require_role
+
+# Keten van het doel naar zijn project, per resource-type
+RESOURCE_CHAINS = {
+    "project": (Project,),
+    "feature": (Features_ideas, Project),
+    "roadmap": (Roadmap, Project),
+    "milestone": (Milestone, Roadmap, Project),
+    "evidence": (Evidence, Features_ideas, Project),
+    "attachment": (EvidenceAttachment, Evidence, Features_ideas, Project),
+}
+
+# Naam waaronder een object aan de route doorgegeven wordt
+_NAMES = {
+    Project: "project",
+    Features_ideas: "feature",
+    Roadmap: "roadmap",
+    Milestone: "milestone",
+    Evidence: "evidence",
+    EvidenceAttachment: "attachment",
+}
+
+# Foreign key van een model naar het volgende model in zijn keten
+_PARENT_KEYS = {
+    Features_ideas: Features_ideas.id_project,
+    Roadmap: Roadmap.id_project,
+    Milestone: Milestone.id_roadmap,
+    Evidence: Evidence.id_feature,
+    EvidenceAttachment: EvidenceAttachment.id_evidence,
+}
+
+
+def _primary_key(model):
+    return sa_inspect(model).primary_key[0]
+
+
+def resolve_resource(kind, resource_id):
+    """
+    Het doel met zijn ouders, project en company in één query.
+    :return: {"evidence": ..., "feature": ..., "project": ..., "company": ...} (namen per type)
+    :raises NotFound: onbestaand doel (of verwijderd project)
+    """
+    chain = RESOURCE_CHAINS[kind]
+    if isinstance(resource_id, uuid.UUID):
+        resource_id = str(resource_id)
+
+    stmt = select(*chain, Company).select_from(chain[0])
+    for child, parent in zip(chain, chain[1:]):
+        stmt = stmt.join(parent, _primary_key(parent) == _PARENT_KEYS[child])
+    stmt = stmt.join(Company, Company.id_company == Project.id_company).where(_primary_key(chain[0]) == resource_id)
+
+    row = db.session.execute(stmt).first()
+    if row is None:
+        abort(404)
+    objects = {_NAMES[model]: obj for model, obj in zip(chain, row)}
+    objects["company"] = row[-1]
+    return objects
+
+
+def authorize(kind, url_arg, roles=None, json=False):
+    """
+    Decorator voor routes op een resource uit RESOURCE_CHAINS; `url_arg` is de URL-parameter met het id.
+    Zonder toegang: dezelfde redirects (+ flash) als de losse helpers, of 401/403 zonder body bij json=True.
+    """
+    def decorator(view):
+        wanted = set(inspect.signature(view).parameters)
+
+        @wraps(view)
+        def wrapper(**kwargs):
+            user = require_login()
+            if not isinstance(user, Profile):
+                return ('', 401) if json else user
+
+            if roles:
+                role_redirect = require_role(roles, user)
+                if role_redirect:
+                    return ('', 403) if json else role_redirect
+
+            objects = resolve_resource(kind, kwargs[url_arg])
+            company_redirect = require_company_ownership(objects["project"].id_company, user)
+            if company_redirect:
+                return ('', 403) if json else company_redirect
+
+            objects["user"] = user
+            if url_arg not in wanted:
+                del kwargs[url_arg]
+            kwargs.update({name: obj for name, obj in objects.items() if name in wanted})
+            return view(**kwargs)
+
+        return wrapper
+    return decorator
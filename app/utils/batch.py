@@ -0,0 +1,282 @@
+# app/utils/batch.py
+# Batch-mutaties voor de JSON API (app/api.py): veel features, stemmen of evidence in één request.
+#
+# - Elk item wordt gevalideerd met dezelfde regels als het HTML-formulier (parse_*_form); JSON-waarden
+#   worden daarvoor als formuliervelden (tekst) aangeboden.
+# - Eerst valideren (validate_*), dan schrijven (write_*): zo kan de API bij "atomic" niets schrijven
+#   zodra één item fout is. Standaard worden de geldige items geschreven en krijgt elk item een resultaat.
+# - Schrijven gebeurt met bulk-statements (executemany / multi-row INSERT ... ON CONFLICT) in de
+#   transactie van de request; de caller commit één keer.
+# - Bulk-statements passeren de flush-listeners niet: zoekindex en cache-invalidatie worden hier
+#   expliciet bijgewerkt.
+import datetime
+import uuid
+
+from sqlalchemy import insert, select, update
+
+from app import db
+from app.models import Decision, Evidence, FeatureDecisionTally, Features_ideas, MilestoneFeature
+from app.utils.cache_bus import publish_invalidation
+from app.utils.calculations import calc_roi, calc_ttv
+from app.utils.decisions import TALLY_COLUMNS, dialect_insert, rebuild_decision_tallies
+from app.utils.form_helpers import parse_evidence_form, parse_feature_form
+from app.utils.milestone_links import project_feature_ids
+from app.utils.milestone_scheduler import reschedule_feature, scheduling_inputs
+from app.utils.search import replace_documents
+
+# Stemwaarden zoals de knoppen ze sturen (Yes/No) of de decision types zelf
+DECISION_VALUES = {"Yes": "Approved", "No": "Rejected", **{kind: kind for kind in TALLY_COLUMNS}}
+
+
+def _as_form(item):
+    """JSON-item -> formuliervelden (strings), zodat parse_*_form ongewijzigd bruikbaar is."""
+    return {key: "" if value is None else str(value) for key, value in item.items()}
+
+
+def _error(index, errors):
+    return {"index": index, "status": "error", "errors": errors}
+
+
+def has_errors(results):
+    return any(result["status"] == "error" for result in results)
+
+
+def _item_ids(items, key):
+    return {str(item[key]) for item in items if isinstance(item, dict) and item.get(key) is not None}
+
+
+# -----------------------------------
+# FEATURES
+# -----------------------------------
+
+def validate_features(project, items):
+    """
+    Items zonder id_feature worden aangemaakt, items met id_feature (van dit project) volledig
+    bijgewerkt, zoals edit_feature. :return: (resultaten, (nieuwe rijen, gewijzigde rijen))
+    """
+    existing = project_feature_ids(project.id_project, _item_ids(items, "id_feature"))
+    results, creates, updates, seen = [], [], [], set()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append(_error(index, ["Item must be an object."]))
+            continue
+        data, errors = parse_feature_form(_as_form(item))
+        feature_id = str(item["id_feature"]) if item.get("id_feature") is not None else None
+        if feature_id is not None:
+            if feature_id not in existing:
+                errors.append("Feature not found in this project.")
+            elif feature_id in seen:
+                errors.append("Feature appears more than once in this batch.")
+            seen.add(feature_id)
+        if errors:
+            results.append(_error(index, errors))
+            continue
+
+        row = dict(data)
+        row["roi_percent"] = calc_roi(
+            data["extra_revenue"], data["churn_reduction"], data["cost_savings"],
+            data["investment_hours"], data["hourly_rate"], data["opex"], data["other_costs"],
+        )
+        row["ttv_weeks"] = calc_ttv(data["ttm_weeks"], data["ttbv_weeks"])
+        if feature_id is None:
+            row.update(id_feature=str(uuid.uuid4()), id_project=project.id_project,
+                       createdat=datetime.datetime.utcnow(), warning_dismissed=False)
+            creates.append(row)
+            results.append({"index": index, "status": "created", "id_feature": row["id_feature"]})
+        else:
+            row.update(id_feature=feature_id, warning_dismissed=False)       # elke edit reset de waarschuwing
+            updates.append(row)
+            results.append({"index": index, "status": "updated", "id_feature": feature_id})
+    return results, (creates, updates)
+
+
+def write_features(project, plan):
+    """Eén INSERT (executemany) voor nieuwe en één UPDATE per primary key (executemany) voor gewijzigde features."""
+    creates, updates = plan
+
+    # Ingeplande features: invoer voor de planning vóór de UPDATE bewaren (enkel wijzigingen herplannen)
+    updated_ids = [row["id_feature"] for row in updates]
+    scheduled = db.session.execute(
+        select(MilestoneFeature.id_feature).where(MilestoneFeature.id_feature.in_(updated_ids)).distinct()
+    ).scalars().all() if updated_ids else []
+    before = {
+        feature.id_feature: scheduling_inputs(feature)
+        for feature in Features_ideas.query.filter(Features_ideas.id_feature.in_(scheduled)).all()
+    } if scheduled else {}
+
+    if creates:
+        db.session.execute(insert(Features_ideas), creates)
+    if updates:
+        db.session.execute(update(Features_ideas), updates)
+
+    ids = [row["id_feature"] for row in creates + updates]
+    if not ids:
+        return
+    replace_documents(features=db.session.execute(
+        select(Features_ideas.id_feature, Features_ideas.id_project, Features_ideas.name_feature,
+               Features_ideas.description, Features_ideas.createdat)
+        .where(Features_ideas.id_feature.in_(ids))
+    ).all())
+
+    # Milestone-planning repareren zoals edit_feature (enkel features met gewijzigde uren/kosten/ROI/TTM)
+    if scheduled:
+        features = (
+            Features_ideas.query.filter(Features_ideas.id_feature.in_(scheduled))
+            .execution_options(populate_existing=True)
+            .all()
+        )
+        for feature in features:
+            reschedule_feature(feature, project, before=before.get(feature.id_feature))
+
+    publish_invalidation(project_ids=[project.id_project])
+
+
+# -----------------------------------
+# STEMMEN
+# -----------------------------------
+
+def validate_decisions(project, items):
+    """Stemmen van de ingelogde gebruiker: {"id_feature", "decision"}. :return: (resultaten, {feature: type})"""
+    existing = project_feature_ids(project.id_project, _item_ids(items, "id_feature"))
+    results, votes = [], {}
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append(_error(index, ["Item must be an object."]))
+            continue
+        errors = []
+        feature_id = str(item.get("id_feature") or "")
+        decision_type = DECISION_VALUES.get(str(item.get("decision") or ""))
+        if feature_id not in existing:
+            errors.append("Feature not found in this project.")
+        elif feature_id in votes:
+            errors.append("Feature appears more than once in this batch.")
+        if decision_type is None:
+            errors.append(f"Decision must be one of: {', '.join(DECISION_VALUES)}.")
+        if errors:
+            results.append(_error(index, errors))
+            continue
+        votes[feature_id] = decision_type
+        results.append({"index": index, "status": "ok", "id_feature": feature_id, "decision": decision_type})
+    return results, votes
+
+
+def write_decisions(project, profile_id, votes, results):
+    """
+    Alle stemmen in één INSERT ... ON CONFLICT DO UPDATE; daarna de tellingen van de gewijzigde
+    features set-based opnieuw geteld. De tally-rijen worden eerst vergrendeld (vaste volgorde,
+    dus geen deadlocks met gelijktijdige batches of losse stemmen).
+    """
+    if not votes:
+        return
+    feature_ids = sorted(votes)
+    previous = dict(db.session.execute(
+        select(Decision.id_feature, Decision.decision_type)
+        .where(Decision.id_profile == profile_id, Decision.id_feature.in_(feature_ids))
+    ).all())
+
+    db.session.execute(
+        dialect_insert(FeatureDecisionTally)
+        .values([{"id_feature": fid} for fid in feature_ids])
+        .on_conflict_do_nothing(index_elements=["id_feature"])
+    )
+    db.session.execute(
+        select(FeatureDecisionTally.id_feature)
+        .where(FeatureDecisionTally.id_feature.in_(feature_ids))
+        .order_by(FeatureDecisionTally.id_feature)
+        .with_for_update()
+    )
+
+    now = datetime.datetime.utcnow()
+    upsert = dialect_insert(Decision).values([
+        {"id_feature": fid, "id_profile": profile_id, "decision_type": votes[fid], "createdat": now}
+        for fid in feature_ids
+    ])
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=["id_feature", "id_profile"],
+        set_={"decision_type": upsert.excluded.decision_type},
+    ))
+    rebuild_decision_tallies([fid for fid in feature_ids if previous.get(fid) != votes[fid]])
+
+    for result in results:
+        if result["status"] == "ok":
+            result["previous"] = previous.get(result["id_feature"])
+    publish_invalidation(project_ids=[project.id_project])
+
+
+# -----------------------------------
+# EVIDENCE
+# -----------------------------------
+
+def validate_evidence(project, items):
+    """Nieuwe evidence (velden van het formulier + id_feature). :return: (resultaten, rijen)"""
+    existing = project_feature_ids(project.id_project, _item_ids(items, "id_feature"))
+    results, rows = [], []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append(_error(index, ["Item must be an object."]))
+            continue
+        data, errors = parse_evidence_form(_as_form(item))
+        feature_id = str(item.get("id_feature") or "")
+        if feature_id not in existing:
+            errors.append("Feature not found in this project.")
+        if errors:
+            results.append(_error(index, errors))
+            continue
+        rows.append({
+            "id_feature": feature_id,
+            "title": data["title"],
+            "type": data["final_type"],
+            "source": data["source"],
+            "description": data["description"],
+            "attachment_url": data["attachment_url"],
+            "new_confidence": data["new_confidence"],
+        })
+        results.append({"index": index, "status": "created", "id_feature": feature_id})
+    return results, rows
+
+
+def write_evidence(project, rows, results):
+    """
+    Eén INSERT (executemany, met RETURNING van de ids) en één UPDATE per feature waarvan de
+    confidence stijgt. old_confidence volgt de volgorde van de batch, zoals bij losse formulieren.
+    """
+    if not rows:
+        return
+    scores = dict(db.session.execute(
+        select(Features_ideas.id_feature, Features_ideas.quality_score)
+        .where(Features_ideas.id_feature.in_({row["id_feature"] for row in rows}))
+    ).all())
+    raised = set()
+    now = datetime.datetime.utcnow()
+    for row in rows:
+        current = scores.get(row["id_feature"])
+        row["old_confidence"] = current or 0.0
+        row["createdat"] = now
+        # Zelfde regel als apply_evidence_added: de score stijgt enkel
+        if row["new_confidence"] is not None and (current is None or row["new_confidence"] > current):
+            scores[row["id_feature"]] = row["new_confidence"]
+            raised.add(row["id_feature"])
+
+    ids = db.session.execute(
+        insert(Evidence).returning(Evidence.id_evidence, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    if raised:
+        db.session.execute(
+            update(Features_ideas),
+            [{"id_feature": fid, "quality_score": scores[fid]} for fid in sorted(raised)],
+        )
+
+    created = iter(ids)
+    for result in results:
+        if result["status"] == "created":
+            result["id_evidence"] = next(created)
+
+    replace_documents(evidence=db.session.execute(
+        select(Evidence.id_evidence, Evidence.id_feature, Evidence.title, Evidence.description,
+               Evidence.source, Evidence.createdat)
+        .where(Evidence.id_evidence.in_(ids))
+    ).all())
+    publish_invalidation(project_ids=[project.id_project])
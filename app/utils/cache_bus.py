@@ -0,0 +1,352 @@
+# app/utils/cache_bus.py
+# Invalidatie van in-process caches over alle (gunicorn) workers heen.
+#
+# - Sleutels zijn ("project", id_project) of ("company", id_company). Een cache bewaart bij elke
+#   entry de "generatie" van zijn sleutels; wordt een sleutel geïnvalideerd, dan stijgt zijn
+#   generatie en is de entry in elke worker meteen ongeldig (ScopedCache).
+# - Transactionele outbox: bij elke flush worden de geraakte sleutels in cache_invalidation
+#   geschreven, in dezelfde transactie als de wijziging. Een rollback neemt ze dus mee terug,
+#   en een commit kan nooit gebeuren zonder dat de andere workers het te weten komen.
+#   Automatisch voor ORM-wijzigingen (features, evidence, stemmen, projecten, ...); Core
+#   UPDATE's (stemtelling, bulk-confidence) melden hun sleutels met publish_invalidation().
+# - Verspreiden: per worker leest een achtergrondthread de nieuwe outbox-rijen. Op PostgreSQL
+#   wordt die gewekt door LISTEN/NOTIFY (NOTIFY wordt pas bij de commit afgeleverd); op andere
+#   databases (SQLite) pollt hij elke CACHE_BUS_POLL_INTERVAL seconden. De worker die schreef
+#   verhoogt zijn generaties meteen na de commit.
+# - Ids van een sequence worden niet in volgorde gecommit: rijen boven het laatste aaneengesloten
+#   id worden opnieuw gelezen tot het gat gevuld is (of CACHE_BUS_GAP_SECONDS oud: rollback).
+# - Met read replicas wordt een waarde pas gecachet als de invalidatie ouder is dan de
+#   toegelaten replica-lag, anders zou een achterlopende replica de oude waarde terugzetten.
+import datetime
+import os
+import select as select_module
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text
+
+from app import db
+from app.models import (
+    CacheInvalidation, Decision, Evidence, FeatureDecisionTally, FeatureDependency, Features_ideas,
+    Profile, Project, Roadmap,
+)
+
+NOTIFY_CHANNEL = "cache_invalidation"
+SESSION_KEYS = "cache_keys"                 # session.info: sleutels die deze transactie al schreef
+SESSION_NOTIFIED = "cache_notified"
+BATCH_SIZE = 1000                           # outbox-rijen per leesronde
+
+# Modellen met een id_project-kolom, en modellen die via hun feature bij een project horen
+PROJECT_MODELS = (Features_ideas, Roadmap)
+FEATURE_MODELS = (Evidence, Decision, FeatureDecisionTally, FeatureDependency)
+
+
+# -----------------------------------
+# GENERATIES + LISTENER (per proces)
+# -----------------------------------
+
+class CacheBus:
+    """Generatie per sleutel, bijgewerkt door eigen commits en door de outbox-listener."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generations = {}              # (scope, key) -> teller
+        self._invalidated_at = {}           # (scope, key) -> time.monotonic() van de laatste invalidatie
+        self.settle_seconds = 0.0
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._watermark = None              # alle ids <= watermark zijn verwerkt (None: nog geen rijen)
+        self._seen = {}                     # verwerkte ids boven de watermark -> tijdstip
+        self._gaps = {}                     # ontbrekende ids boven de watermark -> eerst gezien
+        self._last_cleanup = 0.0
+
+    # --- generaties ---
+
+    def generation(self, scope, key):
+        return self._generations.get((scope, key), 0)
+
+    def stamp(self, keys):
+        return tuple(self._generations.get(k, 0) for k in keys)
+
+    def settled(self, keys):
+        """False zolang een sleutel recent geïnvalideerd is en replicas nog kunnen achterlopen."""
+        if not self.settle_seconds:
+            return True
+        now = time.monotonic()
+        return all(now - self._invalidated_at.get(k, float("-inf")) >= self.settle_seconds for k in keys)
+
+    def invalidate(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            for k in keys:
+                self._generations[k] = self._generations.get(k, 0) + 1
+                self._invalidated_at[k] = now
+
+    # --- outbox lezen ---
+
+    def _advance(self, ids, gap_seconds):
+        """Watermark opschuiven over aaneengesloten (of opgegeven) ids."""
+        if self._watermark is None:
+            return
+        now = time.monotonic()
+        for i in ids:
+            self._seen[i] = now
+            self._gaps.pop(i, None)
+        if ids:
+            for missing in range(self._watermark + 1, max(ids)):
+                if missing not in self._seen:
+                    self._gaps.setdefault(missing, now)
+        while True:
+            following = self._watermark + 1
+            if following in self._seen:
+                del self._seen[following]
+            elif following in self._gaps and now - self._gaps[following] >= gap_seconds:
+                del self._gaps[following]                           # teruggedraaide transactie
+            else:
+                break
+            self._watermark = following
+
+    def poll(self, engine, gap_seconds):
+        """Nieuwe outbox-rijen verwerken; geeft het aantal geïnvalideerde sleutels terug."""
+        table = CacheInvalidation.__table__
+        keys = set()
+        after = self._watermark or 0
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(table.c.id_invalidation, table.c.scope, table.c.key)
+                    .where(table.c.id_invalidation > after)
+                    .order_by(table.c.id_invalidation)
+                    .limit(BATCH_SIZE)
+                ).all()
+            if self._watermark is None and rows:
+                self._watermark = rows[0].id_invalidation - 1         # outbox was leeg bij de start
+            fresh = [row for row in rows if row.id_invalidation not in self._seen]
+            keys.update((row.scope, row.key) for row in fresh)
+            self._advance([row.id_invalidation for row in rows], gap_seconds)
+            if len(rows) < BATCH_SIZE:
+                break
+            after = rows[-1].id_invalidation
+        if keys:
+            self.invalidate(keys)
+        return len(keys)
+
+    def cleanup(self, engine, retention_seconds, interval):
+        """Oude outbox-rijen verwijderen (hooguit eens per `interval` seconden)."""
+        now = time.monotonic()
+        if now - self._last_cleanup < interval:
+            return
+        self._last_cleanup = now
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=retention_seconds)
+        with engine.begin() as conn:
+            conn.execute(delete(CacheInvalidation).where(CacheInvalidation.createdat < cutoff))
+
+    # --- achtergrondthread ---
+
+    def start(self, engine, config):
+        """Start de listener in dit proces (opnieuw na een fork, bv. gunicorn)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            # Nieuw proces: de caches zijn nog leeg, enkel transacties die nog bezig kunnen zijn
+            # (jonger dan CACHE_BUS_GAP_SECONDS) moeten we nog zien
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=config["CACHE_BUS_GAP_SECONDS"])
+            column = CacheInvalidation.id_invalidation
+            with engine.connect() as conn:
+                settled = conn.execute(select(func.max(column)).where(CacheInvalidation.createdat < cutoff)).scalar()
+                oldest = conn.execute(select(func.min(column))).scalar()
+            self._watermark = settled if settled is not None else (oldest - 1 if oldest is not None else None)
+            self._seen, self._gaps = {}, {}
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(engine, dict(config)), name="cache-bus", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, engine, config):
+        interval = config["CACHE_BUS_POLL_INTERVAL"]
+        while not self._stop.is_set():
+            listener = None
+            try:
+                if engine.dialect.name == "postgresql":
+                    listener = engine.raw_connection()
+                    self._listen(listener.driver_connection, engine, config)
+                else:
+                    while not self._stop.is_set():
+                        self._tick(engine, config)
+                        self._stop.wait(interval)
+            except Exception as e:                                      # verbinding weg: opnieuw proberen
+                print(f"Cache bus error: {e}")
+                self._stop.wait(interval)
+            finally:
+                if listener is not None:
+                    listener.invalidate()                               # LISTEN-verbinding niet terug in de pool
+
+    def _listen(self, connection, engine, config):
+        """PostgreSQL (psycopg2): wachten op NOTIFY; de timeout is een vangnet en ruimt op."""
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self._tick(engine, config)                                      # wat binnenkwam vóór LISTEN
+        while not self._stop.is_set():
+            ready, _, _ = select_module.select([connection], [], [], config["CACHE_BUS_LISTEN_TIMEOUT"])
+            if ready:
+                connection.poll()
+                connection.notifies.clear()
+            self._tick(engine, config)
+
+    def _tick(self, engine, config):
+        self.poll(engine, config["CACHE_BUS_GAP_SECONDS"])
+        self.cleanup(engine, config["CACHE_BUS_RETENTION_SECONDS"], config["CACHE_BUS_CLEANUP_INTERVAL"])
+
+
+cache_bus = CacheBus()
+
+
+class ScopedCache:
+    """
+    Kleine LRU-cache waarvan elke entry aan sleutels hangt (bv. (("project", 3),)).
+    Een invalidatie van een van die sleutels, in eender welke worker, maakt de entry ongeldig.
+    """
+
+    def __init__(self, size=256, bus=cache_bus):
+        self.size = size
+        self.bus = bus
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, scopes, compute):
+        stamp = self.bus.stamp(scopes)              # vóór het berekenen: een invalidatie tijdens compute telt
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = compute()
+        if self.bus.settled(scopes):
+            with self._lock:
+                self._entries[key] = (stamp, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return value
+
+
+# -----------------------------------
+# OUTBOX SCHRIJVEN (in de transactie)
+# -----------------------------------
+
+def project_key(project_id):
+    return ("project", int(project_id))
+
+
+def company_key(company_id):
+    return ("company", int(company_id))
+
+
+def _record(session, keys):
+    """Nieuwe sleutels van deze transactie in de outbox zetten (+ NOTIFY op PostgreSQL)."""
+    written = session.info.setdefault(SESSION_KEYS, set())
+    new_keys = set(keys) - written
+    if not new_keys:
+        return
+    connection = session.connection()
+    now = datetime.datetime.utcnow()
+    connection.execute(
+        insert(CacheInvalidation),
+        [{"scope": scope, "key": key, "createdat": now} for scope, key in sorted(new_keys)],
+    )
+    written.update(new_keys)
+    if connection.dialect.name == "postgresql" and not session.info.get(SESSION_NOTIFIED):
+        connection.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+        session.info[SESSION_NOTIFIED] = True
+
+
+def publish_invalidation(project_ids=(), company_ids=()):
+    """Voor wijzigingen buiten de ORM om (Core UPDATE/INSERT): sleutels expliciet melden. De caller commit."""
+    keys = {project_key(p) for p in project_ids if p is not None}
+    keys |= {company_key(c) for c in company_ids if c is not None}
+    _record(db.session(), keys)
+
+
+def _old_value(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else None
+
+
+def _changed_keys(session):
+    """Project- en company-sleutels van alle nieuwe, gewijzigde en verwijderde objecten in deze flush."""
+    objects = [obj for obj in session.new] + [obj for obj in session.deleted]
+    objects += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+
+    keys, feature_ids = set(), set()
+    for obj in objects:
+        if isinstance(obj, Project):
+            if obj.id_project is not None:
+                keys.add(project_key(obj.id_project))
+            for company_id in (obj.id_company, _old_value(obj, "id_company")):
+                if company_id is not None:
+                    keys.add(company_key(company_id))
+        elif isinstance(obj, PROJECT_MODELS):
+            for project_id in (obj.id_project, _old_value(obj, "id_project")):
+                if project_id is not None:
+                    keys.add(project_key(project_id))
+        elif isinstance(obj, FEATURE_MODELS):
+            if obj.id_feature is not None:
+                feature_ids.add(str(obj.id_feature))
+        elif isinstance(obj, Profile) and obj.id_company is not None:
+            keys.add(company_key(obj.id_company))                       # leden van de company
+
+    if feature_ids:
+        rows = session.connection().execute(
+            select(Features_ideas.id_project).where(Features_ideas.id_feature.in_(feature_ids)).distinct()
+        )
+        keys.update(project_key(project_id) for (project_id,) in rows)
+    return keys
+
+
+def record_flush(session, flush_context):
+    keys = _changed_keys(session)
+    if keys:
+        _record(session, keys)
+
+
+def apply_commit(session):
+    """Eigen commit: deze worker invalideert meteen (de listener ziet de rijen later ook)."""
+    keys = session.info.pop(SESSION_KEYS, None)
+    session.info.pop(SESSION_NOTIFIED, None)
+    if keys:
+        cache_bus.invalidate(keys)
+
+
+def discard_transaction(session):
+    session.info.pop(SESSION_KEYS, None)
+    session.info.pop(SESSION_NOTIFIED, None)
+
+
+def init_cache_bus(app):
+    """Outbox bijhouden bij elke flush en de listener van dit proces starten bij de eerste request."""
+    for name, listener in (
+        ("after_flush", record_flush),
+        ("after_commit", apply_commit),
+        ("after_rollback", discard_transaction),
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+    # Met replicas: pas cachen als de replicas de invalidatie zeker gezien hebben
+    if app.config.get("SQLALCHEMY_REPLICA_URIS"):
+        cache_bus.settle_seconds = app.config["REPLICA_MAX_LAG_SECONDS"]
+
+    @app.before_request
+    def start_cache_bus():
+        cache_bus.start(db.engines[None], app.config)
@@ -0,0 +1,126 @@
+# app/utils/capacity_curve.py
+# Capaciteitscurve van een roadmap: de beste haalbare VECTR-waarde (en selectie) voor ELK
+# tijd- en budgetniveau tot de maximale capaciteit, in één dynamisch-programmeren pass.
+#
+# - Tijd en budget worden op een raster gezet (time_levels x budget_levels stappen).
+# - Gewichten worden naar BOVEN afgerond op het raster: elke selectie past dus echt binnen
+#   het niveau waar ze bij hoort (de curve is een veilige ondergrens).
+# - dp[t, b] = beste waarde met tijd <= niveau t en budget <= niveau b. Eén NumPy-bewerking
+#   per feature over de hele tabel; de keuzes worden bijgehouden om selecties terug te vinden.
+# - Door de afronding kan de DP onder de greedy selectie van optimize_roadmap uitkomen; voor de
+#   1D-curves nemen we per niveau het beste van beide (greedy in dezelfde dichtheidsvolgorde).
+import time
+import numpy as np
+from app.utils.knapsack_optimizer import knapsack_item, roadmap_capacities
+
+MAX_LEVELS = 100
+
+
+def compute_capacity_curve(roadmap, features, time_levels=40, budget_levels=40):
+    """
+    :param features: features met vectr_score (zie calculate_vectr_scores)
+    :return: dict met de rasters, de waarde-tabel en wat nodig is om selecties op te vragen
+    """
+    start = time.perf_counter()
+    time_levels = max(1, min(int(time_levels), MAX_LEVELS))
+    budget_levels = max(1, min(int(budget_levels), MAX_LEVELS))
+    max_time, max_cost = roadmap_capacities(roadmap)
+
+    # Zelfde filters als optimize_roadmap (positieve waarde, past binnen de volledige capaciteit)
+    items = [it for it in (knapsack_item(f, max_time, max_cost, alpha=1.0) for f in features) if it]
+
+    time_step = max_time / time_levels if max_time > 0 else 1.0
+    cost_step = max_cost / budget_levels if max_cost > 0 else 1.0
+
+    dp = np.zeros((time_levels + 1, budget_levels + 1))
+    keep = np.zeros((len(items), time_levels + 1, budget_levels + 1), dtype=bool)
+    weights = []
+
+    for i, it in enumerate(items):
+        wt = int(np.ceil(it['time_weight'] / time_step - 1e-9))
+        wc = int(np.ceil(it['cost_weight'] / cost_step - 1e-9))
+        weights.append((wt, wc))
+        if wt > time_levels or wc > budget_levels:
+            continue
+        candidate = np.full_like(dp, -np.inf)
+        candidate[wt:, wc:] = dp[:time_levels + 1 - wt, :budget_levels + 1 - wc] + it['value']
+        better = candidate > dp
+        keep[i] = better
+        dp = np.where(better, candidate, dp)
+
+    # Volgorde voor de greedy vergelijking (alpha=1.0: dichtheid is schaal-onafhankelijk)
+    greedy_order = sorted(items, key=lambda it: it['density'], reverse=True)
+
+    return {
+        "items": items,
+        "greedy_order": greedy_order,
+        "weights": weights,
+        "keep": keep,
+        "value": dp,
+        "time_levels": [round(time_step * t, 2) for t in range(time_levels + 1)],
+        "budget_levels": [round(cost_step * b, 2) for b in range(budget_levels + 1)],
+        "solve_seconds": time.perf_counter() - start,
+    }
+
+
+def selection_at(curve, t_level, b_level):
+    """Reconstrueert de optimale selectie (feature-objecten) voor raster-niveau (t_level, b_level)."""
+    selected = []
+    t, b = t_level, b_level
+    for i in range(len(curve["items"]) - 1, -1, -1):
+        if curve["keep"][i, t, b]:
+            selected.append(curve["items"][i]['feature'])
+            wt, wc = curve["weights"][i]
+            t -= wt
+            b -= wc
+    selected.reverse()
+    return selected
+
+
+def greedy_at(curve, time_cap, cost_cap):
+    """Greedy selectie (zoals optimize_roadmap) bij een lagere capaciteit: (waarde, features)."""
+    value, selected = 0.0, []
+    time_used = cost_used = 0.0
+    for it in curve["greedy_order"]:
+        if time_used + it['time_weight'] <= time_cap and cost_used + it['cost_weight'] <= cost_cap:
+            selected.append(it['feature'])
+            value += it['value']
+            time_used += it['time_weight']
+            cost_used += it['cost_weight']
+    return value, selected
+
+
+def curve_to_json(curve):
+    """
+    JSON-vorm: de volledige waarde-tabel plus twee 1D-curves met selecties:
+    budget bij volledige tijd, en tijd bij volledig budget.
+    """
+    value = curve["value"]
+    t_max = len(curve["time_levels"]) - 1
+    b_max = len(curve["budget_levels"]) - 1
+
+    def point(t, b):
+        hours, budget = curve["time_levels"][t], curve["budget_levels"][b]
+        best, selected, method = float(value[t, b]), None, "dp"
+        greedy_value, greedy_selected = greedy_at(curve, hours, budget)
+        if greedy_value > best + 1e-9:
+            best, selected, method = greedy_value, greedy_selected, "greedy"
+        if selected is None:
+            selected = selection_at(curve, t, b)
+        return {
+            "hours": hours,
+            "budget": budget,
+            "value": round(best, 2),
+            "method": method,
+            "features": [f.id_feature for f in selected],
+        }
+
+    return {
+        "time_levels": curve["time_levels"],
+        "budget_levels": curve["budget_levels"],
+        "value": np.round(value, 2).tolist(),
+        "budget_curve": [point(t_max, b) for b in range(b_max + 1)],
+        "time_curve": [point(t, b_max) for t in range(t_max + 1)],
+        "features": {it['feature'].id_feature: it['feature'].name_feature for it in curve["items"]},
+        "solve_seconds": round(curve["solve_seconds"], 4),
+    }
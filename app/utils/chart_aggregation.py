@@ -0,0 +1,204 @@
+# app/utils/chart_aggregation.py
+# Level-of-detail voor de VECTR chart: de server bundelt features tot clusters, de browser tekent
+# hoogstens grid x grid bubbels, hoe groot de backlog ook is.
+#
+# - Punten in (confidence, geschaalde TtV) met dezelfde filter en schaling als prepare_vectr_chart_data.
+# - Binnen het gevraagde venster (bounds) wordt een raster van grid x grid cellen gelegd. Een cel met
+#   één feature blijft een gewone bubbel; een cel met meer features wordt een cluster met een
+#   ROI-gewogen zwaartepunt, het aantal features, de ROI (gemiddelde en som) en de top-features.
+#   Inzoomen = dezelfde vraag met kleinere bounds (die van de cluster), dus fijnere cellen.
+# - Zitten er hoogstens max_points (CHART_MAX_POINTS) features in het venster, dan gaan ze allemaal afzonderlijk
+#   mee (kleine projecten zien er exact uit zoals voorheen).
+# - Antwoorden worden gzip-gecomprimeerd bewaard per (project, bounds, raster) in een ScopedCache op
+#   de projectsleutel: elke commit die het project of zijn features raakt (in eender welke worker)
+#   maakt de entry ongeldig via de cache bus. De ETag is een hash van de inhoud zelf, dus een 304
+#   betekent altijd dat de client exact dezelfde data heeft, ook over workers heen.
+import gzip
+import hashlib
+import json
+
+import numpy as np
+
+from app.utils.cache_bus import ScopedCache, project_key
+from app.utils.calculations import to_float
+from app.utils.feature_data import fetch_columns
+
+CHART_COLUMNS = ("id_feature", "name_feature", "quality_score", "ttm_weeks", "ttbv_weeks", "roi_percent")
+AXIS_RANGE = (0.0, 10.0)
+MIN_SPAN = 0.01                 # kleiner inzoomen heeft geen zin (scores hebben 2 decimalen)
+DEFAULT_GRID = 24
+GRID_RANGE = (4, 64)
+DEFAULT_MAX_POINTS = 400
+TOP_FEATURES = 3                # features met de hoogste ROI in de tooltip van een cluster
+
+_CHART_CACHE = ScopedCache(size=128)    # (project, bounds, raster, max_points) -> (etag, gzip bytes)
+
+
+# -----------------------------------
+# PARAMETERS
+# -----------------------------------
+
+def parse_bounds(args):
+    """(x0, x1, y0, y1) uit ?x0=&x1=&y0=&y1=, begrensd tot de assen; fout of leeg -> volledige chart."""
+    low, high = AXIS_RANGE
+    bounds = []
+    for lo_name, hi_name in (("x0", "x1"), ("y0", "y1")):
+        lo = min(max(to_float(args.get(lo_name), low), low), high)
+        hi = min(max(to_float(args.get(hi_name), high), low), high)
+        if hi - lo < MIN_SPAN:
+            lo, hi = low, high
+        bounds += [round(lo, 4), round(hi, 4)]
+    return tuple(bounds)
+
+
+def parse_grid(args, default=DEFAULT_GRID):
+    grid = int(to_float(args.get("grid"), default))
+    return min(max(grid, GRID_RANGE[0]), GRID_RANGE[1])
+
+
+# -----------------------------------
+# PUNTEN EN AGGREGATIE
+# -----------------------------------
+
+def load_chart_points(project):
+    """
+    NumPy kolommen van de plotbare features (zelfde filter en TtV-schaling als prepare_vectr_chart_data).
+    ROI komt rechtstreeks uit de inputkolommen (compute_in_sql): ook features die via SQL/import
+    binnenkwamen zonder bewaarde roi_percent staan correct in de chart.
+    """
+    data = fetch_columns(CHART_COLUMNS, project_id=project.id_project, compute_in_sql=True)
+    keep = ~(
+        np.isnan(data["roi_percent"]) | np.isnan(data["quality_score"])
+        | np.isnan(data["ttm_weeks"]) | np.isnan(data["ttbv_weeks"])
+    )
+    ttv_weeks = data["ttm_weeks"][keep] + data["ttbv_weeks"][keep]
+
+    ttv_min = to_float(project.ttm_low_limit) + to_float(project.ttbv_low_limit)
+    ttv_max = to_float(project.ttm_high_limit) + to_float(project.ttbv_high_limit)
+    if ttv_max > ttv_min:
+        ttv = 10.0 - np.clip((ttv_weeks - ttv_min) / (ttv_max - ttv_min) * 10, 0, 10)
+    else:
+        ttv = np.zeros_like(ttv_weeks)
+
+    index = np.flatnonzero(keep)
+    return {
+        "id": [data["id_feature"][i] for i in index],
+        "name": [data["name_feature"][i] for i in index],
+        "confidence": data["quality_score"][keep],
+        "ttv": ttv,
+        "ttv_weeks": ttv_weeks,
+        "roi": data["roi_percent"][keep],
+    }
+
+
+def _point(points, i):
+    return {
+        "name": points["name"][i],
+        "confidence": float(points["confidence"][i]),
+        "ttv": round(float(points["ttv"][i]), 4),
+        "ttv_weeks": float(points["ttv_weeks"][i]),
+        "roi": float(points["roi"][i]),
+        "id": points["id"][i],
+    }
+
+
+def _zoom_bounds(low_x, high_x, low_y, high_y):
+    """Venster rond de features van een cluster, met wat marge en minstens MIN_SPAN breed."""
+    axis_low, axis_high = AXIS_RANGE
+    bounds = []
+    for low, high in ((low_x, high_x), (low_y, high_y)):
+        margin = max((high - low) * 0.05, MIN_SPAN)
+        bounds += [round(max(low - margin, axis_low), 4), round(min(high + margin, axis_high), 4)]
+    return bounds
+
+
+def aggregate_points(points, bounds, grid=DEFAULT_GRID, max_points=DEFAULT_MAX_POINTS):
+    """
+    Features binnen `bounds` als losse punten en clusters (zie bovenaan).
+    :return: dict met points, clusters, total (features in het venster) en aggregated
+    """
+    x0, x1, y0, y1 = bounds
+    x, y, roi = points["confidence"], points["ttv"], points["roi"]
+    inside = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+
+    if len(inside) <= max_points:
+        return {
+            "points": [_point(points, i) for i in inside],
+            "clusters": [],
+            "total": int(len(inside)),
+            "aggregated": False,
+        }
+
+    xs, ys, rois = x[inside], y[inside], roi[inside]
+    cx = np.minimum(((xs - x0) / (x1 - x0) * grid).astype(int), grid - 1)
+    cy = np.minimum(((ys - y0) / (y1 - y0) * grid).astype(int), grid - 1)
+    cell = cy * grid + cx
+    size = grid * grid
+
+    count = np.bincount(cell, minlength=size)
+    roi_sum = np.bincount(cell, weights=rois, minlength=size)
+    # ROI-gewogen zwaartepunt; cellen zonder positieve ROI vallen terug op het gewone gemiddelde
+    weights = np.maximum(rois, 0.0)
+    weight_sum = np.bincount(cell, weights=weights, minlength=size)
+    weighted = weight_sum > 0
+
+    def center(values):
+        mean = np.bincount(cell, weights=values, minlength=size) / np.maximum(count, 1)
+        weighted_mean = np.bincount(cell, weights=weights * values, minlength=size) / np.where(weighted, weight_sum, 1)
+        return np.where(weighted, weighted_mean, mean)
+
+    center_x, center_y = center(xs), center(ys)
+
+    # Uitgestrektheid per cel: een cluster zoomt in op zijn eigen features, niet op de hele cel
+    low_x, high_x = np.full(size, np.inf), np.full(size, -np.inf)
+    low_y, high_y = np.full(size, np.inf), np.full(size, -np.inf)
+    np.minimum.at(low_x, cell, xs)
+    np.maximum.at(high_x, cell, xs)
+    np.minimum.at(low_y, cell, ys)
+    np.maximum.at(high_y, cell, ys)
+
+    # Features per cel, hoogste ROI eerst (voor de losse punten en de top-features van een cluster)
+    order = np.lexsort((-rois, cell))
+    starts = np.searchsorted(cell[order], np.arange(size))
+
+    result_points, clusters = [], []
+    for c in np.flatnonzero(count):
+        members = inside[order[starts[c]:starts[c] + min(count[c], TOP_FEATURES)]]
+        if count[c] == 1:
+            result_points.append(_point(points, members[0]))
+            continue
+        clusters.append({
+            "confidence": round(float(center_x[c]), 4),
+            "ttv": round(float(center_y[c]), 4),
+            "count": int(count[c]),
+            "roi": round(float(roi_sum[c] / count[c]), 2),
+            "roi_sum": round(float(roi_sum[c]), 2),
+            "bounds": _zoom_bounds(low_x[c], high_x[c], low_y[c], high_y[c]),
+            # Features op exact dezelfde plek worden door inzoomen niet gescheiden
+            "zoomable": bool(high_x[c] > low_x[c] or high_y[c] > low_y[c]),
+            "top": [{"name": points["name"][i], "roi": float(points["roi"][i]), "id": points["id"][i]} for i in members],
+        })
+    return {"points": result_points, "clusters": clusters, "total": int(len(inside)), "aggregated": True}
+
+
+# -----------------------------------
+# GECACHETE PAYLOAD
+# -----------------------------------
+
+def chart_payload(project, bounds, grid, max_points=DEFAULT_MAX_POINTS, cache_size=128):
+    """
+    (etag, gzip-bytes) van de chart-data; uit de cache tot het project of een feature wijzigt.
+    """
+    _CHART_CACHE.size = cache_size
+
+    def compute():
+        data = aggregate_points(load_chart_points(project), bounds, grid=grid, max_points=max_points)
+        data.update({"project_id": project.id_project, "bounds": list(bounds), "grid": grid})
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return hashlib.sha1(body).hexdigest(), gzip.compress(body, compresslevel=6)
+
+    return _CHART_CACHE.get_or_set(
+        (project.id_project, bounds, grid, max_points),
+        (project_key(project.id_project),),
+        compute,
+    )
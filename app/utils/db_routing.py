@@ -0,0 +1,155 @@
+# app/utils/db_routing.py
+# Read replicas: leesqueries van GET-requests gaan naar een replica, al de rest naar de primary.
+#
+# - Replicas staan in Config.SQLALCHEMY_REPLICA_URIS en worden als binds "replica_0", "replica_1", ...
+#   aangemaakt (zie replica_binds). Zonder replicas gedraagt db.session zich exact zoals voorheen.
+# - Naar de primary gaan: alles buiten een request (CLI, benchmarks), niet-GET requests, schrijfacties
+#   (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE) en alle reads na een schrijfactie in
+#   dezelfde sessie.
+# - Read-your-writes: na een POST (of een GET die toch schreef) blijft de browsersessie
+#   REPLICA_STICKY_SECONDS lang op de primary, zodat de gebruiker zijn eigen wijziging meteen ziet.
+# - Lag: per replica wordt de replicatie-achterstand gemeten (hooguit eens per
+#   REPLICA_LAG_CHECK_INTERVAL). Replicas boven REPLICA_MAX_LAG_SECONDS of die niet antwoorden
+#   worden overgeslagen; is er geen gezonde replica, dan valt alles terug op de primary.
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql import Delete, Insert, Select, Update
+from sqlalchemy.sql.selectable import CompoundSelect
+
+REPLICA_BIND_PREFIX = "replica_"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+WRITTEN_AT_KEY = "db_written_at"
+
+# PostgreSQL standby: 0 als alle ontvangen WAL al toegepast is, anders de leeftijd van de laatste replay
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS-entries voor de geconfigureerde replicas."""
+    return {f"{REPLICA_BIND_PREFIX}{i}": uri for i, uri in enumerate(config.get("SQLALCHEMY_REPLICA_URIS") or [])}
+
+
+# -----------------------------------
+# LAG / GEZONDHEID
+# -----------------------------------
+
+class ReplicaMonitor:
+    """Houdt per replica de laatst gemeten lag bij (None = onbereikbaar) en kiest round-robin."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}          # bind key -> (tijdstip, lag in seconden of None)
+        self._counter = itertools.count()
+
+    def measure_lag(self, engine):
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    return float(conn.execute(POSTGRES_LAG_SQL).scalar() or 0)
+                # Andere databases (bv. twee lokale SQLite-bestanden) kennen geen replicatie:
+                # enkel bereikbaarheid telt
+                conn.execute(text("SELECT 1"))
+                return 0.0
+        except Exception:                                               # onbereikbaar: replica overslaan
+            return None
+
+    def lag(self, key, engine, interval):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(key)
+            if checked is not None and now - checked[0] < interval:
+                return checked[1]
+            # Tijdstip meteen zetten: andere threads gebruiken intussen de vorige meting
+            self._checked[key] = (now, checked[1] if checked else None)
+        lag = self.measure_lag(engine)
+        with self._lock:
+            self._checked[key] = (time.monotonic(), lag)
+        return lag
+
+    def status(self, engines, config):
+        """[(bind key, lag of None, gezond)] voor alle replicas (voor `flask db-replicas`)."""
+        rows = []
+        for key, engine in sorted(engines.items(), key=lambda item: str(item[0])):
+            if not str(key).startswith(REPLICA_BIND_PREFIX):
+                continue
+            lag = self.measure_lag(engine)
+            rows.append((key, lag, lag is not None and lag <= config["REPLICA_MAX_LAG_SECONDS"]))
+        return rows
+
+    def choose(self, engines, config):
+        """Een gezonde replica-engine (round-robin), of None als er geen is."""
+        keys = [key for key in engines if str(key).startswith(REPLICA_BIND_PREFIX)]
+        if not keys:
+            return None
+        start = next(self._counter)
+        for offset in range(len(keys)):
+            key = keys[(start + offset) % len(keys)]
+            lag = self.lag(key, engines[key], config["REPLICA_LAG_CHECK_INTERVAL"])
+            if lag is not None and lag <= config["REPLICA_MAX_LAG_SECONDS"]:
+                return engines[key]
+        return None
+
+
+replica_monitor = ReplicaMonitor()
+
+
+# -----------------------------------
+# ROUTING SESSION
+# -----------------------------------
+
+def _is_write(clause):
+    return isinstance(clause, (Insert, Update, Delete))
+
+
+def _is_read(clause):
+    if isinstance(clause, CompoundSelect):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def _recently_wrote(config):
+    written_at = session.get(WRITTEN_AT_KEY)
+    return written_at is not None and time.time() - written_at < config["REPLICA_STICKY_SECONDS"]
+
+
+class RoutingSession(Session):
+    """db.session die leesqueries van GET-requests naar een replica stuurt (zie bovenaan)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_request_context() or not current_app.config.get("SQLALCHEMY_REPLICA_URIS"):
+            return primary
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            g.db_wrote = True
+            return primary
+        # Ruwe SQL (text()) en SELECT ... FOR UPDATE: voor de zekerheid op de primary
+        if not _is_read(clause) or self.info.get("wrote") or request.method not in SAFE_METHODS:
+            return primary
+        # Enkel tabellen van de standaard bind horen op een replica
+        if primary is not self._db.engines.get(None):
+            return primary
+
+        if _recently_wrote(current_app.config):
+            return primary
+        return replica_monitor.choose(self._db.engines, current_app.config) or primary
+
+
+def init_read_replicas(app):
+    """Read-your-writes: onthoud in de browsersessie wanneer deze gebruiker laatst schreef."""
+
+    @app.after_request
+    def remember_write(response):
+        if request.method not in SAFE_METHODS or g.get("db_wrote"):
+            session[WRITTEN_AT_KEY] = time.time()
+        return response
@@ -0,0 +1,110 @@
+# app/utils/decisions.py
+# Stemmen (Decisions) per feature: atomaire upsert + gematerialiseerde telling.
+import datetime
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Decision, FeatureDecisionTally
+
+# decision_type -> kolom in FeatureDecisionTally
+TALLY_COLUMNS = {
+    "Approved": "approved",
+    "Rejected": "rejected",
+    "Pending": "pending",
+}
+
+
+def dialect_insert(model):
+    """Returns an INSERT that supports ON CONFLICT for the active database dialect."""
+    dialect = db.session.get_bind(mapper=model).dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT upsert is not supported for '{dialect}'.")
+
+
+def cast_feature_decision(id_feature, id_profile, decision_type):
+    """
+    Saves a user's vote with a single INSERT ... ON CONFLICT (id_feature, id_profile) DO UPDATE
+    and adjusts the feature's tally in the same transaction. Returns the previous decision type.
+
+    The tally row is locked first (SELECT ... FOR UPDATE), so concurrent votes on one feature
+    are serialized and the counters never drift. The caller commits.
+    """
+    if decision_type not in TALLY_COLUMNS:
+        raise ValueError(f"Unknown decision type: {decision_type}")
+
+    # 1) Tally-rij garanderen en vergrendelen
+    ensure_tally = dialect_insert(FeatureDecisionTally).values(id_feature=id_feature)
+    db.session.execute(ensure_tally.on_conflict_do_nothing(index_elements=["id_feature"]))
+    db.session.execute(
+        select(FeatureDecisionTally.id_feature)
+        .where(FeatureDecisionTally.id_feature == id_feature)
+        .with_for_update()
+    )
+
+    # 2) Vorige stem van deze gebruiker (consistent dankzij de lock)
+    previous = db.session.execute(
+        select(Decision.decision_type).where(
+            Decision.id_feature == id_feature, Decision.id_profile == id_profile
+        )
+    ).scalar()
+
+    # 3) Atomaire upsert op de unieke sleutel uq_decision_feature_profile
+    upsert = dialect_insert(Decision).values(
+        id_feature=id_feature,
+        id_profile=id_profile,
+        decision_type=decision_type,
+        createdat=datetime.datetime.utcnow(),
+    )
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["id_feature", "id_profile"],
+        set_={"decision_type": upsert.excluded.decision_type},
+    )
+    db.session.execute(upsert)
+
+    # 4) Telling bijwerken met een delta (geen hertelling van ruwe rijen)
+    if previous != decision_type:
+        deltas = {}
+        new_col = getattr(FeatureDecisionTally, TALLY_COLUMNS[decision_type])
+        deltas[new_col.key] = new_col + 1
+        if previous in TALLY_COLUMNS:
+            old_col = getattr(FeatureDecisionTally, TALLY_COLUMNS[previous])
+            deltas[old_col.key] = old_col - 1
+        db.session.execute(
+            update(FeatureDecisionTally)
+            .where(FeatureDecisionTally.id_feature == id_feature)
+            .values(**deltas)
+        )
+
+    return previous
+
+
+def rebuild_decision_tallies(feature_ids):
+    """
+    Recounts the tallies of the given features from the decision table in one set-based
+    UPDATE. Used when decisions disappear through a database cascade (e.g. profile deletion).
+    """
+    feature_ids = list(feature_ids)
+    if not feature_ids:
+        return 0
+
+    def count_of(decision_type):
+        return (
+            select(func.count())
+            .where(
+                Decision.id_feature == FeatureDecisionTally.id_feature,
+                Decision.decision_type == decision_type,
+            )
+            .correlate(FeatureDecisionTally)
+            .scalar_subquery()
+        )
+
+    stmt = (
+        update(FeatureDecisionTally)
+        .where(FeatureDecisionTally.id_feature.in_(feature_ids))
+        .values({column: count_of(kind) for kind, column in TALLY_COLUMNS.items()})
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(stmt).rowcount
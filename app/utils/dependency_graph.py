@@ -0,0 +1,194 @@
+# app/utils/dependency_graph.py
+# Afhankelijkheden tussen features als gerichte acyclische graaf (DAG).
+#
+# - Een boog feature -> prerequisite betekent: de feature kan pas gekozen worden als de
+#   prerequisite ook gekozen is.
+# - Transitieve sluitingen (alle voorgangers / alle opvolgers) worden één keer berekend in
+#   topologische volgorde en bijgehouden als bitsets (Python ints): een unie is dan één OR.
+# - Grafen worden per project gecached zolang de set bogen niet verandert.
+from collections import OrderedDict, deque
+from app import db
+from app.models import FeatureDependency, Features_ideas
+
+GRAPH_CACHE_SIZE = 64
+_GRAPH_CACHE = OrderedDict()
+
+
+class DependencyCycleError(ValueError):
+    """De afhankelijkheden bevatten een cyclus; `cycle` is de lijst feature-ids op die cyclus."""
+
+    def __init__(self, cycle):
+        super().__init__("Feature dependencies contain a cycle.")
+        self.cycle = cycle
+
+
+def iter_bits(mask):
+    """Indices van de gezette bits in een bitset."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DependencyGraph:
+    def __init__(self, nodes, edges):
+        """
+        :param nodes: feature-ids
+        :param edges: iterable van (id_feature, id_prerequisite)
+        """
+        edges = list(edges)
+        self.nodes = list(dict.fromkeys(list(nodes) + [n for edge in edges for n in edge]))
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.edges = edges
+        self.prerequisites = [[] for _ in self.nodes]
+        self.dependents = [[] for _ in self.nodes]
+        for feature, prerequisite in edges:
+            self.prerequisites[self.index[feature]].append(self.index[prerequisite])
+            self.dependents[self.index[prerequisite]].append(self.index[feature])
+
+        self._order = None
+        self._ancestors = None
+        self._descendants = None
+
+    @property
+    def has_edges(self):
+        return bool(self.edges)
+
+    # -----------------------------------
+    # VOLGORDE EN CYCLI
+    # -----------------------------------
+
+    def topological_order(self):
+        """Indices in volgorde 'prerequisites eerst' (Kahn). Raises DependencyCycleError."""
+        if self._order is None:
+            remaining = [len(p) for p in self.prerequisites]
+            queue = deque(i for i, count in enumerate(remaining) if count == 0)
+            order = []
+            while queue:
+                i = queue.popleft()
+                order.append(i)
+                for dependent in self.dependents[i]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        queue.append(dependent)
+            if len(order) < len(self.nodes):
+                raise DependencyCycleError(self.find_cycle())
+            self._order = order
+        return self._order
+
+    def find_cycle(self):
+        """Eén cyclus als lijst feature-ids, of None (iteratieve DFS, geen recursielimiet)."""
+        state = [0] * len(self.nodes)                                   # 0 = nieuw, 1 = op de stack, 2 = klaar
+        for root in range(len(self.nodes)):
+            if state[root]:
+                continue
+            path = [root]
+            stack = [iter(self.prerequisites[root])]
+            state[root] = 1
+            while stack:
+                nxt = next(stack[-1], None)
+                if nxt is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state[nxt] == 1:
+                    return [self.nodes[i] for i in path[path.index(nxt):]]
+                elif state[nxt] == 0:
+                    state[nxt] = 1
+                    path.append(nxt)
+                    stack.append(iter(self.prerequisites[nxt]))
+        return None
+
+    def levels(self):
+        """Niveau per feature-id: 0 = geen prerequisites, anders 1 + hoogste niveau van de prerequisites."""
+        level = [0] * len(self.nodes)
+        for i in self.topological_order():
+            for p in self.prerequisites[i]:
+                level[i] = max(level[i], level[p] + 1)
+        return {self.nodes[i]: level[i] for i in range(len(self.nodes))}
+
+    # -----------------------------------
+    # TRANSITIEVE SLUITINGEN (GECACHED)
+    # -----------------------------------
+
+    def ancestor_masks(self):
+        """Per index de bitset van ALLE (transitieve) prerequisites."""
+        if self._ancestors is None:
+            masks = [0] * len(self.nodes)
+            for i in self.topological_order():
+                mask = 0
+                for p in self.prerequisites[i]:
+                    mask |= masks[p] | (1 << p)
+                masks[i] = mask
+            self._ancestors = masks
+        return self._ancestors
+
+    def descendant_masks(self):
+        """Per index de bitset van ALLE (transitieve) opvolgers."""
+        if self._descendants is None:
+            masks = [0] * len(self.nodes)
+            for i in reversed(self.topological_order()):
+                mask = 0
+                for d in self.dependents[i]:
+                    mask |= masks[d] | (1 << d)
+                masks[i] = mask
+            self._descendants = masks
+        return self._descendants
+
+    def ancestors(self, id_feature):
+        i = self.index.get(id_feature)
+        if i is None:
+            return set()
+        return {self.nodes[j] for j in iter_bits(self.ancestor_masks()[i])}
+
+    def descendants(self, id_feature):
+        i = self.index.get(id_feature)
+        if i is None:
+            return set()
+        return {self.nodes[j] for j in iter_bits(self.descendant_masks()[i])}
+
+    def would_create_cycle(self, id_feature, id_prerequisite):
+        """True als 'id_feature hangt af van id_prerequisite' een cyclus zou maken."""
+        if id_feature == id_prerequisite:
+            return True
+        return id_feature in self.ancestors(id_prerequisite)
+
+
+# -----------------------------------
+# DATABASE
+# -----------------------------------
+
+def load_project_graph(project_id):
+    """DependencyGraph van een project; hergebruikt de gecachete graaf (en sluitingen) als de bogen gelijk bleven."""
+    edges = sorted(
+        (row.id_feature, row.id_prerequisite)
+        for row in (
+            db.session.query(FeatureDependency.id_feature, FeatureDependency.id_prerequisite)
+            .join(Features_ideas, Features_ideas.id_feature == FeatureDependency.id_feature)
+            .filter(Features_ideas.id_project == project_id)
+        )
+    )
+    signature = tuple(edges)
+
+    cached = _GRAPH_CACHE.get(project_id)
+    if cached is not None and cached[0] == signature:
+        _GRAPH_CACHE.move_to_end(project_id)
+        return cached[1]
+
+    graph = DependencyGraph([], edges)
+    _GRAPH_CACHE[project_id] = (signature, graph)
+    while len(_GRAPH_CACHE) > GRAPH_CACHE_SIZE:
+        _GRAPH_CACHE.popitem(last=False)
+    return graph
+
+
+def add_dependency(feature, prerequisite):
+    """
+    Voegt 'feature hangt af van prerequisite' toe na een cycluscontrole.
+    Raises DependencyCycleError; de caller commit.
+    """
+    graph = load_project_graph(feature.id_project)
+    if graph.would_create_cycle(feature.id_feature, prerequisite.id_feature):
+        raise DependencyCycleError([feature.id_feature, prerequisite.id_feature])
+
+    if db.session.get(FeatureDependency, (feature.id_feature, prerequisite.id_feature)) is None:
+        db.session.add(FeatureDependency(id_feature=feature.id_feature, id_prerequisite=prerequisite.id_feature))
@@ -0,0 +1,130 @@
+# app/utils/feature_data.py
+# Data-access laag voor de scoring-, chart- en optimalisatiepaden.
+#
+# - Smalle SQLAlchemy Core select()'s: enkel de gevraagde kolommen, geen ORM-hydratatie en
+#   geen identity map. De kost schaalt met het aantal kolommen dat een pad echt nodig heeft.
+# - Resultaat als lichte Row's (fetch_rows) of als dict van NumPy kolommen (fetch_columns).
+# - Optioneel worden ROI en TTV in SQL berekend (compute_in_sql) i.p.v. de bewaarde
+#   roi_percent/ttv_weeks te lezen; zelfde formules als calc_roi/calc_ttv (gecontroleerd door
+#   de benchmark-case sql_roi_ttv_parity).
+import numpy as np
+from sqlalchemy import BigInteger, Float, Integer, case, cast, func, select
+from app import db
+from app.models import Features_ideas, Project
+
+# Kolommen die we als tekst (object) teruggeven; al de rest is numeriek
+TEXT_COLUMNS = ("id_feature", "name_feature")
+# Projectkolommen die mee opgevraagd kunnen worden (join op Project)
+PROJECT_COLUMNS = ("ttm_low_limit", "ttm_high_limit", "ttbv_low_limit", "ttbv_high_limit", "id_company")
+
+
+# -----------------------------------
+# SQL-EXPRESSIES (ROI / TTV)
+# -----------------------------------
+
+def _zero_if_null(column):
+    return func.coalesce(column, 0)
+
+
+def roi_expression():
+    """ROI (%) zoals calc_roi: ((winst - kosten) / kosten) * 100, 2 decimalen; NULL als kosten <= 0."""
+    f = Features_ideas
+    gains = _zero_if_null(f.extra_revenue) + _zero_if_null(f.churn_reduction) + _zero_if_null(f.cost_savings)
+    costs = (
+        cast(_zero_if_null(f.investment_hours), Float) * _zero_if_null(f.hourly_rate)
+        + _zero_if_null(f.opex)
+        + _zero_if_null(f.other_costs)
+    )
+    return case((costs > 0, _round_cents((gains - costs) / costs * 100.0)), else_=None)
+
+
+def _round_cents(value):
+    """
+    round(value, 2) zoals Python: half-even op de exacte waarde van de double. SQL's round() rondt
+    .5 weg van nul af, en value * 100 kan een bijna-.5 (4.245 = 4.24500000000000010...) op exact .5
+    afronden; de afrondingsfout van die vermenigvuldiging (Dekker) beslist dan de richting.
+    """
+    cents = value * 100.0
+    split = value * 134217729.0                         # 2^27 + 1
+    high = split - (split - value)
+    error = (high * 100.0 - cents) + (value - high) * 100.0     # value * 100 == cents + error (exact)
+
+    whole = cast(cents, BigInteger)                     # PostgreSQL rondt af, SQLite kapt af
+    floor = case((cents < whole, whole - 1), else_=whole)
+    fraction = cents - floor
+    rounded = case(
+        (fraction > 0.5, floor + 1),
+        (fraction < 0.5, floor),
+        (error > 0, floor + 1),
+        (error < 0, floor),
+        else_=floor + func.abs(floor % 2),              # exact .5: naar het even getal
+    )
+    return cast(rounded, Float) / 100.0
+
+
+def ttv_expression():
+    """TTV (weken) zoals calc_ttv: TTM + TTBV als geheel getal; NULL als de som <= 0."""
+    total = _zero_if_null(Features_ideas.ttm_weeks) + _zero_if_null(Features_ideas.ttbv_weeks)
+    return case((total > 0, cast(total, Integer)), else_=None)
+
+
+# -----------------------------------
+# SELECTS
+# -----------------------------------
+
+def _column(name, compute_in_sql):
+    if compute_in_sql and name == "roi_percent":
+        return roi_expression().label(name)
+    if compute_in_sql and name == "ttv_weeks":
+        return ttv_expression().label(name)
+    if name in PROJECT_COLUMNS:
+        return getattr(Project, name).label(name)
+    return getattr(Features_ideas, name).label(name)
+
+
+def select_features(columns, project_id=None, company_id=None, compute_in_sql=False, order_by=None):
+    """
+    Core select() met enkel `columns` (namen van Features_ideas- of PROJECT_COLUMNS-kolommen).
+    Filter op één project of op alle projecten van een company.
+    :param compute_in_sql: roi_percent en ttv_weeks uit de inputkolommen berekenen (roi_expression,
+                           ttv_expression) i.p.v. de bewaarde waarden te lezen
+    """
+    stmt = select(*[_column(name, compute_in_sql) for name in columns])
+    needs_project = company_id is not None or any(name in PROJECT_COLUMNS for name in columns)
+    if needs_project:
+        stmt = stmt.join_from(Features_ideas, Project, Project.id_project == Features_ideas.id_project)
+    else:
+        stmt = stmt.select_from(Features_ideas)
+    if project_id is not None:
+        stmt = stmt.where(Features_ideas.id_project == project_id)
+    if company_id is not None:
+        stmt = stmt.where(Project.id_company == company_id)
+    if order_by is not None:
+        stmt = stmt.order_by(getattr(Features_ideas, order_by))
+    return stmt
+
+
+def fetch_rows(columns, **filters):
+    """Lichte Row's (tuple-achtig, attributen per kolomnaam)."""
+    return db.session.execute(select_features(columns, **filters)).all()
+
+
+def fetch_columns(columns, fill=None, **filters):
+    """
+    Dict kolomnaam -> NumPy array (tekstkolommen als lijst).
+    :param fill: {kolom: waarde voor NULL}; standaard NaN voor numerieke kolommen
+    """
+    fill = fill or {}
+    rows = fetch_rows(columns, **filters)
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+
+    result = {}
+    for name, column in zip(columns, values):
+        if name in TEXT_COLUMNS:
+            result[name] = list(column)
+            continue
+        missing = fill.get(name, np.nan)
+        result[name] = np.fromiter(
+            (missing if v is None else v for v in column), dtype=float, count=len(column)
+        )
+    return result
@@ -1,8 +1,11 @@
 # app/utils/form_helpers.py
 import datetime
 from flask import session, flash, redirect, url_for
-from app.models import Profile, Project, CONFIDENCE_LEVELS, Features_ideas
+from sqlalchemy import func, select, update, exists
+from app import db
+from app.models import Profile, Project, CONFIDENCE_LEVELS, Features_ideas, Evidence
 from app.utils.calculations import calc_ttv_scaled
+from app.utils.cache_bus import publish_invalidation
 
 # -----------------------------------
 # LOGIN / ROLE / OWNERSHIP HELPERS
@@ -188,27 +191,29 @@ def parse_project_form(form):
         "ttbv_high_limit": ttbv_high,
     }, errors
 
+
+# Veld -> validator voor features: gedeeld door parse_feature_form en de quick edit in de tabel
+FEATURE_FIELD_PARSERS = {
+    "name_feature": lambda form, errors: required_str(form, "name_feature", errors, label="Title"),
+    "extra_revenue": lambda form, errors: required_int(form, "extra_revenue", errors),
+    "churn_reduction": lambda form, errors: optional_int_zero(form, "churn_reduction", errors),
+    "cost_savings": lambda form, errors: optional_int_zero(form, "cost_savings", errors),
+    "investment_hours": lambda form, errors: required_int(form, "investment_hours", errors),
+    "hourly_rate": lambda form, errors: required_int(form, "hourly_rate", errors),
+    "opex": lambda form, errors: optional_int_zero(form, "opex", errors),
+    "other_costs": lambda form, errors: optional_int_zero(form, "other_costs", errors),
+    "horizon": lambda form, errors: required_int(form, "horizon", errors),
+    "ttm_weeks": lambda form, errors: required_int(form, "ttm_weeks", errors),
+    "ttbv_weeks": lambda form, errors: required_int(form, "ttbv_weeks", errors),
+    "quality_score": lambda form, errors: required_float(form, "quality_score", errors, required=False),
+}
+
+
 def parse_feature_form(form):
     errors = []
 
-    name_feature = required_str(form, "name_feature", errors, label="Title")
-    description = form.get("description", "").strip() or None
-
-    data = {
-        "name_feature": name_feature,
-        "description": description,
-        "extra_revenue": required_int(form, "extra_revenue", errors),
-        "churn_reduction": optional_int_zero(form, "churn_reduction", errors),
-        "cost_savings": optional_int_zero(form, "cost_savings", errors),
-        "investment_hours": required_int(form, "investment_hours", errors),
-        "hourly_rate": required_int(form, "hourly_rate", errors),
-        "opex": optional_int_zero(form, "opex", errors),
-        "other_costs": optional_int_zero(form, "other_costs", errors),
-        "horizon": required_int(form, "horizon", errors),
-        "ttm_weeks": required_int(form, "ttm_weeks", errors),
-        "ttbv_weeks": required_int(form, "ttbv_weeks", errors),
-        "quality_score": required_float(form, "quality_score", errors, required=False),
-    }
+    data = {field: parse(form, errors) for field, parse in FEATURE_FIELD_PARSERS.items()}
+    data["description"] = form.get("description", "").strip() or None
 
     return data, errors
 
@@ -337,7 +342,70 @@ def parse_evidence_form(form):
 # -----------------------------------
 
 def recompute_feature_confidence(feature):
-    if not feature.evidence:
-        return None
-    scores = [e.new_confidence for e in feature.evidence]
-    return max(scores) if scores else None
+    """
+    Returns the highest evidence confidence for a feature (or None without evidence).
+    Uses one indexed SELECT max() instead of loading every Evidence row via the backref.
+    """
+    return (
+        db.session.query(func.max(Evidence.new_confidence))
+        .filter(Evidence.id_feature == feature.id_feature)
+        .scalar()
+    )
+
+
+def apply_evidence_added(feature, new_conf):
+    """
+    O(1) update after inserting (or raising) evidence: quality_score only moves up
+    when the new confidence exceeds the current one. No query needed.
+    """
+    current = feature.quality_score
+    if new_conf is not None and (current is None or new_conf > current):
+        feature.quality_score = new_conf
+    return feature.quality_score
+
+
+def apply_evidence_removed(feature, removed_conf, fallback=0.0):
+    """
+    Update after deleting (or lowering) evidence. Only when the removed value could have
+    been the maximum do we run the indexed SELECT max(); otherwise nothing changes.
+    """
+    current = feature.quality_score if feature.quality_score is not None else 0.0
+    if removed_conf is not None and removed_conf < current:
+        return feature.quality_score                                # Was niet het maximum -> score blijft gelijk
+
+    new_score = recompute_feature_confidence(feature)
+    feature.quality_score = new_score if new_score is not None else fallback
+    return feature.quality_score
+
+
+def recompute_confidence_bulk(project_id=None, company_id=None):
+    """
+    Repairs quality_score for every feature (with evidence) of a project or company
+    in one set-based UPDATE with a correlated max() subquery. Returns the row count.
+    """
+    max_conf = (
+        select(func.max(Evidence.new_confidence))
+        .where(Evidence.id_feature == Features_ideas.id_feature)
+        .correlate(Features_ideas)
+        .scalar_subquery()
+    )
+    has_evidence = exists().where(Evidence.id_feature == Features_ideas.id_feature)
+
+    stmt = update(Features_ideas).where(has_evidence).values(quality_score=max_conf)
+    if project_id is not None:
+        stmt = stmt.where(Features_ideas.id_project == project_id)
+    if company_id is not None:
+        company_projects = select(Project.id_project).where(Project.id_company == company_id)
+        stmt = stmt.where(Features_ideas.id_project.in_(company_projects))
+
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
+
+    # Core UPDATE: de caches van de geraakte projecten expliciet invalideren (zelfde transactie)
+    if project_id is not None:
+        publish_invalidation(project_ids=[project_id])
+    if company_id is not None:
+        publish_invalidation(project_ids=db.session.execute(
+            select(Project.id_project).where(Project.id_company == company_id)
+        ).scalars().all())
+    db.session.commit()
+    return result.rowcount
@@ -1,125 +1,149 @@
 # app/utils/knapsack_optimizer.py
+import heapq
+import numpy as np
+from app.utils.dependency_graph import iter_bits
 
-def optimize_roadmap(roadmap, features, alpha=0.5):
-    
-    # Greedy optimalisatie met knapzakheuristiek (2 constraints: tijd en kosten).
-    # We gebruiken een fractionele knapzak benadering voor de sorteer-dichtheid,
-    # maar een 0/1 selectie (wel of niet nemen) in de daadwerkelijke selectiefase.
+# Groepen tot deze grootte worden in Python opgeteld, grotere via NumPy
+SMALL_GROUP = 48
 
-    #:param roadmap: Roadmap object met attributen total_time_capacity (in uren), budget_allocation
-    #:param features: iterable van feature-objecten met attributen: vectr_score, investment_hours, hourly_rate
-    #:param alpha: float in [0,1], weging tussen tijd (1.0) en kosten (0.0)
-    #:return: lijst van geselecteerde feature-objecten
-    
-    # 1) Capaciteiten bepalen en veilig stellen als float
 
+def roadmap_capacities(roadmap):
+    """(tijd in uren, budget) van een roadmap als floats; ongeldige waarden worden 0.0."""
     try:
         total_time_capacity = float(roadmap.time_capacity)
     except Exception:
         # Fallback naar 0.0 als de waarde ontbreekt of ongeldig is
         total_time_capacity = 0.0
-    
+
     # Oorspronkelijke budgetallocatie blijft
     try:
         budget_allocation = float(roadmap.budget_allocation)
     except Exception:
         budget_allocation = 0.0
 
-    # Definieer de maximale capaciteiten.
-    # MAX_TIME_CAPACITY is nu direct de totale beschikbare tijd in uren.
-    MAX_TIME_CAPACITY = total_time_capacity
-    MAX_COST_CAPACITY = budget_allocation
+    return total_time_capacity, budget_allocation
+
 
+def knapsack_item(f, MAX_TIME_CAPACITY, MAX_COST_CAPACITY, alpha, require_value=True):
+    """
+    Zet één feature om naar een knapzak-item (dict met feature, density, time_weight, cost_weight, value).
+    Returns None als de feature niet in aanmerking komt.
+
+    :param require_value: False voor gepinde features (must-include): die tellen mee ook zonder
+                          positieve VECTR score.
+    """
     # Voorkom deling door nul bij normalisatie
     # Zorgt ervoor dat we kunnen normaliseren naar [0, 1] zelfs als de capaciteit 0 is.
     max_time = MAX_TIME_CAPACITY if MAX_TIME_CAPACITY > 0.0 else 1.0
     max_cost = MAX_COST_CAPACITY if MAX_COST_CAPACITY > 0.0 else 1.0
 
-    features_to_optimize = []  # lijst van dicts met keys: feature, density, time_weight, cost_weight, value
+    # Validatie en conversie van benodigde velden
+    # We controleren of de feature de benodigde attributen heeft om de waarde en kosten te berekenen.
+    if getattr(f, 'vectr_score', None) is None and require_value:
+        # Geen score -> negeren. VECTR score is onze 'value' in de knapzak.
+        return None
+    if getattr(f, 'investment_hours', None) is None:
+        # Tijdsinvestering is het 'gewicht' voor de tijds-constraint.
+        return None
+    if getattr(f, 'hourly_rate', None) is None:
+        # Uurtarief is nodig om de kosten ('gewicht' voor de kosten-constraint) te berekenen.
+        return None
 
-    # 2) Bereken dichtheid (density) voor iedere feature en filter ongeschikte features weg
-    for f in features:
-        # Validatie en conversie van benodigde velden
-        # We controleren of de feature de benodigde attributen heeft om de waarde en kosten te berekenen.
-        
-        if getattr(f, 'vectr_score', None) is None:
-            # Geen score -> negeren. VECTR score is onze 'value' in de knapzak.
-            continue
-        if getattr(f, 'investment_hours', None) is None:
-            # Tijdsinvestering is het 'gewicht' voor de tijds-constraint.
-            continue
-        if getattr(f, 'hourly_rate', None) is None:
-            # Uurtarief is nodig om de kosten ('gewicht' voor de kosten-constraint) te berekenen.
-            continue
+    # Zet waarden om naar floats, met fallback op 0.0
+    try:
+        value = float(f.vectr_score)
+    except Exception:
+        # Ongeldig of niet-numeriek VECTR -> overslaan (een gepinde feature telt als waarde 0)
+        if require_value:
+            return None
+        value = 0.0
 
-        # Zet waarden om naar floats, met fallback op 0.0
-        try:
-            value = float(f.vectr_score)
-        except Exception:
-            # Ongeldig of niet-numeriek VECTR -> overslaan
-            continue
+    # Negeer features zonder positieve waarde (we zoeken naar features die waarde toevoegen)
+    if value <= 0.0 and require_value:
+        return None
 
-        # Negeer features zonder positieve waarde (we zoeken naar features die waarde toevoegen)
-        if value <= 0.0:
-            continue
+    try:
+        time_weight = float(f.investment_hours)
+    except Exception:
+        time_weight = 0.0
 
-        try:
-            time_weight = float(f.investment_hours)
-        except Exception:
-            time_weight = 0.0
+    try:
+        hourly_rate = float(f.hourly_rate)
+    except Exception:
+        hourly_rate = 0.0
 
-        try:
-            hourly_rate = float(f.hourly_rate)
-        except Exception:
-            hourly_rate = 0.0
+    # Bereken kosten van feature: Tijd * Tarief = Kosten
+    # Haal de extra kostenvelden op (met fallback naar 0.0)
+    try:
+        opex = float(getattr(f, 'opex', 0.0) or 0.0)
+        other_costs = float(getattr(f, 'other_costs', 0.0) or 0.0)
+    except Exception:
+        opex = 0.0
+        other_costs = 0.0
 
-        # Bereken kosten van feature: Tijd * Tarief = Kosten
-        # Haal de extra kostenvelden op (met fallback naar 0.0)
-        try:
-            opex = float(getattr(f, 'opex', 0.0) or 0.0)
-            other_costs = float(getattr(f, 'other_costs', 0.0) or 0.0)
-        except Exception:
-            opex = 0.0
-            other_costs = 0.0
+    # Bereken de VOLLEDIGE kosten van de feature
+    cost_weight = (time_weight * hourly_rate) + opex + other_costs
 
-        # Bereken de VOLLEDIGE kosten van de feature
-        cost_weight = (time_weight * hourly_rate) + opex + other_costs
+    # Harde filter: als één van de gewichten groter is dan totale capaciteit -> overslaan
+    # Deze feature kan per definitie niet in de roadmap passen.
+    if time_weight > MAX_TIME_CAPACITY or cost_weight > MAX_COST_CAPACITY:
+        return None
 
-        # Harde filter: als één van de gewichten groter is dan totale capaciteit -> overslaan
-        # Deze feature kan per definitie niet in de roadmap passen.
-        if time_weight > MAX_TIME_CAPACITY or cost_weight > MAX_COST_CAPACITY:
-            continue
+    # Normaliseer gewichten t.o.v. maxima (waardes in [0,1])
+    # Dit is essentieel voor het combineren van de twee gewichten (tijd en kosten).
+    normalized_time_weight = time_weight / max_time
+    normalized_cost_weight = cost_weight / max_cost
 
-        # Normaliseer gewichten t.o.v. maxima (waardes in [0,1])
-        # Dit is essentieel voor het combineren van de twee gewichten (tijd en kosten).
-        normalized_time_weight = time_weight / max_time
-        normalized_cost_weight = cost_weight / max_cost
+    # Haal alpha op en zorg dat het een float is, fallback naar 0.5 indien nodig
+    try:
+        alpha_val = float(alpha)
+    except Exception:
+        alpha_val = 0.5
 
-        # Haal alpha op en zorg dat het een float is, fallback naar 0.5 indien nodig
-        try:
-            alpha_val = float(alpha)
-        except Exception:
-            alpha_val = 0.5
+    # Gecombineerd gewicht volgens alpha-weging: 
+    # (alpha * Genormaliseerde Tijd) + ((1 - alpha) * Genormaliseerde Kosten)
+    combined_weight = (alpha_val * normalized_time_weight) + ((1.0 - alpha_val) * normalized_cost_weight)
 
-        # Gecombineerd gewicht volgens alpha-weging: 
-        # (alpha * Genormaliseerde Tijd) + ((1 - alpha) * Genormaliseerde Kosten)
-        combined_weight = (alpha_val * normalized_time_weight) + ((1.0 - alpha_val) * normalized_cost_weight)
+    # Bereken de dichtheid: Waarde / Gecombineerd Gewicht
+    # Dit bepaalt de prioriteit: Hoge waarde per gewicht is beter.
+    if combined_weight > 0.0:
+        density = value / combined_weight
+    else:
+        # Als gewicht 0 is, geven we een 0 dichtheid om deze niet te prioriteren (mag niet voorkomen).
+        density = 0.0
 
-        # Bereken de dichtheid: Waarde / Gecombineerd Gewicht
-        # Dit bepaalt de prioriteit: Hoge waarde per gewicht is beter.
-        if combined_weight > 0.0:
-            density = value / combined_weight
-        else:
-            # Als gewicht 0 is, geven we een 0 dichtheid om deze niet te prioriteren (mag niet voorkomen).
-            density = 0.0
+    return {
+        'feature': f,
+        'density': density,
+        'time_weight': time_weight,
+        'cost_weight': cost_weight,
+        'value': value
+    }
+
+
+def optimize_roadmap(roadmap, features, alpha=0.5):
+    
+    # Greedy optimalisatie met knapzakheuristiek (2 constraints: tijd en kosten).
+    # We gebruiken een fractionele knapzak benadering voor de sorteer-dichtheid,
+    # maar een 0/1 selectie (wel of niet nemen) in de daadwerkelijke selectiefase.
 
-        features_to_optimize.append({
-            'feature': f,
-            'density': density,
-            'time_weight': time_weight,
-            'cost_weight': cost_weight,
-            'value': value
-        })
+    #:param roadmap: Roadmap object met attributen total_time_capacity (in uren), budget_allocation
+    #:param features: iterable van feature-objecten met attributen: vectr_score, investment_hours, hourly_rate
+    #:param alpha: float in [0,1], weging tussen tijd (1.0) en kosten (0.0)
+    #:return: lijst van geselecteerde feature-objecten
+    
+    # 1) Capaciteiten bepalen en veilig stellen als float
+    # Definieer de maximale capaciteiten.
+    # MAX_TIME_CAPACITY is nu direct de totale beschikbare tijd in uren.
+    MAX_TIME_CAPACITY, MAX_COST_CAPACITY = roadmap_capacities(roadmap)
+
+    features_to_optimize = []  # lijst van dicts met keys: feature, density, time_weight, cost_weight, value
+
+    # 2) Bereken dichtheid (density) voor iedere feature en filter ongeschikte features weg
+    for f in features:
+        item = knapsack_item(f, MAX_TIME_CAPACITY, MAX_COST_CAPACITY, alpha)
+        if item is not None:
+            features_to_optimize.append(item)
 
     # 3) Handmatige sortering op density (desc) 
     # De Selection Sort logica is behouden om de oorspronkelijke code te respecteren, 
@@ -191,4 +215,250 @@ def optimize_roadmap(roadmap, features, alpha=0.5):
 
         k += 1
 
-    return selected_features
\ No newline at end of file
+    return selected_features
+
+def optimize_roadmap_pinned(roadmap, features, alpha=0.5, must_include=(), must_exclude=(),
+                            warm_start=None, changed_ids=None):
+    """
+    Zelfde knapzak als optimize_roadmap, met pins en een optionele warm start.
+
+    - must_include: feature-ids die altijd eerst gekozen worden (zolang ze samen passen).
+    - must_exclude: feature-ids die nooit gekozen worden.
+    - warm_start: geselecteerde ids van een vorige run met dezelfde capaciteiten en alpha. Features
+      die sindsdien NIET veranderden (changed_ids) blijven gekozen; enkel de vrije capaciteit wordt
+      greedy opgevuld en gewijzigde features mogen een zwakkere gekozen feature vervangen.
+
+    :return: dict met selected (feature-objecten), value, time_used, cost_used,
+             pins_not_fitting (ids), warm_started
+    """
+    MAX_TIME_CAPACITY, MAX_COST_CAPACITY = roadmap_capacities(roadmap)
+    include = set(must_include or ())
+    exclude = set(must_exclude or ()) - include
+    changed = set(changed_ids or ())
+
+    items = {}
+    pinned_items = []
+    pins_not_fitting = []
+    for f in features:
+        fid = f.id_feature
+        if fid in exclude:
+            continue
+        item = knapsack_item(f, MAX_TIME_CAPACITY, MAX_COST_CAPACITY, alpha, require_value=fid not in include)
+        if item is None:
+            if fid in include:
+                pins_not_fitting.append(fid)
+            continue
+        if fid in include:
+            pinned_items.append(item)
+        else:
+            items[fid] = item
+
+    chosen = []
+    state = {"time": 0.0, "cost": 0.0}
+
+    def take(item):
+        if state["time"] + item['time_weight'] <= MAX_TIME_CAPACITY and \
+           state["cost"] + item['cost_weight'] <= MAX_COST_CAPACITY:
+            chosen.append(item)
+            state["time"] += item['time_weight']
+            state["cost"] += item['cost_weight']
+            return True
+        return False
+
+    # 1) Pins eerst (hoogste dichtheid eerst als ze niet allemaal passen)
+    for item in sorted(pinned_items, key=lambda it: it['density'], reverse=True):
+        if not take(item):
+            pins_not_fitting.append(item['feature'].id_feature)
+
+    # 2) Warm start: ongewijzigde features van de vorige selectie behouden
+    warm_started = warm_start is not None
+    if warm_started:
+        kept = [items.pop(fid) for fid in warm_start if fid in items and fid not in changed]
+        for item in sorted(kept, key=lambda it: it['density'], reverse=True):
+            if not take(item):
+                items[item['feature'].id_feature] = item  # pins kosten nu meer ruimte: terug in de pool
+
+    # 3) Vrije capaciteit greedy opvullen (zelfde volgorde als optimize_roadmap)
+    for item in sorted(items.values(), key=lambda it: it['density'], reverse=True):
+        take(item)
+
+    # 4) Warm start: gewijzigde features die niet pasten mogen één zwakkere (niet-gepinde) feature verdringen
+    if warm_started and changed:
+        chosen_ids = {it['feature'].id_feature for it in chosen}
+        pinned_ids = {it['feature'].id_feature for it in pinned_items}
+        for item in sorted((items[fid] for fid in changed if fid in items and fid not in chosen_ids),
+                           key=lambda it: it['value'], reverse=True):
+            for weaker in sorted((it for it in chosen if it['feature'].id_feature not in pinned_ids),
+                                 key=lambda it: it['value']):
+                if weaker['value'] >= item['value']:
+                    break
+                dt = item['time_weight'] - weaker['time_weight']
+                dc = item['cost_weight'] - weaker['cost_weight']
+                if state["time"] + dt <= MAX_TIME_CAPACITY and state["cost"] + dc <= MAX_COST_CAPACITY:
+                    chosen.remove(weaker)
+                    chosen.append(item)
+                    state["time"] += dt
+                    state["cost"] += dc
+                    break
+
+    return {
+        "selected": [it['feature'] for it in chosen],
+        "value": sum(it['value'] for it in chosen),
+        "time_used": state["time"],
+        "cost_used": state["cost"],
+        "pins_not_fitting": pins_not_fitting,
+        "warm_started": warm_started,
+    }
+
+
+def optimize_roadmap_with_dependencies(roadmap, features, graph, alpha=0.5, must_include=(), must_exclude=()):
+    """
+    Knapzak met precedence-constraints: een feature wordt enkel gekozen SAMEN met al zijn
+    (nog niet gekozen) transitieve prerequisites.
+
+    - Dichtheid is closure-aware: (waarde feature + ontbrekende prerequisites) gedeeld door het
+      gecombineerde gewicht van die hele groep.
+    - Greedy met een lazy heap: een dichtheid wordt pas herberekend wanneer hij bovenaan komt
+      en er sindsdien iets gekozen werd. Features waarvan een prerequisite net gekozen werd,
+      worden meteen met hun (mogelijk hogere) dichtheid opnieuw gepusht. De sluitingen komen
+      als bitsets uit de graaf.
+    - Een feature met een uitgesloten of onbruikbare (transitieve) prerequisite is geblokkeerd.
+
+    :param graph: DependencyGraph (zie app/utils/dependency_graph.py)
+    :return: dict zoals optimize_roadmap_pinned
+    """
+    MAX_TIME_CAPACITY, MAX_COST_CAPACITY = roadmap_capacities(roadmap)
+    max_time = MAX_TIME_CAPACITY if MAX_TIME_CAPACITY > 0.0 else 1.0
+    max_cost = MAX_COST_CAPACITY if MAX_COST_CAPACITY > 0.0 else 1.0
+    try:
+        alpha_val = float(alpha)
+    except Exception:
+        alpha_val = 0.5
+
+    # Knopen: de graaf + features zonder afhankelijkheden (achteraan, zonder bogen)
+    nodes = list(graph.nodes) + [f.id_feature for f in features if f.id_feature not in graph.index]
+    index = {fid: i for i, fid in enumerate(nodes)}
+    ancestors = list(graph.ancestor_masks()) + [0] * (len(nodes) - len(graph.nodes))
+    descendants = list(graph.descendant_masks()) + [0] * (len(nodes) - len(graph.nodes))
+
+    items = [None] * len(nodes)
+    for f in features:
+        items[index[f.id_feature]] = knapsack_item(f, MAX_TIME_CAPACITY, MAX_COST_CAPACITY, alpha_val, require_value=False)
+
+    # 1) Geblokkeerd: geen item (ontbrekende data, te groot, ander project) of uitgesloten,
+    #    en alles wat daar transitief van afhangt
+    blocked = 0
+    for fid in must_exclude or ():
+        if fid in index:
+            blocked |= 1 << index[fid]
+    for i, item in enumerate(items):
+        if item is None:
+            blocked |= 1 << i
+    for i in list(iter_bits(blocked)):
+        blocked |= descendants[i]
+
+    selected = 0
+    state = {"time": 0.0, "cost": 0.0, "value": 0.0}
+
+    def group_of(i):
+        return (ancestors[i] | (1 << i)) & ~selected
+
+    # Waarden/gewichten ook als arrays: grote groepen worden in één keer opgeteld
+    values = np.array([it['value'] if it else 0.0 for it in items])
+    time_weights = np.array([it['time_weight'] if it else 0.0 for it in items])
+    cost_weights = np.array([it['cost_weight'] if it else 0.0 for it in items])
+    n_bytes = (len(nodes) + 7) // 8
+
+    def group_totals(group):
+        if group.bit_count() <= SMALL_GROUP:
+            value = time_w = cost_w = 0.0
+            for j in iter_bits(group):
+                value += items[j]['value']
+                time_w += items[j]['time_weight']
+                cost_w += items[j]['cost_weight']
+            return value, time_w, cost_w
+        bits = np.unpackbits(
+            np.frombuffer(group.to_bytes(n_bytes, "little"), dtype=np.uint8), bitorder="little"
+        )[:len(nodes)].astype(bool)
+        return float(values[bits].sum()), float(time_weights[bits].sum()), float(cost_weights[bits].sum())
+
+    def fits(time_w, cost_w):
+        return state["time"] + time_w <= MAX_TIME_CAPACITY and state["cost"] + cost_w <= MAX_COST_CAPACITY
+
+    def take(value, time_w, cost_w):
+        state["time"] += time_w
+        state["cost"] += cost_w
+        state["value"] += value
+
+    # 2) Pins eerst, telkens met hun volledige groep
+    pins_not_fitting = []
+    for fid in must_include or ():
+        i = index.get(fid)
+        if i is None or (blocked >> i) & 1:
+            pins_not_fitting.append(fid)
+            continue
+        group = group_of(i)
+        value, time_w, cost_w = group_totals(group)
+        if fits(time_w, cost_w):
+            take(value, time_w, cost_w)
+            selected |= group
+        else:
+            pins_not_fitting.append(fid)
+
+    # 3) Greedy op closure-aware dichtheid, met lazy herberekening: een heap-entry draagt het
+    #    aantal keuzes op het moment van berekenen. Is er sindsdien iets gekozen, dan wordt de
+    #    dichtheid pas bij het poppen herberekend (en teruggeduwd als hij gezakt is).
+    #    Lazy werkt enkel voor dalende keys: wordt een prerequisite gekozen, dan valt zijn gewicht
+    #    uit de groep van elke dependent en kan diens dichtheid STIJGEN. Die dependents worden
+    #    daarom na elke keuze meteen opnieuw gepusht (hun oude entry wordt bij het poppen herberekend).
+    def density_of(i):
+        group = group_of(i)
+        value, time_w, cost_w = group_totals(group)
+        combined = alpha_val * (time_w / max_time) + (1.0 - alpha_val) * (cost_w / max_cost)
+        density = value / combined if combined > 0.0 else 0.0
+        return density, group, value, time_w, cost_w
+
+    heap = []
+    for i, item in enumerate(items):
+        if item is not None and item['value'] > 0.0 and not (blocked >> i) & 1 and not (selected >> i) & 1:
+            density, _, value, _, _ = density_of(i)
+            if value > 0.0:
+                heap.append((-density, 0, i))
+    heapq.heapify(heap)
+
+    picks = 0
+    while heap:
+        neg_density, stamp, i = heapq.heappop(heap)
+        if (selected >> i) & 1:
+            continue  # Al meegenomen als prerequisite van een andere groep
+        density, group, value, time_w, cost_w = density_of(i)
+        if stamp != picks:
+            if value <= 0.0:
+                continue
+            if heap and density < -heap[0][0]:
+                heapq.heappush(heap, (-density, picks, i))
+                continue
+        if not fits(time_w, cost_w):
+            continue  # Past niet: greedy laat hem vallen (ook als zijn groep later nog zou krimpen)
+        take(value, time_w, cost_w)
+        selected |= group
+        picks += 1
+
+        dependents = 0
+        for j in iter_bits(group):
+            dependents |= descendants[j]
+        for j in iter_bits(dependents & ~selected & ~blocked):
+            if items[j]['value'] > 0.0:
+                density, _, value, _, _ = density_of(j)
+                if value > 0.0:
+                    heapq.heappush(heap, (-density, picks, j))
+
+    chosen = [items[i]['feature'] for i in iter_bits(selected)]
+    return {
+        "selected": chosen,
+        "value": state["value"],
+        "time_used": state["time"],
+        "cost_used": state["cost"],
+        "pins_not_fitting": pins_not_fitting,
+        "warm_started": False,
+    }
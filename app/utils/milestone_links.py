@@ -0,0 +1,122 @@
+# app/utils/milestone_links.py
+# Koppelingen milestone <-> feature (milestone_features) bijwerken met verschilverzamelingen.
+#
+# - Bestaande links worden in één query gelezen; enkel wat verdwijnt gaat weg (één bulk DELETE) en
+#   enkel wat nieuw is komt erbij (één bulk INSERT). Een ongewijzigde selectie schrijft niets.
+# - Feature-ids uit formulieren/API's worden in één query tegen het project gecontroleerd.
+# - Alles via Core-statements op dezelfde sessie: de caller commit (één transactie).
+from sqlalchemy import delete, insert, select, tuple_
+
+from app import db
+from app.models import Features_ideas, Milestone, MilestoneFeature, Roadmap
+
+
+# -----------------------------------
+# VALIDATIE
+# -----------------------------------
+
+def project_feature_ids(project_id, feature_ids):
+    """De feature-ids die echt bij dit project horen (één query)."""
+    feature_ids = {str(fid) for fid in feature_ids if fid}
+    if not feature_ids:
+        return set()
+    return set(db.session.execute(
+        select(Features_ideas.id_feature)
+        .where(Features_ideas.id_project == project_id, Features_ideas.id_feature.in_(feature_ids))
+    ).scalars())
+
+
+def project_milestones(project_id):
+    """{id_milestone: id_roadmap} van alle milestones van dit project (één query)."""
+    return dict(db.session.execute(
+        select(Milestone.id_milestone, Milestone.id_roadmap)
+        .join(Roadmap, Roadmap.id_roadmap == Milestone.id_roadmap)
+        .where(Roadmap.id_project == project_id)
+    ).all())
+
+
+# -----------------------------------
+# SYNCHRONISEREN
+# -----------------------------------
+
+def sync_links(milestone_ids, wanted):
+    """
+    Zet de links van `milestone_ids` gelijk aan `wanted` ({(id_milestone, id_feature)}).
+    :return: (toegevoegd, verwijderd)
+    """
+    milestone_ids = list(milestone_ids)
+    if not milestone_ids:
+        return 0, 0
+    wanted = {(mid, str(fid)) for mid, fid in wanted}
+    current = set(db.session.execute(
+        select(MilestoneFeature.id_milestone, MilestoneFeature.id_feature)
+        .where(MilestoneFeature.id_milestone.in_(milestone_ids))
+    ).all())
+
+    to_remove = current - wanted
+    to_add = wanted - current
+    if to_remove:
+        db.session.execute(
+            delete(MilestoneFeature)
+            .where(tuple_(MilestoneFeature.id_milestone, MilestoneFeature.id_feature).in_(sorted(to_remove)))
+            .execution_options(synchronize_session=False)
+        )
+    if to_add:
+        db.session.execute(
+            insert(MilestoneFeature),
+            [{"id_milestone": mid, "id_feature": fid} for mid, fid in sorted(to_add)],
+        )
+    if to_remove or to_add:
+        _expire_links(milestone_ids)
+    return len(to_add), len(to_remove)
+
+
+def sync_milestone_links(milestone_id, feature_ids):
+    """Selectie van één milestone wegschrijven. :return: (toegevoegd, verwijderd)"""
+    return sync_links([milestone_id], {(milestone_id, fid) for fid in feature_ids})
+
+
+def move_feature_links(feature_ids, target_milestone_id, source_milestone_ids):
+    """
+    Verplaatst features naar `target_milestone_id`: hun links in `source_milestone_ids` verdwijnen
+    (één DELETE), ontbrekende links naar het doel komen erbij (één INSERT).
+    :return: (toegevoegd, verwijderd)
+    """
+    feature_ids = sorted({str(fid) for fid in feature_ids})
+    sources = [mid for mid in set(source_milestone_ids) if mid != target_milestone_id]
+    if not feature_ids:
+        return 0, 0
+
+    removed = 0
+    if sources:
+        removed = db.session.execute(
+            delete(MilestoneFeature)
+            .where(MilestoneFeature.id_milestone.in_(sources), MilestoneFeature.id_feature.in_(feature_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    present = set(db.session.execute(
+        select(MilestoneFeature.id_feature)
+        .where(MilestoneFeature.id_milestone == target_milestone_id, MilestoneFeature.id_feature.in_(feature_ids))
+    ).scalars())
+    to_add = [fid for fid in feature_ids if fid not in present]
+    if to_add:
+        db.session.execute(
+            insert(MilestoneFeature),
+            [{"id_milestone": target_milestone_id, "id_feature": fid} for fid in to_add],
+        )
+    if removed or to_add:
+        _expire_links(sources + [target_milestone_id])
+    return len(to_add), removed
+
+
+def _expire_links(milestone_ids):
+    """Geladen link-collecties (milestone.features, feature.milestone_features) zijn na Core-writes verouderd."""
+    milestone_ids = set(milestone_ids)
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, Milestone) and obj.id_milestone in milestone_ids:
+            db.session.expire(obj, ["milestone_features", "features"])
+        elif isinstance(obj, Features_ideas):
+            db.session.expire(obj, ["milestone_features"])
+        elif isinstance(obj, MilestoneFeature) and obj.id_milestone in milestone_ids:
+            db.session.expunge(obj)
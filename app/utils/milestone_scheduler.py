@@ -0,0 +1,373 @@
+# app/utils/milestone_scheduler.py
+# Plant de door de optimizer gekozen features in over de milestones (periodes) van een roadmap.
+#
+# - Elke milestone met start- en einddatum is een periode.
+# - Capaciteit per periode = Roadmap.time_capacity en budget_allocation, pro rata volgens het
+#   aantal dagen van de milestone binnen de roadmap.
+# - Een feature past enkel in een periode als zijn TTM (weken) binnen de duur van die periode valt.
+# - Volledige planning: hoogste VECTR eerst, first-fit in de vroegste periode die past.
+# - Herplanning na één wijziging is een REPARATIE: enkel die feature (en eventueel verdrongen
+#   features met lagere waarde) verschuift; de rest van de planning blijft staan. Ze draait enkel
+#   als uren, kosten, ROI of TTM echt wijzigen, een feature die nog past blijft in zijn periode,
+#   en bestaande links worden verplaatst maar nooit zonder melding verwijderd.
+# - Vrijgekomen capaciteit wordt aangevuld met features die de laatst bewaarde optimalisatie-run
+#   van de roadmap koos maar die (nog) aan geen milestone van de roadmap hangen.
+# - Links naar milestones zonder datums vallen buiten de planning en worden niet aangeraakt.
+from app import db
+from app.models import Features_ideas, Milestone, MilestoneFeature, OptimizationRun, Roadmap
+from app.utils.calculations import to_float, calculate_feature_cost
+from app.utils.milestone_links import sync_links
+from app.utils.scoring import ScoringRow, scoring_columns, score_rows
+
+
+def _days_between(start, end):
+    return (end - start).days + 1
+
+
+def build_periods(roadmap, milestones):
+    """Zet de gedateerde milestones om in periodes met pro-rata capaciteit (chronologisch)."""
+    rm_start, rm_end = roadmap.start_roadmap, roadmap.end_roadmap
+    total_days = _days_between(rm_start, rm_end) if rm_start and rm_end else 0
+
+    periods = []
+    for m in sorted(milestones, key=lambda m: (m.start_date or rm_start, m.id_milestone)):
+        if not m.start_date or not m.end_date or total_days <= 0:
+            continue  # Zonder datums kan een milestone geen capaciteit krijgen
+        start = max(m.start_date, rm_start)
+        end = min(m.end_date, rm_end)
+        if start > end:
+            continue
+        days = _days_between(start, end)
+        share = days / total_days
+        periods.append({
+            "id_milestone": m.id_milestone,
+            "name": m.name,
+            "days": days,
+            "time_cap": to_float(roadmap.time_capacity) * share,
+            "cost_cap": to_float(roadmap.budget_allocation) * share,
+            "time_used": 0.0,
+            "cost_used": 0.0,
+            "features": [],
+        })
+    return periods
+
+
+def schedule_item(feature):
+    """Compacte voorstelling van een feature voor de planner."""
+    return {
+        "id_feature": feature.id_feature,
+        "hours": to_float(feature.investment_hours),
+        "cost": calculate_feature_cost(feature),
+        "ttm_days": to_float(feature.ttm_weeks) * 7,
+        "value": to_float(getattr(feature, "vectr_score", 0.0)),
+    }
+
+
+def _fits(period, item):
+    return (
+        item["ttm_days"] <= period["days"]
+        and period["time_used"] + item["hours"] <= period["time_cap"] + 1e-9
+        and period["cost_used"] + item["cost"] <= period["cost_cap"] + 1e-9
+    )
+
+
+def _assign(schedule, index, item):
+    period = schedule["periods"][index]
+    period["features"].append(item["id_feature"])
+    period["time_used"] += item["hours"]
+    period["cost_used"] += item["cost"]
+    schedule["placement"][item["id_feature"]] = index
+    schedule["items"][item["id_feature"]] = item
+
+
+def _unassign(schedule, id_feature):
+    index = schedule["placement"].pop(id_feature, None)
+    item = schedule["items"].get(id_feature)
+    if index is None or item is None:
+        return None
+    period = schedule["periods"][index]
+    period["features"].remove(id_feature)
+    period["time_used"] -= item["hours"]
+    period["cost_used"] -= item["cost"]
+    return index
+
+
+def _place_first_fit(schedule, item, start_index=0):
+    for index in range(start_index, len(schedule["periods"])):
+        if _fits(schedule["periods"][index], item):
+            _assign(schedule, index, item)
+            return index
+    return None
+
+
+def new_schedule(periods):
+    return {"periods": periods, "placement": {}, "items": {}, "unscheduled": [], "conflicts": []}
+
+
+def schedule_features(periods, items):
+    """Volledige planning: hoogste waarde eerst, elke feature in de vroegste periode die past."""
+    schedule = new_schedule(periods)
+    for item in sorted(items, key=lambda it: it["value"], reverse=True):
+        if _place_first_fit(schedule, item) is None:
+            schedule["items"][item["id_feature"]] = item
+            schedule["unscheduled"].append(item["id_feature"])
+    return schedule
+
+
+def schedule_from_links(periods, linked_items):
+    """
+    Reconstrueert de huidige planning uit bestaande MilestoneFeature-links.
+    :param linked_items: lijst van (id_milestone, item)
+    """
+    schedule = new_schedule(periods)
+    index_of = {p["id_milestone"]: i for i, p in enumerate(periods)}
+    for id_milestone, item in linked_items:
+        if item["id_feature"] in schedule["placement"]:
+            continue  # Handmatig aan meerdere milestones gekoppeld: eerste telt
+        index = index_of.get(id_milestone)
+        if index is not None:
+            _assign(schedule, index, item)
+    return schedule
+
+
+def _evict_and_place(schedule, index, item):
+    """
+    Probeert item in periode `index` te zetten door features met lagere waarde (laagste eerst) naar
+    een latere periode te verschuiven. Lukt dat niet voor alle verdrongen features, dan blijft alles
+    zoals het was: een verdrongen feature wordt nooit ongepland. :return: de verschoven features of None
+    """
+    periods = schedule["periods"]
+    period = periods[index]
+    weaker = sorted(
+        (fid for fid in period["features"] if schedule["items"][fid]["value"] < item["value"]),
+        key=lambda fid: schedule["items"][fid]["value"],
+    )
+    free_time = period["time_cap"] - period["time_used"]
+    free_cost = period["cost_cap"] - period["cost_used"]
+    evict = []
+    for fid in weaker:
+        if free_time >= item["hours"] and free_cost >= item["cost"]:
+            break
+        evict.append(fid)
+        free_time += schedule["items"][fid]["hours"]
+        free_cost += schedule["items"][fid]["cost"]
+    if free_time + 1e-9 < item["hours"] or free_cost + 1e-9 < item["cost"]:
+        return None
+
+    for fid in evict:
+        _unassign(schedule, fid)
+    _assign(schedule, index, item)
+    moved = []
+    for fid in evict:
+        if _place_first_fit(schedule, schedule["items"][fid], start_index=index + 1) is None:
+            # Terugdraaien: de oorspronkelijke planning herstellen
+            for placed_fid in moved:
+                _unassign(schedule, placed_fid)
+            _unassign(schedule, item["id_feature"])
+            for evicted in evict:
+                _assign(schedule, index, schedule["items"][evicted])
+            return None
+        moved.append(fid)
+    return moved
+
+
+def repair_schedule(schedule, item):
+    """
+    Incrementele herplanning na een wijziging van één feature (i.p.v. alles opnieuw oplossen).
+
+    1) Past de feature nog in zijn huidige periode, dan blijft hij daar (handmatige plaatsing blijft staan).
+    2) Anders first-fit vanaf de vroegste periode.
+    3) Past hij nergens en heeft hij waarde: verdring in de vroegste geschikte periode features met
+       lagere waarde, maar enkel als die zelf in een latere periode terechtkunnen.
+    4) Lukt niets, dan blijft een ingeplande feature in zijn oude periode (boven capaciteit) en komt
+       hij in schedule["conflicts"]; de planner ontkoppelt nooit zelf een feature.
+    5) Vrijgekomen capaciteit in de oude periode wordt aangevuld met ongeplande features
+       (schedule["unscheduled"], zie add_run_candidates).
+
+    :return: dict {id_feature: (oude id_milestone of None, nieuwe id_milestone of None)}
+    """
+    periods = schedule["periods"]
+    before = {fid: periods[i]["id_milestone"] for fid, i in schedule["placement"].items()}
+    touched = {item["id_feature"]}
+
+    old_index = _unassign(schedule, item["id_feature"])
+    if item["id_feature"] in schedule["unscheduled"]:
+        schedule["unscheduled"].remove(item["id_feature"])
+    schedule["items"][item["id_feature"]] = item
+
+    if old_index is not None and _fits(periods[old_index], item):
+        _assign(schedule, old_index, item)
+        placed = old_index
+    else:
+        placed = _place_first_fit(schedule, item)
+    if placed is None and item["value"] > 0.0:
+        for index, period in enumerate(periods):
+            if item["ttm_days"] > period["days"]:
+                continue
+            if item["hours"] > period["time_cap"] or item["cost"] > period["cost_cap"]:
+                continue
+            moved = _evict_and_place(schedule, index, item)
+            if moved is not None:
+                placed = index
+                touched.update(moved)
+                break
+
+    if placed is None:
+        if old_index is not None:
+            _assign(schedule, old_index, item)
+            schedule["conflicts"].append(item["id_feature"])
+            return {}
+        schedule["unscheduled"].append(item["id_feature"])
+
+    # Vrijgekomen ruimte in de oude periode opvullen met ongeplande features (hoogste waarde eerst);
+    # ook als de feature bleef maar kleiner werd
+    if old_index is not None:
+        for fid in sorted(schedule["unscheduled"], key=lambda f: schedule["items"][f]["value"], reverse=True):
+            if fid == item["id_feature"]:
+                continue
+            candidate = schedule["items"][fid]
+            if candidate["value"] > 0.0 and _fits(periods[old_index], candidate):
+                _assign(schedule, old_index, candidate)
+                schedule["unscheduled"].remove(fid)
+                touched.add(fid)
+
+    changes = {}
+    for fid in touched:
+        old = before.get(fid)
+        new_index = schedule["placement"].get(fid)
+        new = periods[new_index]["id_milestone"] if new_index is not None else None
+        if old != new:
+            changes[fid] = (old, new)
+    return changes
+
+
+# -----------------------------------
+# DATABASE HELPERS
+# -----------------------------------
+
+def _score(features, project):
+    return score_rows(features, project)
+
+
+def replace_roadmap_links(roadmap, schedule):
+    """Schrijft een volledige planning weg: enkel de links die verschillen worden verwijderd/toegevoegd."""
+    sync_links(
+        [p["id_milestone"] for p in schedule["periods"]],
+        {(p["id_milestone"], fid) for p in schedule["periods"] for fid in p["features"]},
+    )
+
+
+def apply_schedule_changes(changes):
+    """
+    Schrijft enkel de verschoven features weg (resultaat van repair_schedule). Een link wordt alleen
+    verplaatst: zonder nieuwe periode blijft de bestaande link staan.
+    """
+    for fid, (old, new) in changes.items():
+        if new is None:
+            continue
+        if old is not None:
+            MilestoneFeature.query.filter_by(id_milestone=old, id_feature=fid).delete(
+                synchronize_session=False
+            )
+        if db.session.get(MilestoneFeature, (new, fid)) is None:        # al handmatig gekoppeld
+            db.session.add(MilestoneFeature(id_milestone=new, id_feature=fid))
+
+
+def load_roadmap_schedule(roadmap, project):
+    """Huidige planning van een roadmap, opgebouwd uit de bestaande MilestoneFeature-links."""
+    periods = build_periods(roadmap, roadmap.milestones)
+    milestone_ids = [p["id_milestone"] for p in periods]
+    if not milestone_ids:
+        return new_schedule(periods)
+
+    rows = (
+        db.session.query(MilestoneFeature.id_milestone, *scoring_columns())
+        .join(Features_ideas, Features_ideas.id_feature == MilestoneFeature.id_feature)
+        .filter(MilestoneFeature.id_milestone.in_(milestone_ids))
+        .all()
+    )
+    linked = [(row[0], ScoringRow(*row[1:])) for row in rows]
+    _score([feature for _, feature in linked], project)
+    return schedule_from_links(periods, [(mid, schedule_item(feature)) for mid, feature in linked])
+
+
+def add_run_candidates(schedule, roadmap, project):
+    """
+    Zet de features van de laatst bewaarde optimalisatie-run die aan geen enkele milestone van de
+    roadmap hangen in schedule["unscheduled"]: zij vullen capaciteit op die repair_schedule vrijmaakt.
+    """
+    run = (
+        OptimizationRun.query.filter_by(id_roadmap=roadmap.id_roadmap)
+        .order_by(OptimizationRun.id_run.desc())
+        .first()
+    )
+    if run is None or not run.selected_feature_ids:
+        return
+
+    linked = (
+        db.session.query(MilestoneFeature.id_feature)
+        .join(Milestone, Milestone.id_milestone == MilestoneFeature.id_milestone)
+        .filter(Milestone.id_roadmap == roadmap.id_roadmap)
+    )
+    rows = (
+        db.session.query(*scoring_columns())
+        .filter(
+            Features_ideas.id_project == project.id_project,
+            Features_ideas.id_feature.in_(run.selected_feature_ids),
+            Features_ideas.id_feature.not_in(linked),
+        )
+        .all()
+    )
+    features = [ScoringRow(*row) for row in rows]
+    _score(features, project)
+    for feature in features:
+        schedule["items"][feature.id_feature] = schedule_item(feature)
+        schedule["unscheduled"].append(feature.id_feature)
+
+
+SCHEDULING_FIELDS = (
+    "investment_hours", "hourly_rate", "opex", "other_costs",                      # uren en kosten
+    "extra_revenue", "churn_reduction", "cost_savings", "roi_percent",             # ROI
+    "ttm_weeks",
+)
+
+
+def scheduling_inputs(feature):
+    """Momentopname van de velden die de planning beïnvloeden (vóór een wijziging nemen)."""
+    return tuple(to_float(getattr(feature, field, None)) for field in SCHEDULING_FIELDS)
+
+
+def reschedule_feature(feature, project, before=None):
+    """
+    Repareert de planning van elke roadmap waarin deze feature ingepland staat, na een wijziging
+    van de feature. De caller commit.
+    :param before: scheduling_inputs(feature) van vóór de wijziging; ongewijzigd = niets te doen
+    :return: (aantal verschoven features, namen van milestones waar de feature niet meer past)
+    """
+    if before is not None and before == scheduling_inputs(feature):
+        return 0, []
+
+    roadmap_ids = [
+        row.id_roadmap
+        for row in (
+            db.session.query(Milestone.id_roadmap)
+            .join(MilestoneFeature, MilestoneFeature.id_milestone == Milestone.id_milestone)
+            .filter(MilestoneFeature.id_feature == feature.id_feature)
+            .distinct()
+        )
+    ]
+
+    moved, conflicts = 0, []
+    for roadmap in Roadmap.query.filter(Roadmap.id_roadmap.in_(roadmap_ids)).all() if roadmap_ids else []:
+        schedule = load_roadmap_schedule(roadmap, project)
+        if feature.id_feature not in schedule["placement"]:
+            continue  # Enkel aan een milestone zonder datums gekoppeld: buiten de planning
+        _score([feature], project)
+        add_run_candidates(schedule, roadmap, project)
+        changes = repair_schedule(schedule, schedule_item(feature))
+        apply_schedule_changes(changes)
+        moved += len(changes)
+        conflicts += [
+            schedule["periods"][schedule["placement"][fid]]["name"] for fid in schedule["conflicts"]
+        ]
+    return moved, conflicts
@@ -0,0 +1,311 @@
+# app/utils/monte_carlo.py
+# Monte Carlo simulatie van ROI, geschaalde TTV en VECTR voor alle features van een project.
+#
+# - De inputs van calc_roi/calc_ttv zijn puntschattingen. We trekken per feature en per sample
+#   lognormale ruis rond die schatting (mediaan = de ingevulde waarde).
+# - De spreiding hangt af van de confidence (quality_score): hoe lager, hoe breder.
+# - Alles wordt berekend als NumPy-bewerkingen op matrices (features x samples), in blokken
+#   van samples.
+# - Past features x samples x metrieken (float32) binnen het geheugenbudget (MONTE_CARLO_EXACT_MAX_BYTES),
+#   dan worden de blokken samengevoegd en zijn de percentielen exact (np.percentile).
+# - Daarboven wordt elk blok meteen samengevat in een vaste histogram per feature en per metriek
+#   (bins met gelijke massa, bepaald op het eerste blok); enkel die tellingen worden opgeteld, dus
+#   het geheugen hangt af van features x SAMPLES_PER_CHUNK, niet van het totaal aantal samples.
+#   De percentielen worden op het einde uit de histogrammen geïnterpoleerd (benadering).
+# - Grote runs kunnen over een process pool: elke worker levert zijn blokken, of in de
+#   histogram-modus enkel de opgetelde tellingen.
+# - Per sample wordt ook de greedy knapzak van optimize_roadmap gevectoriseerd uitgevoerd
+#   (over alle samples tegelijk), wat de kans op selectie per feature oplevert.
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.constants import CONF_MIN, CONF_MAX, MC_SPREAD_AT_MAX_CONF, MC_SPREAD_AT_MIN_CONF
+from app.utils.knapsack_optimizer import roadmap_capacities
+from app.utils.feature_data import fetch_columns
+
+# Inputs die onzeker zijn (hourly_rate is een afspraak, geen schatting)
+UNCERTAIN_FIELDS = (
+    "extra_revenue", "churn_reduction", "cost_savings",
+    "investment_hours", "opex", "other_costs",
+    "ttm_weeks", "ttbv_weeks",
+)
+PERCENTILES = (10, 50, 90)
+METRICS = ("roi", "ttv_scaled", "vectr")
+SAMPLES_PER_CHUNK = 1000
+HISTOGRAM_BINS = 256            # bins per feature en per metriek
+
+
+def load_simulation_inputs(project):
+    """Eén query, enkel de kolommen die de simulatie nodig heeft; kolomgewijs als NumPy arrays."""
+    # NaN = ontbreekt -> nooit selecteerbaar (zoals optimize_roadmap); de rest valt terug op 0
+    fill = {name: 0.0 for name in UNCERTAIN_FIELDS if name != "investment_hours"}
+    fill["quality_score"] = 0.0
+    inputs = fetch_columns(
+        ("id_feature", "name_feature", "hourly_rate", "quality_score") + UNCERTAIN_FIELDS,
+        fill=fill,
+        project_id=project.id_project,
+        order_by="name_feature",
+    )
+    inputs["ttv_limits"] = (
+        float(project.ttm_low_limit or 0) + float(project.ttbv_low_limit or 0),
+        float(project.ttm_high_limit or 0) + float(project.ttbv_high_limit or 0),
+    )
+    return inputs
+
+
+def spread_for_confidence(confidence):
+    """Lineair van MC_SPREAD_AT_MIN_CONF (confidence 0) naar MC_SPREAD_AT_MAX_CONF (confidence 10)."""
+    share = np.clip((confidence - CONF_MIN) / (CONF_MAX - CONF_MIN), 0.0, 1.0)
+    return MC_SPREAD_AT_MIN_CONF + (MC_SPREAD_AT_MAX_CONF - MC_SPREAD_AT_MIN_CONF) * share
+
+
+def _simulate_chunk(inputs, n_samples, seed, capacities=None, alpha=1.0):
+    """
+    Simuleert `n_samples` samples voor alle features. Module-level zodat de process pool hem kan picklen.
+    :return: (roi, ttv_scaled, vectr) als float32 (features x samples) en het aantal selecties per feature
+    """
+    rng = np.random.default_rng(seed)
+    n = len(inputs["id_feature"])
+    sigma = spread_for_confidence(inputs["quality_score"])[:, None]
+
+    def sample(name):
+        # Lognormale ruis: altijd >= 0, mediaan = puntschatting
+        return inputs[name][:, None] * np.exp(sigma * rng.standard_normal((n, n_samples)))
+
+    revenue = sample("extra_revenue") + sample("churn_reduction") + sample("cost_savings")
+    hours = sample("investment_hours")
+    cost = hours * inputs["hourly_rate"][:, None] + sample("opex") + sample("other_costs")
+
+    # ROI zoals calc_roi (None -> 0 in calculate_vectr_scores)
+    safe_cost = np.where(cost > 0, cost, 1.0)
+    roi = np.where(cost > 0, (revenue - cost) / safe_cost * 100.0, 0.0)
+    roi = np.nan_to_num(roi, nan=0.0)
+
+    # TTV zoals calc_ttv (afgekapt naar int, None -> 5.5) en calc_ttv_scaled
+    total = sample("ttm_weeks") + sample("ttbv_weeks")
+    ttv_weeks = np.where(total > 0, np.floor(total), 5.5)
+    ttv_min, ttv_max = inputs["ttv_limits"]
+    if ttv_max > ttv_min:
+        ttv_scaled = 10.0 - np.clip((ttv_weeks - ttv_min) / (ttv_max - ttv_min) * 10.0, 0.0, 10.0)
+    else:
+        ttv_scaled = np.zeros_like(ttv_weeks)
+
+    vectr = ttv_scaled * (roi / 100.0) * inputs["quality_score"][:, None]
+
+    selected_counts = np.zeros(n, dtype=np.int64)
+    if capacities is not None:
+        selected_counts = _greedy_selection_counts(vectr, hours, cost, capacities, alpha)
+
+    return roi.astype(np.float32), ttv_scaled.astype(np.float32), vectr.astype(np.float32), selected_counts
+
+
+def _greedy_selection_counts(vectr, hours, cost, capacities, alpha):
+    """
+    Gevectoriseerde versie van optimize_roadmap over alle samples tegelijk:
+    zelfde filters en dichtheid, daarna één lus over de rangposities (niet over de samples).
+    """
+    max_time_cap, max_cost_cap = capacities
+    max_time = max_time_cap if max_time_cap > 0.0 else 1.0
+    max_cost = max_cost_cap if max_cost_cap > 0.0 else 1.0
+
+    eligible = (
+        ~np.isnan(hours) & ~np.isnan(cost)
+        & (vectr > 0.0)
+        & (hours <= max_time_cap) & (cost <= max_cost_cap)
+    )
+    hours = np.nan_to_num(hours)
+    cost = np.nan_to_num(cost)
+    combined = alpha * (hours / max_time) + (1.0 - alpha) * (cost / max_cost)
+    density = np.where(combined > 0.0, vectr / np.where(combined > 0.0, combined, 1.0), 0.0)
+    density = np.where(eligible, density, -np.inf)
+
+    # Per sample (kolom) de features op dichtheid sorteren: (samples x features)
+    order = np.argsort(-density.T, axis=1, kind="stable")
+    n_samples = order.shape[0]
+    cols = np.arange(n_samples)
+    time_used = np.zeros(n_samples)
+    cost_used = np.zeros(n_samples)
+    selected = np.zeros_like(eligible)
+
+    for rank in range(order.shape[1]):
+        idx = order[:, rank]
+        h, c = hours[idx, cols], cost[idx, cols]
+        take = eligible[idx, cols] & (time_used + h <= max_time_cap) & (cost_used + c <= max_cost_cap)
+        if not take.any() and not eligible[idx, cols].any():
+            break  # Vanaf hier enkel nog niet-selecteerbare features (gesorteerd op -inf)
+        time_used += np.where(take, h, 0.0)
+        cost_used += np.where(take, c, 0.0)
+        selected[idx[take], cols[take]] = True
+
+    return selected.sum(axis=1)
+
+
+# -----------------------------------
+# SAMENVATTEN PER BLOK (HISTOGRAMMEN)
+# -----------------------------------
+
+def _bin_edges(values):
+    """Randen met gelijke massa per feature, uit het eerste blok: (features x HISTOGRAM_BINS + 1)."""
+    return np.quantile(values, np.linspace(0.0, 1.0, HISTOGRAM_BINS + 1), axis=1).T
+
+
+def _histogram(values, edges):
+    """
+    Telt de samples per bin, per feature, met één searchsorted voor alle features samen: elke rij
+    wordt naar een eigen interval [rij, rij + 0.5] geschaald. Waarden buiten de randen van het
+    eerste blok tellen in de eerste/laatste bin.
+    :return: (features x bins x 2): samples exact op de ondergrens (discrete waarden, bv. TTV in
+             hele weken) en samples erboven
+    """
+    n, bins = edges.shape[0], edges.shape[1] - 1
+    values = np.nan_to_num(values)
+    lo, hi = edges[:, :1], edges[:, -1:]
+    span = np.where(hi > lo, hi - lo, 1.0)
+    rows = np.arange(n)[:, None]
+    flat_edges = (rows + 0.5 * (edges - lo) / span).ravel()
+    positions = rows + 0.5 * np.clip((values - lo) / span, 0.0, 1.0)
+
+    index = np.searchsorted(flat_edges, positions.ravel(), side="right") - 1
+    index = np.clip(index.reshape(positions.shape) - rows * (bins + 1), 0, bins - 1)
+    on_edge = values == edges[rows, index]
+    slot = (rows * bins + index) * 2 + np.where(on_edge, 0, 1)
+    return np.bincount(slot.ravel(), minlength=n * bins * 2).reshape(n, bins, 2)
+
+
+def _histogram_percentiles(counts, edges, percentiles):
+    """
+    Percentielen uit de histogrammen: (percentielen x features). Valt het percentiel in de samples
+    op de ondergrens van een bin, dan is het die waarde; anders lineair geïnterpoleerd binnen de bin.
+    """
+    n = counts.shape[0]
+    per_bin = counts.sum(axis=2)
+    cumulative = np.cumsum(per_bin, axis=1)
+    total = cumulative[:, -1]
+    rows = np.arange(n)
+    result = np.zeros((len(percentiles), n))
+    for k, p in enumerate(percentiles):
+        target = total * (p / 100.0)
+        index = np.argmax(cumulative >= target[:, None], axis=1)
+        before = np.where(index > 0, cumulative[rows, index - 1], 0) + counts[rows, index, 0]
+        inside = counts[rows, index, 1]
+        share = np.where(inside > 0, (target - before) / np.where(inside > 0, inside, 1), 0.0)
+        low, high = edges[rows, index], edges[rows, index + 1]
+        result[k] = low + np.clip(share, 0.0, 1.0) * (high - low)
+    return result
+
+
+def _summarize_chunks(inputs, sizes, seeds, capacities, alpha, edges):
+    """
+    Simuleert een reeks blokken en telt enkel hun histogrammen en selecties op.
+    Module-level zodat de process pool hem kan picklen.
+    """
+    n = len(inputs["id_feature"])
+    counts = {name: np.zeros((n, HISTOGRAM_BINS, 2), dtype=np.int64) for name in METRICS}
+    selected_counts = np.zeros(n, dtype=np.int64)
+    for size, chunk_seed in zip(sizes, seeds):
+        *metrics, selected = _simulate_chunk(inputs, size, chunk_seed, capacities, alpha)
+        for name, values in zip(METRICS, metrics):
+            counts[name] += _histogram(values, edges[name])
+        selected_counts += selected
+    return counts, selected_counts
+
+
+def _exact_summary(inputs, sizes, seeds, capacities, alpha, workers):
+    """Alle blokken samengevoegd, exacte percentielen. :return: (percentielen per metriek, selecties)"""
+    args = [(inputs, size, chunk_seed, capacities, alpha) for size, chunk_seed in zip(sizes, seeds)]
+    if workers and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*a) for a in args]
+
+    summary = {}
+    for position, name in enumerate(METRICS):
+        samples = np.concatenate([chunk[position] for chunk in chunks], axis=1)
+        summary[name] = np.percentile(samples, PERCENTILES, axis=1)
+        del samples
+    return summary, sum(chunk[3] for chunk in chunks)
+
+
+def _histogram_summary(inputs, sizes, seeds, capacities, alpha, workers):
+    """Per blok gevouwen in histogrammen, benaderde percentielen. :return: zoals _exact_summary"""
+    # 1) Eerste blok in dit proces: bepaalt de bins (en telt zelf mee)
+    *first_metrics, selected_counts = _simulate_chunk(inputs, sizes[0], seeds[0], capacities, alpha)
+    edges = {name: _bin_edges(values) for name, values in zip(METRICS, first_metrics)}
+    counts = {name: _histogram(values, edges[name]) for name, values in zip(METRICS, first_metrics)}
+    del first_metrics
+
+    # 2) De rest per worker (round robin) samenvatten; enkel de tellingen komen terug
+    groups = max(min(workers or 1, len(sizes) - 1), 1)
+    parts = [
+        (inputs, sizes[1 + g::groups], seeds[1 + g::groups], capacities, alpha, edges)
+        for g in range(groups)
+    ]
+    parts = [part for part in parts if part[1]]
+    if groups > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=groups) as pool:
+            results = list(pool.map(_summarize_chunks, *zip(*parts)))
+    else:
+        results = [_summarize_chunks(*part) for part in parts]
+    for part_counts, part_selected in results:
+        for name in METRICS:
+            counts[name] += part_counts[name]
+        selected_counts += part_selected
+
+    summary = {name: _histogram_percentiles(counts[name], edges[name], PERCENTILES) for name in METRICS}
+    return summary, selected_counts
+
+
+def simulate_project(inputs, n_samples=10000, roadmap=None, alpha=1.0, seed=None, workers=1, max_exact_bytes=None):
+    """
+    Draait de simulatie en vat per feature samen.
+
+    :param roadmap: optioneel; geeft de kans op selectie onder optimize_roadmap voor deze roadmap
+    :param workers: > 1 verdeelt de blokken van samples over een process pool
+    :param max_exact_bytes: geheugenbudget voor alle samples samen (None = altijd exact); erboven
+                            worden de percentielen uit histogrammen per blok benaderd
+    :return: dict met per feature P10/P50/P90 van ROI, TTV (geschaald) en VECTR, en selectiekans
+    """
+    start = time.perf_counter()
+    capacities = roadmap_capacities(roadmap) if roadmap is not None else None
+    try:
+        alpha = float(alpha)
+    except (TypeError, ValueError):
+        alpha = 1.0
+
+    sizes = [SAMPLES_PER_CHUNK] * (n_samples // SAMPLES_PER_CHUNK)
+    if n_samples % SAMPLES_PER_CHUNK:
+        sizes.append(n_samples % SAMPLES_PER_CHUNK)
+    # Onafhankelijke, reproduceerbare RNG-stromen per blok (ook over processen heen)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    n = len(inputs["id_feature"])
+    sample_bytes = n * n_samples * len(METRICS) * np.dtype(np.float32).itemsize
+    exact = max_exact_bytes is None or sample_bytes <= max_exact_bytes
+
+    summary = {name: np.zeros((len(PERCENTILES), 0)) for name in METRICS}
+    selection_probability = None
+    if n and sizes:
+        summarize = _exact_summary if exact else _histogram_summary
+        summary, selected_counts = summarize(inputs, sizes, seeds, capacities, alpha, workers)
+        if capacities is not None:
+            selection_probability = selected_counts / float(max(n_samples, 1))
+
+    features = []
+    for i in range(n):
+        row = {"id_feature": inputs["id_feature"][i], "name_feature": inputs["name_feature"][i]}
+        for name, values in summary.items():
+            for k, p in enumerate(PERCENTILES):
+                row[f"{name}_p{p}"] = float(values[k, i])
+        row["selection_probability"] = (
+            float(selection_probability[i]) if selection_probability is not None else None
+        )
+        features.append(row)
+
+    return {
+        "features": features,
+        "n_samples": n_samples,
+        "workers": workers,
+        "exact": exact,
+        "solve_seconds": time.perf_counter() - start,
+    }
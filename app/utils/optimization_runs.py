@@ -0,0 +1,201 @@
+# app/utils/optimization_runs.py
+# Bewaarde optimalisatie-runs per roadmap.
+#
+# - Elke run bewaart een hash van de input (feature-waarden, capaciteiten, alpha en pins).
+#   Identieke input -> de bewaarde selectie wordt teruggegeven zonder opnieuw te rekenen.
+# - Veranderden er sinds de vorige run (zelfde capaciteiten en alpha) maar weinig features of pins,
+#   dan start de solver vanuit de vorige selectie (warm start) i.p.v. van nul.
+# - Opzoeken is read-only (ook op GET en op een read replica); een run wordt enkel bewaard als de
+#   gebruiker hem expliciet opslaat (POST), en per roadmap blijven de laatste runs bewaard.
+import hashlib
+import json
+import time
+from sqlalchemy import delete, select
+from app import db
+from app.models import OptimizationRun, RoadmapFeaturePin, Milestone, MilestoneFeature, PIN_TYPES
+from app.utils.calculations import to_float, calculate_feature_cost
+from app.utils.knapsack_optimizer import optimize_roadmap_pinned, optimize_roadmap_with_dependencies, roadmap_capacities
+from app.utils.dependency_graph import DependencyGraph, load_project_graph
+
+# Warm start enkel als hoogstens dit aandeel van de features (of pins) veranderde
+WARM_START_MAX_CHANGED_SHARE = 0.25
+
+
+def feature_fingerprint(feature):
+    """Alles wat de knapzak van één feature gebruikt: waarde, uren, kosten."""
+    vectr = getattr(feature, "vectr_score", None)
+    return [
+        None if vectr is None else round(to_float(vectr), 6),
+        None if feature.investment_hours is None else round(to_float(feature.investment_hours), 6),
+        None if feature.hourly_rate is None else round(calculate_feature_cost(feature), 6),
+    ]
+
+
+def load_pins(roadmap, pin_milestones=False):
+    """
+    (must_include, must_exclude) als gesorteerde id-lijsten.
+    Met pin_milestones tellen features die al aan een milestone van deze roadmap hangen als must-include.
+    """
+    include, exclude = set(), set()
+    for pin in RoadmapFeaturePin.query.filter_by(id_roadmap=roadmap.id_roadmap):
+        (include if pin.pin == "include" else exclude).add(pin.id_feature)
+
+    if pin_milestones:
+        linked = (
+            db.session.query(MilestoneFeature.id_feature)
+            .join(Milestone, Milestone.id_milestone == MilestoneFeature.id_milestone)
+            .filter(Milestone.id_roadmap == roadmap.id_roadmap)
+        )
+        include.update(row.id_feature for row in linked)
+
+    exclude -= include
+    return sorted(include), sorted(exclude)
+
+
+def set_pin(roadmap, id_feature, pin):
+    """Zet of verwijdert een pin ('include', 'exclude' of iets anders = verwijderen). De caller commit."""
+    existing = db.session.get(RoadmapFeaturePin, (roadmap.id_roadmap, id_feature))
+    if pin not in PIN_TYPES:
+        if existing is not None:
+            db.session.delete(existing)
+        return None
+    if existing is None:
+        existing = RoadmapFeaturePin(id_roadmap=roadmap.id_roadmap, id_feature=id_feature)
+        db.session.add(existing)
+    existing.pin = pin
+    return existing
+
+
+def run_input_hash(capacities, alpha, fingerprints, must_include, must_exclude, dependencies=()):
+    payload = {
+        "capacities": [round(c, 6) for c in capacities],
+        "alpha": round(float(alpha), 6),
+        "features": sorted(fingerprints.items()),
+        "include": sorted(must_include),
+        "exclude": sorted(must_exclude),
+    }
+    if dependencies:
+        payload["dependencies"] = sorted(dependencies)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def recent_runs(roadmap, limit=10):
+    return (
+        OptimizationRun.query.filter_by(id_roadmap=roadmap.id_roadmap)
+        .order_by(OptimizationRun.createdat.desc(), OptimizationRun.id_run.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def _changed_ids(previous, fingerprints, must_include, must_exclude):
+    """Features waarvan waarde/gewicht of pin veranderde sinds `previous` (ook nieuwe/verwijderde)."""
+    old = previous.feature_fingerprints or {}
+    changed = {fid for fid, fp in fingerprints.items() if old.get(fid) != fp}
+    changed |= set(old) - set(fingerprints)
+    changed |= set(previous.must_include or []) ^ set(must_include)
+    changed |= set(previous.must_exclude or []) ^ set(must_exclude)
+    return changed
+
+
+def prune_runs(roadmap, keep):
+    """Verwijdert alles behalve de `keep` recentste runs van de roadmap. De caller commit."""
+    newest = (
+        select(OptimizationRun.id_run)
+        .where(OptimizationRun.id_roadmap == roadmap.id_roadmap)
+        .order_by(OptimizationRun.id_run.desc())
+        .limit(keep)
+    )
+    result = db.session.execute(
+        delete(OptimizationRun)
+        .where(OptimizationRun.id_roadmap == roadmap.id_roadmap, OptimizationRun.id_run.not_in(newest))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def get_or_solve_run(roadmap, features, alpha, user=None, pin_milestones=False, persist=False,
+                     ignore_dependencies=False):
+    """
+    Geeft (run, cached) terug. Features moeten al een vectr_score hebben.
+    Zonder persist blijft een nieuwe run transient (id_run None) en schrijft deze functie niets;
+    met persist wordt hij aan de sessie toegevoegd en commit de caller.
+    Raises DependencyCycleError als de afhankelijkheden een cyclus bevatten (enkel mogelijk bij data
+    die buiten add_dependency binnenkwam); ignore_dependencies lost dan op zonder de graaf.
+    """
+    capacities = roadmap_capacities(roadmap)
+    must_include, must_exclude = load_pins(roadmap, pin_milestones=pin_milestones)
+    fingerprints = {f.id_feature: feature_fingerprint(f) for f in features}
+    graph = DependencyGraph([], []) if ignore_dependencies else load_project_graph(roadmap.id_project)
+    input_hash = run_input_hash(capacities, alpha, fingerprints, must_include, must_exclude, graph.edges)
+
+    # 1) Identieke input al eens opgelost -> bewaarde run
+    cached = (
+        OptimizationRun.query.filter_by(id_roadmap=roadmap.id_roadmap, input_hash=input_hash)
+        .order_by(OptimizationRun.id_run.desc())
+        .first()
+    )
+    if cached is not None:
+        return cached, True
+
+    # 2) Vorige run met dezelfde capaciteiten en alpha -> kandidaat voor een warm start
+    #    (niet met afhankelijkheden: daar bepaalt de hele groep of een feature past)
+    warm_start, changed = None, None
+    previous = None if graph.has_edges else (
+        OptimizationRun.query.filter_by(
+            id_roadmap=roadmap.id_roadmap,
+            alpha=float(alpha),
+            time_capacity=capacities[0],
+            budget_allocation=capacities[1],
+        )
+        .order_by(OptimizationRun.id_run.desc())
+        .first()
+    )
+    if previous is not None:
+        changed = _changed_ids(previous, fingerprints, must_include, must_exclude)
+        if len(changed) <= WARM_START_MAX_CHANGED_SHARE * max(len(fingerprints), 1):
+            warm_start = previous.selected_feature_ids or []
+
+    # 3) Oplossen
+    start = time.perf_counter()
+    if graph.has_edges:
+        result = optimize_roadmap_with_dependencies(
+            roadmap,
+            features,
+            graph,
+            alpha=alpha,
+            must_include=must_include,
+            must_exclude=must_exclude,
+        )
+    else:
+        result = optimize_roadmap_pinned(
+            roadmap,
+            features,
+            alpha=alpha,
+            must_include=must_include,
+            must_exclude=must_exclude,
+            warm_start=warm_start,
+            changed_ids=changed,
+        )
+    solve_seconds = time.perf_counter() - start
+
+    run = OptimizationRun(
+        id_roadmap=roadmap.id_roadmap,
+        id_profile=getattr(user, "id_profile", None),
+        input_hash=input_hash,
+        alpha=float(alpha),
+        time_capacity=capacities[0],
+        budget_allocation=capacities[1],
+        feature_fingerprints=fingerprints,
+        selected_feature_ids=[f.id_feature for f in result["selected"]],
+        must_include=must_include,
+        must_exclude=must_exclude,
+        objective_value=result["value"],
+        time_used=result["time_used"],
+        cost_used=result["cost_used"],
+        solve_seconds=solve_seconds,
+        warm_started=result["warm_started"],
+    )
+    if persist:
+        db.session.add(run)
+    return run, False
@@ -1,4 +1,13 @@
 # app/utils/outliers.py
+from bisect import bisect_left
+
+# De lijst met metrieken die gecontroleerd moeten worden
+# Hier zit 'ttv_weeks' nu expliciet bij
+OUTLIER_METRICS = {
+    'vectr_score': 'VECTR score',
+    'roi_percent': 'ROI',
+    'ttv_weeks': 'TtV'
+}
 
 def calculate_median(data):
     """Berekent de mediaan (Q2) van een gesorteerde lijst."""
@@ -10,25 +19,94 @@ def calculate_median(data):
     else:
         return (data[n // 2 - 1] + data[n // 2]) / 2
 
+def _quartile_indices(n):
+    """Indices in de gesorteerde lijst waaruit Q1 en Q3 berekend worden."""
+    half = n // 2
+    start_of_upper_half_index = half + (n % 2)
+    indices = []
+    for start in (0, start_of_upper_half_index):
+        if half % 2 == 1:
+            indices.append(start + half // 2)
+        else:
+            indices.extend([start + half // 2 - 1, start + half // 2])
+    return indices
+
 def get_iqr_bounds(features, attribute_name):
     """Berekent de statistische grenzen voor een specifiek attribuut van de features."""
+    low, high, _ = get_iqr_bounds_with_anchors(features, attribute_name)
+    return low, high
+
+def get_iqr_bounds_with_anchors(features, attribute_name):
+    """
+    Zelfde grenzen als get_iqr_bounds, plus de 'ankers': de gesorteerde waarden waaruit
+    Q1 en Q3 berekend worden. Zolang een gewijzigde waarde niet over een anker springt,
+    blijven de grenzen exact gelijk (zie iqr_bounds_affected).
+    """
     values = [getattr(f, attribute_name, 0.0) or 0.0 for f in features]
     if len(values) < 4:
-        return None, None
-        
+        return None, None, []
+
     sorted_vals = sorted(values)
     n = len(sorted_vals)
 
     lower_half = sorted_vals[:n // 2]
     start_of_upper_half_index = n // 2 + (n % 2)
-    upper_half = sorted_vals[start_of_upper_half_index:] 
-    
-    Q1 = calculate_median(lower_half) 
+    upper_half = sorted_vals[start_of_upper_half_index:]
+
+    Q1 = calculate_median(lower_half)
     Q3 = calculate_median(upper_half)
     IQR = Q3 - Q1
-    
+
+    anchors = [sorted_vals[i] for i in _quartile_indices(n)]
+
     # Gebruik de standaard 1.5 * IQR regel voor uitschieters
-    return (Q1 - 1.5 * IQR), (Q3 + 1.5 * IQR)
+    return (Q1 - 1.5 * IQR), (Q3 + 1.5 * IQR), anchors
+
+def compute_outlier_bounds(features):
+    """Berekent per metriek (low, high, anchors) over alle features van een project."""
+    return {attr: get_iqr_bounds_with_anchors(features, attr) for attr in OUTLIER_METRICS}
+
+def iqr_bounds_affected(bounds, attribute_name, old_value, new_value):
+    """
+    True als het wijzigen van één waarde (old -> new) de IQR-grenzen kan verschuiven.
+    Dat is enkel zo als een van beide waarden gelijk is aan een anker, of als de waarde
+    in een ander interval tussen de ankers terechtkomt.
+    """
+    old_value = old_value or 0.0
+    new_value = new_value or 0.0
+    if old_value == new_value:
+        return False
+
+    low, _, anchors = bounds.get(attribute_name, (None, None, []))
+    if low is None:
+        return False  # Te weinig data: er zijn geen grenzen die kunnen verschuiven
+    if old_value in anchors or new_value in anchors:
+        return True
+    return bisect_left(anchors, old_value) != bisect_left(anchors, new_value)
+
+def tag_outlier(f, bounds):
+    """Zet is_outlier/outlier_type/outlier_id voor één feature op basis van reeds berekende grenzen."""
+    f.is_outlier = False
+    f.outlier_type = ""
+    f.outlier_id = f"outlier-{f.id_feature}"
+
+    reasons = []
+    for attr, label in OUTLIER_METRICS.items():
+        low_bound, high_bound, _ = bounds.get(attr, (None, None, []))
+        if low_bound is None:
+            continue # Te weinig data (minimaal 4 nodig)
+
+        val = getattr(f, attr, 0.0) or 0.0
+        if val < low_bound:
+            reasons.append(f"Low {label}")
+            f.is_outlier = True
+        elif val > high_bound:
+            reasons.append(f"High {label}")
+            f.is_outlier = True
+
+    # Zet de samengevoegde redenen terug (bijv: "High ROI, High TtV")
+    f.outlier_type = ", ".join(reasons)
+    return f
 
 def detect_vectr_outliers_and_tag(features):
     """
@@ -37,40 +115,8 @@ def detect_vectr_outliers_and_tag(features):
     if not features:
         return features
 
-    # Reset en initialiseer velden voor alle features
+    bounds = compute_outlier_bounds(features)
     for f in features:
-        f.is_outlier = False
-        f.outlier_type = ""
-        f.outlier_id = f"outlier-{f.id_feature}"
-
-    # De lijst met metrieken die gecontroleerd moeten worden
-    # Hier zit 'ttv_weeks' nu expliciet bij
-    metrics = {
-        'vectr_score': 'VECTR score',
-        'roi_percent': 'ROI',
-        'ttv_weeks': 'TtV'
-    }
-
-    for attr, label in metrics.items():
-        low_bound, high_bound = get_iqr_bounds(features, attr)
-        
-        if low_bound is None: 
-            continue # Te weinig data (minimaal 4 nodig)
+        tag_outlier(f, bounds)
 
-        for f in features:
-            val = getattr(f, attr, 0.0) or 0.0
-            
-            # Bestaande redenen ophalen om ze te combineren
-            reasons = f.outlier_type.split(', ') if f.outlier_type else []
-
-            if val < low_bound:
-                reasons.append(f"Low {label}")
-                f.is_outlier = True
-            elif val > high_bound:
-                reasons.append(f"High {label}")
-                f.is_outlier = True
-            
-            # Zet de samengevoegde redenen terug (bijv: "High ROI, High TtV")
-            f.outlier_type = ", ".join(reasons)
-
-    return features
\ No newline at end of file
+    return features
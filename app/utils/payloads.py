@@ -0,0 +1,43 @@
+# app/utils/payloads.py
+# JSON-vormen die zowel de sync routes (WSGI) als de async endpoints (app/asgi.py) teruggeven.
+
+
+def feature_list_payload(project_id, rows):
+    """Gescoorde ScoringRow's als JSON, beste VECTR eerst."""
+    rows = sorted(rows, key=lambda r: r.vectr_score if r.vectr_score is not None else 0.0, reverse=True)
+    return {
+        "project_id": project_id,
+        "features": [
+            {
+                "id_feature": r.id_feature,
+                "name_feature": r.name_feature,
+                "vectr_score": r.vectr_score,
+                "roi_percent": r.roi_percent,
+                "ttv_weeks": r.ttv_weeks,
+                "quality_score": r.quality_score,
+                "investment_hours": r.investment_hours,
+                "hourly_rate": r.hourly_rate,
+            }
+            for r in rows
+        ],
+    }
+
+
+def chat_messages_payload(messages, user_id, after=0):
+    """
+    :param messages: rijen met id_message, id_profile, sender_name, content, createdat
+    :return: dict met de berichten en het hoogste id (voor de volgende ?after=)
+    """
+    items = [
+        {
+            "id_message": m.id_message,
+            "id_profile": m.id_profile,
+            "sender": m.sender_name,
+            "content": m.content,
+            "createdat": m.createdat.isoformat() if m.createdat else None,
+            "mine": m.id_profile == user_id,
+        }
+        for m in messages
+    ]
+    latest = max([after] + [m["id_message"] for m in items])
+    return {"messages": items, "latest": latest}
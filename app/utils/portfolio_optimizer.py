@@ -0,0 +1,252 @@
+# app/utils/portfolio_optimizer.py
+# Portfolio-optimalisatie over ALLE projecten en roadmaps van een Company.
+#
+# Waar optimize_roadmap één roadmap met ORM-objecten bekijkt, werkt deze module kolomgewijs
+# (NumPy arrays) zodat tienduizenden kandidaten binnen een request-tijdbudget passen:
+#   1) Eén query laadt de numerieke velden van alle features + de TtV-limieten van hun project.
+#   2) VECTR wordt gevectoriseerd berekend, genormaliseerd met de limieten van ELK project.
+#   3) Multi-knapzak: elke feature kan enkel naar een roadmap van zijn eigen project, met
+#      tijd/budget-limieten per roadmap én company-brede limieten.
+#   4) Greedy op dichtheid, daarna een begrensde swap-zoektocht (deadline + max iteraties).
+import time
+from bisect import insort
+import numpy as np
+from app import db
+from app.models import Project, Roadmap
+from app.utils.feature_data import fetch_columns
+
+
+def load_portfolio_candidates(company_id):
+    """
+    Laadt alle features van de company in één query, enkel de kolommen die het optimalisatie-
+    model nodig heeft. Retourneert een dict van NumPy arrays (kolomgewijs) + lijsten voor id/naam.
+    """
+    candidates = fetch_columns(
+        (
+            "id_feature", "name_feature", "id_project",
+            "roi_percent", "ttv_weeks", "quality_score",
+            "investment_hours", "hourly_rate", "opex", "other_costs",   # uren/tarief NaN = ontbreekt -> genegeerd
+            "ttm_low_limit", "ttm_high_limit", "ttbv_low_limit", "ttbv_high_limit",
+        ),
+        fill={
+            "roi_percent": 0.0,
+            "ttv_weeks": 5.5,                          # zelfde fallback als calculate_vectr_scores
+            "quality_score": 0.0,
+            "opex": 0.0,
+            "other_costs": 0.0,
+            "ttm_low_limit": 0.0,
+            "ttm_high_limit": 0.0,
+            "ttbv_low_limit": 0.0,
+            "ttbv_high_limit": 0.0,
+        },
+        company_id=company_id,
+    )
+    candidates["id_project"] = candidates["id_project"].astype(np.int64)
+    return candidates
+
+
+def load_company_roadmaps(company_id):
+    """Alle roadmaps van de company (met hun project), chronologisch."""
+    return (
+        db.session.query(Roadmap, Project.project_name)
+        .join(Project, Project.id_project == Roadmap.id_project)
+        .filter(Project.id_company == company_id)
+        .order_by(Roadmap.start_roadmap.asc(), Roadmap.id_roadmap.asc())
+        .all()
+    )
+
+
+def vectr_scores_vectorized(candidates):
+    """
+    Gevectoriseerde versie van calculate_vectr_scores: per feature de TtV-schaling met de
+    limieten van het EIGEN project (calc_ttv_scaled), daarna TTV_scaled * ROI/100 * Confidence.
+    """
+    ttv_max = candidates["ttm_high_limit"] + candidates["ttbv_high_limit"]
+    ttv_min = candidates["ttm_low_limit"] + candidates["ttbv_low_limit"]
+    span = ttv_max - ttv_min
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ttv_norm = (candidates["ttv_weeks"] - ttv_min) / span * 10.0
+    ttv_scaled = np.where(span > 0, 10.0 - np.clip(ttv_norm, 0.0, 10.0), 0.0)
+
+    vectr = ttv_scaled * (candidates["roi_percent"] / 100.0) * candidates["quality_score"]
+    return np.round(vectr, 2)
+
+
+def _roadmap_arrays(roadmaps):
+    ids = np.array([r.id_roadmap for r in roadmaps], dtype=np.int64)
+    projects = np.array([r.id_project for r in roadmaps], dtype=np.int64)
+    time_caps = np.array([float(r.time_capacity or 0.0) for r in roadmaps], dtype=float)
+    cost_caps = np.array([float(r.budget_allocation or 0.0) for r in roadmaps], dtype=float)
+    return ids, projects, time_caps, cost_caps
+
+
+def default_company_caps(candidates, roadmaps):
+    """Standaard company-brede limieten: som van de roadmaps van projecten die features hebben."""
+    _, rm_projects, rm_time_caps, rm_cost_caps = _roadmap_arrays(roadmaps)
+    reachable = np.isin(rm_projects, candidates["id_project"])
+    return float(rm_time_caps[reachable].sum()), float(rm_cost_caps[reachable].sum())
+
+
+def optimize_portfolio(candidates, roadmaps, company_time_cap=None, company_budget_cap=None,
+                       alpha=0.5, time_budget=0.5, max_swap_iterations=200000):
+    """
+    Verdeelt features over roadmaps (multi-knapzak, 2 constraints per roadmap + company-breed).
+
+    :param candidates: output van load_portfolio_candidates
+    :param roadmaps: lijst van Roadmap-objecten (of objecten met id_roadmap, id_project,
+                     time_capacity, budget_allocation)
+    :param company_time_cap / company_budget_cap: company-brede limiet; None = som van de roadmaps
+                                                  van projecten met features
+    :param alpha: weging tussen tijd (1.0) en kosten (0.0), zoals in optimize_roadmap
+    :param time_budget: maximale rekentijd (seconden) voor de swap-zoektocht
+    :return: dict met per roadmap de gekozen kandidaat-indices en de totalen
+    """
+    start = time.perf_counter()
+    rm_ids, rm_projects, rm_time_caps, rm_cost_caps = _roadmap_arrays(roadmaps)
+
+    # Roadmaps per project (chronologisch, zoals aangeleverd): een feature kan naar elke roadmap
+    # van zijn eigen project
+    project_roadmaps = {}
+    for idx, id_project in enumerate(rm_projects.tolist()):
+        project_roadmaps.setdefault(id_project, []).append(idx)
+
+    # Company-brede limiet standaard = som van de roadmaps die effectief features kunnen krijgen
+    default_time_cap, default_budget_cap = default_company_caps(candidates, roadmaps)
+    if company_time_cap is None:
+        company_time_cap = default_time_cap
+    if company_budget_cap is None:
+        company_budget_cap = default_budget_cap
+
+    try:
+        alpha = float(alpha)
+    except (TypeError, ValueError):
+        alpha = 0.5
+
+    n = len(candidates["id_feature"])
+    value = vectr_scores_vectorized(candidates)
+    hours = candidates["investment_hours"]
+    rate = candidates["hourly_rate"]
+    cost = hours * rate + candidates["opex"] + candidates["other_costs"]
+
+    # 1+2) Harde filters (zelfde regels als optimize_roadmap), gevectoriseerd per roadmap:
+    #      de feature moet in minstens één roadmap van zijn project passen
+    fits_a_roadmap = np.zeros(n, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for idx in range(len(rm_ids)):
+            fits_a_roadmap |= (
+                (candidates["id_project"] == rm_projects[idx])
+                & (hours <= rm_time_caps[idx])
+                & (cost <= rm_cost_caps[idx])
+            )
+        feasible = (
+            fits_a_roadmap
+            & ~np.isnan(hours) & ~np.isnan(rate)
+            & (value > 0.0)
+            & (hours <= company_time_cap)
+            & (cost <= company_budget_cap)
+        )
+
+    # 3) Dichtheid t.o.v. de company-brede (schaarse) capaciteit
+    max_time = company_time_cap if company_time_cap > 0.0 else 1.0
+    max_cost = company_budget_cap if company_budget_cap > 0.0 else 1.0
+    combined = alpha * (np.nan_to_num(hours) / max_time) + (1.0 - alpha) * (np.nan_to_num(cost) / max_cost)
+    density = np.where(combined > 0.0, value / np.where(combined > 0.0, combined, 1.0), 0.0)
+
+    order = np.flatnonzero(feasible)
+    order = order[np.argsort(-density[order], kind="stable")]
+
+    # 4) Greedy selectie over alle constraints: vroegste roadmap van het project die nog plaats heeft
+    time_left = rm_time_caps.tolist()
+    cost_left = rm_cost_caps.tolist()
+    company_time_left = float(company_time_cap)
+    company_cost_left = float(company_budget_cap)
+    selected = np.zeros(n, dtype=bool)
+    assigned = [-1] * n
+
+    hours_l, cost_l, project_l = hours.tolist(), cost.tolist(), candidates["id_project"].tolist()
+    for i in order.tolist():
+        h, c = hours_l[i], cost_l[i]
+        if h > company_time_left or c > company_cost_left:
+            continue
+        for r in project_roadmaps.get(project_l[i], ()):
+            if h <= time_left[r] and c <= cost_left[r]:
+                selected[i] = True
+                assigned[i] = r
+                time_left[r] -= h
+                cost_left[r] -= c
+                company_time_left -= h
+                company_cost_left -= c
+                break
+
+    # 5) Begrensde verbeterfase: 1-op-1 swaps binnen een roadmap van hetzelfde project
+    #    (niet-gekozen feature met hogere waarde vervangt gekozen feature met lagere waarde)
+    deadline = start + time_budget
+    value_l = value.tolist()
+    per_roadmap = {}
+    for i in np.flatnonzero(selected).tolist():
+        per_roadmap.setdefault(assigned[i], []).append(i)
+    for members in per_roadmap.values():
+        members.sort(key=lambda k: value_l[k])
+
+    swaps = 0
+    iterations = 0
+    rejected = [i for i in order.tolist() if not selected[i]]
+    rejected.sort(key=lambda k: value_l[k], reverse=True)
+    for i in rejected:
+        if iterations >= max_swap_iterations or time.perf_counter() > deadline:
+            break
+        for r in project_roadmaps.get(project_l[i], ()):
+            members = per_roadmap.setdefault(r, [])
+            swapped = False
+            for pos, j in enumerate(members):
+                iterations += 1
+                if value_l[j] >= value_l[i]:
+                    break  # members is oplopend gesorteerd: geen winst meer mogelijk
+                dh, dc = hours_l[i] - hours_l[j], cost_l[i] - cost_l[j]
+                if dh <= time_left[r] and dc <= cost_left[r] and dh <= company_time_left and dc <= company_cost_left:
+                    selected[j], selected[i] = False, True
+                    assigned[j], assigned[i] = -1, r
+                    time_left[r] -= dh
+                    cost_left[r] -= dc
+                    company_time_left -= dh
+                    company_cost_left -= dc
+                    members.pop(pos)
+                    insort(members, i, key=value_l.__getitem__)  # lijst blijft oplopend gesorteerd
+                    swaps += 1
+                    swapped = True
+                    break
+            if swapped:
+                break
+
+    # 6) Resultaat per roadmap
+    assignments = {int(rm_id): [] for rm_id in rm_ids}
+    for i in np.flatnonzero(selected).tolist():
+        assignments[int(rm_ids[assigned[i]])].append(i)
+
+    roadmap_usage = {
+        int(rm_ids[r]): {
+            "time_used": float(rm_time_caps[r] - time_left[r]),
+            "cost_used": float(rm_cost_caps[r] - cost_left[r]),
+            "time_capacity": float(rm_time_caps[r]),
+            "budget_allocation": float(rm_cost_caps[r]),
+        }
+        for r in range(len(rm_ids))
+    }
+
+    return {
+        "assignments": assignments,
+        "selected": selected,
+        "value": value,
+        "hours": hours,
+        "cost": cost,
+        "feasible": feasible,
+        "total_value": float(value[selected].sum()) if n else 0.0,
+        "time_used": float(company_time_cap - company_time_left),
+        "cost_used": float(company_budget_cap - company_cost_left),
+        "company_time_cap": float(company_time_cap),
+        "company_budget_cap": float(company_budget_cap),
+        "roadmap_usage": roadmap_usage,
+        "swaps": swaps,
+        "solve_seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,296 @@
+# app/utils/purge.py
+# Verwijderen van projecten en profielen in twee fasen.
+#
+# 1. In de request: enkel deleted_at zetten en een PurgeJob aanmaken (twee kleine UPDATE/INSERT's).
+#    Vanaf dan is het project/profiel overal verborgen: een do_orm_execute listener voegt
+#    "deleted_at IS NULL" toe aan elke ORM-query op Project en Profile (ook joins en relaties).
+# 2. Op de achtergrond: de rijen eronder verdwijnen in blokken van PURGE_CHUNK_SIZE met set-based
+#    DELETE ... WHERE pk IN (...), elk blok in een eigen korte transactie. Wat ON DELETE CASCADE
+#    heeft (tellingen, pins, afhankelijkheden, milestones, runs) ruimt de database zelf op.
+#    Evidence, stemmen en milestone-links hebben in het productieschema geen cascade naar de
+#    feature en moeten dus expliciet vóór de features weg; bijlagen vóór de evidence (hun quota
+#    telt mee).
+#    Na elk blok worden de voortgang en een heartbeat bewaard.
+# - Elke worker heeft een runner-thread. Een job wordt eerst geclaimd (UPDATE ... WHERE status
+#   = 'queued' of heartbeat te oud), zodat nooit twee workers dezelfde job doen; jobs van een
+#   gestopte worker worden na PURGE_STALE_SECONDS door een andere overgenomen.
+# - Alle stappen zijn idempotent (DELETE WHERE ...): een onderbroken job herbegint gewoon.
+# - `flask purge-run` werkt openstaande jobs af in de voorgrond.
+import datetime
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import delete, event, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app import db
+from app.models import (
+    Decision, Evidence, EvidenceAttachment, Features_ideas, MilestoneFeature, Profile, Project, ProjectChatMessage,
+    PurgeJob, Roadmap, SearchDocument,
+)
+from app.utils.attachments import release_attachments
+from app.utils.decisions import rebuild_decision_tallies
+
+INCLUDE_DELETED = "include_deleted"         # execution option: ook verwijderde projecten/profielen tonen
+ACTIVE_STATUSES = ("queued", "running")
+
+
+# -----------------------------------
+# VERBERGEN (fase 1)
+# -----------------------------------
+
+def hide_deleted(orm_execute_state):
+    """Voegt deleted_at IS NULL toe aan elke ORM-SELECT die Project of Profile raakt."""
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and not orm_execute_state.is_relationship_load
+        and not orm_execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(Project, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Profile, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        )
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def mark_project_deleted(project):
+    """Project meteen verbergen en de opruiming inplannen. De caller commit (en start de runner)."""
+    project.deleted_at = _now()
+    job = PurgeJob(
+        kind="project", target_id=project.id_project, id_company=project.id_company,
+        label=project.project_name, status="queued", deleted_rows=0,
+    )
+    db.session.add(job)
+    return job
+
+
+def mark_profile_deleted(profile):
+    """Profiel meteen verbergen (inloggen kan niet meer) en de opruiming inplannen. De caller commit."""
+    profile.deleted_at = _now()
+    # E-mailadres meteen vrijgeven: een nieuw account mag hetzelfde adres gebruiken
+    profile.email = f"deleted-{profile.id_profile}@deleted.invalid"
+    job = PurgeJob(
+        kind="profile", target_id=profile.id_profile, id_company=profile.id_company,
+        label=profile.name, status="queued", deleted_rows=0,
+    )
+    db.session.add(job)
+    return job
+
+
+# -----------------------------------
+# STAPPEN (fase 2)
+# -----------------------------------
+
+def _rebuild_tallies(rows):
+    rebuild_decision_tallies(sorted({row.id_feature for row in rows}))
+
+
+def purge_steps(job):
+    """
+    [(naam, model, primary key, voorwaarde, extra kolommen, na elk blok)] in uitvoeringsvolgorde.
+    De primary key is een kolom of een tuple kolommen (samengestelde sleutel).
+    """
+    if job.kind == "project":
+        project_id = job.target_id
+        project_features = select(Features_ideas.id_feature).where(Features_ideas.id_project == project_id)
+        project_evidence = select(Evidence.id_evidence).where(Evidence.id_feature.in_(project_features))
+        return [
+            ("search index", SearchDocument, SearchDocument.id_document, SearchDocument.id_project == project_id, (), None),
+            ("chat messages", ProjectChatMessage, ProjectChatMessage.id_message,
+             ProjectChatMessage.id_project == project_id, (), None),
+            # Bijlagen expliciet: de quota van de company moet mee omlaag (bestanden ruimt attachments-gc op)
+            ("attachments", EvidenceAttachment, EvidenceAttachment.id_attachment,
+             EvidenceAttachment.id_evidence.in_(project_evidence),
+             (EvidenceAttachment.id_company, EvidenceAttachment.sha256, EvidenceAttachment.size), release_attachments),
+            # Geen cascade op evidence, decision en milestone_features -> feature (database_dump.sql):
+            # die rijen eerst. De stemtellingen verdwijnen met de feature, herberekenen is niet nodig.
+            ("evidence", Evidence, Evidence.id_evidence, Evidence.id_feature.in_(project_features), (), None),
+            ("votes", Decision, Decision.id_decision, Decision.id_feature.in_(project_features), (), None),
+            ("milestone links", MilestoneFeature, (MilestoneFeature.id_milestone, MilestoneFeature.id_feature),
+             MilestoneFeature.id_feature.in_(project_features), (), None),
+            # Tellingen, pins en afhankelijkheden gaan mee via ON DELETE CASCADE
+            ("features", Features_ideas, Features_ideas.id_feature, Features_ideas.id_project == project_id, (), None),
+            # Milestones, optimalisatie-runs en pins via ON DELETE CASCADE
+            ("roadmaps", Roadmap, Roadmap.id_roadmap, Roadmap.id_project == project_id, (), None),
+        ]
+    profile_id = job.target_id
+    return [
+        # Stemtellingen van de geraakte features per blok opnieuw tellen
+        ("votes", Decision, Decision.id_decision, Decision.id_profile == profile_id,
+         (Decision.id_feature,), _rebuild_tallies),
+        ("chat messages", ProjectChatMessage, ProjectChatMessage.id_message,
+         ProjectChatMessage.id_profile == profile_id, (), None),
+    ]
+
+
+def _target(job):
+    """(tabel, voorwaarde) van de rij zelf, als laatste verwijderd."""
+    if job.kind == "project":
+        return Project.__table__, Project.__table__.c.id_project == job.target_id
+    return Profile.__table__, Profile.__table__.c.id_profile == job.target_id
+
+
+def _count(model, condition):
+    return db.session.execute(select(func.count()).select_from(model).where(condition)).scalar() or 0
+
+
+def _delete_chunk(model, pk, condition, extra, chunk_size):
+    """Eén blok: primary keys ophalen en in één DELETE verwijderen. Geeft de verwijderde rijen terug."""
+    keys = pk if isinstance(pk, tuple) else (pk,)
+    rows = db.session.execute(select(*keys, *extra).where(condition).limit(chunk_size)).all()
+    if rows:
+        if len(keys) == 1:
+            match = pk.in_([row[0] for row in rows])
+        else:
+            match = tuple_(*keys).in_([tuple(row[:len(keys)]) for row in rows])
+        db.session.execute(delete(model.__table__).where(match))
+    return rows
+
+
+def claim_job(job_id, stale_seconds):
+    """True als deze worker de job mag uitvoeren (nieuw, of de vorige worker gaf te lang geen teken)."""
+    now = _now()
+    stale = now - datetime.timedelta(seconds=stale_seconds)
+    result = db.session.execute(
+        update(PurgeJob)
+        .where(
+            PurgeJob.id_job == job_id,
+            or_(
+                PurgeJob.status == "queued",
+                (PurgeJob.status == "running") & (PurgeJob.heartbeat_at < stale),
+            ),
+        )
+        .values(status="running", heartbeat_at=now, started_at=func.coalesce(PurgeJob.started_at, now))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def run_purge_job(job_id, chunk_size=2000, stale_seconds=120, progress=None):
+    """
+    Voert een job uit als hij geclaimd kan worden.
+    :param progress: optionele callback(job) na elk blok (CLI)
+    :return: de PurgeJob, of None als een andere worker hem al uitvoert
+    """
+    if not claim_job(job_id, stale_seconds):
+        return None
+    job = db.session.get(PurgeJob, job_id)
+    steps = purge_steps(job)
+
+    try:
+        if job.total_rows is None:
+            job.total_rows = sum(_count(model, condition) for _, model, _, condition, _, _ in steps) + 1
+            db.session.commit()
+
+        for name, model, pk, condition, extra, after_chunk in steps:
+            job.step = name
+            while True:
+                rows = _delete_chunk(model, pk, condition, extra, chunk_size)
+                if rows and after_chunk is not None:
+                    after_chunk(rows)
+                job.deleted_rows += len(rows)
+                job.heartbeat_at = _now()
+                db.session.commit()
+                if progress is not None:
+                    progress(job)
+                if len(rows) < chunk_size:
+                    break
+
+        # Tot slot de rij zelf (wat nog overblijft gaat mee via ON DELETE CASCADE / SET NULL)
+        table, condition = _target(job)
+        job.step = job.kind
+        db.session.execute(delete(table).where(condition))
+        job.deleted_rows += 1
+        job.status = "done"
+        job.finished_at = job.heartbeat_at = _now()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error purging {job.kind} {job.target_id}: {e}")
+        job = db.session.get(PurgeJob, job_id)
+        job.status = "failed"
+        job.error = str(e)[:1000]
+        db.session.commit()
+    if progress is not None:
+        progress(job)
+    return job
+
+
+def pending_job_ids(stale_seconds):
+    """Jobs die (opnieuw) opgepakt moeten worden: nog niet gestart, of gestart door een gestopte worker."""
+    stale = _now() - datetime.timedelta(seconds=stale_seconds)
+    return db.session.execute(
+        select(PurgeJob.id_job)
+        .where(or_(
+            PurgeJob.status == "queued",
+            (PurgeJob.status == "running") & (PurgeJob.heartbeat_at < stale),
+        ))
+        .order_by(PurgeJob.id_job)
+    ).scalars().all()
+
+
+# -----------------------------------
+# RUNNER (één thread per worker)
+# -----------------------------------
+
+class PurgeRunner:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self, app):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(app,), name="purge-runner", daemon=True)
+            self._thread.start()
+
+    def submit(self, job_id):
+        self._queue.put(job_id)
+
+    def _run(self, app):
+        config = app.config
+        options = {"chunk_size": config["PURGE_CHUNK_SIZE"], "stale_seconds": config["PURGE_STALE_SECONDS"]}
+        next_scan = 0.0                                             # meteen bij de start: jobs van vorige workers
+        while True:
+            try:
+                job_ids = [self._queue.get(timeout=max(next_scan - time.monotonic(), 0.01))]
+            except queue.Empty:
+                job_ids = []
+            with app.app_context():
+                try:
+                    if time.monotonic() >= next_scan:
+                        job_ids += pending_job_ids(config["PURGE_STALE_SECONDS"])
+                        next_scan = time.monotonic() + config["PURGE_SCAN_INTERVAL"]
+                    for job_id in dict.fromkeys(job_ids):
+                        run_purge_job(job_id, **options)
+                except Exception as e:
+                    print(f"Purge runner error: {e}")
+                finally:
+                    db.session.remove()
+
+
+purge_runner = PurgeRunner()
+
+
+def init_purge(app):
+    """Verwijderde projecten/profielen verbergen en de runner van dit proces starten bij de eerste request."""
+    if not event.contains(Session, "do_orm_execute", hide_deleted):
+        event.listen(Session, "do_orm_execute", hide_deleted)
+
+    @app.before_request
+    def start_purge_runner():
+        purge_runner.start(app)
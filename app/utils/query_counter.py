@@ -0,0 +1,44 @@
+# app/utils/query_counter.py
+# Telt de SQL-queries per request en zet ze in de response header X-DB-Queries.
+# Enkel actief met QUERY_COUNT_HEADER=1 (bv. tijdens een load test, zie benchmarks/load_test.py).
+#
+# stream_page rendert in die modus de volledige pagina vóór de headers, zodat ook de gestreamde pagina's
+# een exacte telling krijgen. Een andere generator-response draait zijn queries pas NA de headers: die
+# krijgt X-DB-Queries: streamed en de echte telling komt in de log zodra de stream gesloten is.
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_COUNT_HEADER = "X-DB-Queries"
+STREAMED = "streamed"
+_listening = False
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.db_query_count = g.get("db_query_count", 0) + 1
+
+
+def init_query_counter(app):
+    global _listening
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _count_query)
+        _listening = True
+
+    @app.after_request
+    def add_query_count_header(response):
+        # send_file (direct_passthrough) levert enkel bytes: de queries liepen al
+        if not response.is_streamed or response.direct_passthrough:
+            response.headers[QUERY_COUNT_HEADER] = str(g.get("db_query_count", 0))
+            return response
+
+        # stream_with_context hergebruikt deze context tijdens het streamen: g telt dus verder
+        response.headers[QUERY_COUNT_HEADER] = STREAMED
+        request_g, logger = g._get_current_object(), current_app.logger
+        method, path = request.method, request.full_path.rstrip("?")
+
+        def log_streamed_count():
+            logger.info("%s %s: %d queries (streamed)", method, path, request_g.get("db_query_count", 0))
+
+        response.call_on_close(log_streamed_count)
+        return response
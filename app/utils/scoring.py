@@ -0,0 +1,67 @@
+# app/utils/scoring.py
+# Compact read model voor de scoring pipeline (VECTR, outliers, optimizer, chart, planner).
+#
+# - ScoringRow gebruikt __slots__: geen __dict__, geen ORM-instrumentatie en geen identity map.
+#   calculate_vectr_scores en tag_outlier zetten hun resultaten (vectr_score, is_outlier, ...)
+#   op de rij zelf, zonder dat er iets per ongeluk geflusht kan worden.
+# - Gevuld door een smalle Core select (zie feature_data.py): enkel de ids en numerieke inputs.
+# - Voor pagina's die de volledige feature tonen of wijzigen (view_features, edit) blijven we
+#   de ORM-objecten gebruiken.
+from app.models import Features_ideas
+from app.utils.calculations import calculate_vectr_scores
+from app.utils.feature_data import fetch_rows
+
+# Kolommen die de scoring, de knapzak (uren/kosten), de planner en de chart nodig hebben
+SCORING_COLUMNS = (
+    "id_feature",
+    "name_feature",
+    "investment_hours",
+    "hourly_rate",
+    "opex",
+    "other_costs",
+    "ttm_weeks",
+    "ttbv_weeks",
+    "quality_score",
+    "roi_percent",
+    "ttv_weeks",
+)
+
+
+class ScoringRow:
+    """Eén feature zoals de scoring hem ziet: de input-kolommen plus de berekende velden."""
+
+    __slots__ = SCORING_COLUMNS + ("vectr_score", "is_outlier", "outlier_type", "outlier_id")
+
+    def __init__(self, *values):
+        for name, value in zip(SCORING_COLUMNS, values):
+            setattr(self, name, value)
+        self.vectr_score = None
+        self.is_outlier = False
+        self.outlier_type = ""
+        self.outlier_id = None
+
+    def __repr__(self):
+        return f"<ScoringRow {self.id_feature} vectr={self.vectr_score}>"
+
+
+def scoring_columns():
+    """De geprojecteerde kolommen, om te combineren met andere kolommen in één query."""
+    return [getattr(Features_ideas, name) for name in SCORING_COLUMNS]
+
+
+def load_scoring_rows(project_id):
+    """Alle features van een project als ScoringRow's (nog niet gescoord)."""
+    rows = fetch_rows(SCORING_COLUMNS, project_id=project_id)
+    return [ScoringRow(*row) for row in rows]
+
+
+def score_rows(rows, project):
+    """Zet vectr_score op elke rij met de TtV-limieten van het project."""
+    ttm_limits = (project.ttm_low_limit, project.ttm_high_limit)
+    ttbv_limits = (project.ttbv_low_limit, project.ttbv_high_limit)
+    return calculate_vectr_scores(rows, ttm_limits, ttbv_limits)
+
+
+def load_scored_rows(project):
+    """load_scoring_rows + score_rows in één stap."""
+    return score_rows(load_scoring_rows(project.id_project), project)
@@ -0,0 +1,393 @@
+# app/utils/search.py
+# Full-text zoeken over features, evidence en projectchat, per company.
+#
+# - Elke doorzoekbare rij heeft een SearchDocument (titel + tekst, met company en project erbij).
+#   Zoeken is dus één geïndexeerde query op één tabel, zonder joins en zonder LIKE '%...%'.
+# - De documenten worden bijgewerkt in dezelfde transactie als de bron: een after_flush listener
+#   kijkt welke features/evidence/berichten nieuw, gewijzigd (enkel de tekstvelden) of verwijderd
+#   zijn en vervangt hun documenten met één DELETE en één INSERT (executemany).
+#   Bronrijen die de database zelf verwijdert (ON DELETE CASCADE) nemen hun document mee via de FK's.
+# - PostgreSQL: tsvector (titel gewicht A, tekst gewicht B) + GIN (id_company, tsvector), ts_rank
+#   voor de volgorde. SQLite (lokaal, benchmarks): FTS5 met bm25.
+# - Gerankt wordt over hoogstens max_candidates treffers; zijn er meer, dan meldt de zoekpagina dat
+#   (truncated) i.p.v. een onvolledige ranking als volledig te tonen.
+# - Elk woord is een prefix ("road" vindt "roadmap"), alle woorden moeten voorkomen.
+# - Markeringen (ts_headline, of in Python voor SQLite) worden enkel voor de getoonde pagina berekend.
+# - `flask search-reindex` bouwt de index set-based opnieuw op (na imports of bulk-wijzigingen).
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import cast, delete, event, func, insert, inspect, literal, or_, select, text
+
+from app import db
+from app.models import Evidence, Features_ideas, Project, ProjectChatMessage, SearchDocument, SEARCH_KINDS
+
+MAX_TERMS = 8                   # meer woorden maken de query enkel trager, niet beter
+MAX_QUERY_LENGTH = 200
+SNIPPET_WORDS = 24
+HIGHLIGHT_START, HIGHLIGHT_STOP = "\x02", "\x03"     # komen niet voor in gewone tekst; na escapen -> <mark>
+
+# Velden waarvan een wijziging het document verandert
+FEATURE_FIELDS = ("name_feature", "description", "id_project")
+EVIDENCE_FIELDS = ("title", "description", "source", "id_feature")
+CHAT_FIELDS = ("content", "id_project")
+
+
+# -----------------------------------
+# DOCUMENTEN OPBOUWEN
+# -----------------------------------
+
+def evidence_body(description, source):
+    return f"{description or ''} {source or ''}".strip()
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _company_by_project(connection, project_ids):
+    if not project_ids:
+        return {}
+    rows = connection.execute(
+        select(Project.id_project, Project.id_company).where(Project.id_project.in_(project_ids))
+    )
+    return dict(rows.all())
+
+
+def _documents(connection, features, evidence, messages):
+    """Rijen voor search_document van de gegeven (al geflushte) objecten."""
+    # Evidence: project via de feature (die hoeft niet in de sessie te zitten)
+    evidence_projects = {}
+    feature_ids = {ev.id_feature for ev in evidence}
+    if feature_ids:
+        rows = connection.execute(
+            select(Features_ideas.id_feature, Features_ideas.id_project)
+            .where(Features_ideas.id_feature.in_(feature_ids))
+        )
+        evidence_projects = dict(rows.all())
+
+    project_ids = (
+        {f.id_project for f in features}
+        | set(evidence_projects.values())
+        | {m.id_project for m in messages}
+    )
+    companies = _company_by_project(connection, project_ids)
+
+    documents = []
+    for f in features:
+        documents.append({
+            "kind": "feature", "ref_id": str(f.id_feature),
+            "id_company": companies.get(f.id_project), "id_project": f.id_project,
+            "id_feature": f.id_feature, "id_evidence": None, "id_message": None,
+            "title": f.name_feature, "body": f.description, "createdat": f.createdat,
+        })
+    for ev in evidence:
+        project_id = evidence_projects.get(ev.id_feature)
+        documents.append({
+            "kind": "evidence", "ref_id": str(ev.id_evidence),
+            "id_company": companies.get(project_id), "id_project": project_id,
+            "id_feature": ev.id_feature, "id_evidence": ev.id_evidence, "id_message": None,
+            "title": ev.title, "body": evidence_body(ev.description, ev.source), "createdat": ev.createdat,
+        })
+    for m in messages:
+        documents.append({
+            "kind": "chat", "ref_id": str(m.id_message),
+            "id_company": companies.get(m.id_project), "id_project": m.id_project,
+            "id_feature": None, "id_evidence": None, "id_message": m.id_message,
+            "title": None, "body": m.content, "createdat": m.createdat,
+        })
+    # Bron zonder (bestaand) project: niets om te indexeren
+    return [doc for doc in documents if doc["id_company"] is not None]
+
+
+# -----------------------------------
+# BIJWERKEN BIJ ELKE FLUSH
+# -----------------------------------
+
+def _collect(session):
+    """(te herindexeren objecten per kind, te verwijderen ref_ids per kind) van deze flush."""
+    upsert = {kind: [] for kind in SEARCH_KINDS}
+    removed = {kind: set() for kind in SEARCH_KINDS}
+    models = (
+        ("feature", Features_ideas, FEATURE_FIELDS, "id_feature"),
+        ("evidence", Evidence, EVIDENCE_FIELDS, "id_evidence"),
+        ("chat", ProjectChatMessage, CHAT_FIELDS, "id_message"),
+    )
+    for kind, model, fields, key in models:
+        for obj in session.new:
+            if isinstance(obj, model):
+                upsert[kind].append(obj)
+        for obj in session.dirty:
+            if isinstance(obj, model) and _changed(obj, fields):
+                upsert[kind].append(obj)
+                removed[kind].add(str(getattr(obj, key)))
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                removed[kind].add(str(getattr(obj, key)))
+    return upsert, removed
+
+
+def sync_search_documents(session, flush_context):
+    upsert, removed = _collect(session)
+    if not any(upsert.values()) and not any(removed.values()):
+        return
+
+    connection = session.connection()
+    conditions = [
+        (SearchDocument.kind == kind) & SearchDocument.ref_id.in_(ref_ids)
+        for kind, ref_ids in removed.items() if ref_ids
+    ]
+    if removed["feature"]:
+        # Evidence-documenten van verwijderde features (ook zonder FK-cascade, bv. SQLite)
+        deleted_features = {str(obj.id_feature) for obj in session.deleted if isinstance(obj, Features_ideas)}
+        if deleted_features:
+            conditions.append(SearchDocument.id_feature.in_(deleted_features))
+    if conditions:
+        connection.execute(delete(SearchDocument).where(or_(*conditions)))
+
+    documents = _documents(connection, upsert["feature"], upsert["evidence"], upsert["chat"])
+    if documents:
+        connection.execute(insert(SearchDocument), documents)
+
+
+def replace_documents(features=(), evidence=()):
+    """
+    Voor bulk-writes buiten de flush om (INSERT/UPDATE via Core, zie app/utils/batch.py): documenten
+    van deze rijen vervangen. Rijen hebben dezelfde attributen als de ORM-objecten.
+    """
+    connection = db.session.connection()
+    conditions = []
+    if features:
+        conditions.append((SearchDocument.kind == "feature") & SearchDocument.ref_id.in_([str(f.id_feature) for f in features]))
+    if evidence:
+        conditions.append((SearchDocument.kind == "evidence") & SearchDocument.ref_id.in_([str(ev.id_evidence) for ev in evidence]))
+    if not conditions:
+        return
+    connection.execute(delete(SearchDocument).where(or_(*conditions)))
+    documents = _documents(connection, features, evidence, [])
+    if documents:
+        connection.execute(insert(SearchDocument), documents)
+
+
+def init_search_index(app):
+    """Houdt search_document bij voor alle sessies van db.session."""
+    if not event.contains(db.session, "after_flush", sync_search_documents):
+        event.listen(db.session, "after_flush", sync_search_documents)
+
+
+# -----------------------------------
+# VOLLEDIGE HERINDEXERING
+# -----------------------------------
+
+def rebuild_search_index(company_id=None):
+    """
+    Bouwt search_document opnieuw op met drie INSERT ... SELECT's (geen rijen via Python).
+    :return: aantal documenten
+    """
+    f, ev, m, p = Features_ideas, Evidence, ProjectChatMessage, Project
+    columns = ["kind", "ref_id", "id_company", "id_project", "id_feature", "id_evidence", "id_message",
+               "title", "body", "createdat"]
+
+    def scoped(stmt):
+        return stmt.where(p.id_company == company_id) if company_id is not None else stmt
+
+    sources = [
+        select(
+            literal("feature"), f.id_feature, p.id_company, f.id_project, f.id_feature,
+            literal(None, db.Integer), literal(None, db.Integer),
+            f.name_feature, f.description, f.createdat,
+        ).join(p, p.id_project == f.id_project),
+        select(
+            literal("evidence"), cast(ev.id_evidence, db.String), p.id_company, f.id_project, ev.id_feature,
+            ev.id_evidence, literal(None, db.Integer),
+            ev.title,
+            func.trim(func.coalesce(ev.description, "") + " " + func.coalesce(ev.source, "")),
+            ev.createdat,
+        ).join(f, f.id_feature == ev.id_feature).join(p, p.id_project == f.id_project),
+        select(
+            literal("chat"), cast(m.id_message, db.String), p.id_company, m.id_project,
+            literal(None, db.String), literal(None, db.Integer), m.id_message,
+            literal(None, db.Text), m.content, m.createdat,
+        ).join(p, p.id_project == m.id_project),
+    ]
+
+    cleanup = delete(SearchDocument)
+    if company_id is not None:
+        cleanup = cleanup.where(SearchDocument.id_company == company_id)
+    db.session.execute(cleanup)
+    for source in sources:
+        db.session.execute(insert(SearchDocument).from_select(columns, scoped(source)))
+
+    count = select(func.count()).select_from(SearchDocument)
+    if company_id is not None:
+        count = count.where(SearchDocument.id_company == company_id)
+    total = db.session.execute(count).scalar()
+    db.session.commit()
+    return total
+
+
+# -----------------------------------
+# ZOEKEN
+# -----------------------------------
+
+def search_terms(query):
+    """Woorden uit de zoekvraag (letters en cijfers; leestekens en operators vallen weg)."""
+    return re.findall(r"[^\W_]+", (query or "")[:MAX_QUERY_LENGTH].lower())[:MAX_TERMS]
+
+
+# Projecten die op de achtergrond verwijderd worden (deleted_at gezet, zie app/utils/purge.py):
+# hun documenten bestaan nog even, maar mogen niet meer gevonden worden
+DELETED_PROJECTS_FILTER = (
+    " AND d.id_project NOT IN (SELECT p.id_project FROM public.project p"
+    " WHERE p.id_company = :company_id AND p.deleted_at IS NOT NULL)"
+)
+
+
+def _filters(kind, project_id):
+    sql, params = DELETED_PROJECTS_FILTER, {}
+    if kind in SEARCH_KINDS:
+        sql += " AND d.kind = :kind"
+        params["kind"] = kind
+    if project_id is not None:
+        sql += " AND d.id_project = :project_id"
+        params["project_id"] = project_id
+    return sql, params
+
+
+# PostgreSQL: eerst hoogstens max_candidates treffers via de GIN-index (de recentste: ts_rank voor
+# ALLE treffers van een veelvoorkomend woord is net wat de limiet vermijdt), dan ranken en pagineren,
+# en pas daarna ts_headline voor de rijen van deze pagina. Eén treffer extra (candidate_limit) zegt
+# of er afgekapt werd.
+POSTGRES_SEARCH_SQL = """
+WITH q AS (SELECT to_tsquery('simple', :tsquery) AS query),
+matches AS (
+    SELECT d.id_document, d.kind, d.ref_id, d.id_project, d.id_feature, d.title, d.body, d.createdat,
+           d.search_vector
+    FROM public.search_document d, q
+    WHERE d.id_company = :company_id AND d.search_vector @@ q.query{filters}
+    ORDER BY d.createdat DESC NULLS LAST, d.id_document DESC
+    LIMIT :candidate_limit
+),
+candidates AS (
+    SELECT m.*, ts_rank(m.search_vector, q.query) AS rank
+    FROM (SELECT * FROM matches ORDER BY createdat DESC NULLS LAST, id_document DESC LIMIT :max_candidates) m, q
+),
+page AS (
+    SELECT * FROM candidates ORDER BY rank DESC, id_document DESC LIMIT :limit OFFSET :offset
+)
+SELECT page.id_document, page.kind, page.ref_id, page.id_project, page.id_feature, page.createdat,
+       ts_headline('simple', coalesce(page.title, ''), q.query, :title_options) AS title,
+       ts_headline('simple', coalesce(page.body, ''), q.query, :body_options) AS snippet,
+       (SELECT count(*) FROM matches) > :max_candidates AS truncated
+FROM page, q
+ORDER BY page.rank DESC, page.id_document DESC
+"""
+
+# SQLite FTS5: bm25 (lager = beter) met de titel 10x zwaarder, al gesorteerd vóór de limiet: de
+# kandidaten zijn de best gerankte treffers. Markeren gebeurt in Python (_headline):
+# snippet()/highlight() voeren de MATCH per rij opnieuw uit
+SQLITE_SEARCH_SQL = """
+WITH matches AS (
+    SELECT d.id_document, d.kind, d.ref_id, d.id_project, d.id_feature, d.createdat, d.title, d.body,
+           bm25(search_document_fts, 10.0, 1.0) AS score
+    FROM public.search_document_fts
+    JOIN public.search_document d ON d.id_document = search_document_fts.rowid
+    WHERE search_document_fts MATCH :match AND d.id_company = :company_id{filters}
+    ORDER BY score, d.id_document DESC
+    LIMIT :candidate_limit
+),
+candidates AS (
+    SELECT * FROM matches ORDER BY score, id_document DESC LIMIT :max_candidates
+)
+SELECT id_document, kind, ref_id, id_project, id_feature, createdat, title, body AS snippet,
+       (SELECT count(*) FROM matches) > :max_candidates AS truncated
+FROM candidates
+ORDER BY score, id_document DESC
+LIMIT :limit OFFSET :offset
+"""
+
+
+def _headline(value, terms, max_words=None):
+    """Woorden die met een zoekterm beginnen markeren; lange tekst inkorten rond de eerste treffer."""
+    pattern = re.compile(r"(?<![^\W_])(?:" + "|".join(map(re.escape, terms)) + r")[^\W_]*", re.IGNORECASE)
+    words = (value or "").split()
+    if max_words and len(words) > max_words:
+        first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+        start = max(min(first - max_words // 4, len(words) - max_words), 0)
+        prefix = "… " if start > 0 else ""
+        suffix = " …" if start + max_words < len(words) else ""
+        value = prefix + " ".join(words[start:start + max_words]) + suffix
+    return pattern.sub(lambda match: HIGHLIGHT_START + match.group(0) + HIGHLIGHT_STOP, value or "")
+
+
+def _marked(value):
+    """Escapen en de markeringen van de database omzetten naar <mark>."""
+    html = str(escape(value or ""))
+    return Markup(html.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_STOP, "</mark>"))
+
+
+def search_documents(company_id, query, page=1, per_page=20, kind=None, project_id=None, max_candidates=5000):
+    """
+    Zoekt binnen één company.
+    :return: (resultaten, has_next, truncated); een resultaat is een dict met kind, ref_id, id_project,
+             id_feature, createdat, project_name en gemarkeerde title/snippet (Markup). truncated: er
+             waren meer dan max_candidates treffers en enkel die werden gerankt
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False, False
+
+    page = max(int(page), 1)
+    filters, params = _filters(kind, project_id)
+    params.update({
+        "company_id": company_id,
+        "max_candidates": max_candidates,
+        "candidate_limit": max_candidates + 1,
+        "limit": per_page + 1,                    # één extra rij: is er een volgende pagina?
+        "offset": (page - 1) * per_page,
+    })
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        marks = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}"
+        params.update({
+            "tsquery": " & ".join(f"{term}:*" for term in terms),
+            "title_options": f"{marks}, HighlightAll=true",
+            "body_options": f"{marks}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=2",
+        })
+        sql = POSTGRES_SEARCH_SQL
+    else:
+        params["match"] = " ".join(f'"{term}"*' for term in terms)
+        sql = SQLITE_SEARCH_SQL
+
+    stmt = text(sql.format(filters=filters)).columns(createdat=SearchDocument.createdat.type)
+    rows = db.session.execute(stmt, params).mappings().all()
+    has_next = len(rows) > per_page
+    truncated = bool(rows) and bool(rows[0]["truncated"])
+    rows = rows[:per_page]
+    if dialect != "postgresql":
+        rows = [
+            {**row, "title": _headline(row["title"], terms), "snippet": _headline(row["snippet"], terms, SNIPPET_WORDS)}
+            for row in rows
+        ]
+
+    project_ids = {row["id_project"] for row in rows}
+    names = dict(
+        db.session.query(Project.id_project, Project.project_name).filter(Project.id_project.in_(project_ids)).all()
+    ) if project_ids else {}
+
+    results = [
+        {
+            "kind": row["kind"],
+            "ref_id": row["ref_id"],
+            "id_project": row["id_project"],
+            "id_feature": row["id_feature"],
+            "createdat": row["createdat"],
+            "project_name": names.get(row["id_project"], ""),
+            "title": _marked(row["title"]),
+            "snippet": _marked(row["snippet"]),
+        }
+        for row in rows
+    ]
+    return results, has_next, truncated
@@ -0,0 +1,95 @@
+# app/utils/streaming.py
+# Gestreamde HTML voor grote pagina's (features, roadmap, chat).
+#
+# - stream_page() stuurt de layout (head + navbar) meteen door via het flush-punt in base.html; de
+#   zware queries lopen pas wanneer de template bij de lijst komt (LazyRows of een iterator over de query).
+# - Jinja levert veel kleine stukjes: die worden gebundeld tot STREAM_BUFFER_BYTES per write.
+# - Flash-berichten en het CSRF-token schrijven in de sessie; de sessie-cookie zit in de headers en die
+#   vertrekken vóór de eerste byte, dus worden ze op voorhand opgehaald.
+# - Een fout halverwege de stream kan geen foutpagina meer worden (de status is al verstuurd): controles
+#   (login, rol, company) gebeuren daarom altijd vóór stream_page.
+# - Met QUERY_COUNT_HEADER=1 (load tests) wordt de pagina volledig gerenderd vóór de eerste byte: de
+#   queries lopen dan vóór after_request en X-DB-Queries klopt (zie app/utils/query_counter.py).
+from flask import Response, current_app, get_flashed_messages, stream_with_context
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+
+FLUSH_MARKER = Markup("<!--stream-flush-->")
+
+
+class LazyRows:
+    """Lijst die pas geladen wordt wanneer de template hem nodig heeft (dus na de flush van de layout)."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._rows = None
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = list(self._loader())
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class RowStream:
+    """
+    Iterator over een query die de template op leegte kan testen ({% if not rows %}) zonder alles te
+    laden: enkel de eerste rij wordt vooraf gelezen. Eén keer doorlopen.
+    """
+
+    _END = object()
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._first = None
+
+    def __bool__(self):
+        if self._first is None:
+            self._first = next(self._rows, self._END)
+        return self._first is not self._END
+
+    def __iter__(self):
+        if self:
+            yield self._first
+            yield from self._rows
+
+
+def _chunks(pieces, buffer_bytes):
+    """Bundelt de stukjes van Jinja; op het flush-punt gaat de buffer meteen weg."""
+    buffer, size = [], 0
+    for piece in pieces:
+        flush = FLUSH_MARKER in piece
+        if flush:
+            piece = piece.replace(FLUSH_MARKER, "")
+        buffer.append(piece)
+        size += len(piece)
+        if flush or size >= buffer_bytes:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_page(template_name, **context):
+    """Zoals render_template, maar als stream (Response met een generator)."""
+    app = current_app._get_current_object()
+    get_flashed_messages(with_categories=True)          # uit de sessie halen zolang de cookie nog kan wijzigen
+    generate_csrf()
+
+    template = app.jinja_env.get_template(template_name)
+    app.update_template_context(context)
+    context["stream_flush"] = FLUSH_MARKER
+    pieces = template.generate(context)
+    chunks = _chunks(pieces, app.config["STREAM_BUFFER_BYTES"])
+
+    if app.config.get("QUERY_COUNT_HEADER"):
+        return Response("".join(chunks), mimetype="text/html")
+
+    response = Response(stream_with_context(chunks), mimetype="text/html")
+    response.headers["X-Accel-Buffering"] = "no"         # nginx: niet bufferen, anders is het streamen zinloos
+    return response
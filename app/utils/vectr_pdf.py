@@ -0,0 +1,322 @@
+# app/utils/vectr_pdf.py
+# PDF-export van de VECTR chart: één project (vectr_chart_pdf) of het hele portfolio van een company.
+#
+# - draw_vectr_chart tekent zones, bubbels en labels op een matplotlib-as; beide exports gebruiken hem.
+# - Portfolio-rapport: de database wordt in het request-proces gelezen (één query voor alle features
+#   van de company, scoring en chart-data via score_rows/prepare_vectr_chart_data, optimizer per
+#   roadmap). Enkel pure data (dicts en lijsten) gaat naar de process pool, die per project één
+#   PDF-pagina rendert. Het request-proces plakt de pagina's in volgorde aan elkaar (pypdf) in een
+#   tijdelijk bestand dat naar de client gestreamd wordt.
+# - We gebruiken Figure i.p.v. pyplot: geen globale toestand, veilig in threads en processen.
+import datetime
+import math
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import matplotlib.patches as patches
+from matplotlib.figure import Figure
+from pypdf import PdfReader, PdfWriter
+
+from app.constants import CONF_LOW_THRESHOLD, CONF_MID_HIGH_THRESHOLD, TTV_SLOW_THRESHOLD, TTV_MID_THRESHOLD
+from app.models import Company, Project
+from app.utils.feature_data import fetch_rows
+from app.utils.form_helpers import prepare_vectr_chart_data
+from app.utils.knapsack_optimizer import optimize_roadmap_pinned, roadmap_capacities
+from app.utils.portfolio_optimizer import load_company_roadmaps
+from app.utils.scoring import SCORING_COLUMNS, ScoringRow, score_rows
+
+# Zones van de VECTR chart (zelfde vlakken als vectr_chart.js)
+ZONES = [
+    {"color": (1, 0, 0, 0.25), "x": 0.0, "y": 0.0, "w": 7.0, "h": 5.0},                       # rood zone
+    {"color": (1, 140/255, 0, 0.25), "x": 1.0, "y": 5.0, "w": 6.0, "h": 5.0},                  # oranje zone
+    {"color": (1, 0, 0, 0.25), "x": 0.0, "y": 5.0, "w": 1.0, "h": 5.0},                       # rood smalle zone
+    {"color": (0, 150/255, 0, 0.25), "x": 7.0, "y": 7.0, "w": 3.0, "h": 3.0},                  # groen zone
+    {"color": (144/255, 238/255, 144/255, 0.25), "x": 7.0, "y": 5.0, "w": 3.0, "h": 2.0},      # lichtgroen zone
+    {"color": (1, 165/255, 0, 0.25), "x": 7.0, "y": 0.0, "w": 3.0, "h": 5.0},                  # oranje zone
+]
+A4_PORTRAIT = (8.27, 11.69)
+REPORT_MAX_LABELS = 25          # in het rapport enkel de features met de hoogste ROI benoemen
+REPORT_TOP_FEATURES = 10
+REPORT_MAX_ROADMAPS = 8
+SPOOL_BYTES = 8 * 1024 * 1024   # groter rapport -> tijdelijk bestand op schijf i.p.v. in geheugen
+
+
+# -----------------------------------
+# CHART
+# -----------------------------------
+
+def get_zone_color_mpl(confidence, ttv_scaled):
+    """Kleur van een feature op basis van confidence + TTV (zelfde logica als getZoneColor in JS)."""
+    x_low = CONF_LOW_THRESHOLD        # drempel voor lage confidence
+    x_high = CONF_MID_HIGH_THRESHOLD  # drempel voor hoge confidence
+    y_slow = TTV_SLOW_THRESHOLD       # drempel voor trage TTV
+    y_fast = TTV_MID_THRESHOLD        # drempel voor snelle TTV
+
+    if confidence >= x_high:
+        if ttv_scaled >= y_fast:
+            return (0, 150/255, 0, 1)  # groen
+        elif y_slow <= ttv_scaled < y_fast:
+            return (144/255, 238/255, 144/255, 1)  # lichtgroen
+        else:
+            return (1, 165/255, 0, 1)  # oranje
+    else:
+        if ttv_scaled < y_slow or confidence < x_low:
+            return (1, 0, 0, 1)  # rood
+        else:
+            return (1, 140/255, 0, 1)  # oranje
+
+
+def draw_vectr_chart(ax, chart_data, title, max_labels=None, label_size=7, size_scale=1.0):
+    """
+    Tekent de VECTR chart (zones, bubbels, assen, labels) op `ax`.
+    :param chart_data: uitvoer van prepare_vectr_chart_data
+    :param max_labels: enkel de features met de hoogste ROI benoemen (None = alle met ROI > 0)
+    :param size_scale: factor op de bubble-oppervlakte (kleinere chart = kleinere bubbels)
+    """
+    ax.set_xlim(0.0, 10.0)
+    ax.set_ylim(0.0, 10.0)
+
+    for z in ZONES:
+        ax.add_patch(patches.Rectangle(
+            (z["x"], z["y"]), z["w"], z["h"],
+            facecolor=z["color"], edgecolor=(0, 0, 0, 0.4), linewidth=0.5,
+        ))
+
+    xs, ys, sizes, colors, labelled = [], [], [], [], []
+    for item in chart_data:
+        roi_val = item["roi"]
+        # Bubble-oppervlakte (straal = 32 * sqrt(ROI/100)); ROI <= 0 -> geen bubbel en geen label
+        size = 32 * math.sqrt(roi_val / 100) * 32 * math.sqrt(roi_val / 100) * math.pi if roi_val and roi_val > 0 else 0
+        size *= size_scale
+        xs.append(item["confidence"])
+        ys.append(item["ttv"])
+        sizes.append(size)
+        colors.append(get_zone_color_mpl(item["confidence"], item["ttv"]))
+        if size > 0:
+            labelled.append(item)
+
+    ax.scatter(xs, ys, s=sizes, c=colors, edgecolors="black", linewidths=1.0, alpha=0.8)
+
+    ax.set_xticks([0, 1, 3, 5, 7, 8, 10])
+    ax.set_xticklabels(["0", "Low", "3", "5", "7", "High", "10"])
+    ax.set_yticks([0, 1, 2, 3, 5, 7, 8, 10])
+    ax.set_yticklabels(["0", "1", "Slow", "3", "5", "7", "Fast", "10"])
+    ax.set_xlabel("Confidence")
+    ax.set_ylabel("Time-to-Value (TtV)")
+    ax.set_title(title)
+
+    if max_labels is not None:
+        labelled = sorted(labelled, key=lambda item: item["roi"], reverse=True)[:max_labels]
+    for item in labelled:
+        ax.annotate(
+            item["name"], (item["confidence"], item["ttv"]),
+            textcoords="offset points", xytext=(5, -5), ha="left", fontsize=label_size,
+        )
+
+
+def render_chart_pdf(chart_data, title):
+    """Eén VECTR chart als PDF (bytes), zoals de export per project."""
+    fig = Figure(figsize=(10, 10))
+    draw_vectr_chart(fig.subplots(), chart_data, title)
+    fig.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format="pdf")
+    return buf.getvalue()
+
+
+# -----------------------------------
+# PORTFOLIO RAPPORT: DATA (request-proces)
+# -----------------------------------
+
+def _roadmap_summary(roadmap, rows, alpha):
+    """Knapzak voor één roadmap op de al gescoorde rijen (geen pins, niets wordt bewaard)."""
+    time_cap, budget_cap = roadmap_capacities(roadmap)
+    result = optimize_roadmap_pinned(roadmap, rows, alpha=alpha)
+    return {
+        "period": f"{roadmap.start_roadmap:%d/%m/%Y} - {roadmap.end_roadmap:%d/%m/%Y}",
+        "selected": len(result["selected"]),
+        "value": result["value"],
+        "time_used": result["time_used"],
+        "time_cap": time_cap,
+        "cost_used": result["cost_used"],
+        "cost_cap": budget_cap,
+        "selected_ids": {f.id_feature for f in result["selected"]},
+    }
+
+
+def load_portfolio_report(company_id, alpha=0.5):
+    """
+    Alles wat het rapport nodig heeft, als pure data: een cover en één pagina per project.
+    Eén query voor alle features van de company; scoring en chart-data één keer per project.
+    """
+    company = Company.query.get(company_id)
+    projects = Project.query.filter_by(id_company=company_id).order_by(Project.project_name.asc()).all()
+
+    rows_by_project = defaultdict(list)
+    for row in fetch_rows(SCORING_COLUMNS + ("id_project",), company_id=company_id):
+        rows_by_project[row.id_project].append(ScoringRow(*row[:-1]))
+
+    roadmaps_by_project = defaultdict(list)
+    for roadmap, _name in load_company_roadmaps(company_id):
+        roadmaps_by_project[roadmap.id_project].append(roadmap)
+
+    pages = []
+    for project in projects:
+        rows = score_rows(rows_by_project[project.id_project], project)
+        summaries = [_roadmap_summary(r, rows, alpha) for r in roadmaps_by_project[project.id_project]]
+        selected_in = defaultdict(int)
+        for summary in summaries:
+            for fid in summary.pop("selected_ids"):
+                selected_in[fid] += 1
+
+        top = sorted((r for r in rows if r.vectr_score is not None), key=lambda r: r.vectr_score, reverse=True)
+        pages.append({
+            "title": f"VECTR Prioritization Chart for {project.project_name}",
+            "project_name": project.project_name,
+            "feature_count": len(rows),
+            "chart_data": prepare_vectr_chart_data(project, rows),
+            "roadmaps": summaries,
+            "top_features": [
+                {
+                    "name": r.name_feature,
+                    "vectr": float(r.vectr_score),
+                    "roi": r.roi_percent,
+                    "ttv_weeks": r.ttv_weeks,
+                    "roadmaps": selected_in[r.id_feature],
+                }
+                for r in top[:REPORT_TOP_FEATURES]
+            ],
+        })
+
+    cover = {
+        "company_name": company.company_name if company else "",
+        "date": datetime.date.today().strftime("%d/%m/%Y"),
+        "alpha": alpha,
+        "projects": [
+            {
+                "name": page["project_name"],
+                "features": page["feature_count"],
+                "roadmaps": len(page["roadmaps"]),
+                "selected": sum(s["selected"] for s in page["roadmaps"]),
+                "value": sum(s["value"] for s in page["roadmaps"]),
+            }
+            for page in pages
+        ],
+    }
+    return cover, pages
+
+
+# -----------------------------------
+# PORTFOLIO RAPPORT: PAGINA'S (process pool)
+# -----------------------------------
+
+def _table(ax, title, header, rows, empty_text, col_widths=None):
+    ax.axis("off")
+    ax.set_title(title, loc="left", fontsize=11)
+    if not rows:
+        ax.text(0.0, 0.8, empty_text, fontsize=9, color="grey", transform=ax.transAxes)
+        return
+    table = ax.table(cellText=rows, colLabels=header, colWidths=col_widths, loc="upper left", cellLoc="left")
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    table.scale(1, 1.3)
+
+
+def _fmt(value, pattern="{:,.0f}"):
+    return "-" if value is None else pattern.format(value)
+
+
+def _pdf_bytes(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format="pdf")
+    return buf.getvalue()
+
+
+def render_cover_page(cover):
+    fig = Figure(figsize=A4_PORTRAIT)
+    fig.text(0.08, 0.93, f"Portfolio report: {cover['company_name']}", fontsize=18, weight="bold")
+    fig.text(0.08, 0.90, f"Generated on {cover['date']}  |  Strategic weight (alpha) {cover['alpha']:.1f}", fontsize=10)
+    ax = fig.add_axes([0.08, 0.05, 0.84, 0.80])
+    _table(
+        ax, "Projects",
+        ["Project", "Features", "Roadmaps", "Selected", "VECTR value"],
+        [
+            [p["name"], p["features"], p["roadmaps"], p["selected"], _fmt(p["value"], "{:,.2f}")]
+            for p in cover["projects"]
+        ],
+        "This company has no projects yet.",
+    )
+    return _pdf_bytes(fig)
+
+
+def render_project_page(page):
+    """Eén A4-pagina: VECTR chart bovenaan, optimizer-samenvatting per roadmap en top-features eronder."""
+    fig = Figure(figsize=A4_PORTRAIT)
+    chart_ax = fig.add_axes([0.12, 0.47, 0.76, 0.48])
+    # Bubbels schalen mee met de chart (6.3 i.p.v. 10 inch breed zoals de export per project)
+    size_scale = (0.76 * A4_PORTRAIT[0] / 10) ** 2
+    draw_vectr_chart(
+        chart_ax, page["chart_data"], page["title"],
+        max_labels=REPORT_MAX_LABELS, label_size=6, size_scale=size_scale,
+    )
+
+    roadmaps = page["roadmaps"]
+    roadmap_rows = [
+        [
+            r["period"], r["selected"], _fmt(r["value"], "{:,.2f}"),
+            f"{_fmt(r['time_used'])} / {_fmt(r['time_cap'])}",
+            f"€ {_fmt(r['cost_used'])} / € {_fmt(r['cost_cap'])}",
+        ]
+        for r in roadmaps[:REPORT_MAX_ROADMAPS]
+    ]
+    if len(roadmaps) > REPORT_MAX_ROADMAPS:
+        roadmap_rows.append([f"... {len(roadmaps) - REPORT_MAX_ROADMAPS} more", "", "", "", ""])
+    _table(
+        fig.add_axes([0.08, 0.25, 0.84, 0.17]),
+        "Roadmap optimization (greedy knapsack)",
+        ["Roadmap", "Selected", "VECTR value", "Hours used / capacity", "Budget used / budget"],
+        roadmap_rows,
+        "No roadmaps for this project.",
+        col_widths=[0.28, 0.12, 0.16, 0.2, 0.24],
+    )
+    _table(
+        fig.add_axes([0.08, 0.02, 0.84, 0.20]),
+        f"Top {REPORT_TOP_FEATURES} features by VECTR ({page['feature_count']} features)",
+        ["Feature", "VECTR", "ROI (%)", "TtV (weeks)", "Selected in roadmaps"],
+        [
+            [f["name"][:40], _fmt(f["vectr"], "{:,.2f}"), _fmt(f["roi"], "{:,.1f}"), _fmt(f["ttv_weeks"]), f["roadmaps"]]
+            for f in page["top_features"]
+        ],
+        "No scored features.",
+        col_widths=[0.36, 0.14, 0.16, 0.14, 0.2],
+    )
+    return _pdf_bytes(fig)
+
+
+def build_portfolio_pdf(cover, pages, workers=1):
+    """
+    Rendert cover + projectpagina's (parallel als workers > 1) en voegt ze in volgorde samen.
+    :return: bestandsobject (teruggespoeld) met de volledige PDF
+    """
+    writer = PdfWriter()
+
+    def append(pdf_bytes):
+        for pdf_page in PdfReader(BytesIO(pdf_bytes)).pages:
+            writer.add_page(pdf_page)
+
+    append(render_cover_page(cover))
+    if workers and workers > 1 and len(pages) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pages))) as pool:
+            # map geeft de resultaten in volgorde terug: pagina's worden toegevoegd zodra ze klaar zijn
+            for pdf_bytes in pool.map(render_project_page, pages):
+                append(pdf_bytes)
+    else:
+        for page in pages:
+            append(render_project_page(page))
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    writer.write(output)
+    output.seek(0)
+    return output
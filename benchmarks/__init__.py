@@ -0,0 +1,2 @@
+# benchmarks/
+# Benchmark suite (geen tests): zie run_benchmarks.py, load_test.py en vote_concurrency.py.
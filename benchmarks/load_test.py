@@ -0,0 +1,370 @@
+# benchmarks/load_test.py
+# Load test tegen een lokaal draaiende server (flask run / gunicorn) met een realistische mix van routes.
+#
+#   QUERY_COUNT_HEADER=1 gunicorn -w 4 run:app                   # server, met queries per request in de header
+#   python -m benchmarks.load_test --seed-features 5000          # eenmalig: synthetisch project in DATABASE_URL
+#   python -m benchmarks.load_test --users 20 --duration 60      # load test
+#
+# - Elke virtuele gebruiker logt in via het echte loginformulier (met CSRF-token), heeft zijn eigen
+#   cookies en doet: chat polling om de 3 s, de featurelijst bekijken, live-calc "toetsaanslagen",
+#   stemmen, de roadmap optimaliseren en de PDF downloaden.
+# - De ids (project, roadmap, features) worden opgezocht in dezelfde database als de server
+#   (DATABASE_URL); werkt met de synthetische data of met een geladen database_dump.sql (--email/--password).
+# - Rapport: doorvoer, p50/p95/p99 per endpoint, foutcodes en queries per request (X-DB-Queries).
+#   Met QUERY_COUNT_HEADER=1 rendert de server ook de gestreamde pagina's (featurelijst, chat) eerst
+#   volledig, zodat hun telling exact is. Een response die toch streamt (X-DB-Queries: streamed) wordt
+#   als "stream" gemeld en niet meegeteld; de echte telling staat dan in de serverlog.
+#   Met --output bewaard als JSON om configuraties (workers, pool size, caching) te vergelijken.
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from benchmarks.synthetic import BENCH_PASSWORD, PROFILE_ROLES
+
+CHAT_POLL_SECONDS = 3.0
+CSRF_RE = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+QUERY_COUNT_HEADER = "X-DB-Queries"
+QUERY_COUNT_STREAMED = "streamed"
+
+# actie -> gewicht (chat polling loopt apart op een vaste klok)
+ACTION_WEIGHTS = {
+    "feature_list": 30,
+    "live_calc": 30,
+    "vote": 20,
+    "optimize": 12,
+    "pdf": 8,
+}
+VOTE_VALUES = ("Yes", "No", "Maybe")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a realistic route mix against a running VECTR server.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000", help="Server to load.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Test duration in seconds.")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between actions (seconds).")
+    parser.add_argument("--email", action="append", default=None,
+                        help="Login email (repeatable; users rotate over them). Default: the synthetic profiles.")
+    parser.add_argument("--password", default=BENCH_PASSWORD, help="Password of the login emails.")
+    parser.add_argument("--project-id", type=int, default=None, help="Project to load (default: largest of the company).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the action mix (and --seed-features).")
+    parser.add_argument("--seed-features", type=int, default=None,
+                        help="Only seed a synthetic project with this many features into DATABASE_URL and exit.")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+# -----------------------------------
+# DATABASE: SEEDEN EN IDS OPZOEKEN
+# -----------------------------------
+
+def seed_database(n_features, seed):
+    from app import create_app, db
+    from app.models import Profile
+    from benchmarks.synthetic import generate_project
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if Profile.query.filter_by(email="bench1@example.com").first() is not None:
+            print("Synthetic data already present (bench1@example.com); nothing seeded.")
+            return 1
+        ids = generate_project(n_features, seed=seed)
+    print(f"Seeded project {ids['project_id']}: {ids['counts']}")
+    print(f"Log in as bench1..bench{len(PROFILE_ROLES)}@example.com / {BENCH_PASSWORD}")
+    return 0
+
+
+def discover_targets(email, project_id=None, max_features=500):
+    """Project, roadmap en een steekproef feature-ids voor de account `email`."""
+    from sqlalchemy import func
+    from app import create_app, db
+    from app.models import Profile, Project, Roadmap, Features_ideas
+
+    app = create_app()
+    with app.app_context():
+        profile = Profile.query.filter_by(email=email.lower()).first()
+        if profile is None:
+            raise SystemExit(f"No profile with email {email} in DATABASE_URL.")
+
+        if project_id is None:
+            largest = (
+                db.session.query(Project.id_project, func.count(Features_ideas.id_feature).label("n"))
+                .outerjoin(Features_ideas, Features_ideas.id_project == Project.id_project)
+                .filter(Project.id_company == profile.id_company)
+                .group_by(Project.id_project)
+                .order_by(func.count(Features_ideas.id_feature).desc())
+                .first()
+            )
+            if largest is None:
+                raise SystemExit(f"The company of {email} has no projects.")
+            project_id = largest.id_project
+
+        roadmap = Roadmap.query.filter_by(id_project=project_id).order_by(Roadmap.id_roadmap).first()
+        feature_ids = [
+            row.id_feature for row in
+            db.session.query(Features_ideas.id_feature)
+            .filter(Features_ideas.id_project == project_id)
+            .order_by(Features_ideas.id_feature)
+            .limit(max_features)
+        ]
+
+    return {
+        "project_id": project_id,
+        "roadmap_id": roadmap.id_roadmap if roadmap else None,
+        "feature_ids": feature_ids,
+    }
+
+
+# -----------------------------------
+# METINGEN
+# -----------------------------------
+
+class Recorder:
+    """Thread-safe verzameling van (endpoint, latency, status, queries)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.queries = defaultdict(list)
+        self.streamed = defaultdict(int)
+
+    def add(self, endpoint, seconds, status, queries):
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+            if queries == QUERY_COUNT_STREAMED:
+                self.streamed[endpoint] += 1
+            elif queries is not None:
+                self.queries[endpoint].append(int(queries))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentiel van een gesorteerde lijst."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def build_report(recorder, elapsed, args):
+    endpoints = {}
+    total = errors = 0
+    for endpoint, latencies in sorted(recorder.samples.items()):
+        ordered = sorted(latencies)
+        statuses = dict(recorder.statuses[endpoint])
+        failed = sum(count for status, count in statuses.items() if not (200 <= status < 400))
+        queries = recorder.queries.get(endpoint) or []
+        endpoints[endpoint] = {
+            "requests": len(ordered),
+            "throughput": len(ordered) / elapsed if elapsed else 0.0,
+            "p50": percentile(ordered, 50),
+            "p95": percentile(ordered, 95),
+            "p99": percentile(ordered, 99),
+            "max": ordered[-1],
+            "errors": failed,
+            "statuses": {str(k): v for k, v in statuses.items()},
+            "queries_mean": sum(queries) / len(queries) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "queries_streamed": recorder.streamed.get(endpoint, 0),
+        }
+        total += len(ordered)
+        errors += failed
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "base_url": args.base_url,
+        "users": args.users,
+        "duration": elapsed,
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['duration']:.1f}s "
+          f"({report['throughput']:.1f} req/s, {report['errors']} errors) with {report['users']} users\n")
+    print(f"{'endpoint':<18}{'req':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err':>6}{'queries':>9}")
+    for endpoint, row in report["endpoints"].items():
+        if row["queries_mean"] is not None:
+            queries = f"{row['queries_mean']:.1f}"
+        else:
+            queries = "stream" if row["queries_streamed"] else "-"
+        print(f"{endpoint:<18}{row['requests']:>7}{row['throughput']:>8.2f}"
+              f"{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}{row['p99'] * 1000:>9.1f}"
+              f"{row['errors']:>6}{queries:>9}")
+    rows = report["endpoints"].values()
+    if not any(row["queries_mean"] is not None or row["queries_streamed"] for row in rows):
+        print("\nNo query counts: start the server with QUERY_COUNT_HEADER=1.")
+    elif any(row["queries_streamed"] for row in rows):
+        print("\nstream = streamed page, not counted (its queries run after the headers; see the server log).")
+
+
+# -----------------------------------
+# VIRTUELE GEBRUIKER
+# -----------------------------------
+
+class VirtualUser:
+    def __init__(self, base_url, email, password, targets, recorder, rng, think):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.targets = targets
+        self.recorder = recorder
+        self.rng = rng
+        self.think = think
+        self.csrf_token = None
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, endpoint, path, data=None, headers=None, record=True):
+        body = urllib.parse.urlencode(data).encode("utf-8") if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                payload = response.read()
+                status, reply_headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            payload, status, reply_headers = e.read(), e.code, e.headers
+        except (urllib.error.URLError, OSError):
+            payload, status, reply_headers = b"", 599, {}
+        seconds = time.perf_counter() - start
+
+        if record:
+            queries = reply_headers.get(QUERY_COUNT_HEADER) if reply_headers else None
+            self.recorder.add(endpoint, seconds, status, queries or None)
+        return status, payload.decode("utf-8", "replace")
+
+    def refresh_csrf(self, html):
+        match = CSRF_RE.search(html)
+        if match:
+            self.csrf_token = match.group(1)
+
+    def login(self):
+        _status, html = self.request("login_form", "/login")
+        self.refresh_csrf(html)
+        status, html = self.request("login", "/login", data={
+            "email": self.email, "password": self.password, "csrf_token": self.csrf_token or "",
+        })
+        if status != 200 or "/logout" not in html:
+            raise RuntimeError(f"Login failed for {self.email} (status {status}).")
+        self.refresh_csrf(html)
+
+    # Acties
+
+    def chat_poll(self):
+        self.request("chat_poll", f"/chat/project/{self.targets['project_id']}/messages")
+
+    def feature_list(self):
+        _status, html = self.request("feature_list", f"/projects/{self.targets['project_id']}/features")
+        self.refresh_csrf(html)
+
+    def live_calc(self):
+        # Formulier openen, daarna een paar "toetsaanslagen" (elke aanslag = ROI + TTV request)
+        _status, html = self.request("add_feature_form", f"/projects/{self.targets['project_id']}/add-feature")
+        self.refresh_csrf(html)
+        form = {
+            "csrf_token": self.csrf_token or "",
+            "extra_revenue": "", "churn_reduction": "0", "cost_savings": "0",
+            "investment_hours": str(self.rng.randint(8, 400)), "hourly_rate": "75",
+            "opex": "0", "other_costs": "0",
+            "ttm_weeks": str(self.rng.randint(1, 12)), "ttbv_weeks": str(self.rng.randint(1, 12)),
+        }
+        for digit in str(self.rng.randint(1000, 99999)):
+            form["extra_revenue"] += digit
+            self.request("live_calc_roi", "/features/calc/roi", data=form)
+            self.request("live_calc_ttv", "/features/calc/ttv", data=form)
+            time.sleep(self.rng.uniform(0.08, 0.25))
+
+    def vote(self):
+        if not self.targets["feature_ids"]:
+            return
+        id_feature = self.rng.choice(self.targets["feature_ids"])
+        value = self.rng.choice(VOTE_VALUES)
+        self.request(
+            "vote",
+            f"/feature/{id_feature}/decision/{value}/row",
+            data={"csrf_token": self.csrf_token or ""},
+            headers={"X-CSRFToken": self.csrf_token or ""},
+        )
+
+    def optimize(self):
+        if self.targets["roadmap_id"] is None:
+            return
+        alpha = self.rng.choice(("0.0", "0.5", "1.0"))
+        self.request("optimize", f"/roadmap/optimize/{self.targets['roadmap_id']}?alpha={alpha}")
+
+    def pdf(self):
+        self.request("pdf", f"/projects/{self.targets['project_id']}/vectr-chart/pdf")
+
+    def run(self, deadline):
+        actions = list(ACTION_WEIGHTS)
+        weights = [ACTION_WEIGHTS[a] for a in actions]
+        next_poll = time.monotonic()
+        while time.monotonic() < deadline:
+            if time.monotonic() >= next_poll:
+                self.chat_poll()
+                next_poll += CHAT_POLL_SECONDS
+                continue
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            pause = min(self.rng.expovariate(1.0 / self.think) if self.think > 0 else 0.0,
+                        max(next_poll - time.monotonic(), 0.0), max(deadline - time.monotonic(), 0.0))
+            time.sleep(pause)
+
+
+# -----------------------------------
+# MAIN
+# -----------------------------------
+
+def run(args):
+    if args.seed_features:
+        return seed_database(args.seed_features, args.seed)
+
+    emails = args.email or [f"bench{i + 1}@example.com" for i in range(len(PROFILE_ROLES))]
+    targets = discover_targets(emails[0], project_id=args.project_id)
+    print(f"Target project {targets['project_id']}, roadmap {targets['roadmap_id']}, "
+          f"{len(targets['feature_ids'])} feature ids, {args.users} users for {args.duration:.0f}s")
+
+    recorder = Recorder()
+    users = [
+        VirtualUser(args.base_url, emails[i % len(emails)], args.password, targets, recorder,
+                    random.Random(args.seed + i), args.think)
+        for i in range(args.users)
+    ]
+    for user in users:
+        user.login()
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    report = build_report(recorder, elapsed, args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,319 @@
+# benchmarks/run_benchmarks.py
+# Benchmark suite voor de zware paden van de app, op synthetische projecten van 10^2 tot 10^5 features.
+#
+#   python -m benchmarks.run_benchmarks                          # alle groottes, vergelijk met baseline
+#   python -m benchmarks.run_benchmarks --sizes 100 1000         # enkel kleine projecten
+#   python -m benchmarks.run_benchmarks --update-baseline        # huidige resultaten als nieuwe baseline
+#
+# - Elke grootte krijgt een verse SQLite database (tijdelijke map) met het 'public' schema als
+#   ATTACH; met --database-url kan een lege PostgreSQL testdatabase gebruikt worden.
+# - Per case wordt de mediaan van --repeat metingen bewaard.
+# - Een case is een regressie als hij meer dan --threshold trager is dan de baseline
+#   (en minstens --min-delta seconden); dan is de exit code 1.
+# - Sommige cases zijn begrensd (max_features): bv. de selection sort in optimize_roadmap is
+#   O(n^2) en zou bij 10^5 features uren duren. --no-limits heft die grenzen op.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the VECTR scoring, optimizer, chart/PDF and key routes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Feature counts per project.")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per case (the median is kept).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data generator.")
+    parser.add_argument("--cases", nargs="+", default=None, help="Only run these cases.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs. baseline (0.25 = 25%%).")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns smaller than this (seconds).")
+    parser.add_argument("--output", default=None, help="Also write the results of this run to this JSON file.")
+    parser.add_argument("--database-url", default=None, help="Empty test database to use instead of temporary SQLite.")
+    parser.add_argument("--no-limits", action="store_true", help="Run every case at every size.")
+    return parser.parse_args(argv)
+
+
+# -----------------------------------
+# OMGEVING (vóór de app-import: config.py leest de env bij import)
+# -----------------------------------
+
+def configure_environment(args):
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("FLASK_ENV", "development")
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        return None
+
+    workdir = tempfile.mkdtemp(prefix="vectr-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "main.db")
+    public_db = os.path.join(workdir, "public.db")
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    # Alle modellen gebruiken schema 'public': in SQLite is dat een tweede, gekoppelde database
+    @event.listens_for(Engine, "connect")
+    def _attach_public_schema(dbapi_connection, _record):
+        if "sqlite" in type(dbapi_connection).__module__:
+            dbapi_connection.execute(f"ATTACH DATABASE '{public_db}' AS public")
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    return workdir
+
+
+# -----------------------------------
+# CASES
+# -----------------------------------
+
+class BenchContext:
+    """Wat de cases delen voor één projectgrootte: app, ingelogde client, ids en geladen features."""
+
+    def __init__(self, app, client, ids):
+        self.app = app
+        self.client = client
+        self.ids = ids
+        self.project = None
+        self.roadmap = None
+        self.features = None
+        self.scored = False
+
+    @property
+    def project_id(self):
+        return self.ids["project_id"]
+
+    @property
+    def roadmap_id(self):
+        return self.ids["roadmap_ids"][0]
+
+    def load(self):
+        from app import db
+        from app.models import Project, Roadmap, Features_ideas
+        db.session.expire_all()
+        self.project = db.session.get(Project, self.project_id)
+        self.roadmap = db.session.get(Roadmap, self.roadmap_id)
+        self.features = Features_ideas.query.filter_by(id_project=self.project_id).all()
+        self.scored = False
+        return self.features
+
+    def ensure_scored(self):
+        if not self.scored:
+            bench_calculate_vectr_scores(self)
+            self.scored = True
+
+
+def bench_load_features(ctx):
+    ctx.load()
+
+
+def bench_load_scoring_rows(ctx):
+    from app.utils.scoring import load_scoring_rows
+    load_scoring_rows(ctx.project_id)
+
+
+def bench_sql_roi_ttv_parity(ctx):
+    """compute_in_sql tegen de bewaarde roi_percent/ttv_weeks (berekend met calc_roi/calc_ttv)."""
+    from app.utils.feature_data import fetch_rows
+    columns = ("id_feature", "roi_percent", "ttv_weeks")
+    stored = {row.id_feature: row for row in fetch_rows(columns, project_id=ctx.project_id)}
+    for row in fetch_rows(columns, project_id=ctx.project_id, compute_in_sql=True):
+        expected = stored[row.id_feature]
+        if (row.roi_percent, row.ttv_weeks) != (expected.roi_percent, expected.ttv_weeks):
+            raise RuntimeError(
+                f"SQL ROI/TTV drifted from calc_roi/calc_ttv for {row.id_feature}: "
+                f"{(row.roi_percent, row.ttv_weeks)} != {(expected.roi_percent, expected.ttv_weeks)}"
+            )
+
+
+def bench_calculate_vectr_scores(ctx):
+    from app.utils.calculations import calculate_vectr_scores
+    project = ctx.project
+    calculate_vectr_scores(
+        ctx.features,
+        (project.ttm_low_limit, project.ttm_high_limit),
+        (project.ttbv_low_limit, project.ttbv_high_limit),
+    )
+
+
+def bench_detect_outliers(ctx):
+    from app.utils.outliers import detect_vectr_outliers_and_tag
+    ctx.ensure_scored()
+    detect_vectr_outliers_and_tag(ctx.features)
+
+
+def bench_optimize_roadmap(ctx):
+    from app.utils.knapsack_optimizer import optimize_roadmap
+    ctx.ensure_scored()
+    optimize_roadmap(ctx.roadmap, ctx.features, alpha=0.5)
+
+
+def bench_prepare_chart_data(ctx):
+    from app.utils.form_helpers import prepare_vectr_chart_data
+    prepare_vectr_chart_data(ctx.project, ctx.features)
+
+
+def route_case(url_of):
+    """Case die een GET via de test client doet; faalt luid bij een foute status."""
+    def run(ctx):
+        url = url_of(ctx)
+        response = ctx.client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        response.get_data()
+    return run
+
+
+# naam -> (functie, max_features); None = geen grens
+CASES = {
+    "load_features": (bench_load_features, None),
+    "load_scoring_rows": (bench_load_scoring_rows, None),
+    "sql_roi_ttv_parity": (bench_sql_roi_ttv_parity, None),
+    "calculate_vectr_scores": (bench_calculate_vectr_scores, None),
+    "detect_vectr_outliers_and_tag": (bench_detect_outliers, None),
+    "optimize_roadmap": (bench_optimize_roadmap, 10000),
+    "prepare_vectr_chart_data": (bench_prepare_chart_data, None),
+    "route:vectr_chart_pdf": (route_case(lambda c: f"/projects/{c.project_id}/vectr-chart/pdf"), 10000),
+    "route:view_features": (route_case(lambda c: f"/projects/{c.project_id}/features"), 10000),
+    "route:vectr_chart": (route_case(lambda c: f"/projects/{c.project_id}/vectr-chart"), None),
+    "route:vectr_chart_data": (route_case(lambda c: f"/projects/{c.project_id}/vectr-chart/data"), None),
+    "route:roadmap_overview": (route_case(lambda c: f"/roadmap/{c.project_id}"), None),
+    "route:roadmap_optimize": (route_case(lambda c: f"/roadmap/optimize/{c.roadmap_id}"), 10000),
+    "route:dashboard": (route_case(lambda c: "/dashboard"), None),
+    "route:chat_messages": (route_case(lambda c: f"/chat/project/{c.project_id}/messages"), None),
+    "route:search": (route_case(lambda c: "/search?q=synthetic+feature"), None),
+}
+
+
+def time_case(func, ctx, repeat):
+    timings = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        func(ctx)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# -----------------------------------
+# BASELINE
+# -----------------------------------
+
+def result_key(case, size):
+    return f"{case}@{size}"
+
+
+def load_baseline(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Lijst van (key, baseline, huidig, ratio) voor cases die meer dan `threshold` trager werden."""
+    regressions = []
+    previous = (baseline or {}).get("results", {})
+    for key, current in results.items():
+        old = previous.get(key)
+        if not old or current.get("median") is None or old.get("median") is None:
+            continue
+        ratio = current["median"] / old["median"] if old["median"] > 0 else float("inf")
+        if ratio > 1.0 + threshold and current["median"] - old["median"] > min_delta:
+            regressions.append((key, old["median"], current["median"], ratio))
+    return regressions
+
+
+def write_json(path, payload):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+# -----------------------------------
+# MAIN
+# -----------------------------------
+
+def run(args):
+    configure_environment(args)
+
+    from app import create_app, db
+    from benchmarks.synthetic import generate_project
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    selected = args.cases or list(CASES)
+    unknown = [name for name in selected if name not in CASES]
+    if unknown:
+        raise SystemExit(f"Unknown case(s): {', '.join(unknown)}")
+
+    results = {}
+    for size in sorted(args.sizes):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            ids = generate_project(size, seed=args.seed)
+            print(f"\n== {size} features (generated in {time.perf_counter() - start:.1f}s: {ids['counts']})")
+
+            client = app.test_client()
+            login = client.post("/login", data={"email": ids["login_email"], "password": ids["login_password"]})
+            if login.status_code not in (200, 302):
+                raise RuntimeError(f"Login failed with status {login.status_code}")
+
+            ctx = BenchContext(app, client, ids)
+            ctx.load()
+            for name in selected:
+                func, max_features = CASES[name]
+                key = result_key(name, size)
+                if max_features is not None and size > max_features and not args.no_limits:
+                    results[key] = {"median": None, "skipped": f"limited to {max_features} features"}
+                    print(f"  {name:<32} skipped (limited to {max_features} features)")
+                    continue
+                timings = time_case(func, ctx, args.repeat)
+                results[key] = {"median": statistics.median(timings), "min": min(timings), "runs": len(timings)}
+                print(f"  {name:<32} median {results[key]['median']:9.4f}s   min {results[key]['min']:9.4f}s")
+            db.session.remove()
+
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    if args.output:
+        write_json(args.output, payload)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+
+    if args.update_baseline:
+        # Bestaande cases/groottes die nu niet gedraaid werden blijven in de baseline staan
+        merged = dict((baseline or {}).get("results", {}))
+        merged.update({k: v for k, v in results.items() if v.get("median") is not None})
+        write_json(args.baseline, dict(payload, results=merged))
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for key, old, new, ratio in regressions:
+            print(f"  {key:<40} {old:9.4f}s -> {new:9.4f}s  ({ratio:.2f}x)")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,255 @@
+# benchmarks/synthetic.py
+# Deterministische synthetische data voor de benchmarks.
+#
+# - Zelfde seed + zelfde grootte -> exact dezelfde database (ook de UUID's).
+# - Verdelingen benaderen echte projecten: lognormale bedragen en uren, veel features zonder
+#   churn/kostenbesparing, weinig evidence per feature, een paar stemmen per feature,
+#   een handvol roadmaps met milestones en een chatgeschiedenis.
+# - Alles wordt in bulk ingevoegd (executemany via Core insert): 10^5 features blijft haalbaar.
+#   De zoekindex wordt daarna in één keer opgebouwd (rebuild_search_index).
+import datetime
+import random
+import uuid
+import numpy as np
+from sqlalchemy import insert
+from app import db
+from app.models import (
+    CONFIDENCE_LEVELS, Company, Profile, Project, Features_ideas, Evidence, Decision,
+    FeatureDecisionTally, Roadmap, Milestone, MilestoneFeature, ProjectChatMessage,
+)
+from app.utils.calculations import calc_roi, calc_ttv
+from app.utils.search import rebuild_search_index
+
+BENCH_PASSWORD = "benchmark"
+PROFILE_ROLES = ("Founder", "PM", "PM", "Developer", "Developer", "Developer", "Developer", "Developer")
+EVIDENCE_TYPES = ("Interview", "A/B Test", "Market Analysis", "Survey", "Usage Data")
+DECISION_TYPES = ("Approved", "Rejected", "Pending")
+DECISION_WEIGHTS = (0.45, 0.25, 0.30)
+MILESTONE_STATUSES = ("Planned", "In Progress", "Done")
+
+ROADMAPS_PER_PROJECT = 3
+MILESTONES_PER_ROADMAP = 4
+MILESTONE_LINK_SHARE = 0.10                                     # aandeel features dat aan een milestone hangt
+CHAT_MESSAGES_PER_FEATURE = 0.05
+CHUNK = 5000                                                    # rijen per executemany
+
+# Confidence: vooral lage/middelmatige niveaus, weinig launch data
+CONFIDENCE_WEIGHTS = (0.02, 0.10, 0.10, 0.12, 0.12, 0.16, 0.14, 0.10, 0.08, 0.04, 0.02)
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[start:start + CHUNK])
+
+
+def _lognormal(rng, median, sigma, size):
+    return rng.lognormal(np.log(median), sigma, size)
+
+
+def _sometimes(rng, share, values):
+    """Zet (1 - share) van de waarden op 0: de meeste features hebben geen churn/besparing/opex."""
+    return np.where(rng.random(len(values)) < share, values, 0.0)
+
+
+def generate_features(rng, ids, project_id):
+    """Feature-rijen (dicts) met roi_percent en ttv_weeks al ingevuld, zoals add_feature ze bewaart."""
+    n = len(ids)
+    extra_revenue = _lognormal(rng, 20000, 1.0, n)
+    churn_reduction = _sometimes(rng, 0.35, _lognormal(rng, 5000, 1.0, n))
+    cost_savings = _sometimes(rng, 0.30, _lognormal(rng, 4000, 1.0, n))
+    investment_hours = np.clip(_lognormal(rng, 80, 0.9, n), 4, 2000)
+    hourly_rate = rng.choice((45, 60, 75, 90, 110), size=n)
+    opex = _sometimes(rng, 0.40, _lognormal(rng, 1500, 0.8, n))
+    other_costs = _sometimes(rng, 0.25, _lognormal(rng, 1000, 0.8, n))
+    horizon = rng.choice((3, 6, 12, 24), size=n, p=(0.15, 0.30, 0.40, 0.15))
+    ttm_weeks = np.clip(np.rint(rng.triangular(1, 3, 12, n)), 1, 12)
+    ttbv_weeks = np.clip(np.rint(rng.triangular(1, 4, 12, n)), 1, 12)
+    levels = [value for value, _label in CONFIDENCE_LEVELS]
+    quality_score = rng.choice(levels, size=n, p=CONFIDENCE_WEIGHTS)
+
+    rows = []
+    for i, id_feature in enumerate(ids):
+        row = {
+            "id_feature": id_feature,
+            "id_project": project_id,
+            "name_feature": f"Feature {i + 1:06d}",
+            "description": f"Synthetic feature {i + 1}",
+            "horizon": int(horizon[i]),
+            "extra_revenue": int(extra_revenue[i]),
+            "churn_reduction": int(churn_reduction[i]),
+            "cost_savings": int(cost_savings[i]),
+            "investment_hours": int(investment_hours[i]),
+            "hourly_rate": int(hourly_rate[i]),
+            "opex": int(opex[i]),
+            "other_costs": int(other_costs[i]),
+            "ttm_weeks": int(ttm_weeks[i]),
+            "ttbv_weeks": int(ttbv_weeks[i]),
+            "quality_score": float(quality_score[i]),
+            "warning_dismissed": False,
+        }
+        row["roi_percent"] = calc_roi(
+            row["extra_revenue"], row["churn_reduction"], row["cost_savings"],
+            row["investment_hours"], row["hourly_rate"], row["opex"], row["other_costs"],
+        )
+        row["ttv_weeks"] = calc_ttv(row["ttm_weeks"], row["ttbv_weeks"])
+        rows.append(row)
+    return rows
+
+
+def generate_project(n_features, seed=0, n_profiles=len(PROFILE_ROLES)):
+    """
+    Vult de (lege) database met één bedrijf en één project van `n_features` features.
+    :return: dict met de ids die de benchmarks nodig hebben (project, roadmaps, login)
+    """
+    rng = np.random.default_rng(seed)
+    ids = random.Random(seed)
+
+    def new_uuid():
+        return str(uuid.UUID(int=ids.getrandbits(128), version=4))
+
+    base_date = datetime.date(2026, 1, 1)
+    base_time = datetime.datetime(2026, 1, 1, 9, 0)
+
+    company = Company(company_name=f"Benchmark Company {n_features}")
+    db.session.add(company)
+    db.session.flush()
+
+    profiles = []
+    for i in range(n_profiles):
+        profile = Profile(
+            name=f"Bench User {i + 1}",
+            email=f"bench{i + 1}@example.com",
+            role=PROFILE_ROLES[i % len(PROFILE_ROLES)],
+            id_company=company.id_company,
+        )
+        profile.set_password(BENCH_PASSWORD)
+        profiles.append(profile)
+    db.session.add_all(profiles)
+
+    project = Project(
+        project_name=f"Benchmark Project {n_features}",
+        id_company=company.id_company,
+        ttm_low_limit=1,
+        ttm_high_limit=12,
+        ttbv_low_limit=1,
+        ttbv_high_limit=12,
+    )
+    db.session.add(project)
+    db.session.flush()
+    profile_ids = [p.id_profile for p in profiles]
+
+    # 1) Features
+    feature_ids = [new_uuid() for _ in range(n_features)]
+    features = generate_features(rng, feature_ids, project.id_project)
+    _insert(Features_ideas, features)
+
+    # 2) Evidence: Poisson(1.2) per feature, confidence rond het huidige niveau
+    levels = [value for value, _label in CONFIDENCE_LEVELS]
+    evidence_counts = rng.poisson(1.2, n_features)
+    evidence = []
+    for f, count in zip(features, evidence_counts):
+        previous = 0.0
+        for k in range(int(count)):
+            new_conf = float(rng.choice(levels, p=CONFIDENCE_WEIGHTS))
+            evidence.append({
+                "id_feature": f["id_feature"],
+                "title": f"Evidence {k + 1} for {f['name_feature']}",
+                "type": EVIDENCE_TYPES[int(rng.integers(len(EVIDENCE_TYPES)))],
+                "source": "synthetic",
+                "description": "Generated for benchmarking.",
+                "old_confidence": previous,
+                "new_confidence": new_conf,
+            })
+            previous = new_conf
+    _insert(Evidence, evidence)
+
+    # 3) Decisions: elke profiel stemt op ~35% van de features; tally in dezelfde pass
+    decisions, tallies = [], []
+    vote_mask = rng.random((n_features, len(profile_ids))) < 0.35
+    vote_types = rng.choice(len(DECISION_TYPES), size=vote_mask.shape, p=DECISION_WEIGHTS)
+    for i, f in enumerate(features):
+        counts = [0, 0, 0]
+        for j in np.flatnonzero(vote_mask[i]):
+            kind = int(vote_types[i, j])
+            counts[kind] += 1
+            decisions.append({
+                "id_feature": f["id_feature"],
+                "id_profile": profile_ids[j],
+                "decision_type": DECISION_TYPES[kind],
+                "createdat": base_time + datetime.timedelta(minutes=i),
+            })
+        if any(counts):
+            tallies.append({
+                "id_feature": f["id_feature"], "approved": counts[0], "rejected": counts[1], "pending": counts[2],
+            })
+    _insert(Decision, decisions)
+    _insert(FeatureDecisionTally, tallies)
+
+    # 4) Roadmaps (kwartalen) met milestones; ~10% van de features hangt aan een milestone
+    #    Capaciteit ~ 5% van de totale uren/kosten: de optimizer moet echt kiezen
+    total_hours = float(sum(f["investment_hours"] for f in features))
+    total_cost = float(sum(f["investment_hours"] * f["hourly_rate"] + f["opex"] + f["other_costs"] for f in features))
+    roadmap_ids, milestone_ids = [], []
+    for r in range(ROADMAPS_PER_PROJECT):
+        start = base_date + datetime.timedelta(days=91 * r)
+        roadmap = Roadmap(
+            id_project=project.id_project,
+            start_roadmap=start,
+            end_roadmap=start + datetime.timedelta(days=90),
+            time_capacity=max(int(total_hours * 0.05), 40),
+            budget_allocation=max(int(total_cost * 0.05), 5000),
+        )
+        db.session.add(roadmap)
+        db.session.flush()
+        roadmap_ids.append(roadmap.id_roadmap)
+        for m in range(MILESTONES_PER_ROADMAP):
+            milestone = Milestone(
+                id_roadmap=roadmap.id_roadmap,
+                name=f"Milestone {r + 1}.{m + 1}",
+                start_date=start + datetime.timedelta(days=22 * m),
+                end_date=start + datetime.timedelta(days=22 * m + 21),
+                goal="Synthetic milestone",
+                status=MILESTONE_STATUSES[min(m, len(MILESTONE_STATUSES) - 1)],
+            )
+            db.session.add(milestone)
+            db.session.flush()
+            milestone_ids.append(milestone.id_milestone)
+
+    linked = rng.random(n_features) < MILESTONE_LINK_SHARE
+    targets = rng.integers(len(milestone_ids), size=n_features)
+    _insert(MilestoneFeature, [
+        {"id_milestone": milestone_ids[int(targets[i])], "id_feature": features[i]["id_feature"]}
+        for i in np.flatnonzero(linked)
+    ])
+
+    # 5) Chatberichten
+    n_messages = max(10, int(n_features * CHAT_MESSAGES_PER_FEATURE))
+    senders = rng.integers(len(profile_ids), size=n_messages)
+    _insert(ProjectChatMessage, [
+        {
+            "id_project": project.id_project,
+            "id_profile": profile_ids[int(senders[k])],
+            "content": f"Synthetic message {k + 1}",
+            "createdat": base_time + datetime.timedelta(minutes=7 * k),
+        }
+        for k in range(n_messages)
+    ])
+
+    db.session.commit()
+
+    # 6) Zoekindex: de Core inserts hierboven passeren de flush-listener niet
+    n_documents = rebuild_search_index(company_id=company.id_company)
+    return {
+        "project_id": project.id_project,
+        "roadmap_ids": roadmap_ids,
+        "login_email": profiles[0].email,
+        "login_password": BENCH_PASSWORD,
+        "counts": {
+            "features": n_features,
+            "evidence": len(evidence),
+            "decisions": len(decisions),
+            "milestone_links": int(linked.sum()),
+            "chat_messages": n_messages,
+            "search_documents": n_documents,
+        },
+    }
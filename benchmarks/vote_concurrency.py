@@ -0,0 +1,190 @@
+# benchmarks/vote_concurrency.py
+# Concurrency-check voor de stemmen: veel threads stemmen tegelijk op DEZELFDE feature en daarna
+# moet de gematerialiseerde telling (FeatureDecisionTally) exact gelijk zijn aan
+# SELECT decision_type, COUNT(*) FROM decision WHERE id_feature = ... GROUP BY decision_type.
+#
+#   python -m benchmarks.vote_concurrency --database-url postgresql://.../vectr_test
+#   python -m benchmarks.vote_concurrency --threads 16 --votes-per-thread 200 --voters 40
+#
+# - Enkel PostgreSQL: de lock (SELECT ... FOR UPDATE) in cast_feature_decision is net wat getest wordt.
+# - Maakt een eigen company/project/feature/profielen aan (unieke namen) en ruimt die achteraf op.
+# - Elke thread heeft een eigen app context en dus een eigen session/connectie; een barrier laat
+#   alle threads tegelijk starten. Elke stem is één transactie (zoals in de vote-route).
+# - Exit code 1 bij een afwijkende telling of fouten.
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fire parallel votes on one feature and verify the vote tally.")
+    parser.add_argument("--database-url", default=None, help="PostgreSQL test database (default: DATABASE_URL).")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent voting threads.")
+    parser.add_argument("--votes-per-thread", type=int, default=100, help="Votes cast by each thread.")
+    parser.add_argument("--voters", type=int, default=20, help="Profiles that vote (threads share them).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the vote sequence.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated rows for inspection.")
+    return parser.parse_args(argv)
+
+
+# -----------------------------------
+# DATA
+# -----------------------------------
+
+def create_fixture(n_voters, seed):
+    """Company, project, één feature en `n_voters` profielen. :return: (feature-id, profiel-ids, ids om op te ruimen)"""
+    import numpy as np
+    from app import db
+    from app.models import Company, Features_ideas, Profile, Project
+    from benchmarks.synthetic import BENCH_PASSWORD, generate_features
+
+    tag = uuid.uuid4().hex[:8]
+    company = Company(company_name=f"Vote Concurrency {tag}")
+    db.session.add(company)
+    db.session.flush()
+
+    project = Project(
+        project_name=f"Vote Concurrency {tag}", id_company=company.id_company,
+        ttm_low_limit=1, ttm_high_limit=12, ttbv_low_limit=1, ttbv_high_limit=12,
+    )
+    profiles = []
+    for i in range(n_voters):
+        profile = Profile(
+            name=f"Voter {i + 1}", email=f"voter{i + 1}-{tag}@example.com", role="Developer",
+            id_company=company.id_company,
+        )
+        profile.set_password(BENCH_PASSWORD)
+        profiles.append(profile)
+    db.session.add(project)
+    db.session.add_all(profiles)
+    db.session.flush()
+
+    feature_id = str(uuid.uuid4())
+    feature = generate_features(np.random.default_rng(seed), [feature_id], project.id_project)[0]
+    db.session.add(Features_ideas(**feature))
+    db.session.commit()
+    return feature_id, [p.id_profile for p in profiles], (company.id_company, project.id_project)
+
+
+def drop_fixture(feature_id, profile_ids, owner_ids):
+    from sqlalchemy import delete
+    from app import db
+    from app.models import Company, Decision, FeatureDecisionTally, Features_ideas, Profile, Project
+
+    company_id, project_id = owner_ids
+    db.session.execute(delete(Decision).where(Decision.id_feature == feature_id))
+    db.session.execute(delete(FeatureDecisionTally).where(FeatureDecisionTally.id_feature == feature_id))
+    db.session.execute(delete(Features_ideas).where(Features_ideas.id_feature == feature_id))
+    db.session.execute(delete(Profile).where(Profile.id_profile.in_(profile_ids)))
+    db.session.execute(delete(Project).where(Project.id_project == project_id))
+    db.session.execute(delete(Company).where(Company.id_company == company_id))
+    db.session.commit()
+
+
+# -----------------------------------
+# STEMMEN
+# -----------------------------------
+
+def vote_worker(app, barrier, feature_id, profile_ids, n_votes, rng, errors):
+    from app import db
+    from app.utils.decisions import TALLY_COLUMNS, cast_feature_decision
+
+    decision_types = list(TALLY_COLUMNS)
+    with app.app_context():
+        barrier.wait()
+        for _ in range(n_votes):
+            try:
+                cast_feature_decision(feature_id, rng.choice(profile_ids), rng.choice(decision_types))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errors.append(repr(e))
+        db.session.remove()
+
+
+def read_counts(feature_id):
+    """(telling uit FeatureDecisionTally, COUNT(*) GROUP BY decision_type op decision)"""
+    from sqlalchemy import func, select
+    from app import db
+    from app.models import Decision, FeatureDecisionTally
+    from app.utils.decisions import TALLY_COLUMNS
+
+    db.session.expire_all()
+    tally = db.session.get(FeatureDecisionTally, feature_id)
+    materialized = {kind: getattr(tally, column) if tally else 0 for kind, column in TALLY_COLUMNS.items()}
+
+    grouped = dict(db.session.execute(
+        select(Decision.decision_type, func.count())
+        .where(Decision.id_feature == feature_id)
+        .group_by(Decision.decision_type)
+    ).all())
+    counted = {kind: grouped.get(kind, 0) for kind in TALLY_COLUMNS}
+    return materialized, counted
+
+
+# -----------------------------------
+# MAIN
+# -----------------------------------
+
+def run(args):
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    if not (os.environ.get("DATABASE_URL") or "").startswith("postgresql"):
+        raise SystemExit("A PostgreSQL database is required (--database-url or DATABASE_URL).")
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        feature_id, profile_ids, owner_ids = create_fixture(args.voters, args.seed)
+
+    errors = []
+    barrier = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(
+            target=vote_worker,
+            args=(app, barrier, feature_id, profile_ids, args.votes_per_thread, random.Random(args.seed + i), errors),
+        )
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        materialized, counted = read_counts(feature_id)
+        if not args.keep:
+            drop_fixture(feature_id, profile_ids, owner_ids)
+
+    total = args.threads * args.votes_per_thread
+    print(f"{total} votes by {args.threads} threads on feature {feature_id} in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} votes/s), {len(errors)} error(s)")
+    print(f"  tally:          {materialized}")
+    print(f"  COUNT GROUP BY: {counted}")
+    for error in errors[:10]:
+        print(f"  error: {error}")
+
+    if materialized != counted:
+        print("FAIL: the materialized tally drifted from the decision rows.")
+        return 1
+    if errors:
+        print("FAIL: some votes raised an error.")
+        return 1
+    if sum(counted.values()) > len(profile_ids):
+        print("FAIL: more decisions than voters (the upsert let a duplicate through).")
+        return 1
+    print("OK: tally matches the decision rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
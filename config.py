@@ -8,4 +8,66 @@ class Config:
     # Haal de waarden op via de namen die je in .env hebt gekozen
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Monte Carlo simulatie: grotere runs (in samples) worden over een process pool verdeeld
+    MONTE_CARLO_MAX_SAMPLES = int(os.getenv("MONTE_CARLO_MAX_SAMPLES", "100000"))
+    MONTE_CARLO_POOL_THRESHOLD = int(os.getenv("MONTE_CARLO_POOL_THRESHOLD", "20000"))
+    MONTE_CARLO_WORKERS = int(os.getenv("MONTE_CARLO_WORKERS", "4"))
+    MONTE_CARLO_EXACT_MAX_BYTES = int(os.getenv("MONTE_CARLO_EXACT_MAX_BYTES", str(256 * 1024 * 1024)))  # samples in geheugen; daarboven benaderde percentielen
+
+    # Load tests: zet het aantal SQL-queries per request in de header X-DB-Queries
+    QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER") == "1"
+
+    # ASGI-modus (asgi.py): async endpoints voor chat, live calc en feature-lijst
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")                          # leeg = afgeleid van DATABASE_URL
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))                 # threads voor de gewone (sync) routes
+    CHAT_LONG_POLL_SECONDS = int(os.getenv("CHAT_LONG_POLL_SECONDS", "25"))       # max. wachttijd van een chat-request
+    CHAT_WATCH_INTERVAL = float(os.getenv("CHAT_WATCH_INTERVAL", "1.0"))          # seconden tussen checks op nieuwe berichten
+
+    # Read replicas: komma-gescheiden URLs; GET-requests lezen daar (zie app/utils/db_routing.py)
+    SQLALCHEMY_REPLICA_URIS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))        # meer lag = replica overslaan
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))  # seconden tussen lag-metingen
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))         # read-your-writes na een POST
+
+    # VECTR chart: boven CHART_MAX_POINTS features in beeld worden ze per rastercel gebundeld
+    CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "400"))
+    CHART_GRID = int(os.getenv("CHART_GRID", "24"))                               # cellen per as
+    CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "128"))                  # gecachete antwoorden (per proces)
+
+    # Portfolio-rapport (PDF): projectpagina's worden over een process pool gerenderd
+    PDF_REPORT_WORKERS = int(os.getenv("PDF_REPORT_WORKERS", "4"))
+
+    # Full-text zoeken (/search): resultaten per pagina en max. aantal treffers dat gerankt wordt
+    SEARCH_PER_PAGE = int(os.getenv("SEARCH_PER_PAGE", "20"))
+    SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "5000"))
+
+    # Cache-invalidatie over workers heen (outbox + LISTEN/NOTIFY, zie app/utils/cache_bus.py)
+    CACHE_BUS_POLL_INTERVAL = float(os.getenv("CACHE_BUS_POLL_INTERVAL", "1.0"))         # zonder NOTIFY (SQLite): seconden tussen polls
+    CACHE_BUS_LISTEN_TIMEOUT = float(os.getenv("CACHE_BUS_LISTEN_TIMEOUT", "5.0"))       # PostgreSQL: vangnet-poll zonder NOTIFY
+    CACHE_BUS_GAP_SECONDS = float(os.getenv("CACHE_BUS_GAP_SECONDS", "30"))              # ontbrekend outbox-id = teruggedraaid na ...
+    CACHE_BUS_RETENTION_SECONDS = int(os.getenv("CACHE_BUS_RETENTION_SECONDS", "3600"))  # outbox-rijen bewaren
+    CACHE_BUS_CLEANUP_INTERVAL = int(os.getenv("CACHE_BUS_CLEANUP_INTERVAL", "300"))
+
+    # Verwijderen van projecten/profielen op de achtergrond (zie app/utils/purge.py)
+    PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "2000"))            # rijen per DELETE (= per transactie)
+    PURGE_STALE_SECONDS = int(os.getenv("PURGE_STALE_SECONDS", "120"))       # job zonder heartbeat -> overnemen
+    PURGE_SCAN_INTERVAL = int(os.getenv("PURGE_SCAN_INTERVAL", "60"))        # seconden tussen zoeken naar achtergebleven jobs
+
+    # Evidence-bijlagen: content-addressed op schijf (zie app/utils/attachments.py)
+    ATTACHMENT_ROOT = os.getenv("ATTACHMENT_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "attachments"))
+    ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(25 * 1024 * 1024)))          # per bestand
+    ATTACHMENT_QUOTA_BYTES = int(os.getenv("ATTACHMENT_QUOTA_BYTES", str(1024 * 1024 * 1024)))     # per company
+    ATTACHMENT_MAX_AGE = int(os.getenv("ATTACHMENT_MAX_AGE", str(365 * 24 * 3600)))                # browsercache (inhoud verandert nooit)
+    ATTACHMENT_GC_GRACE_SECONDS = int(os.getenv("ATTACHMENT_GC_GRACE_SECONDS", "3600"))            # recente bestanden niet opruimen
+
+    # Gestreamde pagina's (zie app/utils/streaming.py) en gecompileerde templates op schijf
+    STREAM_BUFFER_BYTES = int(os.getenv("STREAM_BUFFER_BYTES", "16384"))                          # tekens per write naar de client
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "jinja_cache"))  # leeg = uit
+
+    # Bewaarde optimalisatie-runs: enkel de recentste per roadmap blijven staan
+    OPTIMIZATION_RUNS_KEEP = int(os.getenv("OPTIMIZATION_RUNS_KEEP", "20"))
+
+    # JSON API: maximum aantal items per batch-request (zie app/api.py)
+    API_BATCH_MAX_ITEMS = int(os.getenv("API_BATCH_MAX_ITEMS", "1000"))
@@ -0,0 +1,35 @@
+"""Cache invalidation outbox
+
+Revision ID: a8d1e5f3c027
+Revises: f3a7c2d9e614
+Create Date: 2026-02-09 14:03:27.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d1e5f3c027'
+down_revision = 'f3a7c2d9e614'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Outbox: welke project-/company-caches door een commit verouderd zijn (zie app/utils/cache_bus.py)
+    op.create_table('cache_invalidation',
+    sa.Column('id_invalidation', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('scope', sa.String(length=10), nullable=False),
+    sa.Column('key', sa.Integer(), nullable=False),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id_invalidation'),
+    schema='public',
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_cache_invalidation_createdat', 'cache_invalidation', ['createdat'], unique=False, schema='public')
+
+
+def downgrade():
+    op.drop_index('ix_cache_invalidation_createdat', table_name='cache_invalidation', schema='public')
+    op.drop_table('cache_invalidation', schema='public')
@@ -0,0 +1,31 @@
+"""Index on evidence (id_feature, new_confidence) for incremental confidence
+
+Revision ID: b3c1d7e2f904
+Revises: a6b03e94a4b4
+Create Date: 2026-01-08 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c1d7e2f904'
+down_revision = 'a6b03e94a4b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Samengestelde index: SELECT max(new_confidence) WHERE id_feature = ... wordt een index-lookup
+    op.create_index(
+        'ix_evidence_feature_confidence',
+        'evidence',
+        ['id_feature', 'new_confidence'],
+        unique=False,
+        schema='public',
+    )
+
+
+def downgrade():
+    op.drop_index('ix_evidence_feature_confidence', table_name='evidence', schema='public')
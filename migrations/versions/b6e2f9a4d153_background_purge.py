@@ -0,0 +1,55 @@
+"""Soft delete + background purge of projects and profiles
+
+Revision ID: b6e2f9a4d153
+Revises: a8d1e5f3c027
+Create Date: 2026-02-11 10:22:41.906115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2f9a4d153'
+down_revision = 'a8d1e5f3c027'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # deleted_at gezet = verborgen, de rijen eronder worden op de achtergrond verwijderd (zie app/utils/purge.py)
+    with op.batch_alter_table('project', schema='public') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    with op.batch_alter_table('profile', schema='public') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.create_table('purge_job',
+    sa.Column('id_job', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('id_company', sa.Integer(), nullable=False),
+    sa.Column('label', sa.String(), nullable=True),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('step', sa.String(length=40), nullable=True),
+    sa.Column('total_rows', sa.Integer(), nullable=True),
+    sa.Column('deleted_rows', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['id_company'], ['public.company.id_company'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_job'),
+    schema='public'
+    )
+    op.create_index('ix_purge_job_company_status', 'purge_job', ['id_company', 'status'], unique=False, schema='public')
+
+
+def downgrade():
+    op.drop_index('ix_purge_job_company_status', table_name='purge_job', schema='public')
+    op.drop_table('purge_job', schema='public')
+
+    with op.batch_alter_table('profile', schema='public') as batch_op:
+        batch_op.drop_column('deleted_at')
+    with op.batch_alter_table('project', schema='public') as batch_op:
+        batch_op.drop_column('deleted_at')
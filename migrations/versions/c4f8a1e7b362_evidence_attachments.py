@@ -0,0 +1,57 @@
+"""Content-addressed evidence attachments + storage quota per company
+
+Revision ID: c4f8a1e7b362
+Revises: b6e2f9a4d153
+Create Date: 2026-02-13 09:41:18.224907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f8a1e7b362'
+down_revision = 'b6e2f9a4d153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bytes aan unieke bijlagen per company (zie app/utils/attachments.py)
+    with op.batch_alter_table('company', schema='public') as batch_op:
+        batch_op.add_column(sa.Column('storage_used_bytes', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Eén rij per unieke inhoud (SHA-256 = bestandsnaam op schijf)
+    op.create_table('attachment_blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('sha256'),
+    schema='public'
+    )
+    op.create_table('evidence_attachment',
+    sa.Column('id_attachment', sa.Integer(), nullable=False),
+    sa.Column('id_evidence', sa.Integer(), nullable=False),
+    sa.Column('id_company', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('mimetype', sa.String(), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['id_evidence'], ['public.evidence.id_evidence'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_company'], ['public.company.id_company'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sha256'], ['public.attachment_blob.sha256'], ),
+    sa.PrimaryKeyConstraint('id_attachment'),
+    sa.UniqueConstraint('id_evidence'),
+    schema='public'
+    )
+    op.create_index('ix_evidence_attachment_company_sha', 'evidence_attachment', ['id_company', 'sha256'], unique=False, schema='public')
+
+
+def downgrade():
+    op.drop_index('ix_evidence_attachment_company_sha', table_name='evidence_attachment', schema='public')
+    op.drop_table('evidence_attachment', schema='public')
+    op.drop_table('attachment_blob', schema='public')
+
+    with op.batch_alter_table('company', schema='public') as batch_op:
+        batch_op.drop_column('storage_used_bytes')
@@ -0,0 +1,46 @@
+"""Feature decision tally table
+
+Revision ID: c7e4a9b15d20
+Revises: b3c1d7e2f904
+Create Date: 2026-01-09 14:03:27.118942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e4a9b15d20'
+down_revision = 'b3c1d7e2f904'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 1. Gematerialiseerde stemtelling per feature
+    op.create_table('feature_decision_tally',
+    sa.Column('id_feature', sa.String(), nullable=False),
+    sa.Column('approved', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rejected', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('pending', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['id_feature'], ['public.features_ideas.id_feature'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_feature'),
+    schema='public'
+    )
+
+    # 2. Bestaande stemmen eenmalig tellen (backfill)
+    op.execute(
+        """
+        INSERT INTO public.feature_decision_tally (id_feature, approved, rejected, pending)
+        SELECT id_feature,
+               SUM(CASE WHEN decision_type = 'Approved' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN decision_type = 'Rejected' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN decision_type = 'Pending' THEN 1 ELSE 0 END)
+        FROM public.decision
+        GROUP BY id_feature
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('feature_decision_tally', schema='public')
@@ -0,0 +1,61 @@
+"""Optimization runs and roadmap feature pins
+
+Revision ID: d4a8f2c61e93
+Revises: c7e4a9b15d20
+Create Date: 2026-01-13 10:21:45.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8f2c61e93'
+down_revision = 'c7e4a9b15d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 1. Bewaarde optimalisatie-runs (cache op input-hash + basis voor warm starts)
+    op.create_table('optimization_run',
+    sa.Column('id_run', sa.Integer(), nullable=False),
+    sa.Column('id_roadmap', sa.Integer(), nullable=False),
+    sa.Column('id_profile', sa.Integer(), nullable=True),
+    sa.Column('input_hash', sa.String(length=64), nullable=False),
+    sa.Column('alpha', sa.Float(), nullable=False),
+    sa.Column('time_capacity', sa.Float(), nullable=True),
+    sa.Column('budget_allocation', sa.Float(), nullable=True),
+    sa.Column('feature_fingerprints', sa.JSON(), nullable=False),
+    sa.Column('selected_feature_ids', sa.JSON(), nullable=False),
+    sa.Column('must_include', sa.JSON(), nullable=False),
+    sa.Column('must_exclude', sa.JSON(), nullable=False),
+    sa.Column('objective_value', sa.Float(), nullable=False),
+    sa.Column('time_used', sa.Float(), nullable=False),
+    sa.Column('cost_used', sa.Float(), nullable=False),
+    sa.Column('solve_seconds', sa.Float(), nullable=False),
+    sa.Column('warm_started', sa.Boolean(), nullable=False),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['id_roadmap'], ['public.roadmap.id_roadmap'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_profile'], ['public.profile.id_profile'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id_run'),
+    schema='public'
+    )
+    op.create_index('ix_optimization_run_roadmap_hash', 'optimization_run', ['id_roadmap', 'input_hash'], unique=False, schema='public')
+
+    # 2. Must-include / must-exclude pins per roadmap
+    op.create_table('roadmap_feature_pin',
+    sa.Column('id_roadmap', sa.Integer(), nullable=False),
+    sa.Column('id_feature', sa.String(), nullable=False),
+    sa.Column('pin', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['id_roadmap'], ['public.roadmap.id_roadmap'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_feature'], ['public.features_ideas.id_feature'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_roadmap', 'id_feature'),
+    schema='public'
+    )
+
+
+def downgrade():
+    op.drop_table('roadmap_feature_pin', schema='public')
+    op.drop_index('ix_optimization_run_roadmap_hash', table_name='optimization_run', schema='public')
+    op.drop_table('optimization_run', schema='public')
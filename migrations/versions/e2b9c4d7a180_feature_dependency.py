@@ -0,0 +1,36 @@
+"""Feature dependency table
+
+Revision ID: e2b9c4d7a180
+Revises: d4a8f2c61e93
+Create Date: 2026-01-15 16:40:12.772301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b9c4d7a180'
+down_revision = 'd4a8f2c61e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Precedence tussen features: id_prerequisite moet gekozen zijn vóór id_feature
+    op.create_table('feature_dependency',
+    sa.Column('id_feature', sa.String(), nullable=False),
+    sa.Column('id_prerequisite', sa.String(), nullable=False),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint('id_feature <> id_prerequisite', name='ck_dependency_not_self'),
+    sa.ForeignKeyConstraint(['id_feature'], ['public.features_ideas.id_feature'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_prerequisite'], ['public.features_ideas.id_feature'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_feature', 'id_prerequisite'),
+    schema='public'
+    )
+    op.create_index('ix_feature_dependency_prerequisite', 'feature_dependency', ['id_prerequisite'], unique=False, schema='public')
+
+
+def downgrade():
+    op.drop_index('ix_feature_dependency_prerequisite', table_name='feature_dependency', schema='public')
+    op.drop_table('feature_dependency', schema='public')
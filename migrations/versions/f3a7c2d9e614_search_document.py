@@ -0,0 +1,112 @@
+"""Full-text search documents
+
+Revision ID: f3a7c2d9e614
+Revises: e2b9c4d7a180
+Create Date: 2026-02-02 10:12:44.120934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c2d9e614'
+down_revision = 'e2b9c4d7a180'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B')"
+)
+
+SQLITE_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS public.search_document_fts USING fts5("
+    "title, body, content='search_document', content_rowid='id_document')",
+    "CREATE TRIGGER public.search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id_document, new.title, new.body); END",
+    "CREATE TRIGGER public.search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+    "VALUES ('delete', old.id_document, old.title, old.body); END",
+    "CREATE TRIGGER public.search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, title, body) "
+    "VALUES ('delete', old.id_document, old.title, old.body); "
+    "INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id_document, new.title, new.body); END",
+)
+
+# Bestaande features, evidence en chatberichten indexeren
+BACKFILL_SQL = (
+    """
+    INSERT INTO public.search_document (kind, ref_id, id_company, id_project, id_feature, title, body, createdat)
+    SELECT 'feature', f.id_feature, p.id_company, f.id_project, f.id_feature, f.name_feature, f.description, f.createdat
+    FROM public.features_ideas f JOIN public.project p ON p.id_project = f.id_project
+    """,
+    """
+    INSERT INTO public.search_document (kind, ref_id, id_company, id_project, id_feature, id_evidence, title, body, createdat)
+    SELECT 'evidence', CAST(e.id_evidence AS VARCHAR), p.id_company, f.id_project, e.id_feature, e.id_evidence,
+           e.title, trim(coalesce(e.description, '') || ' ' || coalesce(e.source, '')), e.createdat
+    FROM public.evidence e
+    JOIN public.features_ideas f ON f.id_feature = e.id_feature
+    JOIN public.project p ON p.id_project = f.id_project
+    """,
+    """
+    INSERT INTO public.search_document (kind, ref_id, id_company, id_project, id_message, body, createdat)
+    SELECT 'chat', CAST(m.id_message AS VARCHAR), p.id_company, m.id_project, m.id_message, m.content, m.createdat
+    FROM public.project_chat_message m JOIN public.project p ON p.id_project = m.id_project
+    """,
+)
+
+
+def upgrade():
+    # Eén doorzoekbaar document per feature, evidence en chatbericht (zie app/utils/search.py)
+    op.create_table('search_document',
+    sa.Column('id_document', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('ref_id', sa.String(), nullable=False),
+    sa.Column('id_company', sa.Integer(), nullable=False),
+    sa.Column('id_project', sa.Integer(), nullable=False),
+    sa.Column('id_feature', sa.String(), nullable=True),
+    sa.Column('id_evidence', sa.Integer(), nullable=True),
+    sa.Column('id_message', sa.Integer(), nullable=True),
+    sa.Column('title', sa.Text(), nullable=True),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('createdat', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['id_company'], ['public.company.id_company'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_project'], ['public.project.id_project'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_feature'], ['public.features_ideas.id_feature'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_evidence'], ['public.evidence.id_evidence'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_message'], ['public.project_chat_message.id_message'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_document'),
+    sa.UniqueConstraint('kind', 'ref_id', name='uq_search_document_ref'),
+    schema='public'
+    )
+    op.create_index('ix_search_document_project', 'search_document', ['id_project'], unique=False, schema='public')
+    op.create_index('ix_search_document_feature', 'search_document', ['id_feature'], unique=False, schema='public')
+    op.create_index('ix_search_document_evidence', 'search_document', ['id_evidence'], unique=False, schema='public')
+    op.create_index('ix_search_document_message', 'search_document', ['id_message'], unique=False, schema='public')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Gegenereerde tsvector + GIN op (company, tsvector): zoeken blijft binnen één company
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+        op.execute(
+            'ALTER TABLE public.search_document ADD COLUMN search_vector tsvector '
+            f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED'
+        )
+        op.execute('CREATE INDEX ix_search_document_vector ON public.search_document USING gin (id_company, search_vector)')
+    else:
+        for statement in SQLITE_FTS_SQL:
+            op.execute(statement)
+
+    for statement in BACKFILL_SQL:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute('DROP TABLE IF EXISTS public.search_document_fts')
+    op.drop_index('ix_search_document_message', table_name='search_document', schema='public')
+    op.drop_index('ix_search_document_evidence', table_name='search_document', schema='public')
+    op.drop_index('ix_search_document_feature', table_name='search_document', schema='public')
+    op.drop_index('ix_search_document_project', table_name='search_document', schema='public')
+    op.drop_table('search_document', schema='public')